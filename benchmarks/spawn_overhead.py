@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Measures the overhead of spawning one process per input with `os.system("bash -c '... < file'")`, like the `run`
+command used to do, against the argv-based `run_process` backend.
+
+Usage: python benchmarks/spawn_overhead.py [--runs N] [--executable PATH]
+
+The executable defaults to `true`, so the result is the spawn overhead itself. Pass `--executable d8` inside the
+image to include the d8 startup.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# pylint: disable=wrong-import-position
+from docker_entrypoint._libs.executor import run_process  # noqa: E402
+
+
+def measure(func, runs: int):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=300, help='number of spawns per backend')
+    parser.add_argument('--executable', default='true', help='the program that is spawned')
+    arguments = parser.parse_args()
+
+    with tempfile.NamedTemporaryFile('w', suffix='.txt') as input_file:
+        input_file.write('1 2 3\n')
+        input_file.flush()
+
+        backends = {
+            'os.system (sh -> bash -> program)':
+                lambda: os.system(f"bash -c '{arguments.executable} < {input_file.name}'"),
+            'run_process (argv, stdin fd)':
+                lambda: run_process([arguments.executable], stdin_path=input_file.name),
+        }
+        medians = {}
+        for name, func in backends.items():
+            measure(func, 10)  # Warm-up
+            times = measure(func, arguments.runs)
+            medians[name] = statistics.median(times)
+            print(f"{name:40} median {medians[name] * 1e6:9.1f} us   "
+                  f"mean {statistics.mean(times) * 1e6:9.1f} us")
+
+    old, new = medians.values()
+    print(f"Overhead removed per input: {(old - new) * 1e6:.1f} us ({old / new:.2f}x faster)")
+
+
+if __name__ == '__main__':
+    main()
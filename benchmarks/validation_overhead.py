@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Measures the overhead per call of the parameter validation: `pylity`'s `validate_func_params`, the compiled
+validator of the entrypoint, and the compiled validator with the internal validation disabled
+(`D8_VALIDATION=boundary`). The decorated function is `convert_code_to_result`, with the same schema.
+
+Usage: python benchmarks/validation_overhead.py [--calls N]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# pylint: disable=wrong-import-position
+from on_rails import Result  # noqa: E402
+from pylity.decorators.validate_func_params import \
+    validate_func_params as pylity_validate_func_params  # noqa: E402
+from schema import And, Schema  # noqa: E402
+
+from docker_entrypoint._libs import validation  # noqa: E402
+
+SCHEMA = Schema({
+    'code': And(int, error='The code is required and must be an integer.'),
+})
+
+
+def convert_code_to_result(code: int) -> Result:
+    return Result.ok(code) if code == 0 else Result.fail()
+
+
+def measure(func, calls: int, repeats: int = 7):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(calls):
+            func(0)
+        times.append((time.perf_counter() - start) / calls)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--calls', type=int, default=20000, help='number of calls per measurement')
+    arguments = parser.parse_args()
+
+    variants = {
+        'undecorated': convert_code_to_result,
+        'pylity validate_func_params': pylity_validate_func_params(schema=SCHEMA)(convert_code_to_result),
+        'compiled validator': validation.validate_func_params(schema=SCHEMA)(convert_code_to_result),
+    }
+    skipped = validation.validate_func_params(schema=SCHEMA, internal=True)(convert_code_to_result)
+
+    medians = {}
+    for name, func in variants.items():
+        medians[name] = statistics.median(measure(func, arguments.calls))
+    validation.set_internal_validation(False)
+    medians['compiled, D8_VALIDATION=boundary'] = statistics.median(measure(skipped, arguments.calls))
+    validation.set_internal_validation(True)
+
+    baseline = medians['undecorated']
+    for name, median in medians.items():
+        print(f"{name:35} {median * 1e6:8.2f} us/call   overhead {(median - baseline) * 1e6:8.2f} us")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+from typing import Dict, List, Optional
+
+from schema import And, Or, Schema
+
+from docker_entrypoint._libs.validation import validate_func_params
+
+
+class BenchOptions:  # pylint: disable=R0902  # One attribute per option of the bench command.
+    """
+    The class `BenchOptions` groups the options that control how the `bench` command measures a program.
+    """
+
+    runs: int
+    warmup: int
+    # Fixes the seed of `Math.random` and the hash seeds of V8.
+    random_seed: Optional[int]
+    # Makes V8 behave deterministically, for example by disabling concurrent compilation and GC.
+    predictable: bool
+    # Disables address space layout randomization for the measured processes.
+    disable_aslr: bool
+    # The CPU that the measured processes are pinned to.
+    cpu: Optional[int]
+    # Measures the startup of d8 with an empty script and subtracts it from the results.
+    subtract_baseline: bool
+    # The named sets of d8 flags that are compared, in the order they are given. The first one is the reference.
+    variants: Dict[str, str]
+
+    @validate_func_params(schema=Schema({
+        'runs': And(int, lambda n: n > 0, error='The runs must be a positive integer.'),
+        'warmup': And(int, lambda n: n >= 0, error='The warmup must be a non-negative integer.'),
+        'random_seed': Or(None, int, error='The random_seed must be None or an integer.'),
+        'predictable': And(bool, error='The predictable must be a boolean.'),
+        'disable_aslr': And(bool, error='The disable_aslr must be a boolean.'),
+        'cpu': Or(None, And(int, lambda n: n >= 0), error='The cpu must be None or a non-negative integer.'),
+        'subtract_baseline': And(bool, error='The subtract_baseline must be a boolean.'),
+        'variants': Or(None, And(dict, lambda variants: all(isinstance(name, str) and name.strip() and
+                                                            isinstance(flags, str)
+                                                            for name, flags in variants.items())),
+                       error='The variants must be None or a dictionary of non-empty names to flags.'),
+    }), raise_exception=True)
+    def __init__(self, runs: int = 10, warmup: int = 2, random_seed: Optional[int] = None, predictable: bool = False,
+                 disable_aslr: bool = False, cpu: Optional[int] = None, subtract_baseline: bool = True,
+                 variants: Optional[Dict[str, str]] = None):
+        self.runs = runs
+        self.warmup = warmup
+        self.random_seed = random_seed
+        self.predictable = predictable
+        self.disable_aslr = disable_aslr
+        self.cpu = cpu
+        self.subtract_baseline = subtract_baseline
+        self.variants = variants or {}
+
+    def d8_flags(self) -> List[str]:
+        """
+        Returns the d8 flags that reduce the noise of the measurements.
+        """
+
+        flags = []
+        if self.random_seed is not None:
+            flags.append(f"--random-seed={self.random_seed}")
+        if self.predictable:
+            flags.append('--predictable')
+        return flags
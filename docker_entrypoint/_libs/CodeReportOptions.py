@@ -0,0 +1,45 @@
+from typing import Optional
+
+from schema import And, Or, Schema
+
+from docker_entrypoint._libs.bytecode_trace import CODE_REPORTS, CODE_SORT_KEYS
+from docker_entrypoint._libs.runner import get_available_cpus
+from docker_entrypoint._libs.validation import validate_func_params
+
+
+class CodeReportOptions:
+    """
+    The class `CodeReportOptions` groups the options that control how the `code-report` command traces the bytecode
+    and the compilations of a program and reports them.
+    """
+
+    jobs: int
+    # The number of functions in the table.
+    top: int
+    # One of CODE_SORT_KEYS: the column that sorts the table, or whose changes sort the diff.
+    sort: str
+    # table: the functions, sorted. json: all functions as JSON, which can be compared later.
+    report: str
+    # A JSON report of a previous trace. If it is given, the table shows the functions that changed since then.
+    diff: Optional[str]
+    # The file that the report is written to. If it is None, the table is logged, and the JSON is printed.
+    output: Optional[str]
+
+    @validate_func_params(schema=Schema({
+        'jobs': Or(None, And(int, lambda n: n > 0), error='The jobs must be None or a positive integer.'),
+        'top': And(int, lambda n: n > 0, error='The top must be a positive integer.'),
+        'sort': And(str, lambda name: name in CODE_SORT_KEYS,
+                    error=f"The sort must be one of {', '.join(CODE_SORT_KEYS)}."),
+        'report': And(str, lambda name: name in CODE_REPORTS,
+                      error=f"The report must be one of {', '.join(CODE_REPORTS)}."),
+        'diff': Or(None, And(str, str.strip), error='The diff must be None or a non-empty string.'),
+        'output': Or(None, And(str, str.strip), error='The output must be None or a non-empty string.'),
+    }), raise_exception=True)
+    def __init__(self, jobs: Optional[int] = None, top: int = 20, sort: str = 'bytecode', report: str = 'table',
+                 diff: Optional[str] = None, output: Optional[str] = None):
+        self.jobs = jobs if jobs is not None else get_available_cpus()
+        self.top = top
+        self.sort = sort
+        self.report = report
+        self.diff = diff
+        self.output = output
@@ -1,9 +1,10 @@
 import os
 
 from on_rails import Result, def_result
-from pylity.decorators.validate_func_params import validate_func_params
 from schema import And, Schema
 
+from docker_entrypoint._libs.validation import validate_func_params
+
 
 class DockerEnvironments:
     """
@@ -25,7 +26,7 @@ class DockerEnvironments:
         'vcs_url': And(str, len, error='The vcs_url is required string and can not be empty.'),
         'bug_report': And(str, len, error='The bug_report is required string and can not be empty.'),
         'docker_name': And(str, len, error='The docker_name is required string and can not be empty.'),
-    }), raise_exception=True)
+    }), raise_exception=True, internal=True)
     def __init__(self, maintainer: str, docker_version: str, build_date: str, vcs_url: str, bug_report: str,
                  docker_name: str):
         self.maintainer = maintainer
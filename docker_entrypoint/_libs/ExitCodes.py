@@ -29,3 +29,12 @@ class ExitCode:
 
     # Indicates that the program was compiled or executed on an incompatible machine architecture.
     INCORRECT_MACHINE_ARCHITECTURE = 7
+
+    # Indicates that a command was found but could not be executed, for example because of its permissions.
+    COMMAND_CANNOT_EXECUTE = 126
+
+    # Indicates that a command could not be found in the PATH.
+    COMMAND_NOT_FOUND = 127
+
+    # Indicates that a process was killed by a signal. The exit status is this value plus the signal number.
+    FATAL_ERROR_SIGNAL = 128
@@ -0,0 +1,31 @@
+from typing import Optional
+
+from schema import And, Or, Schema
+
+from docker_entrypoint._libs.gc_trace import GC_REPORTS
+from docker_entrypoint._libs.runner import get_available_cpus
+from docker_entrypoint._libs.validation import validate_func_params
+
+
+class GcReportOptions:
+    """
+    The class `GcReportOptions` groups the options that control how the `gc-report` command traces the collections
+    of a program and reports them.
+    """
+
+    jobs: int
+    # table: the pauses, the heap and the suggested flags. json: the same statistics as JSON.
+    report: str
+    # The file that the report is written to. If it is None, the table is logged, and the JSON is printed.
+    output: Optional[str]
+
+    @validate_func_params(schema=Schema({
+        'jobs': Or(None, And(int, lambda n: n > 0), error='The jobs must be None or a positive integer.'),
+        'report': And(str, lambda name: name in GC_REPORTS,
+                      error=f"The report must be one of {', '.join(GC_REPORTS)}."),
+        'output': Or(None, And(str, str.strip), error='The output must be None or a non-empty string.'),
+    }), raise_exception=True)
+    def __init__(self, jobs: Optional[int] = None, report: str = 'table', output: Optional[str] = None):
+        self.jobs = jobs if jobs is not None else get_available_cpus()
+        self.report = report
+        self.output = output
@@ -2,9 +2,10 @@ import logging
 from typing import Optional
 
 from on_rails import Result, def_result
-from pylity.decorators.validate_func_params import validate_func_params
 from schema import And, Or, Schema
 
+from docker_entrypoint._libs.validation import validate_func_params
+
 
 class Logger:
     """
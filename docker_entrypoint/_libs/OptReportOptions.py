@@ -0,0 +1,35 @@
+from typing import Optional
+
+from schema import And, Or, Schema
+
+from docker_entrypoint._libs.opt_trace import OPT_REPORTS
+from docker_entrypoint._libs.runner import get_available_cpus
+from docker_entrypoint._libs.validation import validate_func_params
+
+
+class OptReportOptions:
+    """
+    The class `OptReportOptions` groups the options that control how the `opt-report` command traces the
+    optimizations, the deopts and the inline caches of a program and reports them.
+    """
+
+    jobs: int
+    # The number of functions and of inline cache sites in the report.
+    top: int
+    # table: the deopts of the functions and the inline cache sites, ranked. json: the same as JSON.
+    report: str
+    # The file that the report is written to. If it is None, the table is logged, and the JSON is printed.
+    output: Optional[str]
+
+    @validate_func_params(schema=Schema({
+        'jobs': Or(None, And(int, lambda n: n > 0), error='The jobs must be None or a positive integer.'),
+        'top': And(int, lambda n: n > 0, error='The top must be a positive integer.'),
+        'report': And(str, lambda name: name in OPT_REPORTS,
+                      error=f"The report must be one of {', '.join(OPT_REPORTS)}."),
+        'output': Or(None, And(str, str.strip), error='The output must be None or a non-empty string.'),
+    }), raise_exception=True)
+    def __init__(self, jobs: Optional[int] = None, top: int = 20, report: str = 'table', output: Optional[str] = None):
+        self.jobs = jobs if jobs is not None else get_available_cpus()
+        self.top = top
+        self.report = report
+        self.output = output
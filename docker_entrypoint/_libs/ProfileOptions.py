@@ -0,0 +1,35 @@
+from typing import Optional
+
+from schema import And, Or, Schema
+
+from docker_entrypoint._libs.profiler import PROFILE_REPORTS
+from docker_entrypoint._libs.runner import get_available_cpus
+from docker_entrypoint._libs.validation import validate_func_params
+
+
+class ProfileOptions:
+    """
+    The class `ProfileOptions` groups the options that control how the `profile` command samples a program and
+    reports its ticks.
+    """
+
+    jobs: int
+    # The number of functions in the flat profile and in the bottom-up tree.
+    top: int
+    # table: the flat profile and the bottom-up tree. folded: the stacks for flame graphs. speedscope: a JSON profile.
+    report: str
+    # The file that the report is written to. If it is None, the table is logged, and the other reports are printed.
+    output: Optional[str]
+
+    @validate_func_params(schema=Schema({
+        'jobs': Or(None, And(int, lambda n: n > 0), error='The jobs must be None or a positive integer.'),
+        'top': And(int, lambda n: n > 0, error='The top must be a positive integer.'),
+        'report': And(str, lambda name: name in PROFILE_REPORTS,
+                      error=f"The report must be one of {', '.join(PROFILE_REPORTS)}."),
+        'output': Or(None, And(str, str.strip), error='The output must be None or a non-empty string.'),
+    }), raise_exception=True)
+    def __init__(self, jobs: Optional[int] = None, top: int = 20, report: str = 'table', output: Optional[str] = None):
+        self.jobs = jobs if jobs is not None else get_available_cpus()
+        self.top = top
+        self.report = report
+        self.output = output
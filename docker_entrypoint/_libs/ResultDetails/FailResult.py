@@ -2,9 +2,10 @@ from typing import Optional
 
 from on_rails import ErrorDetail
 from pylity import String
-from pylity.decorators.validate_func_params import validate_func_params
 from schema import And, Or, Schema
 
+from docker_entrypoint._libs.validation import validate_func_params
+
 
 class FailResult(ErrorDetail):
     """
@@ -16,7 +17,7 @@ class FailResult(ErrorDetail):
         'code': And(int, error='The code param is required and must be an integer.'),
         'message': Or(None, And(str, lambda s: len(s.strip()) > 0,
                                 error='The message must be None or non empty string')),
-    }), raise_exception=True)
+    }), raise_exception=True, internal=True)
     def __init__(self, code: int, message: Optional[str] = None):
         super().__init__(title=f"Operation failed with code {code}.",
                          code=code, message=message)
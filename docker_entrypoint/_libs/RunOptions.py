@@ -0,0 +1,103 @@
+from typing import List, Optional
+
+from schema import And, Or, Schema
+
+from docker_entrypoint._libs.executor import ResourceLimits
+from docker_entrypoint._libs.input_walker import DEFAULT_MAX_DEPTH
+from docker_entrypoint._libs.judge import COMPARATORS, DEFAULT_FLOAT_TOLERANCE
+from docker_entrypoint._libs.result_cache import DEFAULT_CACHE_SIZE
+from docker_entrypoint._libs.runner import get_available_cpus
+from docker_entrypoint._libs.stats import STATS_FORMATS
+from docker_entrypoint._libs.validation import validate_func_params
+
+
+class RunOptions:  # pylint: disable=R0902  # One attribute per option of the run command.
+    """
+    The class `RunOptions` groups the options that control how the `run` command executes the input files.
+    """
+
+    jobs: int
+    reuse_process: bool
+    # The directory that the outputs of each input are written to. If it is None, the outputs go to the terminal.
+    output_dir: Optional[str]
+    # Also streams the outputs that are written to `output_dir` to the terminal.
+    tee: bool
+    # The directory of the expected outputs. If it is set, the output of each input is judged.
+    expected_dir: Optional[str]
+    # The name of the comparator that judges the outputs: exact, whitespace or float.
+    comparator: str
+    float_tolerance: float
+    # If it is set, the resource usage of each input is printed after the run, as a table or as JSON.
+    stats: Optional[str]
+    # The limits of each input: the wall time and the CPU time in seconds, the memory and the size of each output in
+    # bytes. The limits that are None are not enforced.
+    limits: ResourceLimits
+    # The directory of the result cache. If it is None, every input is executed.
+    cache_dir: Optional[str]
+    # The size of the cache, in bytes, beyond which the least recently used results are evicted.
+    cache_size: int
+    # Executes every input and replaces its cached result.
+    refresh_cache: bool
+    # After the first run, keeps watching the program, the scripts it loads and the inputs, and runs them again.
+    watch: bool
+    # The globs that select the input files in the directories, and the depth of the files that are selected.
+    include: List[str]
+    exclude: List[str]
+    max_depth: int
+    # Runs the program as an ES module, from a bundle of its modules when the result cache is used.
+    module: bool
+
+    @validate_func_params(schema=Schema({
+        'jobs': Or(None, And(int, lambda n: n > 0), error='The jobs must be None or a positive integer.'),
+        'reuse_process': And(bool, error='The reuse_process must be a boolean.'),
+        'output_dir': Or(None, And(str, str.strip), error='The output_dir must be None or a non-empty string.'),
+        'tee': And(bool, error='The tee must be a boolean.'),
+        'expected_dir': Or(None, And(str, str.strip), error='The expected_dir must be None or a non-empty string.'),
+        'comparator': And(str, lambda name: name in COMPARATORS,
+                          error=f"The comparator must be one of {', '.join(COMPARATORS)}."),
+        'float_tolerance': And(Or(int, float), lambda n: n >= 0,
+                               error='The float_tolerance must be a non-negative number.'),
+        'stats': Or(None, lambda name: name in STATS_FORMATS,
+                    error=f"The stats must be None or one of {', '.join(STATS_FORMATS)}."),
+        'timeout': Or(None, And(Or(int, float), lambda n: n > 0),
+                      error='The timeout must be None or a positive number.'),
+        'memory_limit': Or(None, And(int, lambda n: n > 0),
+                           error='The memory_limit must be None or a positive integer.'),
+        'cpu_limit': Or(None, And(int, lambda n: n > 0), error='The cpu_limit must be None or a positive integer.'),
+        'max_output_bytes': Or(None, And(int, lambda n: n > 0),
+                               error='The max_output_bytes must be None or a positive integer.'),
+        'cache_dir': Or(None, And(str, str.strip), error='The cache_dir must be None or a non-empty string.'),
+        'cache_size': And(int, lambda n: n > 0, error='The cache_size must be a positive integer.'),
+        'refresh_cache': And(bool, error='The refresh_cache must be a boolean.'),
+        'watch': And(bool, error='The watch must be a boolean.'),
+        'include': Or(None, [And(str, str.strip)], error='The include must be None or a list of non-empty strings.'),
+        'exclude': Or(None, [And(str, str.strip)], error='The exclude must be None or a list of non-empty strings.'),
+        'max_depth': And(int, lambda n: n > 0, error='The max_depth must be a positive integer.'),
+        'module': And(bool, error='The module must be a boolean.'),
+    }), raise_exception=True)
+    def __init__(self, jobs: Optional[int] = None, reuse_process: bool = False,  # pylint: disable=R0914
+                 output_dir: Optional[str] = None, tee: bool = False, expected_dir: Optional[str] = None,
+                 comparator: str = 'exact', float_tolerance: float = DEFAULT_FLOAT_TOLERANCE,
+                 stats: Optional[str] = None, timeout: Optional[float] = None, memory_limit: Optional[int] = None,
+                 cpu_limit: Optional[int] = None, max_output_bytes: Optional[int] = None, cache_dir: Optional[str] = None,
+                 cache_size: int = DEFAULT_CACHE_SIZE, refresh_cache: bool = False, watch: bool = False,
+                 include: Optional[List[str]] = None, exclude: Optional[List[str]] = None,
+                 max_depth: int = DEFAULT_MAX_DEPTH, module: bool = False):
+        self.jobs = jobs if jobs is not None else get_available_cpus()
+        self.reuse_process = reuse_process
+        self.output_dir = output_dir
+        self.tee = tee
+        self.expected_dir = expected_dir
+        self.comparator = comparator
+        self.float_tolerance = float_tolerance
+        self.stats = stats
+        self.limits = ResourceLimits(timeout=timeout, memory=memory_limit, cpu_time=cpu_limit,
+                                     max_output_bytes=max_output_bytes)
+        self.cache_dir = cache_dir
+        self.cache_size = cache_size
+        self.refresh_cache = refresh_cache
+        self.watch = watch
+        self.include = include or []
+        self.exclude = exclude or []
+        self.max_depth = max_depth
+        self.module = module
@@ -0,0 +1,61 @@
+from typing import List, Optional
+
+from schema import And, Or, Schema
+
+from docker_entrypoint._libs.executor import ResourceLimits
+from docker_entrypoint._libs.runner import get_available_cpus
+from docker_entrypoint._libs.server import DEFAULT_QUEUE_SIZE
+from docker_entrypoint._libs.validation import validate_func_params
+
+
+class ServeOptions:
+    """
+    The class `ServeOptions` groups the options that control where the `serve` command accepts run requests and how
+    it executes them.
+    """
+
+    # The path of the Unix domain socket, and the port of the HTTP endpoint on 127.0.0.1. At least one of them is
+    # set to serve. The port 0 is replaced with a free port.
+    socket: Optional[str]
+    http_port: Optional[int]
+    # The number of requests that run at the same time, and the number of requests that wait for them. The other
+    # requests are refused.
+    jobs: int
+    queue_size: int
+    # Runs the programs in the warm workers of long-lived d8 processes. Preloading programs implies it.
+    reuse_process: bool
+    # The programs whose warm workers are started before the first request.
+    preload: List[str]
+    # The limits of each request: the wall time and the CPU time in seconds, the memory and the size of each output in
+    # bytes. A request can lower them. The limits that are None are not enforced.
+    limits: ResourceLimits
+
+    @validate_func_params(schema=Schema({
+        'socket': Or(None, And(str, str.strip), error='The socket must be None or a non-empty string.'),
+        'http_port': Or(None, And(int, lambda n: 0 <= n <= 65535),
+                        error='The http_port must be None or an integer from 0 to 65535.'),
+        'jobs': Or(None, And(int, lambda n: n > 0), error='The jobs must be None or a positive integer.'),
+        'queue_size': And(int, lambda n: n >= 0, error='The queue_size must be a non-negative integer.'),
+        'reuse_process': And(bool, error='The reuse_process must be a boolean.'),
+        'preload': Or(None, [And(str, str.strip)], error='The preload must be None or a list of non-empty strings.'),
+        'timeout': Or(None, And(Or(int, float), lambda n: n > 0),
+                      error='The timeout must be None or a positive number.'),
+        'memory_limit': Or(None, And(int, lambda n: n > 0),
+                           error='The memory_limit must be None or a positive integer.'),
+        'cpu_limit': Or(None, And(int, lambda n: n > 0), error='The cpu_limit must be None or a positive integer.'),
+        'max_output_bytes': Or(None, And(int, lambda n: n > 0),
+                               error='The max_output_bytes must be None or a positive integer.'),
+    }), raise_exception=True)
+    def __init__(self, socket: Optional[str] = None, http_port: Optional[int] = None, jobs: Optional[int] = None,
+                 queue_size: int = DEFAULT_QUEUE_SIZE, reuse_process: bool = False,
+                 preload: Optional[List[str]] = None, timeout: Optional[float] = None,
+                 memory_limit: Optional[int] = None, cpu_limit: Optional[int] = None,
+                 max_output_bytes: Optional[int] = None):
+        self.socket = socket
+        self.http_port = http_port
+        self.jobs = jobs if jobs is not None else get_available_cpus()
+        self.queue_size = queue_size
+        self.preload = preload or []
+        self.reuse_process = reuse_process or bool(self.preload)
+        self.limits = ResourceLimits(timeout=timeout, memory=memory_limit, cpu_time=cpu_limit,
+                                     max_output_bytes=max_output_bytes)
@@ -0,0 +1,147 @@
+import asyncio
+import os
+import shutil
+import time
+from typing import List, Optional, Union
+
+from schema import And, Or, Schema
+
+from docker_entrypoint._libs.executor import (LimitStatus, ProcessGroup,
+                                              ProcessResult, ResourceLimits,
+                                              ResourceUsage, build_d8_command,
+                                              exit_status)
+from docker_entrypoint._libs.ExitCodes import ExitCode
+from docker_entrypoint._libs.validation import validate_func_params
+
+_READ_CHUNK_SIZE = 64 * 1024
+
+
+@validate_func_params(schema=Schema({
+    'program': And(str, str.strip, error='The program must be a non-empty string.'),
+    'stdin': Or(None, bytes, str, error='The stdin must be None, bytes or a string.'),
+    'args': Or(None, [str], error='The args must be None or a list of strings.'),
+    'flags': Or(None, [str], error='The flags must be None or a list of strings.'),
+    'timeout': Or(None, And(Or(int, float), lambda n: not isinstance(n, bool) and n > 0),
+                  error='The timeout must be None or a positive number.'),
+    'memory_limit': Or(None, And(int, lambda n: n > 0), error='The memory_limit must be None or a positive integer.'),
+    'cpu_limit': Or(None, And(int, lambda n: n > 0), error='The cpu_limit must be None or a positive integer.'),
+    'max_output_bytes': Or(None, And(int, lambda n: n > 0),
+                           error='The max_output_bytes must be None or a positive integer.'),
+    'semaphore': Or(None, asyncio.Semaphore, error='The semaphore must be None or an asyncio.Semaphore.'),
+}), raise_exception=True)
+async def run_program(program: str, stdin: Union[bytes, str, None] = None,
+                      args: Optional[List[str]] = None, flags: Optional[List[str]] = None,
+                      timeout: Optional[float] = None, memory_limit: Optional[int] = None,
+                      cpu_limit: Optional[int] = None, max_output_bytes: Optional[int] = None,
+                      semaphore: Optional[asyncio.Semaphore] = None) -> ProcessResult:
+    """
+    Runs a javascript program with d8 in its own process group, without blocking the event loop, and returns its exit
+    status, its outputs and its wall time. The group is killed when the program exits, when a limit is exceeded, or
+    when the coroutine is cancelled, so no process is left behind.
+
+    :param program: The path of the javascript program.
+    :type program: str
+
+    :param stdin: The input of the program. A string is encoded as UTF-8. Without it, the stdin is empty.
+    :type stdin: Union[bytes, str, None]
+
+    :param args: The arguments that are passed to d8 after the program.
+    :type args: Optional[List[str]]
+
+    :param flags: The V8 flags that are passed to d8 before the program.
+    :type flags: Optional[List[str]]
+
+    :param timeout: The wall time limit, in seconds.
+    :type timeout: Optional[float]
+
+    :param memory_limit: The memory limit (`RLIMIT_DATA`), in bytes.
+    :type memory_limit: Optional[int]
+
+    :param cpu_limit: The CPU time limit, in seconds.
+    :type cpu_limit: Optional[int]
+
+    :param max_output_bytes: The size limit of each of stdout and stderr, in bytes. The outputs are cut at the limit.
+    :type max_output_bytes: Optional[int]
+
+    :param semaphore: If it is given, the program waits for it before it is spawned, so a semaphore that is shared by
+    many calls limits the number of programs that run at the same time. The wall time does not include the wait.
+    :type semaphore: Optional[asyncio.Semaphore]
+
+    :raises ValueError: When a parameter is not valid. It is raised by the call, before the coroutine is awaited.
+    """
+
+    command = build_d8_command(program, args, flags)
+    data = stdin.encode() if isinstance(stdin, str) else stdin
+    # The timeout is enforced by the event loop instead of a timer thread of the process group.
+    limits = ResourceLimits(memory=memory_limit, cpu_time=cpu_limit, max_output_bytes=max_output_bytes)
+    if semaphore is None:
+        return await _run(command, data, timeout, limits)
+    async with semaphore:
+        return await _run(command, data, timeout, limits)
+
+
+async def _run(command: List[str], stdin: Optional[bytes], timeout: Optional[float],
+               limits: ResourceLimits) -> ProcessResult:
+    executable = shutil.which(command[0], path=os.environ.get('PATH', os.defpath))
+    if executable is None:
+        return ProcessResult(code=ExitCode.COMMAND_NOT_FOUND, stdout=b'',
+                             stderr=f"{command[0]}: command not found\n".encode())
+
+    start = time.perf_counter()
+    try:
+        process = await asyncio.create_subprocess_exec(
+            *command, executable=executable, stdin=asyncio.subprocess.PIPE if stdin else asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE, start_new_session=True)
+    except OSError as e:  # For example, permission denied or an invalid executable format.
+        return ProcessResult(code=ExitCode.COMMAND_CANNOT_EXECUTE, stdout=b'',
+                             stderr=f"{command[0]}: {e.strerror}\n".encode())
+
+    group = ProcessGroup(process.pid, limits)
+    timer = asyncio.get_running_loop().call_later(timeout, group.kill, LimitStatus.TIMEOUT) \
+        if timeout is not None else None
+    try:
+        _, stdout, stderr = await asyncio.gather(_write_input(process.stdin, stdin),
+                                                 _read_output(process.stdout, group),
+                                                 _read_output(process.stderr, group))
+    finally:
+        if timer is not None:
+            timer.cancel()
+        # The outputs are closed, or the coroutine is cancelled or reading failed. Either way, the group is killed
+        # before the process that leads it is waited for, so its id is still reserved and no descendant is left.
+        group.close()
+        returncode = await process.wait()
+    usage = ResourceUsage(wall_time=time.perf_counter() - start)
+    return ProcessResult(code=exit_status(returncode), stdout=stdout, stderr=stderr, usage=usage,
+                         limit=group.exceeded_limit(returncode))
+
+
+async def _write_input(stream: Optional[asyncio.StreamWriter], data: Optional[bytes]) -> None:
+    if stream is None:
+        return
+    try:
+        stream.write(data)
+        await stream.drain()
+    except (BrokenPipeError, ConnectionResetError):
+        pass  # The program exited without reading all of its input.
+    stream.close()
+    try:
+        # The error of the pipe is kept until it is waited for, and asyncio logs it otherwise.
+        await stream.wait_closed()
+    except (BrokenPipeError, ConnectionResetError):
+        pass
+
+
+async def _read_output(stream: asyncio.StreamReader, group: ProcessGroup) -> bytes:
+    max_bytes = group.limits.max_output_bytes
+    chunks = []
+    total = 0
+    while True:
+        chunk = await stream.read(_READ_CHUNK_SIZE)
+        if not chunk:
+            return b''.join(chunks)
+        total += len(chunk)
+        if max_bytes is not None and total > max_bytes:
+            chunks.append(chunk[:len(chunk) - (total - max_bytes)])
+            group.kill(LimitStatus.OUTPUT_LIMIT)
+            return b''.join(chunks)
+        chunks.append(chunk)
@@ -0,0 +1,167 @@
+import ctypes
+import logging
+import os
+import statistics
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+from docker_entrypoint._libs.bench_stats import (DEFAULT_CONFIDENCE,
+                                                 SIGNIFICANCE_LEVEL, Summary,
+                                                 mann_whitney_u)
+from docker_entrypoint._libs.executor import format_command, run_process
+
+# The personality flag of Linux that disables address space layout randomization for the programs that are
+# executed afterwards.
+_ADDR_NO_RANDOMIZE = 0x0040000
+_QUERY_PERSONALITY = 0xffffffff
+
+
+class BenchmarkError(Exception):
+    """
+    Raised when a measured process fails, because its timing would be meaningless.
+    """
+
+    code: int
+
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code = code
+
+
+class BenchTarget:
+    """
+    The class `BenchTarget` describes one command that is measured, and the inputs it is executed with in each run.
+    """
+
+    name: str
+    command: List[str]
+    # The stdin of each process of a run. None means an empty stdin.
+    inputs: List[Optional[str]]
+
+    def __init__(self, name: str, command: List[str], inputs: Optional[List[Optional[str]]] = None):
+        self.name = name
+        self.command = command
+        self.inputs = inputs or [None]
+
+
+def measure_once(target: BenchTarget) -> float:
+    """
+    Executes the command of the target once per input and returns the sum of their wall times, in seconds. The
+    outputs are discarded.
+
+    :raises BenchmarkError: If a process exits with a non-zero code.
+    """
+
+    total = 0.0
+    for file in target.inputs:
+        result = run_process(target.command, stdin_path=file or os.devnull, capture=True, stdout_path=os.devnull)
+        if result.code != 0:
+            lines = result.stderr.decode(errors='replace').strip().splitlines()
+            raise BenchmarkError(result.code, f"'{format_command(target.command, file)}' exited with code "
+                                              f"{result.code}." + (f" {lines[-1]}" if lines else ""))
+        total += result.usage.wall_time
+    return total
+
+
+def collect_samples(targets: List[BenchTarget], runs: int, warmup: int,
+                    logger: Optional[logging.Logger] = None) -> Dict[str, List[float]]:
+    """
+    Measures the targets `warmup + runs` times and returns the samples of the last `runs` times per target.
+
+    The targets are interleaved, and the order rotates in each round, so slow drifts of the machine (heat, background
+    load) affect all of them alike instead of the one that would run last.
+    """
+
+    samples: Dict[str, List[float]] = {target.name: [] for target in targets}
+    for iteration in range(warmup + runs):
+        shift = iteration % len(targets)
+        for target in targets[shift:] + targets[:shift]:
+            elapsed = measure_once(target)
+            if logger:
+                label = f"warm-up {iteration + 1}" if iteration < warmup else f"run {iteration - warmup + 1}"
+                logger.debug(f"{target.name} {label}: {format_duration(elapsed)}")
+            if iteration >= warmup:
+                samples[target.name].append(elapsed)
+    return samples
+
+
+@contextmanager
+def noise_controls(logger: logging.Logger, cpu: Optional[int] = None, disable_aslr: bool = False) -> Iterator[None]:
+    """
+    Pins this process to a CPU and disables address space layout randomization while the context is active. Both
+    settings are inherited by the processes that are spawned in the meantime.
+
+    :raises BenchmarkError: If the CPU can not be used.
+    """
+
+    original_cpus = os.sched_getaffinity(0)
+    original_personality = None
+    try:
+        if cpu is not None:
+            try:
+                os.sched_setaffinity(0, {cpu})
+            except OSError as e:
+                raise BenchmarkError(1, f"Can not pin to CPU {cpu}: {e.strerror}.") from e
+            logger.debug(f"Pinned to CPU {cpu}.")
+        if disable_aslr:
+            original_personality = _disable_aslr(logger)
+        yield
+    finally:
+        if original_personality is not None:
+            _personality(original_personality)
+        os.sched_setaffinity(0, original_cpus)
+
+
+def format_duration(seconds: float) -> str:
+    """
+    Formats a duration in milliseconds.
+    """
+
+    return f"{seconds * 1000:.3f} ms"
+
+
+def format_summary(summary: Summary, confidence: float = DEFAULT_CONFIDENCE) -> str:
+    """
+    Formats the summary of the samples of a target, whose unit is seconds.
+    """
+
+    return f"median: {format_duration(summary.median)} ({confidence:.0%} CI {format_duration(summary.ci_low)} - " \
+           f"{format_duration(summary.ci_high)})\n" \
+           f"mean: {format_duration(summary.mean)} ± {format_duration(summary.stddev)} (stddev)\n" \
+           f"p95: {format_duration(summary.p95)}\n" \
+           f"samples: {summary.count} ({summary.outliers} outliers rejected)"
+
+
+def format_comparison(name: str, samples: List[float], reference_name: str, reference_samples: List[float]) -> str:
+    """
+    Compares the samples of a target with the samples of the reference target, by the ratio of their medians and the
+    Mann-Whitney U test.
+    """
+
+    median, reference_median = statistics.median(samples), statistics.median(reference_samples)
+    if median > 0 and reference_median > 0:
+        speedup = reference_median / median
+        change = f"{speedup:.3f}x faster" if speedup >= 1 else f"{1 / speedup:.3f}x slower"
+    else:
+        change = "speedup unknown"
+    u_statistic, p_value = mann_whitney_u(samples, reference_samples)
+    verdict = 'significant' if p_value < SIGNIFICANCE_LEVEL else 'not significant'
+    return f"{name} vs {reference_name}: {change} (median {format_duration(median)} vs " \
+           f"{format_duration(reference_median)}), Mann-Whitney U = {u_statistic:g}, p = {p_value:.4f} " \
+           f"({verdict} at {SIGNIFICANCE_LEVEL:g})"
+
+
+def _disable_aslr(logger: logging.Logger) -> Optional[int]:
+    current = _personality(_QUERY_PERSONALITY)
+    if current < 0 or _personality(current | _ADDR_NO_RANDOMIZE) < 0:
+        # The default seccomp profile of docker blocks this flag, unless the container runs with
+        # `--security-opt seccomp=unconfined`.
+        logger.warning(f"Can not disable ASLR: {os.strerror(ctypes.get_errno())}.")
+        return None
+    logger.debug("ASLR is disabled.")
+    return current
+
+
+def _personality(persona: int) -> int:
+    libc = ctypes.CDLL(None, use_errno=True)
+    return libc.personality(ctypes.c_ulong(persona))
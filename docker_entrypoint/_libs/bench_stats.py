@@ -0,0 +1,138 @@
+import math
+import random
+import statistics
+from typing import List, Sequence, Tuple
+
+DEFAULT_CONFIDENCE = 0.95
+DEFAULT_RESAMPLES = 2000
+# The significance level of the comparison of two samples.
+SIGNIFICANCE_LEVEL = 0.05
+
+
+class Summary:  # pylint: disable=R0902  # One attribute per statistic of the summary.
+    """
+    Summarizes the samples of a benchmark, after the outliers are rejected. The values have the unit of the samples.
+    """
+
+    count: int
+    # The number of samples that were rejected as outliers.
+    outliers: int
+    median: float
+    mean: float
+    stddev: float
+    p95: float
+    # The bootstrap confidence interval of the median.
+    ci_low: float
+    ci_high: float
+
+    def __init__(self, count: int, outliers: int, median: float, mean: float, stddev: float, p95: float,
+                 ci_low: float, ci_high: float):
+        self.count = count
+        self.outliers = outliers
+        self.median = median
+        self.mean = mean
+        self.stddev = stddev
+        self.p95 = p95
+        self.ci_low = ci_low
+        self.ci_high = ci_high
+
+
+def percentile(values: Sequence[float], fraction: float) -> float:
+    """
+    Returns the percentile of the values with linear interpolation between the closest ranks.
+
+    :param values: The values, sorted ascending. It can not be empty.
+    :type values: Sequence[float]
+
+    :param fraction: The percentile as a fraction between 0 and 1, for example 0.95 for p95.
+    :type fraction: float
+    """
+
+    position = (len(values) - 1) * fraction
+    lower = math.floor(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+def reject_outliers(samples: Sequence[float]) -> Tuple[List[float], List[float]]:
+    """
+    Splits the samples with Tukey's fences: the samples that are more than 1.5 interquartile ranges below the first
+    quartile or above the third quartile are outliers. Fewer than 4 samples are kept as they are.
+
+    :return: The kept samples and the outliers, both in their original order.
+    """
+
+    if len(samples) < 4:
+        return list(samples), []
+    ordered = sorted(samples)
+    first_quartile, third_quartile = percentile(ordered, 0.25), percentile(ordered, 0.75)
+    margin = 1.5 * (third_quartile - first_quartile)
+    low, high = first_quartile - margin, third_quartile + margin
+    kept = [sample for sample in samples if low <= sample <= high]
+    outliers = [sample for sample in samples if not low <= sample <= high]
+    return kept, outliers
+
+
+def bootstrap_ci(samples: Sequence[float], confidence: float = DEFAULT_CONFIDENCE,
+                 resamples: int = DEFAULT_RESAMPLES, seed: int = 0) -> Tuple[float, float]:
+    """
+    Estimates the confidence interval of the median with the percentile bootstrap. The random generator is seeded,
+    so the same samples always give the same interval.
+    """
+
+    generator = random.Random(seed)
+    medians = sorted(statistics.median(generator.choices(samples, k=len(samples))) for _ in range(resamples))
+    tail = (1 - confidence) / 2
+    return percentile(medians, tail), percentile(medians, 1 - tail)
+
+
+def summarize(samples: Sequence[float], confidence: float = DEFAULT_CONFIDENCE) -> Summary:
+    """
+    Rejects the outliers of the samples and summarizes the rest.
+
+    :param samples: The measured values. It can not be empty.
+    :type samples: Sequence[float]
+
+    :param confidence: The confidence level of the interval of the median.
+    :type confidence: float
+    """
+
+    kept, outliers = reject_outliers(samples)
+    ordered = sorted(kept)
+    ci_low, ci_high = bootstrap_ci(kept, confidence)
+    return Summary(count=len(kept), outliers=len(outliers), median=statistics.median(ordered),
+                   mean=statistics.mean(ordered), stddev=statistics.stdev(ordered) if len(ordered) > 1 else 0.0,
+                   p95=percentile(ordered, 0.95), ci_low=ci_low, ci_high=ci_high)
+
+
+def mann_whitney_u(first: Sequence[float], second: Sequence[float]) -> Tuple[float, float]:
+    """
+    Compares two independent samples with the two-sided Mann-Whitney U test. It does not assume that the samples are
+    normally distributed, which timings rarely are. The p-value uses the normal approximation with a correction for
+    ties and continuity.
+
+    :return: The U statistic of the first sample and the p-value.
+    """
+
+    combined = sorted([(value, 0) for value in first] + [(value, 1) for value in second])
+    first_rank_sum = 0.0
+    tie_term = 0
+    start = 0
+    while start < len(combined):
+        end = start
+        while end + 1 < len(combined) and combined[end + 1][0] == combined[start][0]:
+            end += 1
+        # Tied values share the average of their ranks, which are 1-based.
+        average_rank = (start + end) / 2 + 1
+        first_rank_sum += average_rank * sum(1 for _, group in combined[start:end + 1] if group == 0)
+        tie_term += (end - start + 1) ** 3 - (end - start + 1)
+        start = end + 1
+
+    n1, n2 = len(first), len(second)
+    u_statistic = first_rank_sum - n1 * (n1 + 1) / 2
+    n = n1 + n2
+    variance = n1 * n2 / 12 * ((n + 1) - tie_term / (n * (n - 1)))
+    if variance <= 0:
+        return u_statistic, 1.0
+    z_score = max(abs(u_statistic - n1 * n2 / 2) - 0.5, 0) / math.sqrt(variance)
+    return u_statistic, math.erfc(z_score / math.sqrt(2))
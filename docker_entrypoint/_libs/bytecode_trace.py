@@ -0,0 +1,381 @@
+import json
+import re
+from collections import Counter
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from docker_entrypoint._libs.opt_trace import ANONYMOUS_FUNCTION
+from docker_entrypoint._libs.profiler import (split_log_fields,
+                                              unescape_log_field)
+
+CODE_REPORTS = ('table', 'json')
+CODE_SORT_KEYS = ('bytecode', 'registers', 'constants', 'parse', 'compile', 'name')
+
+# The name of the code of a script, outside of its functions.
+TOP_LEVEL_CODE = '(top-level)'
+
+# [generated bytecode for function: <name> (<address> <SharedFunctionInfo <name>>)]
+_BYTECODE_HEADER_PATTERN = re.compile(r'^\[generated bytecode for function: (?P<name>.*?) \(0x[0-9a-fA-F]+ <')
+_BYTECODE_FIELD_PATTERN = re.compile(
+    r'^(?:Bytecode length: (?P<length>\d+)|Register count (?P<registers>\d+)|Constant pool \(size = (?P<constants>\d+)\))')
+
+# The `--log-function-events` events: function,<event>,<script>,<start>,<end>,<time in ms>,<timestamp>,<name>
+# The parse events of the function itself. The other parse events, like 'parse-function', wrap them.
+_PARSE_EVENTS = ('preparse-no-resolution', 'preparse-resolution', 'full-parse', 'parse')
+# The compilations to bytecode, like 'interpreter-eval', and to baseline code. Each compilation to bytecode prints
+# its bytecode, in the same order.
+_BYTECODE_EVENT = 'interpreter'
+_COMPILE_EVENTS = (_BYTECODE_EVENT, 'baseline')
+# The functions that are compiled when they are first called, instead of with their script.
+_LAZY_EVENT = 'parse-function'
+
+# The fields of the reports, by their sort key.
+_SORT_FIELDS = {'bytecode': 'bytecode_length', 'registers': 'register_count', 'constants': 'constant_pool_size',
+                'parse': 'parse_ms', 'compile': 'compile_ms'}
+
+# A function of a run: (script, start, end, eval).
+_FunctionKey = Tuple[str, int, int, bool]
+
+
+class FunctionCode:  # pylint: disable=R0902  # One attribute per column of the code report.
+    """
+    The bytecode of a function and the time it took to parse and to compile it, added up over the runs. The times
+    are in milliseconds.
+    """
+
+    # The name of the function and its script, with a number if the script has several functions with this name.
+    key: str
+    name: str
+    script: str
+    start: int
+    # The size of the bytecode in bytes, and the sizes of its register file and its constant pool. They are None if
+    # the function was not compiled, or if its bytecode was not printed.
+    bytecode_length: Optional[int]
+    register_count: Optional[int]
+    constant_pool_size: Optional[int]
+    # 'lazy' if the function was compiled when it was first called, 'eager' if it was compiled with its script, or
+    # None if it was not compiled.
+    compilation: Optional[str]
+    # The parse time includes the preparsing of the function, when its outer function was parsed, so the parse times
+    # of the nested functions overlap.
+    parse_time: float
+    compile_time: float
+
+    def __init__(self, key: str, name: str, script: str, start: int):
+        self.key = key
+        self.name = name
+        self.script = script
+        self.start = start
+        self.bytecode_length = self.register_count = self.constant_pool_size = None
+        self.compilation = None
+        self.parse_time = self.compile_time = 0.0
+
+    def to_dict(self, runs: int) -> Dict:
+        """
+        Returns the function as a dictionary that can be serialized to JSON, with its times per run.
+        """
+
+        runs = max(1, runs)
+        return {'key': self.key, 'name': self.name, 'script': self.script, 'start': self.start,
+                'bytecode_length': self.bytecode_length, 'register_count': self.register_count,
+                'constant_pool_size': self.constant_pool_size, 'compilation': self.compilation,
+                'parse_ms': self.parse_time / runs, 'compile_ms': self.compile_time / runs}
+
+
+class _RunFunction:
+    # A function of one run, while its events are read.
+
+    def __init__(self):
+        self.name = ''
+        self.bytecode: Optional[Tuple[int, int, int]] = None
+        self.lazy = self.compiled = False
+        self.parse_time = self.compile_time = 0.0
+
+
+class CodeTrace:
+    """
+    The class `CodeTrace` joins the bytecode that d8 prints with `--print-bytecode` to the function events that it
+    logs with `--log-function-events`, per function, and adds up several runs. The functions of the runs are
+    matched by their name and their script.
+    """
+
+    functions: Dict[str, FunctionCode]
+    runs: int
+    # The number of bytecodes that were printed without a matching compilation event, like the bytecode of a run
+    # whose log is truncated.
+    unmatched: int
+
+    def __init__(self):
+        self.functions = {}
+        self.runs = 0
+        self.unmatched = 0
+
+    def add_run(self, bytecode_path: str, log_path: str) -> None:
+        """
+        Adds a run from the stdout of d8 with `--print-bytecode` and its log with `--log-function-events`.
+        """
+
+        with open(bytecode_path, encoding='utf-8', errors='replace') as bytecode_file, \
+                open(log_path, encoding='utf-8', errors='replace') as log_file:
+            self.add_run_lines(bytecode_file, log_file)
+
+    def add_run_lines(self, bytecode_lines: Iterable[str], log_lines: Iterable[str]) -> None:
+        """
+        Adds a run from the lines of its bytecode and of its log. The other lines, like the output of the program,
+        are ignored.
+        """
+
+        scripts, functions, compilations = _read_function_events(log_lines)
+        bytecodes = _read_bytecodes(bytecode_lines)
+        for (name, key), (bytecode_name, bytecode) in zip(compilations, bytecodes):
+            if name == bytecode_name:
+                functions[key].bytecode = bytecode
+            else:
+                self.unmatched += 1
+        self.unmatched += max(0, len(bytecodes) - len(compilations))
+
+        # The functions with the same name in a script are numbered in the order of their position.
+        numbers: Counter = Counter()
+        for key in sorted(functions, key=lambda key: (key[0], key[1], not key[3], key[2])):
+            self._add_function(key, functions[key], scripts.get(key[0]) or f"<script {key[0]}>", numbers)
+        self.runs += 1
+
+    def sorted_functions(self, sort: str = 'bytecode') -> List[Dict]:
+        """
+        Returns the functions as dictionaries, with their times per run, sorted by one of `CODE_SORT_KEYS`: by name,
+        or from the largest to the smallest value.
+        """
+
+        functions = [function.to_dict(self.runs) for function in self.functions.values()]
+        if sort == 'name':
+            functions.sort(key=lambda function: function['key'])
+        else:
+            functions.sort(key=lambda function: (-_value(function, sort), function['key']))
+        return functions
+
+    def to_dict(self) -> Dict:
+        """
+        Returns the runs and all functions, sorted by name, as a dictionary that can be serialized to JSON and
+        compared later with `load_code_report`.
+        """
+
+        return {'runs': self.runs, 'functions': self.sorted_functions('name')}
+
+    def _add_function(self, key: _FunctionKey, run_function: _RunFunction, script: str, numbers: Counter) -> None:
+        name = run_function.name or (TOP_LEVEL_CODE if key[1] == 0 or key[3] else ANONYMOUS_FUNCTION)
+        numbers[(name, script)] += 1
+        number = numbers[(name, script)]
+        full_name = f"{name} {script}" if number == 1 else f"{name} {script} #{number}"
+        function = self.functions.get(full_name)
+        if function is None:
+            function = self.functions[full_name] = FunctionCode(full_name, name, script, key[1])
+
+        if run_function.bytecode is not None:
+            function.bytecode_length, function.register_count, function.constant_pool_size = run_function.bytecode
+        if run_function.compiled:
+            function.compilation = 'lazy' if run_function.lazy else 'eager'
+        function.parse_time += run_function.parse_time
+        function.compile_time += run_function.compile_time
+
+
+def _read_function_events(lines: Iterable[str]) -> Tuple[Dict[str, str], Dict[_FunctionKey, _RunFunction],
+                                                         List[Tuple[str, _FunctionKey]]]:
+    # Returns the paths of the scripts by their id, the functions, and the compilations to bytecode in order, with
+    # the name of the function at that time.
+    scripts: Dict[str, str] = {}
+    functions: Dict[_FunctionKey, _RunFunction] = {}
+    compilations: List[Tuple[str, _FunctionKey]] = []
+    for line in lines:
+        fields = split_log_fields(line.rstrip('\n'))
+        if fields[0] == 'script-details' and len(fields) > 2:
+            scripts[fields[1]] = unescape_log_field(fields[2])
+        elif fields[0] == 'function' and len(fields) >= 8:
+            key, time = _parse_function_event(fields)
+            # The evals of a script are logged without a position too.
+            if key is not None and key[1] >= 0:
+                function = functions.get(key)
+                if function is None:
+                    function = functions[key] = _RunFunction()
+                name = unescape_log_field(','.join(fields[7:]))
+                _add_function_event(function, fields[1], name, time)
+                if fields[1].startswith(_BYTECODE_EVENT):
+                    compilations.append((name, key))
+    return scripts, functions, compilations
+
+
+def _parse_function_event(fields: List[str]) -> Tuple[Optional[_FunctionKey], float]:
+    try:
+        return (fields[2], int(fields[3]), int(fields[4]), fields[1].endswith('-eval')), float(fields[5])
+    except ValueError:
+        return None, 0.0  # A truncated line, like the last one of a process that was killed.
+
+
+def _add_function_event(function: _RunFunction, event: str, name: str, time: float) -> None:
+    # The first events of an arrow function name it 'arrow function', the later ones by its variable.
+    function.name = name or function.name
+    if event in _PARSE_EVENTS:
+        function.parse_time += time
+    elif event.startswith(_COMPILE_EVENTS):
+        function.compile_time += time
+        function.compiled = True
+    function.lazy = function.lazy or event == _LAZY_EVENT or event.endswith('-lazy')
+
+
+def _read_bytecodes(lines: Iterable[str]) -> List[Tuple[str, Tuple[int, int, int]]]:
+    # Returns the name of each printed function with its bytecode length, register count and constant pool size.
+    bytecodes: List[Tuple[str, List[Optional[int]]]] = []
+    for line in lines:
+        match = _BYTECODE_HEADER_PATTERN.match(line)
+        if match is not None:
+            bytecodes.append((match.group('name'), [None, None, None]))
+        elif bytecodes:
+            match = _BYTECODE_FIELD_PATTERN.match(line)
+            fields = bytecodes[-1][1]
+            # Only the first value counts, the output of the program may follow the bytecode.
+            for index, value in enumerate(match.groups() if match is not None else ()):
+                if value is not None and fields[index] is None:
+                    fields[index] = int(value)
+    return [(name, (length or 0, registers or 0, constants or 0)) for name, (length, registers, constants)
+            in bytecodes]
+
+
+def load_code_report(path: str) -> Dict[str, Dict]:
+    """
+    Loads the functions of a JSON code report, by their key, to compare them with a new trace.
+
+    :raises OSError: If the file can not be read.
+    :raises ValueError: If the file is not a JSON code report.
+    """
+
+    with open(path, encoding='utf-8') as file:
+        try:
+            return {function['key']: function for function in json.load(file)['functions']}
+        except (KeyError, TypeError) as e:
+            raise ValueError(f"'{path}' is not a JSON code report") from e
+
+
+def diff_functions(previous: Dict[str, Dict], trace: CodeTrace, sort: str = 'bytecode') -> List[Dict]:
+    """
+    Returns the functions that were added, removed, or whose bytecode or compilation changed since a previous
+    report, as dictionaries with the key of the function and its previous and current values (None if it is
+    missing), sorted by name or from the largest to the smallest change of the sort key.
+    """
+
+    current = {function['key']: function for function in trace.sorted_functions('name')}
+    changes = [{'key': key, 'before': previous.get(key), 'after': current.get(key)}
+               for key in sorted(set(previous) | set(current)) if _changed(previous.get(key), current.get(key))]
+    if sort != 'name':
+        changes.sort(key=lambda change: (-abs(_value(change['after'], sort) - _value(change['before'], sort)),
+                                         change['key']))
+    return changes
+
+
+def format_code_report(trace: CodeTrace, sort: str, top: int) -> str:
+    """
+    Formats the functions as a table, sorted by one of `CODE_SORT_KEYS`.
+
+    :param trace: The functions of the runs.
+    :type trace: CodeTrace
+
+    :param sort: The column the table is sorted by.
+    :type sort: str
+
+    :param top: The number of functions that are shown.
+    :type top: int
+    """
+
+    functions = trace.sorted_functions(sort)
+    lines = [_format_totals(functions)]
+    rows = [(_format_number(function['bytecode_length']), _format_number(function['register_count']),
+             _format_number(function['constant_pool_size']), function['compilation'] or '-',
+             f"{function['parse_ms']:.3f}", f"{function['compile_ms']:.3f}", function['key'])
+            for function in functions[:top]]
+    lines.append('')
+    lines.extend(_format_table(rows))
+    return '\n'.join(lines)
+
+
+def format_code_diff(previous: Dict[str, Dict], trace: CodeTrace, sort: str, top: int) -> str:
+    """
+    Formats the changes since a previous report as a table of the previous and the current values of the
+    functions, sorted by the largest change of the sort key.
+
+    :param previous: The functions of the previous report, from `load_code_report`.
+    :type previous: Dict[str, Dict]
+
+    :param trace: The functions of the runs.
+    :type trace: CodeTrace
+
+    :param sort: The column whose changes sort the table.
+    :type sort: str
+
+    :param top: The number of functions that are shown.
+    :type top: int
+    """
+
+    before = list(previous.values())
+    after = trace.sorted_functions('name')
+    changes = diff_functions(previous, trace, sort)
+    added = sum(1 for change in changes if change['before'] is None)
+    removed = sum(1 for change in changes if change['after'] is None)
+    lines = [f"Before: {_format_totals(before)}", f"After:  {_format_totals(after)}",
+             f"Changed functions: {len(changes)}, {added} new, {removed} removed."]
+    if changes:
+        rows = [(*(_format_change(change, field, _format_number)
+                   for field in ('bytecode_length', 'register_count', 'constant_pool_size')),
+                 _format_change(change, 'compilation', lambda value: value or '-'),
+                 *(_format_change(change, field, lambda value: f"{value:.3f}") for field in ('parse_ms', 'compile_ms')),
+                 change['key'] + (' (new)' if change['before'] is None else ' (removed)' if change['after'] is None
+                                  else '')) for change in changes[:top]]
+        lines.append('')
+        lines.extend(_format_table(rows))
+    return '\n'.join(lines)
+
+
+def format_code_json(trace: CodeTrace, previous: Optional[Dict[str, Dict]] = None, sort: str = 'bytecode') -> str:
+    """
+    Formats all functions as JSON, which can be compared later, with the changes since a previous report if it is
+    given.
+    """
+
+    report = trace.to_dict()
+    if previous is not None:
+        report['diff'] = diff_functions(previous, trace, sort)
+    return json.dumps(report, indent=2)
+
+
+def _changed(before: Optional[Dict], after: Optional[Dict]) -> bool:
+    # The times change with each run, so only the code tells if a function changed.
+    if before is None or after is None:
+        return True
+    return any(before.get(field) != after.get(field) for field in ('bytecode_length', 'register_count',
+                                                                    'constant_pool_size', 'compilation'))
+
+
+def _value(function: Optional[Dict], sort: str) -> float:
+    # The value of the sort key of a function, with 0 for the missing values.
+    return (function or {}).get(_SORT_FIELDS[sort]) or 0
+
+
+def _format_totals(functions: List[Dict]) -> str:
+    compiled = [function for function in functions if function['compilation'] is not None]
+    lazy = sum(1 for function in compiled if function['compilation'] == 'lazy')
+    return (f"{len(functions)} functions, {len(compiled)} compiled ({lazy} lazily), "
+            f"{sum(function['bytecode_length'] or 0 for function in functions)} bytes of bytecode, "
+            f"{sum(function['compile_ms'] for function in functions):.3f} ms of compilation per run.")
+
+
+def _format_number(value: Optional[int]) -> str:
+    return '-' if value is None else str(value)
+
+
+def _format_change(change: Dict, field: str, format_value: Callable[[Any], str]) -> str:
+    before, after = change['before'], change['after']
+    if before is None or after is None or before.get(field) == after.get(field):
+        return format_value((after or before).get(field))
+    return f"{format_value(before.get(field))} -> {format_value(after.get(field))}"
+
+
+def _format_table(rows: List[Tuple[str, ...]]) -> List[str]:
+    rows = [('Bytecode', 'Registers', 'Constants', 'Compile', 'Parse ms', 'Compile ms', 'Function')] + rows
+    widths = [max(len(row[column]) for row in rows) for column in range(len(rows[0]) - 1)]
+    return ['  '.join([cell.rjust(width) for cell, width in zip(row, widths)] + [row[-1]]) for row in rows]
@@ -1,59 +1,398 @@
 import argparse
+from functools import lru_cache
+from typing import List, Optional, Tuple
 
 from on_rails import Result, def_result
 
-from docker_entrypoint._libs.utility import D8_Recommended_OPTIONS
+from docker_entrypoint._libs.bytecode_trace import CODE_REPORTS, CODE_SORT_KEYS
+from docker_entrypoint._libs.executor import D8_Recommended_OPTIONS
+from docker_entrypoint._libs.gc_trace import GC_REPORTS
+from docker_entrypoint._libs.input_walker import DEFAULT_MAX_DEPTH
+from docker_entrypoint._libs.judge import COMPARATORS, DEFAULT_FLOAT_TOLERANCE
+from docker_entrypoint._libs.opt_trace import OPT_REPORTS
+from docker_entrypoint._libs.profiler import PROFILE_REPORTS
+from docker_entrypoint._libs.result_cache import DEFAULT_CACHE_SIZE
+from docker_entrypoint._libs.server import DEFAULT_QUEUE_SIZE
+from docker_entrypoint._libs.stats import STATS_FORMATS
+
+_SIZE_UNITS = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+
+# The environment variable that enables the result cache of the `run` command by default.
+CACHE_DIR_ENVIRONMENT = 'D8_CACHE_DIR'
+
+# The help of each command, in the order they are listed.
+_COMMAND_HELPS = {
+    'run': 'Execute a javascript program with arguments',
+    'bench': 'Measure a javascript program with warm-ups, repetitions and robust statistics',
+    'profile': 'Sample a javascript program with --prof and report its hot functions',
+    'gc-report': 'Trace the garbage collections of a javascript program and suggest heap sizes',
+    'opt-report': 'Trace the optimizations, deopts and inline caches of a javascript program per function',
+    'code-report': 'Report the bytecode and the parse and compile times of a javascript program per function',
+    'serve': 'Serve run requests on a Unix socket or a localhost HTTP port with warm workers',
+    'shell': 'Execute an enhanced d8 shell with arguments',
+    'd8': 'Default d8 shell',
+    'bash': 'Execute a bash shell with arguments',
+    'samples': 'Show samples',
+    'about': 'Show About message',
+}
 
 
 @def_result()
-def create_cli_parser() -> Result[argparse.ArgumentParser]:
+def create_cli_parser(command: Optional[str] = None) -> Result[argparse.ArgumentParser]:
     """
     This function creates a command-line interface parser with sub-parsers for different commands and their arguments.
 
+    All commands are listed, but only the given command gets its arguments, so a command does not pay for building the
+    arguments of the others. The parsers are cached, because they do not change.
+
+    :param command: The command whose arguments are parsed, usually found with `find_command`. If it is None, no
+    command gets its arguments.
+    :type command: Optional[str]
+
     :return: Returning a `Result` object that contains an `argparse.ArgumentParser` object.
     """
 
+    return Result.ok(_build_cli_parser(command))
+
+
+def find_command(args: List[str]) -> Optional[str]:
+    """
+    Returns the command of the command-line arguments: the first argument that is not an option, because the main
+    parser only has flags. Returns None if there is none.
+    """
+
+    return next((arg for arg in args if not arg.startswith('-')), None)
+
+
+@lru_cache(maxsize=None)
+def _build_cli_parser(command: Optional[str]) -> argparse.ArgumentParser:
     # Define the main parser
     parser = argparse.ArgumentParser(description='The d8 docker entrypoint')
     parser.add_argument('--version', action='store_true', help='show program version')
     parser.add_argument('--debug', action='store_true', help='show logs at debug level')
 
-    # Create a sub-parser for the 'run' command
+    # Add sub-parsers for the commands. The arguments of the other commands are only built when they are used.
+    subparsers = parser.add_subparsers(dest='command')
+    for name, help_msg in _COMMAND_HELPS.items():
+        parents = [_create_command_parser(name)] if name == command else []
+        subparsers.add_parser(name, parents=parents, help=help_msg)
+    return parser
+
+
+def _create_command_parser(command: str) -> argparse.ArgumentParser:
+    """
+    Creates the parser of the arguments of a command.
+    """
+
+    if command == 'run':
+        return _create_run_parser()
+    if command == 'bench':
+        return _create_bench_parser()
+    if command == 'profile':
+        return _create_profile_parser()
+    if command == 'gc-report':
+        return _create_gc_report_parser()
+    if command == 'opt-report':
+        return _create_opt_report_parser()
+    if command == 'code-report':
+        return _create_code_report_parser()
+    if command == 'serve':
+        return _create_serve_parser()
+
+    command_parser = argparse.ArgumentParser(add_help=False)
+    if command in ('shell', 'd8'):
+        for option, help_msg in D8_Recommended_OPTIONS.items():
+            command_parser.add_argument(option, action='store_true', help=help_msg)
+    return command_parser
+
+
+def _create_run_parser() -> argparse.ArgumentParser:
+    """
+    Creates the parser of the arguments of the 'run' command.
+    """
+
     run_parser = argparse.ArgumentParser(add_help=False)
-    run_parser.add_argument('program', type=str, help='The javascript program to execute')
+    run_parser.add_argument('program', type=str, nargs='?', help='The javascript program to execute')
+    run_parser.add_argument('--manifest', type=str, metavar='FILE',
+                            help='Instead of one program, run the jobs of FILE, a JSON lines file whose lines give a '
+                                 'program, its inputs, args and flags, and optionally an id, a priority, a timeout and '
+                                 'the expected outputs. A JSON result line is printed for each job as it finishes')
     run_parser.add_argument('-f', '--file', type=str, action='append', help='Input file(s)')
     run_parser.add_argument('-d', '--directory', type=str, action='append', help='Input directory(s)')
+    run_parser.add_argument('--module', action='store_true',
+                            help='Run the program as an ES module. With the result cache, its imports are bundled '
+                                 'into one file, which later runs use until a module changes')
+    run_parser.add_argument('--include', type=str, action='append', metavar='GLOB',
+                            help='Only use the files in the directories that match GLOB, by name, or by relative '
+                                 'path if GLOB has a /')
+    run_parser.add_argument('--exclude', type=str, action='append', metavar='GLOB',
+                            help='Skip the files and subdirectories that match GLOB')
+    run_parser.add_argument('--max-depth', type=_positive_int, default=DEFAULT_MAX_DEPTH, metavar='N',
+                            help='Also use the files of subdirectories, down to N levels (default: 1, only the '
+                                 'files directly in the directories)')
+    run_parser.add_argument('-j', '--jobs', type=_positive_int,
+                            help='Number of inputs to execute in parallel (default: number of available CPUs)')
+    run_parser.add_argument('--reuse-process', action='store_true',
+                            help='Load the program once per worker and run each input in a fresh Realm of a '
+                                 'long-lived d8 process')
+    run_parser.add_argument('-o', '--output-dir', type=str,
+                            help='Write the stdout and stderr of each input to DIR/<input path>.out and .err')
+    run_parser.add_argument('--tee', action='store_true',
+                            help='Also print the outputs to the terminal when --output-dir is used')
+    run_parser.add_argument('--expected', type=str, metavar='DIR',
+                            help='Judge the output of each input against DIR/<input name>.ans or .out')
+    run_parser.add_argument('--compare', choices=COMPARATORS, default='exact',
+                            help='How outputs are compared with --expected (default: exact)')
+    run_parser.add_argument('--float-tolerance', type=float, default=DEFAULT_FLOAT_TOLERANCE,
+                            help='The absolute or relative tolerance of --compare float '
+                                 f'(default: {DEFAULT_FLOAT_TOLERANCE})')
+    run_parser.add_argument('--stats', nargs='?', const='table', choices=STATS_FORMATS,
+                            help='Print the wall time, CPU time, peak memory and context switches of each input '
+                                 'after the run, as a table (default) or as JSON')
+    run_parser.add_argument('--timeout', type=_positive_float, metavar='SECONDS',
+                            help='Kill an input that runs longer than SECONDS of wall time (TIMEOUT)')
+    run_parser.add_argument('--memory-limit', type=_size, metavar='SIZE',
+                            help='Limit the memory of each input, for example 512M (a crash under it is OOM)')
+    run_parser.add_argument('--cpu-limit', type=_positive_int, metavar='SECONDS',
+                            help='Kill an input that uses more than SECONDS of CPU time (TIMEOUT)')
+    run_parser.add_argument('--max-output-bytes', type=_size, metavar='SIZE',
+                            help='Kill an input that writes more than SIZE bytes to stdout or stderr (OUTPUT LIMIT)')
+    run_parser.add_argument('--cache-dir', type=str, metavar='DIR',
+                            help='Replay the results of unchanged inputs from DIR, and store the new ones there '
+                                 f'(default: ${CACHE_DIR_ENVIRONMENT})')
+    run_parser.add_argument('--cache-size', type=_size, metavar='SIZE', default=DEFAULT_CACHE_SIZE,
+                            help='Evict the least recently used results beyond SIZE (default: 1G)')
+    run_parser.add_argument('--no-cache', action='store_true', help='Do not use the result cache')
+    run_parser.add_argument('--refresh', action='store_true',
+                            help='Execute every input and replace its cached result')
+    run_parser.add_argument('--watch', action='store_true',
+                            help='Keep watching the program, the scripts it loads and the inputs, and run again what '
+                                 'changed')
+    return run_parser
+
 
-    # Create a sub-parser for the 'shell' command
-    shell_parser = argparse.ArgumentParser(add_help=False)
-    for option, help_msg in D8_Recommended_OPTIONS.items():
-        shell_parser.add_argument(option, action='store_true', help=help_msg)
+def _create_bench_parser() -> argparse.ArgumentParser:
+    """
+    Creates the parser of the arguments of the 'bench' command.
+    """
 
-    # Create a sub-parser for the 'bash' command
-    bash_parser = argparse.ArgumentParser(add_help=False)
+    bench_parser = argparse.ArgumentParser(add_help=False)
+    bench_parser.add_argument('program', type=str, help='The javascript program to measure')
+    bench_parser.add_argument('-f', '--file', type=str, action='append', help='Input file(s)')
+    bench_parser.add_argument('-d', '--directory', type=str, action='append', help='Input directory(s)')
+    bench_parser.add_argument('-n', '--runs', type=_positive_int, default=10,
+                              help='Number of measured runs (default: 10)')
+    bench_parser.add_argument('-w', '--warmup', type=_non_negative_int, default=2,
+                              help='Number of runs before the measured runs that are not counted (default: 2)')
+    bench_parser.add_argument('--random-seed', type=int, help='Pass a fixed --random-seed to d8')
+    bench_parser.add_argument('--predictable', action='store_true', help='Pass --predictable to d8')
+    bench_parser.add_argument('--no-aslr', action='store_true',
+                              help='Disable address space layout randomization for the measured processes')
+    bench_parser.add_argument('--cpu', type=_non_negative_int, help='Pin the measured processes to this CPU')
+    bench_parser.add_argument('--no-baseline', action='store_true',
+                              help='Do not subtract the startup time of d8, measured with an empty script')
+    bench_parser.add_argument('--variant', type=_variant, action='append', metavar='NAME=FLAGS',
+                              help='A named set of d8 flags to compare. The variants run interleaved, and the '
+                                   'first one is the reference of the comparison')
+    return bench_parser
 
-    # Create a sub-parser for the 'd8' command
-    d8_parser = argparse.ArgumentParser(add_help=False)
-    for option, help_msg in D8_Recommended_OPTIONS.items():
-        d8_parser.add_argument(option, action='store_true', help=help_msg)
 
-    # Create a sub-parser for the 'samples' command
-    samples_parser = argparse.ArgumentParser(add_help=False)
+def _create_profile_parser() -> argparse.ArgumentParser:
+    """
+    Creates the parser of the arguments of the 'profile' command.
+    """
 
-    # Create a sub-parser for the 'about' command
-    about_parser = argparse.ArgumentParser(add_help=False)
+    profile_parser = argparse.ArgumentParser(add_help=False)
+    profile_parser.add_argument('program', type=str, help='The javascript program to profile')
+    profile_parser.add_argument('-f', '--file', type=str, action='append', help='Input file(s)')
+    profile_parser.add_argument('-d', '--directory', type=str, action='append', help='Input directory(s)')
+    profile_parser.add_argument('-j', '--jobs', type=_positive_int,
+                                help='Number of inputs to profile in parallel (default: number of available CPUs)')
+    profile_parser.add_argument('--top', type=_positive_int, default=20, metavar='N',
+                                help='Number of functions in the flat profile and the bottom-up tree (default: 20)')
+    profile_parser.add_argument('--report', choices=PROFILE_REPORTS, default='table',
+                                help='The flat profile and the bottom-up tree (table), the stacks for flame graphs '
+                                     '(folded), or a profile for https://www.speedscope.app (speedscope)')
+    profile_parser.add_argument('-o', '--output', type=str, metavar='FILE',
+                                help='Write the report to FILE instead of the terminal')
+    return profile_parser
 
-    # Add sub-parsers for the commands
-    subparsers = parser.add_subparsers(dest='command')
 
-    # Add sub-parsers for the sub-commands
-    subparsers.add_parser('run', parents=[run_parser],
-                          help='Execute a javascript program with arguments')
-    subparsers.add_parser('shell', parents=[shell_parser],
-                          help='Execute an enhanced d8 shell with arguments')
-    subparsers.add_parser('d8', parents=[d8_parser], help='Default d8 shell')
-    subparsers.add_parser('bash', parents=[bash_parser], help='Execute a bash shell with arguments')
-    subparsers.add_parser('samples', parents=[samples_parser], help='Show samples')
-    subparsers.add_parser('about', parents=[about_parser], help='Show About message')
-
-    return Result.ok(parser)
+def _create_gc_report_parser() -> argparse.ArgumentParser:
+    """
+    Creates the parser of the arguments of the 'gc-report' command.
+    """
+
+    gc_parser = argparse.ArgumentParser(add_help=False)
+    gc_parser.add_argument('program', type=str, help='The javascript program whose collections are traced')
+    gc_parser.add_argument('-f', '--file', type=str, action='append', help='Input file(s)')
+    gc_parser.add_argument('-d', '--directory', type=str, action='append', help='Input directory(s)')
+    gc_parser.add_argument('-j', '--jobs', type=_positive_int,
+                           help='Number of inputs to trace in parallel (default: number of available CPUs)')
+    gc_parser.add_argument('--report', choices=GC_REPORTS, default='table',
+                           help='The pauses, the heap and the suggested flags as a table (table) or as JSON (json)')
+    gc_parser.add_argument('-o', '--output', type=str, metavar='FILE',
+                           help='Write the report to FILE instead of the terminal')
+    return gc_parser
+
+
+def _create_opt_report_parser() -> argparse.ArgumentParser:
+    """
+    Creates the parser of the arguments of the 'opt-report' command.
+    """
+
+    opt_parser = argparse.ArgumentParser(add_help=False)
+    opt_parser.add_argument('program', type=str, help='The javascript program whose optimizations are traced')
+    opt_parser.add_argument('-f', '--file', type=str, action='append', help='Input file(s)')
+    opt_parser.add_argument('-d', '--directory', type=str, action='append', help='Input directory(s)')
+    opt_parser.add_argument('-j', '--jobs', type=_positive_int,
+                            help='Number of inputs to trace in parallel (default: number of available CPUs)')
+    opt_parser.add_argument('--top', type=_positive_int, default=20, metavar='N',
+                            help='Number of functions and of inline cache sites in the report (default: 20)')
+    opt_parser.add_argument('--report', choices=OPT_REPORTS, default='table',
+                            help='The deopts and the inline cache sites as a table (table) or as JSON (json)')
+    opt_parser.add_argument('-o', '--output', type=str, metavar='FILE',
+                            help='Write the report to FILE instead of the terminal')
+    return opt_parser
+
+
+def _create_code_report_parser() -> argparse.ArgumentParser:
+    """
+    Creates the parser of the arguments of the 'code-report' command.
+    """
+
+    code_parser = argparse.ArgumentParser(add_help=False)
+    code_parser.add_argument('program', type=str, help='The javascript program whose bytecode is traced')
+    code_parser.add_argument('-f', '--file', type=str, action='append', help='Input file(s)')
+    code_parser.add_argument('-d', '--directory', type=str, action='append', help='Input directory(s)')
+    code_parser.add_argument('-j', '--jobs', type=_positive_int,
+                             help='Number of inputs to trace in parallel (default: number of available CPUs)')
+    code_parser.add_argument('--top', type=_positive_int, default=20, metavar='N',
+                             help='Number of functions in the table (default: 20)')
+    code_parser.add_argument('--sort', choices=CODE_SORT_KEYS, default='bytecode',
+                             help='The column that sorts the table, from the largest value, or whose changes sort '
+                                  'the diff (default: bytecode)')
+    code_parser.add_argument('--diff', type=str, metavar='REPORT',
+                             help='A JSON report of a previous run. Only the functions that were added, removed, or '
+                                  'whose bytecode or compilation changed since then are shown')
+    code_parser.add_argument('--report', choices=CODE_REPORTS, default='table',
+                             help='The functions as a table (table) or all of them as JSON (json), which can be '
+                                  'given to --diff later')
+    code_parser.add_argument('-o', '--output', type=str, metavar='FILE',
+                             help='Write the report to FILE instead of the terminal')
+    return code_parser
+
+
+def _create_serve_parser() -> argparse.ArgumentParser:
+    """
+    Creates the parser of the arguments of the 'serve' command.
+    """
+
+    serve_parser = argparse.ArgumentParser(add_help=False)
+    serve_parser.add_argument('--socket', type=str, metavar='PATH',
+                              help='Accept JSON run requests, one per line, on the Unix domain socket PATH')
+    serve_parser.add_argument('--http', type=_port, metavar='PORT', dest='http_port',
+                              help='Accept JSON run requests with POST /run on 127.0.0.1:PORT (0 for a free port)')
+    serve_parser.add_argument('-j', '--jobs', type=_positive_int,
+                              help='Number of requests to execute in parallel (default: number of available CPUs)')
+    serve_parser.add_argument('--queue-size', type=_non_negative_int, default=DEFAULT_QUEUE_SIZE, metavar='N',
+                              help='Number of requests that wait for a free worker. The next requests are refused '
+                                   f'until one finishes (default: {DEFAULT_QUEUE_SIZE})')
+    serve_parser.add_argument('--reuse-process', action='store_true',
+                              help='Run the requests in fresh Realms of warm d8 processes that keep each program '
+                                   'loaded, when the program and the limits allow it')
+    serve_parser.add_argument('--preload', type=str, action='append', metavar='PROGRAM',
+                              help='Start the warm workers of PROGRAM before the first request. Implies '
+                                   '--reuse-process')
+    serve_parser.add_argument('--timeout', type=_positive_float, metavar='SECONDS',
+                              help='Kill a request that runs longer than SECONDS of wall time (TIMEOUT)')
+    serve_parser.add_argument('--memory-limit', type=_size, metavar='SIZE',
+                              help='Limit the memory of each request, for example 512M (a crash under it is OOM)')
+    serve_parser.add_argument('--cpu-limit', type=_positive_int, metavar='SECONDS',
+                              help='Kill a request that uses more than SECONDS of CPU time (TIMEOUT)')
+    serve_parser.add_argument('--max-output-bytes', type=_size, metavar='SIZE',
+                              help='Kill a request that writes more than SIZE bytes to stdout or stderr (OUTPUT '
+                                   'LIMIT)')
+    return serve_parser
+
+
+def _positive_int(value: str) -> int:
+    """
+    Converts a command-line value to a positive integer, used as the `type` of argparse arguments.
+    """
+
+    try:
+        number = int(value)
+    except ValueError:
+        number = 0
+    if number <= 0:
+        raise argparse.ArgumentTypeError(f"'{value}' is not a positive integer")
+    return number
+
+
+def _non_negative_int(value: str) -> int:
+    """
+    Converts a command-line value to a non-negative integer, used as the `type` of argparse arguments.
+    """
+
+    try:
+        number = int(value)
+    except ValueError:
+        number = -1
+    if number < 0:
+        raise argparse.ArgumentTypeError(f"'{value}' is not a non-negative integer")
+    return number
+
+
+def _port(value: str) -> int:
+    """
+    Converts a command-line value to a TCP port, used as the `type` of argparse arguments.
+    """
+
+    number = _non_negative_int(value)
+    if number > 65535:
+        raise argparse.ArgumentTypeError(f"'{value}' is not a port from 0 to 65535")
+    return number
+
+
+def _positive_float(value: str) -> float:
+    """
+    Converts a command-line value to a positive number, used as the `type` of argparse arguments.
+    """
+
+    try:
+        number = float(value)
+    except ValueError:
+        number = 0
+    if not 0 < number < float('inf'):
+        raise argparse.ArgumentTypeError(f"'{value}' is not a positive number")
+    return number
+
+
+def _size(value: str) -> int:
+    """
+    Converts a command-line size in bytes, with an optional K, M or G suffix of binary units, to an integer, used as
+    the `type` of argparse arguments.
+    """
+
+    number, multiplier = value.strip().upper(), 1
+    if number[-1:] in _SIZE_UNITS:
+        number, multiplier = number[:-1], _SIZE_UNITS[number[-1]]
+    try:
+        size = int(float(number) * multiplier)
+    except (ValueError, OverflowError):
+        size = 0
+    if size <= 0:
+        raise argparse.ArgumentTypeError(f"'{value}' is not a positive size, like 4096, 64K, 512M or 2G")
+    return size
+
+
+def _variant(value: str) -> Tuple[str, str]:
+    """
+    Splits a `NAME=FLAGS` command-line value, used as the `type` of the `--variant` argument.
+    """
+
+    name, separator, flags = value.partition('=')
+    if not separator or not name.strip():
+        raise argparse.ArgumentTypeError(f"'{value}' is not in the NAME=FLAGS format")
+    return name.strip(), flags
@@ -1,17 +1,48 @@
 import logging
 import os
-from typing import List, Optional
+import shlex
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from contextlib import ExitStack
+from itertools import chain, islice
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
 
 from on_rails import Result, ValidationError, def_result
-from pylity import Path
-from pylity.decorators.validate_func_params import validate_func_params
 from schema import And, Or, Schema
 
+from docker_entrypoint._libs.bench import (BenchmarkError, BenchTarget,
+                                           collect_samples, format_comparison,
+                                           format_duration, format_summary,
+                                           noise_controls)
+from docker_entrypoint._libs.bench_stats import summarize
+from docker_entrypoint._libs.BenchOptions import BenchOptions
 from docker_entrypoint._libs.DockerEnvironments import DockerEnvironments
+from docker_entrypoint._libs.es_modules import (ModuleBundleCache, ModuleError,
+                                                resolve_module_graph)
+from docker_entrypoint._libs.executor import (LimitStatus, ProcessResult,
+                                              build_d8_command, copy_file_to,
+                                              format_command, run_process)
 from docker_entrypoint._libs.ExitCodes import ExitCode
+from docker_entrypoint._libs.input_walker import prefetch, walk_inputs
+from docker_entrypoint._libs.judge import (Expectation, JudgedResult, Verdict,
+                                           find_expected_file)
+from docker_entrypoint._libs.result_cache import ResultCache
 from docker_entrypoint._libs.ResultDetails.FailResult import FailResult
+from docker_entrypoint._libs.runner import (ExecuteFunction, InputResult,
+                                            InputTask, execute_input,
+                                            run_inputs)
+from docker_entrypoint._libs.RunOptions import RunOptions
+from docker_entrypoint._libs.stats import format_stats_json, format_stats_table
 from docker_entrypoint._libs.utility import (class_properties_to_str,
                                              convert_code_to_result)
+from docker_entrypoint._libs.validation import validate_func_params
+from docker_entrypoint._libs.watcher import (Snapshot, Watcher, changed_paths,
+                                             find_load_dependencies,
+                                             take_snapshot)
+from docker_entrypoint._libs.worker_pool import (WorkerPool,
+                                                 find_global_state_usage)
 
 
 @validate_func_params(Schema({
@@ -20,9 +51,10 @@ from docker_entrypoint._libs.utility import (class_properties_to_str,
                    error='The program can not be empty or whitespace')),
     'files_and_dirs': Or(None, [str], error='files_and_dirs must be a list of strings or None'),
     'args': Or(None, [str], error='args must be a list of strings or None'),
+    'options': Or(None, RunOptions, error='options must be an instance of `RunOptions` or None'),
 }))
 def command_run(logger: logging.Logger, program: str, files_and_dirs: Optional[List[str]] = None,
-                args: Optional[List[str]] = None) -> Result:
+                args: Optional[List[str]] = None, options: Optional[RunOptions] = None) -> Result:
     """
     Runs a javascript source with optional arguments and files/directories as input, and logs the output.
 
@@ -40,6 +72,10 @@ def command_run(logger: logging.Logger, program: str, files_and_dirs: Optional[L
     It is an optional parameter and defaults to an empty list if not provided
     :type args: Optional[List[str]]
 
+    :param options: The `options` parameter controls how the inputs are executed, for example the number of inputs
+    that run in parallel. If it is not provided, the default options are used.
+    :type options: Optional[RunOptions]
+
     :return: a `Result` object. The `Result` object can either be a success or a failure.
     If it is a success, it returns `Result.ok()`. If it is a failure, it returns
     `Result.fail(FailResult(code=ExitCode.IO_ERROR))` or `result` depending on the value
@@ -51,36 +87,423 @@ def command_run(logger: logging.Logger, program: str, files_and_dirs: Optional[L
 
     files_and_dirs = files_and_dirs or []
     args = args or []
+    options = options or RunOptions()
 
-    result = Path.collect_files(files_and_dirs)
+    result = check_input_paths(files_and_dirs)
     if not result.success:
-        if result.detail.is_instance_of(ValidationError):
-            return Result.fail(FailResult(code=ExitCode.IO_ERROR, message=str(result.detail)))
-        return result  # pragma: no cover
-    files: List[str] = result.value
-
-    if len(files) == 0:
+        return result
+    try:
+        prepared = _prepare_program(logger, program, options)
+    except ModuleError as e:
+        return Result.fail(FailResult(code=ExitCode.IO_ERROR, message=str(e)))
+    # The inputs are executed while the directories are still walked.
+    files = prefetch(walk_inputs(files_and_dirs, options.include, options.exclude, options.max_depth))
+    first_file = next(files, None)
+
+    if first_file is None and not options.watch:
         logger.warning("No file provided.")
-        command = f"bash -c 'd8 {program}'"
-        logger.debug(f"command: {command}")
-        code = os.system(command)
-        logger.debug(f"Return Code: {code}")
-        return convert_code_to_result(code)
+        command = build_d8_command(prepared[0], args, prepared[1])
+        logger.debug(f"command: {format_command(command)}")
+        result = run_process(command, limits=options.limits)
+        if result.limit is not None:
+            logger.warning(f"Status: {result.limit}")
+        logger.debug(f"Return Code: {result.code}")
+        return convert_code_to_result(result.code)
+
+    failed: Set[str] = set()
+    code = 0 if first_file is None else _run_input_files(logger, prepared, args, chain([first_file], files), options,
+                                                         failed)
+    if options.watch:
+        code = _watch(logger, program, prepared, files_and_dirs, args, options, failed, code)
+    return convert_code_to_result(code)
+
+
+def _prepare_program(logger: logging.Logger, program: str, options: RunOptions) -> Tuple[str, List[str], List[str]]:
+    # Returns the file that d8 executes, the d8 flags it needs, and the other files whose contents are part of the
+    # keys of the result cache. An ES module is executed from its cached bundle when it can be bundled.
+    if not options.module:
+        # The scripts that a classic program loads are only looked for when the results are cached.
+        return program, [], find_load_dependencies(program) if options.cache_dir is not None else []
+    if options.cache_dir is None:
+        graph = resolve_module_graph(program)
+        graph.check_missing()
+        return program, ['--module'], graph.paths[:-1]
+
+    paths, bundle = ModuleBundleCache(options.cache_dir).load(program, refresh=options.refresh_cache)
+    if bundle is None:
+        logger.debug("The modules can not be bundled, so d8 loads them one by one.")
+        return program, ['--module'], paths[:-1]
+    logger.debug(f"The modules are executed from the bundle '{bundle}'.")
+    return bundle, ['--module'], []
+
+
+def _find_dependencies(program: str, options: RunOptions) -> List[str]:
+    if options.module:
+        return resolve_module_graph(program).paths[:-1]
+    return find_load_dependencies(program)
+
+
+def _run_input_files(logger: logging.Logger, prepared: Tuple[str, List[str], List[str]], args: List[str],
+                     files: Iterator[str], options: RunOptions, failed: Set[str]) -> int:
+    program = prepared[0]
+    # No more jobs are started than there are inputs, which is only known when the walk ends before `jobs` inputs.
+    first_files = list(islice(files, options.jobs))
+    jobs = len(first_files)
+    command = build_d8_command(program, args, prepared[1])
+    tasks = (_create_task(logger, file, command, options) for file in chain(first_files, files))
+    logger.debug(f"Number of parallel jobs: {jobs}")
+    if options.output_dir is not None:
+        logger.info(f"The outputs are written to '{options.output_dir}'.")
+
+    with ExitStack() as stack:
+        execute = _select_execute_function(logger, program, args, options, stack)
+        if options.cache_dir is None:
+            return _run_files(logger, tasks, jobs, execute, options, failed)
+        cache = stack.enter_context(ResultCache(options.cache_dir, options.cache_size))
+        execute = cache.wrap(execute, program, refresh=options.refresh_cache, dependencies=prepared[2])
+        code = _run_files(logger, tasks, jobs, execute, options, failed)
+        logger.info(f"Result cache: {cache.hits} hits, {cache.misses} misses.")
+        return code
+
+
+def _watch(logger: logging.Logger, program: str, prepared: Optional[Tuple[str, List[str], List[str]]],
+           files_and_dirs: List[str], args: List[str], options: RunOptions, failed: Set[str], code: int) -> int:
+    dependencies = _find_dependencies(program, options)
+    snapshot = _take_watch_snapshot(program, dependencies, files_and_dirs, options)
+    with Watcher() as watcher:
+        try:
+            while True:
+                watcher.watch(os.path.dirname(os.path.abspath(path)) for path in snapshot)
+                watcher.watch(path for path in files_and_dirs if os.path.isdir(path))
+                logger.info("Watching for changes. Press Ctrl-C to stop.")
+                new_snapshot = watcher.wait_for_change(
+                    lambda: _take_watch_snapshot(program, dependencies, files_and_dirs, options), snapshot)
+                changed = changed_paths(snapshot, new_snapshot)
+                program_changed = bool(changed & {program, *dependencies})
+                if program_changed:
+                    dependencies = _find_dependencies(program, options)
+                    prepared = _prepare_watched_program(logger, program, options)
+                files = _select_changed_inputs(logger, files_and_dirs, options, changed, failed, program_changed)
+                snapshot = _take_watch_snapshot(program, dependencies, files_and_dirs, options)
+                if files and prepared is not None and os.path.isfile(program):
+                    failed.difference_update(files)
+                    code = _run_input_files(logger, prepared, args, iter(files), options, failed)
+        except KeyboardInterrupt:
+            logger.info("Stopped watching.")
+    return code
+
+
+def _select_changed_inputs(logger: logging.Logger, files_and_dirs: List[str], options: RunOptions,
+                           changed: Set[str], failed: Set[str], program_changed: bool) -> List[str]:
+    files = _list_input_files(files_and_dirs, options)
+    if program_changed:
+        # The inputs that failed before are executed first, so their results come first.
+        files.sort(key=lambda file: file not in failed)
+        logger.info(f"The program changed. All {len(files)} inputs are executed again.")
+        return files
+    files = [file for file in files if file in changed]
+    logger.info(f"{len(files)} changed inputs are executed again.")
+    return files
+
+
+def _prepare_watched_program(logger: logging.Logger, program: str,
+                             options: RunOptions) -> Optional[Tuple[str, List[str], List[str]]]:
+    # A missing module is reported, and the inputs run again when it is fixed.
+    try:
+        return _prepare_program(logger, program, options)
+    except ModuleError as e:
+        logger.error(str(e))
+        return None
+
+
+def _take_watch_snapshot(program: str, dependencies: List[str], files_and_dirs: List[str],
+                         options: RunOptions) -> Snapshot:
+    return take_snapshot([program] + dependencies + _list_input_files(files_and_dirs, options))
+
+
+def _list_input_files(files_and_dirs: List[str], options: RunOptions) -> List[str]:
+    return list(walk_inputs(files_and_dirs, options.include, options.exclude, options.max_depth))
+
+
+def _select_execute_function(logger: logging.Logger, program: str, args: List[str], options: RunOptions,
+                             stack: ExitStack) -> ExecuteFunction:
+    if not options.reuse_process:
+        return execute_input
+
+    if options.module:
+        logger.warning("ES modules can not be executed in a Realm of a reused d8 process. "
+                       "Each input is executed in its own process.")
+        return execute_input
+
+    if options.limits.has_limits():
+        logger.warning("The resource limits can not be enforced in a reused d8 process. "
+                       "Each input is executed in its own process.")
+        return execute_input
+
+    with open(program, encoding='utf-8', errors='replace') as program_file:
+        usage = find_global_state_usage(program_file.read())
+    if usage:
+        logger.warning(f"The program uses '{usage}', which touches the global state of the d8 process. "
+                       "Each input is executed in its own process.")
+        return execute_input
+
+    return stack.enter_context(WorkerPool(program, args)).execute
+
+
+def check_input_paths(files_and_dirs: List[str]) -> Result:
+    """
+    Checks that the given input paths are files or directories. Only the given paths are checked before the walk
+    starts. The entries of the directories are checked as they are reached.
+    """
+
+    for path in files_and_dirs:
+        if not os.path.isfile(path) and not os.path.isdir(path):
+            error = ValidationError(title="File or directory is not valid.", message=f"The ({path}) is not valid.")
+            return Result.fail(FailResult(code=ExitCode.IO_ERROR, message=str(error)))
+    return Result.ok()
+
+
+def _create_task(logger: logging.Logger, file: str, command: List[str], options: RunOptions) -> InputTask:
+    # Each input runs in its own process group, even without limits, so nothing it spawns outlives it.
+    limits = options.limits
+    expected = None
+    if options.expected_dir is not None:
+        expected = find_expectation(logger, options.expected_dir, file, options)
+
+    output_dir = options.output_dir
+    if output_dir is None:
+        return InputTask(file=file, command=command, expected=expected, limits=limits)
+    output_path = mirrored_output_path(output_dir, file)
+    return InputTask(file=file, command=command, stdout_path=output_path + '.out', stderr_path=output_path + '.err',
+                     expected=expected, limits=limits)
+
+
+def find_expectation(logger: logging.Logger, expected_dir: str, file: str,
+                     options: RunOptions) -> Optional[Expectation]:
+    """
+    Returns the expected output of an input in `expected_dir`, compared as the options say, or None with a warning
+    if there is none.
+    """
+
+    expected_path = find_expected_file(expected_dir, file)
+    if expected_path is None:
+        logger.warning(f"There is no expected output for '{file}' in '{expected_dir}'.")
+        return None
+    return Expectation(expected_path, options.comparator, options.float_tolerance)
+
+
+def mirrored_output_path(output_dir: str, file: str) -> str:
+    """
+    Returns the path in `output_dir` where the outputs of an input are written, without their suffix, and creates
+    its directory. The input keeps its path relative to the current directory, so inputs with the same name in
+    different directories do not overwrite the outputs of each other.
+    """
+
+    relative_path = os.path.relpath(os.path.abspath(file))
+    if relative_path == os.pardir or relative_path.startswith(os.pardir + os.sep):
+        relative_path = os.path.abspath(file).lstrip(os.sep)
+    output_path = os.path.join(output_dir, relative_path)
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    return output_path
+
 
+def _run_files(logger: logging.Logger, tasks: Iterable[InputTask], jobs: int, execute: ExecuteFunction,
+               options: RunOptions, failed: Optional[Set[str]] = None) -> int:
     final_code = 0
-    logger.debug(f"Number of input files: {len(files)}")
-    files.sort()
-    for index, file in enumerate(files):
-        logger.info(f"file {index + 1}: {file}")
-        command = f"bash -c 'd8 {program} {' '.join(args)} < {file}'"
-        logger.debug(f"command: {command}")
-        code = os.system(command)
-        logger.debug(f"Return Code: {code}")
-        print('----------------------------------------------------------------')
-        if code != 0:  # pragma: no cover
-            final_code = code
+    # The judged inputs grouped by their verdicts.
+    verdicts: Dict[str, List[str]] = defaultdict(list)
+    # Only the exit codes and the resource usages are kept for the stats, not the outputs.
+    executed: List[InputResult] = []
+    if jobs == 1:
+        input_results = (InputResult(task, _execute_sequentially(logger, index, task, execute))
+                         for index, task in enumerate(tasks))
+    else:
+        input_results = run_inputs(tasks, jobs, execute)
+
+    for index, input_result in enumerate(input_results):
+        task, result = input_result.task, input_result.result
+        if jobs != 1:
+            _log_input_start(logger, index, task)
+        final_code = _finish_input(logger, task, result, options.tee, verdicts, final_code)
+        if failed is not None and _is_failure(result):
+            failed.add(task.file)
+        executed.append(InputResult(task, ProcessResult(code=result.code, usage=result.usage, limit=result.limit)))
+
+    # The number of inputs is only known after the walk.
+    logger.debug(f"Number of input files: {len(executed)}")
+    if any(input_result.task.expected is not None for input_result in executed):
+        _log_judge_summary(logger, verdicts, len(executed))
+    if options.stats == 'json':
+        print(format_stats_json(executed), flush=True)
+    elif options.stats == 'table':
+        print(format_stats_table(executed), flush=True)
+    return final_code
+
+
+def _is_failure(result: ProcessResult) -> bool:
+    if isinstance(result, JudgedResult):
+        return result.verdict != Verdict.ACCEPTED
+    return result.code != 0
+
+
+def _execute_sequentially(logger: logging.Logger, index: int, task: InputTask,
+                          execute: ExecuteFunction) -> ProcessResult:
+    # The input is logged before it is executed, because its output goes straight to the terminal. The output limit
+    # can only be enforced on files, so with it the outputs are captured in files and printed after the input.
+    _log_input_start(logger, index, task)
+    return execute(task, task.limits is not None and task.limits.max_output_bytes is not None)
+
+
+def _finish_input(logger: logging.Logger, task: InputTask, result: ProcessResult, tee: bool,
+                  verdicts: Dict[str, List[str]], final_code: int) -> int:
+    _write_output(task, result, tee)
+    if not isinstance(result, JudgedResult):
+        if result.limit is not None:
+            logger.warning(f"Status: {result.limit}")
+        return _log_input_end(logger, result.code, final_code)
+
+    verdicts[result.verdict].append(task.file)
+    logger.info(f"Verdict: {result.verdict}" + (f" - {result.message}" if result.message else ""))
+    final_code = _log_input_end(logger, result.code, final_code)
+    # A wrong answer fails the run even if the program exited successfully.
+    return ExitCode.GENERAL_ERROR if result.verdict == Verdict.WRONG_ANSWER else final_code
+
+
+def _log_judge_summary(logger: logging.Logger, verdicts: Dict[str, List[str]], total: int) -> None:
+    passed = len(verdicts[Verdict.ACCEPTED])
+    failed = sum(len(files) for verdict, files in verdicts.items() if verdict != Verdict.ACCEPTED)
+    logger.info(f"Summary: {passed} passed, {failed} failed, {total - passed - failed} without an expected output.")
+    for verdict in (Verdict.WRONG_ANSWER, Verdict.RUNTIME_ERROR, LimitStatus.TIMEOUT, LimitStatus.OOM,
+                    LimitStatus.OUTPUT_LIMIT):
+        if verdicts[verdict]:
+            logger.info(f"{verdict}: {', '.join(verdicts[verdict])}")
+
+
+def _write_output(task: InputTask, result: ProcessResult, tee: bool) -> None:
+    if tee and task.stdout_path is not None:
+        copy_file_to(task.stdout_path, sys.stdout.buffer)
+    if tee and task.stderr_path is not None:
+        copy_file_to(task.stderr_path, sys.stderr.buffer)
+    # The stdout of a judged input is compared with the expected output instead of being printed.
+    if result.stdout and task.expected is None:
+        sys.stdout.flush()
+        sys.stdout.buffer.write(result.stdout)
+        sys.stdout.flush()
+    if result.stderr:
+        sys.stderr.flush()
+        sys.stderr.buffer.write(result.stderr)
+        sys.stderr.flush()
+
+
+def _log_input_start(logger: logging.Logger, index: int, task: InputTask) -> None:
+    logger.info(f"file {index + 1}: {task.file}")
+    logger.debug(f"command: {format_command(task.command, stdin_path=task.file)}")
+
+
+def _log_input_end(logger: logging.Logger, code: int, final_code: int) -> int:
+    logger.debug(f"Return Code: {code}")
+    print('----------------------------------------------------------------', flush=True)
+    return code if code != 0 else final_code
 
-    return convert_code_to_result(final_code)
+
+@validate_func_params(Schema({
+    'logger': And(logging.Logger, error='logger is required and must be a logging.Logger object'),
+    'program': And(And(str, error='The program must be a string'), And(str.strip, lambda s: len(s) > 0,
+                   error='The program can not be empty or whitespace')),
+    'files_and_dirs': Or(None, [str], error='files_and_dirs must be a list of strings or None'),
+    'args': Or(None, [str], error='args must be a list of strings or None'),
+    'options': Or(None, BenchOptions, error='options must be an instance of `BenchOptions` or None'),
+}))
+def command_bench(logger: logging.Logger, program: str, files_and_dirs: Optional[List[str]] = None,
+                  args: Optional[List[str]] = None, options: Optional[BenchOptions] = None) -> Result:
+    """
+    Measures a javascript program several times, optionally with input files, and logs robust statistics of its
+    execution time.
+
+    :param logger: A logging.Logger object used for logging messages
+    :type logger: logging.Logger
+
+    :param program: The path to the JavaScript program that needs to be measured
+    :type program: str
+
+    :param files_and_dirs: The input files and directories. In each run, the program is executed once per input
+    file. If no input is given, the program is executed once per run with an empty stdin.
+    :type files_and_dirs: Optional[List[str]]
+
+    :param args: The command line arguments that are passed to the program.
+    :type args: Optional[List[str]]
+
+    :param options: The number of runs and warm-ups, and the noise controls. If it is not provided, the default
+    options are used.
+    :type options: Optional[BenchOptions]
+    """
+
+    if not os.path.isfile(program):
+        return Result.fail(FailResult(code=ExitCode.IO_ERROR, message=f"File '{program}' does not exists."))
+    options = options or BenchOptions()
+
+    result = check_input_paths(files_and_dirs or [])
+    if not result.success:
+        return result
+    inputs: List[Optional[str]] = list(walk_inputs(files_and_dirs or [])) or [None]
+
+    # Without variants, the program is measured with the noise control flags only, under its own name.
+    variants = list(options.variants.items()) or [(program, '')]
+    logger.info(f"Benchmark of {program}: {options.runs} runs after {options.warmup} warm-ups, "
+                f"{len(inputs)} process(es) per run.")
+    with tempfile.TemporaryDirectory() as baseline_dir:
+        empty_script = os.path.join(baseline_dir, 'empty.js')
+        with open(empty_script, 'w', encoding='utf-8'):
+            pass
+        targets = _create_bench_targets(program, args or [], inputs, variants, options, empty_script)
+        try:
+            with noise_controls(logger, options.cpu, options.disable_aslr):
+                samples = collect_samples(targets, options.runs, options.warmup, logger)
+        except BenchmarkError as e:
+            return Result.fail(FailResult(code=e.code, message=str(e)))
+
+    _log_bench_results(logger, variants, samples, len(inputs), show_variants=bool(options.variants))
+    return Result.ok()
+
+
+def _create_bench_targets(program: str, args: List[str], inputs: List[Optional[str]], variants: List[Tuple[str, str]],
+                          options: BenchOptions, empty_script: str) -> List[BenchTarget]:
+    targets = []
+    for name, variant_flags in variants:
+        flags = options.d8_flags() + shlex.split(variant_flags)
+        targets.append(BenchTarget(name, build_d8_command(program, args, flags), inputs))
+        # The flags of a variant can change the startup of d8, so each variant has its own baseline.
+        if options.subtract_baseline:
+            targets.append(BenchTarget(_baseline_name(name), build_d8_command(empty_script, flags=flags)))
+    return targets
+
+
+def _log_bench_results(logger: logging.Logger, variants: List[Tuple[str, str]], samples: Dict[str, List[float]],
+                       processes: int, show_variants: bool) -> None:
+    adjusted_samples = {}
+    for name, variant_flags in variants:
+        if show_variants:
+            logger.info(f"Variant {name} ({variant_flags or 'no flags'}):")
+        adjusted_samples[name] = _subtract_baseline(logger, samples[name], samples.get(_baseline_name(name)),
+                                                    processes)
+        logger.info(format_summary(summarize(adjusted_samples[name])))
+
+    reference = variants[0][0]
+    for name, _ in variants[1:]:
+        logger.info(format_comparison(name, adjusted_samples[name], reference, adjusted_samples[reference]))
+
+
+def _baseline_name(name: str) -> str:
+    return f"{name} (d8 startup)"
+
+
+def _subtract_baseline(logger: logging.Logger, samples: List[float], baseline_samples: Optional[List[float]],
+                       processes: int) -> List[float]:
+    if baseline_samples is None:
+        return samples
+    baseline = summarize(baseline_samples).median
+    logger.info(f"d8 startup baseline: {format_duration(baseline)} per process (median), subtracted.")
+    return [max(sample - baseline * processes, 0.0) for sample in samples]
 
 
 @def_result()
@@ -102,10 +525,11 @@ def command_d8(logger: logging.Logger, args: Optional[List[str]] = None) -> Resu
     :return: a `Result` object that indicates success or failure of the command execution.
     """
 
-    logger.debug(f"Command: d8 {' '.join(args)}")
+    command = build_d8_command(args=args)
+    logger.debug(f"Command: {format_command(command)}")
     logger.info("Use quit() or Ctrl-D (i.e. EOF) to exit the D8 Shell")
 
-    code = os.system(f"d8 {' '.join(args)}")
+    code = run_process(command).code
 
     logger.debug(f"Return code: {code}")
     return convert_code_to_result(code)
@@ -129,15 +553,14 @@ def command_shell(logger: logging.Logger, args: Optional[List[str]] = None) -> R
     """
 
     default_options = ['--harmony', '--allow-natives-syntax']
-    bash_command = ['sleep 0.5;', 'rlwrap', '-m', '-pgreen', 'd8'] + default_options + args
-
-    command_str = f"bash -c '{' '.join(bash_command)}'"
-    logger.debug(f"Command: {command_str}")
+    command = ['rlwrap', '-m', '-pgreen'] + build_d8_command(args=default_options + (args or []))
+    logger.debug(f"Command: {format_command(command)}")
 
     logger.info(f"Default options: {default_options}")
     logger.info("Use quit() or Ctrl-D (i.e. EOF) to exit the D8 Shell")
 
-    code = os.system(command_str)
+    time.sleep(0.5)  # Let the terminal of the container settle before rlwrap takes it over.
+    code = run_process(command).code
 
     logger.debug(f"Return code: {code}")
     return convert_code_to_result(code)
@@ -160,11 +583,11 @@ def command_bash(logger: logging.Logger, args: Optional[List[str]] = None) -> Re
     :type args: Optional[List[str]]
     """
 
-    command_str = f"bash {' '.join(args)}"
-    logger.debug(f"Command: {command_str}")
+    command = ['bash'] + (args or [])
+    logger.debug(f"Command: {format_command(command)}")
     logger.info("Running bash command. Use --help to see other commands.")
 
-    code = os.system(command_str)
+    code = run_process(command).code
 
     logger.debug(f"Return code: {code}")
     return convert_code_to_result(code)
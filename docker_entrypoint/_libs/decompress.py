@@ -0,0 +1,167 @@
+import os
+import shutil
+import subprocess
+import threading
+from typing import List, Optional
+
+# The suffixes of the compressed inputs. The codecs are imported when the first compressed input is opened, because
+# the executor is imported on every start of the entrypoint.
+COMPRESSED_SUFFIXES = ('.gz', '.xz', '.lzma', '.bz2', '.zst')
+ZSTD_EXECUTABLE = 'zstd'
+
+_CHUNK_SIZE = 64 * 1024
+
+
+class DecompressionError(Exception):
+    """
+    Raised when a compressed input can not be decompressed, for example because its format needs a codec that is not
+    installed.
+    """
+
+
+def is_compressed(path: str) -> bool:
+    """
+    Checks whether an input is decompressed before it is passed to the program, from the suffix of its name.
+    """
+
+    return path.endswith(COMPRESSED_SUFFIXES)
+
+
+def open_input(path: str):
+    """
+    Opens an input file to pass it to a process as its stdin: the file itself, or a `DecompressedInput` if it is
+    compressed.
+
+    :raises DecompressionError: If the file is compressed in a format that can not be read.
+    """
+
+    return DecompressedInput(path) if is_compressed(path) else open(path, 'rb')
+
+
+class DecompressedInput:
+    """
+    A pipe that a thread fills with the decompressed content of a file while a process reads it as its stdin, so the
+    content is never written to disk and at most the pipe buffer and one chunk of it are held in memory. The thread
+    starts when the input is opened, so it decompresses the first chunks while the process starts.
+    """
+
+    # The error of the decompression, if the content was cut by it. It is set when the input is closed.
+    error: Optional[str]
+
+    def __init__(self, path: str):
+        self.path = path
+        self.error = None
+        reader = _open_decompressor(path)
+        # The descriptors of `os.pipe` are not inherited, so only the process that gets the read end as its stdin
+        # holds it.
+        self._read_fd, write_fd = os.pipe()
+        self._thread = threading.Thread(target=self._feed, args=(reader, write_fd), name='decompress', daemon=True)
+        self._thread.start()
+
+    def fileno(self) -> int:
+        """
+        Returns the read end of the pipe, which `subprocess` passes to the process.
+        """
+
+        return self._read_fd
+
+    def close(self) -> None:
+        """
+        Closes the read end of the pipe and waits for the thread. A process that did not read its whole input has
+        exited by now, so the thread stops at its next write.
+        """
+
+        if self._read_fd is not None:
+            os.close(self._read_fd)
+            self._read_fd = None
+        self._thread.join()
+
+    def __enter__(self) -> 'DecompressedInput':
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    def _feed(self, reader, write_fd: int) -> None:
+        try:
+            with reader:
+                for chunk in iter(lambda: reader.read(_CHUNK_SIZE), b''):
+                    _write_all(write_fd, chunk)
+        except BrokenPipeError:
+            pass  # The process exited without reading all of its input.
+        except Exception as e:  # pylint: disable=broad-except
+            # A corrupt or truncated file. The process has read the content before the error, and then the end of
+            # its input.
+            self.error = f"'{self.path}' can not be decompressed: {e}"
+        finally:
+            os.close(write_fd)
+
+
+def _write_all(fd: int, data: bytes) -> None:
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view):]
+
+
+def _open_decompressor(path: str):
+    # pylint: disable=import-outside-toplevel
+    if path.endswith('.gz'):
+        import gzip
+        return gzip.open(path, 'rb')
+    if path.endswith(('.xz', '.lzma')):
+        import lzma
+        return lzma.open(path, 'rb')
+    if path.endswith('.bz2'):
+        import bz2
+        return bz2.open(path, 'rb')
+    return _open_zstd(path)
+
+
+def _open_zstd(path: str):
+    # Zstandard is not in the standard library, so it is read with the `zstandard` package if it is installed, or
+    # with the `zstd` command.
+    try:
+        import zstandard  # pylint: disable=import-outside-toplevel
+    except ImportError:
+        return _open_zstd_command(path)
+    file = open(path, 'rb')  # pylint: disable=consider-using-with  # pragma: no cover
+    return zstandard.ZstdDecompressor().stream_reader(file, closefd=True)  # pragma: no cover
+
+
+def _open_zstd_command(path: str) -> '_CommandReader':
+    executable = shutil.which(ZSTD_EXECUTABLE)
+    if executable is None:
+        raise DecompressionError("Reading '.zst' inputs needs the 'zstandard' package or the 'zstd' command.")
+    return _CommandReader([executable, '-d', '-c', '-q', '--', path])
+
+
+class _CommandReader:
+    """
+    Reads the stdout of a command that decompresses a file. The command is killed when the reader is closed.
+    """
+
+    def __init__(self, command: List[str]):
+        self._command = command
+        self._process = subprocess.Popen(command, stdin=subprocess.DEVNULL,  # pylint: disable=consider-using-with
+                                         stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+    def read(self, size: int) -> bytes:
+        """
+        Reads the next chunk of the output. At its end, it raises a `DecompressionError` with the error of the command
+        if the command failed.
+        """
+
+        chunk = self._process.stdout.read(size)
+        if not chunk:
+            stderr = self._process.stderr.read().decode(errors='replace').strip()
+            if self._process.wait() != 0:
+                raise DecompressionError(stderr or f"'{self._command[0]}' exited with code {self._process.returncode}.")
+        return chunk
+
+    def __enter__(self) -> '_CommandReader':
+        return self
+
+    def __exit__(self, *_) -> None:
+        if self._process.poll() is None:
+            self._process.kill()
+        self._process.communicate()
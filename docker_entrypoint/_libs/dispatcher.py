@@ -0,0 +1,214 @@
+import logging
+import os
+import sys
+from typing import List, Optional
+
+from on_rails import Result, def_result
+from schema import And, Or, Schema
+
+from docker_entrypoint._libs.BenchOptions import BenchOptions
+from docker_entrypoint._libs.cli_parser import (CACHE_DIR_ENVIRONMENT,
+                                                create_cli_parser,
+                                                find_command)
+from docker_entrypoint._libs.CodeReportOptions import CodeReportOptions
+from docker_entrypoint._libs.commands import (command_about, command_bash,
+                                              command_bench, command_d8,
+                                              command_run, command_samples,
+                                              command_shell)
+from docker_entrypoint._libs.DockerEnvironments import DockerEnvironments
+from docker_entrypoint._libs.ExitCodes import ExitCode
+from docker_entrypoint._libs.GcReportOptions import GcReportOptions
+from docker_entrypoint._libs.Logger import Logger
+from docker_entrypoint._libs.manifest_command import command_run_manifest
+from docker_entrypoint._libs.OptReportOptions import OptReportOptions
+from docker_entrypoint._libs.ProfileOptions import ProfileOptions
+from docker_entrypoint._libs.report_commands import (command_code_report,
+                                                     command_gc_report,
+                                                     command_opt_report,
+                                                     command_profile)
+from docker_entrypoint._libs.ResultDetails.FailResult import FailResult
+from docker_entrypoint._libs.RunOptions import RunOptions
+from docker_entrypoint._libs.serve_command import command_serve
+from docker_entrypoint._libs.ServeOptions import ServeOptions
+from docker_entrypoint._libs.utility import class_properties_to_str, log_result
+from docker_entrypoint._libs.validation import validate_func_params
+
+
+@def_result()
+@validate_func_params(schema=Schema({
+    'logger': Or(None, logging.Logger, error='The logger must be None or type of logging.Logger'),
+    'args': Or(None, [str], error='The args must be None or be a list of strings'),
+}))
+def run_cli(args: Optional[List[str]] = None, logger: Optional[logging.Logger] = None) -> Result:
+    """
+    Parses the command-line arguments, runs the command and logs the result. The parser only gets the arguments of
+    the command that is used.
+    """
+
+    if not logger:
+        logger = Logger.get(__name__) \
+            .on_fail_break_function() \
+            .value
+
+    args = sys.argv[1:] if args is None else args
+    return create_cli_parser(find_command(args)) \
+        .on_success(lambda parser: (parser.parse_known_args(args), parser)) \
+        .on_success(lambda values: run(values[0], values[1], logger)) \
+        .finally_tee(lambda prev_result: log_result(logger, prev_result)
+                     .on_fail(lambda res: logger.error("An error occurred while logging Result.\n"
+                                                       f"Current Error: {res}\n"
+                                                       f"Previous Result: {prev_result}"))
+                     ) \
+        .on_fail_new_detail(lambda prev_result: FailResult(code=prev_result.code())) \
+        .on_success_new_detail(None)
+
+
+@def_result()
+@validate_func_params(schema=Schema({
+    'arguments': And(lambda param: param is not None, error='The arguments is required'),
+    'parser': And(lambda param: param is not None, error='The parser is required'),
+    'logger': And(logging.Logger, error='The logger is required and must be type of logging.Logger'),
+}), internal=True)
+def run(arguments, parser, logger: logging.Logger) -> Result:
+    """
+    This function runs a command with given arguments and logs information about Docker environments and known parameters.
+
+    :param arguments: The `arguments` parameter is a tuple containing two elements: `known_params` and `args`.
+    `known_params` is a namespace object containing the parsed command-line arguments that were recognized by the parser,
+    while `args` is a list of positional arguments that were not recognized by the parser
+
+    :param parser: `parser` is an instance of the `argparse.ArgumentParser` class, which is used to define and parse
+    command-line arguments for the script. It is typically used to define the expected arguments and options, and to
+    generate help messages and usage information
+
+    :param logger: The logger parameter is an instance of the logging.Logger class, which is used for logging messages
+    during the execution of the run function. It allows the function to output messages of different levels (e.g. debug,
+    info, warning, error) to a specified output stream
+    :type logger: logging.Logger
+    """
+
+    known_params, args = arguments
+
+    return Logger.set_level(debug=known_params.debug) \
+        .on_success(lambda: DockerEnvironments.get_environments()) \
+        .on_success_tee(lambda environments:
+                        (logger.debug(class_properties_to_str(environments, "Environments")),
+                         logger.debug(f"known params: {known_params}\nArgs: {args}"))
+                        ) \
+        .on_success(lambda environments: _run(known_params, args, parser, environments, logger))
+
+
+@def_result()
+def _run(known_params, args, parser, environments: DockerEnvironments, logger: logging.Logger) -> Result:
+    """
+    Processes commands and arguments passed to it and executes the corresponding command function.
+
+    :param known_params: `known_params` is a named tuple that contains the parsed command line arguments and
+    options that are known to the program. It is used to determine which command to execute and what arguments
+    to pass to that command.
+
+    :param args: `args` is a list of additional arguments passed to the program.
+    It is used in the `_run` function to pass additional arguments to the specific command being executed
+
+    :param parser: `parser` is an instance of the `argparse.ArgumentParser` class, which is used to define
+    and parse command-line arguments. It is used to define the expected arguments and options for the
+    command-line interface of the program
+
+    :param environments: `environments` is an object of type `DockerEnvironments`, which is a class that
+    contains information about the Docker environment being used by the program.
+    :type environments: DockerEnvironments
+    """
+
+    args = args or []
+    if not known_params.command:
+        if known_params.version:
+            logger.info(f"Program Version: {environments.docker_version}")
+            return Result.ok()
+
+        # Print the list of available commands
+        parser.print_help()
+        return Result.fail(detail=FailResult(code=ExitCode.MISUSE_SHELL_BUILTINS, message="No command specified."))
+
+    # Process the command
+    known_params.command = known_params.command.lower()
+    if known_params.command == 'run':
+        files_and_dirs = known_params.file or []
+        files_and_dirs += known_params.directory or []
+        # The environment is read here instead of in the parser, because the parsers are cached.
+        cache_dir = known_params.cache_dir or os.environ.get(CACHE_DIR_ENVIRONMENT)
+        options = RunOptions(jobs=known_params.jobs, reuse_process=known_params.reuse_process,
+                             output_dir=known_params.output_dir, tee=known_params.tee,
+                             expected_dir=known_params.expected, comparator=known_params.compare,
+                             float_tolerance=known_params.float_tolerance, stats=known_params.stats,
+                             timeout=known_params.timeout, memory_limit=known_params.memory_limit,
+                             cpu_limit=known_params.cpu_limit, max_output_bytes=known_params.max_output_bytes,
+                             cache_dir=None if known_params.no_cache else cache_dir,
+                             cache_size=known_params.cache_size, refresh_cache=known_params.refresh,
+                             watch=known_params.watch, include=known_params.include,
+                             exclude=known_params.exclude, max_depth=known_params.max_depth,
+                             module=known_params.module)
+        if known_params.manifest is not None:
+            if known_params.program is not None or files_and_dirs or args:
+                return Result.fail(FailResult(code=ExitCode.MISUSE_SHELL_BUILTINS,
+                                              message="The programs, inputs and arguments of a manifest are given "
+                                                      "by its lines."))
+            return command_run_manifest(logger, manifest=known_params.manifest, options=options)
+        if known_params.program is None:
+            return Result.fail(FailResult(code=ExitCode.MISUSE_SHELL_BUILTINS,
+                                          message="The program is required, unless a manifest is given."))
+        return command_run(logger, program=known_params.program, files_and_dirs=files_and_dirs, args=args,
+                           options=options)
+    if known_params.command == 'bench':
+        files_and_dirs = (known_params.file or []) + (known_params.directory or [])
+        options = BenchOptions(runs=known_params.runs, warmup=known_params.warmup,
+                               random_seed=known_params.random_seed, predictable=known_params.predictable,
+                               disable_aslr=known_params.no_aslr, cpu=known_params.cpu,
+                               subtract_baseline=not known_params.no_baseline,
+                               variants=dict(known_params.variant or []))
+        return command_bench(logger, program=known_params.program, files_and_dirs=files_and_dirs, args=args,
+                             options=options)
+    if known_params.command == 'profile':
+        files_and_dirs = (known_params.file or []) + (known_params.directory or [])
+        options = ProfileOptions(jobs=known_params.jobs, top=known_params.top, report=known_params.report,
+                                 output=known_params.output)
+        return command_profile(logger, program=known_params.program, files_and_dirs=files_and_dirs, args=args,
+                               options=options)
+    if known_params.command == 'gc-report':
+        files_and_dirs = (known_params.file or []) + (known_params.directory or [])
+        options = GcReportOptions(jobs=known_params.jobs, report=known_params.report, output=known_params.output)
+        return command_gc_report(logger, program=known_params.program, files_and_dirs=files_and_dirs, args=args,
+                                 options=options)
+    if known_params.command == 'opt-report':
+        files_and_dirs = (known_params.file or []) + (known_params.directory or [])
+        options = OptReportOptions(jobs=known_params.jobs, top=known_params.top, report=known_params.report,
+                                   output=known_params.output)
+        return command_opt_report(logger, program=known_params.program, files_and_dirs=files_and_dirs, args=args,
+                                  options=options)
+    if known_params.command == 'code-report':
+        files_and_dirs = (known_params.file or []) + (known_params.directory or [])
+        options = CodeReportOptions(jobs=known_params.jobs, top=known_params.top, sort=known_params.sort,
+                                    report=known_params.report, diff=known_params.diff, output=known_params.output)
+        return command_code_report(logger, program=known_params.program, files_and_dirs=files_and_dirs, args=args,
+                                   options=options)
+    if known_params.command == 'serve':
+        if args:
+            return Result.fail(FailResult(code=ExitCode.MISUSE_SHELL_BUILTINS,
+                                          message=f"Unknown arguments of the serve command: {' '.join(args)}"))
+        options = ServeOptions(socket=known_params.socket, http_port=known_params.http_port, jobs=known_params.jobs,
+                               queue_size=known_params.queue_size, reuse_process=known_params.reuse_process,
+                               preload=known_params.preload, timeout=known_params.timeout,
+                               memory_limit=known_params.memory_limit, cpu_limit=known_params.cpu_limit,
+                               max_output_bytes=known_params.max_output_bytes)
+        return command_serve(logger, options=options)
+    if known_params.command == 'd8':
+        return command_d8(logger, args)
+    if known_params.command == 'shell':
+        return command_shell(logger, args)
+    if known_params.command == 'bash':
+        return command_bash(logger, args)
+    if known_params.command == 'samples':
+        return command_samples(logger, environments)
+    if known_params.command == 'about':
+        return command_about(logger, environments)
+
+    return Result.ok()  # pragma: no cover
@@ -0,0 +1,647 @@
+import fcntl
+import hashlib
+import json
+import os
+import re
+import tempfile
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from docker_entrypoint._libs.result_cache import lock_directory
+
+# Changes when the bundles change, so old bundles are not used.
+_BUNDLE_VERSION = '1'
+_BUNDLE_DIRECTORY = 'modules'
+
+_ID = r'[A-Za-z_$][\w$]*'
+_SPECIFIER = r'(?P<quote>[\'"])(?P<specifier>[^\'"\\\n]*)(?P=quote)'
+# Import attributes, like `with { type: 'json' }`, can not be bundled.
+_END = r'(?!\s*(?:with|assert)\b)[ \t]*;?'
+_IMPORT_PATTERN = re.compile(
+    rf'import\s*(?:(?P<default>{_ID})\s*(?:,\s*(?=[*{{])|(?=from\b)))?'
+    rf'(?:\*\s*as\s+(?P<namespace>{_ID})\s*|\{{(?P<named>[^}}]*)\}}\s*)?from\s*{_SPECIFIER}{_END}')
+_IMPORT_ONLY_PATTERN = re.compile(rf'import\s*{_SPECIFIER}{_END}')
+_DYNAMIC_IMPORT_PATTERN = re.compile(rf'import\s*\(\s*{_SPECIFIER}\s*\)')
+_EXPORT_STAR_PATTERN = re.compile(rf'export\s*\*\s*(?:as\s+(?P<namespace>{_ID})\s*)?from\s*{_SPECIFIER}{_END}')
+_EXPORT_NAMED_PATTERN = re.compile(rf'export\s*\{{(?P<named>[^}}]*)\}}\s*(?:from\s*{_SPECIFIER})?{_END}')
+_EXPORT_DEFAULT_DECLARATION_PATTERN = re.compile(
+    rf'export\s+default\s+(?P<keyword>(?:async\s+)?function\b\s*(?:\*\s*)?|class\b\s*)(?P<name>(?!extends\b){_ID})?')
+_EXPORT_DEFAULT_PATTERN = re.compile(r'export\s+default\b')
+_EXPORT_DECLARATION_PATTERN = re.compile(
+    rf'export\s+(?P<keyword>(?:const|let|var|class)\b|(?:async\s+)?function\b\s*(?:\*\s*)?)\s*(?P<name>{_ID})?')
+_STATEMENT_SPECIFIER_PATTERN = re.compile(rf'(?:(?:import|export)\b[^\'";]*?\bfrom\s*|import\s*){_SPECIFIER}')
+_NAMED_BINDING_PATTERN = re.compile(rf'\s*(?P<name>{_ID})(?:\s+as\s+(?P<alias>{_ID}))?\s*')
+
+_SPACE_PATTERN = re.compile(r'(?:\s+|//[^\n]*|/\*.*?\*/|^#![^\n]*)+', re.S)
+_STRING_PATTERN = re.compile(r'\'(?:[^\'\\\n]|\\.)*\'|"(?:[^"\\\n]|\\.)*"', re.S)
+_TEMPLATE_PATTERN = re.compile(r'(?:[^`\\$]|\\.|\$(?!\{))*(?:`|\$\{)', re.S)
+_NAME_PATTERN = re.compile(r'[^\W\d][\w$]*|\$[\w$]*')
+_NUMBER_PATTERN = re.compile(r'\.?\d[\w.]*')
+_REGEX_PATTERN = re.compile(r'/(?:[^/\\\[\n]|\\.|\[(?:[^\]\\\n]|\\.)*\])+/[\w$]*')
+_PUNCTUATOR_PATTERN = re.compile(r'=>|\.\.\.|\?\.(?!\d)|.', re.S)
+
+# After these words, a `/` starts a regular expression instead of a division.
+_EXPRESSION_KEYWORDS = {'return', 'typeof', 'instanceof', 'in', 'of', 'new', 'delete', 'void', 'throw', 'case', 'do',
+                        'else', 'yield', 'await'}
+# The `{` after the parentheses of these words opens a block instead of the body of a function.
+_BLOCK_KEYWORDS = {'if', 'for', 'while', 'switch', 'catch', 'with'}
+
+_DEFAULT_LOCAL = '__d8_default'
+_BUNDLE_HELPERS = """\
+function __d8_namespace(exports, defaultName) {
+  const namespace = Object.create(null);
+  for (const name of Object.keys(exports).sort()) {
+    namespace[name] = exports[name];
+  }
+  if (typeof namespace.default === 'function' && namespace.default.name === defaultName) {
+    Object.defineProperty(namespace.default, 'name', {value: 'default'});
+  }
+  Object.defineProperty(namespace, Symbol.toStringTag, {value: 'Module'});
+  return Object.freeze(namespace);
+}
+"""
+
+
+class ModuleError(Exception):
+    """
+    Raised when a module of an import graph does not exist.
+    """
+
+
+class ModuleGraph:
+    """
+    The modules that an ES module entry imports, directly or through other modules, and the entry itself, in the
+    order that they are evaluated.
+    """
+
+    # The absolute paths of the modules. The entry is the last one.
+    paths: List[str]
+    # The size and the modification time of each module, taken before it was read.
+    signatures: List[List[int]]
+    # The imports of modules that do not exist, as messages.
+    missing: List[str]
+    # Why the graph can not be bundled, or None if it can.
+    unsupported: Optional[str]
+
+    def __init__(self, paths: List[str], signatures: List[List[int]], missing: List[str],
+                 unsupported: Optional[str], modules: Dict[str, '_Module']):
+        self.paths = paths
+        self.signatures = signatures
+        self.missing = missing
+        self.unsupported = unsupported
+        self._modules = modules
+
+    def bundle(self) -> Optional[str]:
+        """
+        Flattens the graph into the source of one module, which runs like the entry with `d8 --module`. Each module
+        is evaluated in a function of its own, and its imports are bound to the exports of the modules before it.
+        Returns None if the graph uses a feature that the bundle does not support, like a cyclic import, top-level
+        await, `import.meta`, a dynamic import or an exported `let` or `var`, whose value could change later.
+        """
+
+        if self.unsupported is not None or self.missing:
+            return None
+        indexes = {path: index for index, path in enumerate(self.paths)}
+        exports: Dict[str, Dict[str, str]] = {}
+        parts = [f"// The modules of {self.paths[-1]}, bundled by the entrypoint.\n", _BUNDLE_HELPERS]
+        for index, path in enumerate(self.paths):
+            part = _bundle_module(self._modules[path], index, indexes, exports)
+            if part is None:
+                return None
+            parts.append(part)
+        return ''.join(parts)
+
+    def check_missing(self) -> None:
+        """
+        Raises a `ModuleError` if a module of the graph does not exist.
+        """
+
+        if self.missing:
+            raise ModuleError(self.missing[0])
+
+
+class ModuleBundleCache:
+    """
+    The class `ModuleBundleCache` stores the bundles of module graphs in the `modules` directory of the result cache,
+    keyed by the content of every module of the graph. For each entry, a manifest records the size and the
+    modification time of its modules, so an unchanged graph is loaded without resolving and reading the modules
+    again. The entries are evicted with the results of the cache.
+    """
+
+    directory: str
+
+    def __init__(self, cache_dir: str):
+        self._cache_dir = cache_dir
+        self.directory = os.path.join(cache_dir, _BUNDLE_DIRECTORY)
+        os.makedirs(self.directory, exist_ok=True)
+
+    def load(self, entry: str, refresh: bool = False) -> Tuple[List[str], Optional[str]]:
+        """
+        Returns the paths of the modules of the entry, and the path of its bundle, or None if the graph can not be
+        bundled.
+
+        :param entry: The path of the ES module entry.
+        :type entry: str
+
+        :param refresh: If it is true, the graph is resolved and bundled again.
+        :type refresh: bool
+        """
+
+        entry = os.path.abspath(entry)
+        manifest_path = os.path.join(self.directory, _hash(['manifest', entry]) + '.json')
+        manifest = None if refresh else self._load_manifest(manifest_path)
+        if manifest is not None:
+            return manifest['paths'], manifest['bundle'] and os.path.join(self.directory, manifest['bundle'])
+
+        graph = resolve_module_graph(entry)
+        graph.check_missing()
+        bundle_name = None
+        source = graph.bundle()
+        if source is not None:
+            # The bundle holds the content of every module, so it is keyed by its own content.
+            bundle_name = _hash([_BUNDLE_VERSION, source]) + '.mjs'
+            if not os.path.isfile(os.path.join(self.directory, bundle_name)):
+                self._write(bundle_name, source.encode('utf-8', 'surrogateescape'))
+        self._write(os.path.basename(manifest_path), json.dumps({
+            'version': _BUNDLE_VERSION, 'paths': graph.paths, 'signatures': graph.signatures, 'bundle': bundle_name,
+        }).encode())
+        return graph.paths, bundle_name and os.path.join(self.directory, bundle_name)
+
+    def _load_manifest(self, path: str) -> Optional[Dict]:
+        try:
+            with open(path, 'rb') as file:
+                manifest = json.load(file)
+            if manifest['version'] != _BUNDLE_VERSION or \
+                    [_file_signature(module) for module in manifest['paths']] != manifest['signatures']:
+                return None
+            used = [path] + ([os.path.join(self.directory, manifest['bundle'])] if manifest['bundle'] else [])
+            for used_path in used:
+                os.utime(used_path)  # The least recently used entries are evicted first.
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        return manifest
+
+    def _write(self, name: str, content: bytes) -> None:
+        # The eviction of the result cache does not run while the file is written.
+        with lock_directory(self._cache_dir, fcntl.LOCK_SH):
+            descriptor, temp_path = tempfile.mkstemp(dir=self.directory, prefix='.tmp-')
+            try:
+                with os.fdopen(descriptor, 'wb') as file:
+                    file.write(content)
+                os.replace(temp_path, os.path.join(self.directory, name))
+            except BaseException:
+                os.unlink(temp_path)
+                raise
+
+
+def resolve_module_graph(entry: str) -> ModuleGraph:
+    """
+    Finds the modules that an ES module entry imports, like d8 resolves them: a specifier is a path relative to the
+    directory of the module that imports it, unless it is absolute. The modules that only dynamic imports with a
+    string literal load are also part of the graph.
+
+    :param entry: The path of the ES module entry.
+    :type entry: str
+    """
+
+    modules: Dict[str, _Module] = {}
+    paths: List[str] = []
+    signatures: List[List[int]] = []
+    missing: List[str] = []
+    unsupported: List[str] = []
+    visiting: Set[str] = set()
+
+    def visit(path: str) -> None:
+        visiting.add(path)
+        try:
+            # The signature is taken before the module is read, so a module that changes while it is read does not
+            # match its signature later.
+            signature = _file_signature(path)
+            with open(path, encoding='utf-8', errors='surrogateescape') as file:
+                module = _Module(path, file.read())
+        except OSError as e:
+            missing.append(f"The module '{path}' can not be read: {e.strerror}.")
+            visiting.discard(path)
+            return
+        modules[path] = module
+        if module.unsupported is not None:
+            unsupported.append(f"'{path}' uses {module.unsupported}")
+        for specifier in module.requests + module.dynamic_requests:
+            dependency = resolve_specifier(path, specifier)
+            if dependency in visiting:
+                unsupported.append(f"'{path}' has a cyclic import of '{specifier}'")
+            elif dependency in modules:
+                continue
+            elif not os.path.isfile(dependency):
+                if specifier in module.requests:
+                    missing.append(f"The module '{specifier}' that '{path}' imports does not exist.")
+            else:
+                visit(dependency)
+        visiting.discard(path)
+        paths.append(path)
+        signatures.append(signature)
+
+    visit(os.path.abspath(entry))
+    return ModuleGraph(paths, signatures, missing, unsupported[0] if unsupported else None, modules)
+
+
+def resolve_specifier(referrer: str, specifier: str) -> str:
+    """
+    Returns the absolute path of the module that a specifier in the module `referrer` refers to.
+    """
+
+    return os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(referrer)), specifier))
+
+
+class _Module:  # pylint: disable=R0902  # One attribute per kind of import and export that the scanner finds.
+    """
+    The imports and the exports of one module, found with a scanner that knows enough of the syntax of JavaScript to
+    skip strings, template literals, regular expressions and comments, and to tell the top level from the bodies of
+    functions.
+    """
+
+    def __init__(self, path: str, source: str):
+        self.path = path
+        self.source = source
+        # The specifiers of the static imports and re-exports, in the order of the source.
+        self.requests: List[str] = []
+        self.dynamic_requests: List[str] = []
+        # (local name, specifier, imported name or None for the namespace)
+        self.imports: List[Tuple[str, str, Optional[str]]] = []
+        # (exported name, local name)
+        self.local_exports: List[Tuple[str, str]] = []
+        # (exported name, specifier, imported name or None for the namespace)
+        self.indirect_exports: List[Tuple[str, str, Optional[str]]] = []
+        self.star_exports: List[str] = []
+        # The names of the `const`, function and class declarations at the top level.
+        self.declarations: Set[str] = set()
+        # The replacements of the import and export syntax: (start, end, text).
+        self.edits: List[Tuple[int, int, str]] = []
+        self.unsupported: Optional[str] = None
+        if source.startswith('#!'):
+            # A hashbang is only allowed at the start of a file.
+            line_end = source.find('\n')
+            self.edits.append((0, len(source) if line_end < 0 else line_end, ''))
+        try:
+            self._scan()
+        except ValueError as e:
+            self._set_unsupported(str(e))
+
+    def _set_unsupported(self, reason: str) -> None:
+        if self.unsupported is None:
+            self.unsupported = reason
+
+    def _scan(self) -> None:
+        source = self.source
+        brackets = _Brackets()
+        previous: Tuple[str, str] = ('punctuator', ';')
+        declaration = None
+        exported_const = False
+        position = 0
+        while position < len(source):
+            match = _SPACE_PATTERN.match(source, position)
+            if match:
+                position = match.end()
+                continue
+            char = source[position]
+            if char in '\'"':
+                end = _match_end(_STRING_PATTERN, source, position, 'an unterminated string')
+                token = ('string', source[position:end])
+            elif char == '`' or (char == '}' and brackets.in_template()):
+                end, token = self._template(position, brackets)
+            elif _NAME_PATTERN.match(source, position):
+                end, token = self._name(position, _NAME_PATTERN.match(source, position).end(), previous, brackets)
+            elif char.isdigit() or (char == '.' and source[position + 1:position + 2].isdigit()):
+                end = _NUMBER_PATTERN.match(source, position).end()
+                token = ('number', source[position:end])
+            elif char == '/' and _starts_expression(previous):
+                end = _match_end(_REGEX_PATTERN, source, position, 'an unterminated regular expression')
+                token = ('regex', source[position:end])
+            else:
+                end = _PUNCTUATOR_PATTERN.match(source, position).end()
+                token = ('punctuator', source[position:end])
+                brackets.update(token[1], previous[1])
+
+            if brackets.is_top_level():
+                declaration = self._declaration(declaration, token)
+                exported_const = self._exported_const(exported_const, previous, token)
+            previous = token
+            position = end
+        if not brackets.is_top_level():
+            raise ValueError('unbalanced brackets')
+
+    def _template(self, position: int, brackets: '_Brackets') -> Tuple[int, Tuple[str, str]]:
+        # Scans a part of a template literal, from its start or from the end of a substitution to its end or to the
+        # start of the next substitution.
+        if self.source[position] == '}':
+            brackets.close_template()
+        end = _match_end(_TEMPLATE_PATTERN, self.source, position + 1, 'an unterminated template literal')
+        if self.source.endswith('${', 0, end):
+            brackets.open_template()
+            return end, ('punctuator', '${')
+        return end, ('string', '`')
+
+    def _name(self, position: int, end: int, previous: Tuple[str, str],
+              brackets: '_Brackets') -> Tuple[int, Tuple[str, str]]:
+        name = self.source[position:end]
+        if previous[1] in ('.', '?.'):
+            pass  # A property.
+        elif self._next_char(end) == ':':
+            pass  # A property name or a label.
+        elif name in ('import', 'export') and brackets.is_top_level():
+            return self._statement(position, name)
+        elif name == 'import' and self._next_char(end) in ('(', '.'):
+            self._set_unsupported('a dynamic import or import.meta')
+            self._dynamic_import(position)
+        elif name == 'export':
+            self._set_unsupported('an export that is not at the top level')
+        elif name == 'await' and brackets.function_depth == 0:
+            self._set_unsupported('top-level await')
+        return end, ('name', name)
+
+    def _next_char(self, position: int) -> str:
+        position = _skip_space(self.source, position)
+        return self.source[position:position + 1]
+
+    def _declaration(self, declaration: Optional[str], token: Tuple[str, str]) -> Optional[str]:
+        # Records the names of `const NAME`, `function NAME`, `function* NAME` and `class NAME` at the top level.
+        if declaration is not None and token[0] == 'name':
+            self.declarations.add(token[1])
+            return None
+        if declaration == 'function' and token[1] == '*':
+            return declaration
+        if token[0] == 'name' and token[1] in ('const', 'function', 'class'):
+            return token[1]
+        return None
+
+    def _exported_const(self, exported_const: bool, previous: Tuple[str, str], token: Tuple[str, str]) -> bool:
+        # Follows an exported `const` at the top level until the `;` that ends it. Only its first name is exported
+        # by the bundle, so a comma at the top level, which separates the names of a declaration, can not be bundled.
+        if previous == ('name', 'export') and token == ('name', 'const'):
+            return True
+        if exported_const and token == ('punctuator', ','):
+            self._set_unsupported('an exported declaration of several names')
+        return exported_const and token != ('punctuator', ';')
+
+    def _dynamic_import(self, position: int) -> None:
+        match = _DYNAMIC_IMPORT_PATTERN.match(self.source, position)
+        if match:
+            self.dynamic_requests.append(match.group('specifier'))
+
+    def _statement(self, position: int, keyword: str) -> Tuple[int, Tuple[str, str]]:
+        # Handles an import or an export at the top level. Returns where the scan continues, and the token that
+        # stands for the part that was handled.
+        try:
+            handled = self._import(position) if keyword == 'import' else self._export(position)
+        except ValueError:
+            handled = None
+        if handled is not None:
+            return handled
+        if keyword == 'import' and self._next_char(position + len(keyword)) in ('(', '.'):
+            self._set_unsupported('a dynamic import or import.meta')
+            self._dynamic_import(position)
+        else:
+            self._set_unsupported(f"an {keyword} syntax that can not be bundled")
+            match = _STATEMENT_SPECIFIER_PATTERN.match(self.source, position)
+            if match:
+                self.requests.append(match.group('specifier'))
+        return position + len(keyword), ('name', keyword)
+
+    def _import(self, position: int) -> Optional[Tuple[int, Tuple[str, str]]]:
+        match = _IMPORT_ONLY_PATTERN.match(self.source, position)
+        if match is None:
+            match = _IMPORT_PATTERN.match(self.source, position)
+            if match is None or not (match.group('default') or match.group('namespace') or
+                                     match.group('named') is not None):
+                return None
+        specifier = match.group('specifier')
+        self.requests.append(specifier)
+        if match.re is _IMPORT_PATTERN:
+            if match.group('default'):
+                self.imports.append((match.group('default'), specifier, 'default'))
+            if match.group('namespace'):
+                self.imports.append((match.group('namespace'), specifier, None))
+            for name, alias in _parse_named_bindings(match.group('named')):
+                self.imports.append((alias, specifier, name))
+        return self._remove(match), ('punctuator', ';')
+
+    def _export(self, position: int) -> Optional[Tuple[int, Tuple[str, str]]]:
+        match = _EXPORT_STAR_PATTERN.match(self.source, position)
+        if match:
+            self.requests.append(match.group('specifier'))
+            if match.group('namespace'):
+                self.indirect_exports.append((match.group('namespace'), match.group('specifier'), None))
+            else:
+                self.star_exports.append(match.group('specifier'))
+            return self._remove(match), ('punctuator', ';')
+
+        match = _EXPORT_NAMED_PATTERN.match(self.source, position)
+        if match:
+            specifier = match.group('specifier')
+            if specifier is not None:
+                self.requests.append(specifier)
+            for name, alias in _parse_named_bindings(match.group('named')):
+                if specifier is None:
+                    self.local_exports.append((alias, name))
+                else:
+                    self.indirect_exports.append((alias, specifier, name))
+            return self._remove(match), ('punctuator', ';')
+
+        match = _EXPORT_DEFAULT_DECLARATION_PATTERN.match(self.source, position)
+        if match:
+            # An anonymous function or class gets a name, and the bundle names it `default` again.
+            name = match.group('name') or _DEFAULT_LOCAL
+            self.local_exports.append(('default', name))
+            self.declarations.add(name)
+            return self._replace(match, f"{' '.join(match.group('keyword').split())} {name} "), ('name', name)
+
+        match = _EXPORT_DEFAULT_PATTERN.match(self.source, position)
+        if match:
+            self.local_exports.append(('default', _DEFAULT_LOCAL))
+            self.declarations.add(_DEFAULT_LOCAL)
+            return self._replace(match, f"const {_DEFAULT_LOCAL} ="), ('punctuator', '=')
+
+        match = _EXPORT_DECLARATION_PATTERN.match(self.source, position)
+        if match:
+            if match.group('keyword') in ('let', 'var'):
+                self._set_unsupported(f"an exported '{match.group('keyword')}', whose value can change")
+            elif match.group('name') is None:
+                self._set_unsupported('an exported destructuring declaration')
+            else:
+                self.local_exports.append((match.group('name'), match.group('name')))
+            end = position + len('export')
+            self.edits.append((position, end, ''))
+            return end, ('name', 'export')
+        return None
+
+    def _remove(self, match: re.Match) -> int:
+        return self._replace(match, '')
+
+    def _replace(self, match: re.Match, text: str) -> int:
+        # The lines are kept, so the line numbers in the bundle stay close to the ones of the modules.
+        self.edits.append((match.start(), match.end(), text + '\n' * match.group().count('\n')))
+        return match.end()
+
+
+class _Brackets:
+    """
+    Tracks the open brackets of a scan, and how many of them are the bodies of functions.
+    """
+
+    function_depth: int
+
+    def __init__(self):
+        # Each entry is the opening bracket, and for `(` the token before it, for `{` whether it opens a function.
+        self._stack: List[Tuple[str, object]] = []
+        # The token before the `(` of the last `)`.
+        self._parenthesized_by = ''
+        self.function_depth = 0
+
+    def is_top_level(self) -> bool:
+        """
+        Checks whether no bracket is open.
+        """
+
+        return not self._stack
+
+    def in_template(self) -> bool:
+        """
+        Checks whether the innermost open bracket is the `${` of a template literal.
+        """
+
+        return bool(self._stack) and self._stack[-1][0] == '${'
+
+    def open_template(self) -> None:
+        """
+        Opens the `${` of a template literal.
+        """
+
+        self._stack.append(('${', None))
+
+    def close_template(self) -> None:
+        """
+        Closes the `${` of a template literal.
+        """
+
+        self._stack.pop()
+
+    def update(self, punctuator: str, previous: str) -> None:
+        """
+        Opens or closes the bracket of a punctuator. The token before it tells whether a `{` opens a function.
+        """
+
+        if punctuator in ('(', '['):
+            self._stack.append((punctuator, previous))
+        elif punctuator == '{':
+            is_function = previous == '=>' or (previous == ')' and self._parenthesized_by not in _BLOCK_KEYWORDS)
+            self._stack.append(('{', is_function))
+            self.function_depth += is_function
+        elif punctuator in (')', ']', '}'):
+            if not self._stack or self._stack[-1][0] != {')': '(', ']': '[', '}': '{'}[punctuator]:
+                raise ValueError('unbalanced brackets')
+            bracket, value = self._stack.pop()
+            if bracket == '(':
+                self._parenthesized_by = value
+            elif bracket == '{':
+                self.function_depth -= value
+
+
+def _bundle_module(module: _Module, index: int, indexes: Dict[str, int],
+                   exports: Dict[str, Dict[str, str]]) -> Optional[str]:
+    # Returns the part of the bundle that evaluates the module, and adds its exports to `exports`, as the
+    # expressions that read them in the part. Returns None if an import can not be bound.
+    def target(specifier: str) -> Tuple[str, Dict[str, str]]:
+        path = resolve_specifier(module.path, specifier)
+        return f"__d8_module_{indexes[path]}", exports[path]
+
+    bindings = []
+    for local, specifier, imported in module.imports:
+        variable, target_exports = target(specifier)
+        if imported is not None and imported not in target_exports:
+            return None
+        bindings.append(f"const {local} = {variable}{'' if imported is None else '.' + imported};")
+
+    module_exports = _find_exports(module, target)
+    if module_exports is None:
+        return None
+    exports[module.path] = module_exports
+
+    namespace = ', '.join(f"{json.dumps(name)}: {value}" for name, value in module_exports.items())
+    return (f"const __d8_module_{index} = (() => {{ {' '.join(bindings)}\n{_apply_edits(module)}\n"
+            f"return __d8_namespace({{{namespace}}}, {json.dumps(_DEFAULT_LOCAL)});\n}})();\n")
+
+
+def _find_exports(module: _Module, target: Callable[[str], Tuple[str, Dict[str, str]]]) -> Optional[Dict[str, str]]:
+    # Returns the exported names of the module, and the expressions that read them at the end of the module.
+    module_exports: Dict[str, str] = {}
+    imported_names = {local for local, _, _ in module.imports}
+    for exported, local in module.local_exports:
+        if local not in module.declarations and local not in imported_names:
+            return None  # A `let` or a `var`, or a name that is not declared.
+        module_exports[exported] = local
+    for exported, specifier, imported in module.indirect_exports:
+        variable, target_exports = target(specifier)
+        if imported is not None and imported not in target_exports:
+            return None
+        module_exports[exported] = variable + ('' if imported is None else f".{imported}")
+
+    # A name that several `export *` provide is ambiguous, so it is not exported, like in a module.
+    star_names: Dict[str, Optional[str]] = {}
+    for specifier in module.star_exports:
+        variable, target_exports = target(specifier)
+        for name in target_exports:
+            if name != 'default' and name not in module_exports:
+                star_names[name] = None if name in star_names else f"{variable}.{name}"
+    module_exports.update((name, value) for name, value in star_names.items() if value is not None)
+    return module_exports
+
+
+def _apply_edits(module: _Module) -> str:
+    parts, last_end = [], 0
+    for start, end, text in sorted(module.edits):
+        parts += [module.source[last_end:start], text]
+        last_end = end
+    parts.append(module.source[last_end:])
+    return ''.join(parts)
+
+
+def _parse_named_bindings(named: Optional[str]) -> List[Tuple[str, str]]:
+    # Parses `a, b as c,` to [(a, a), (b, c)].
+    if named is None:
+        return []
+    bindings = []
+    for part in named.split(','):
+        if not part.strip():
+            continue
+        match = _NAMED_BINDING_PATTERN.fullmatch(part)
+        if match is None:
+            raise ValueError(f"the binding '{part.strip()}'")
+        bindings.append((match.group('name'), match.group('alias') or match.group('name')))
+    return bindings
+
+
+def _starts_expression(previous: Tuple[str, str]) -> bool:
+    kind, text = previous
+    if kind == 'name':
+        return text in _EXPRESSION_KEYWORDS
+    return kind == 'punctuator' and text not in (')', ']', '}')
+
+
+def _match_end(pattern: re.Pattern, source: str, position: int, error: str) -> int:
+    match = pattern.match(source, position)
+    if match is None:
+        raise ValueError(error)
+    return match.end()
+
+
+def _skip_space(source: str, position: int) -> int:
+    match = _SPACE_PATTERN.match(source, position)
+    return match.end() if match else position
+
+
+def _file_signature(path: str) -> List[int]:
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def _hash(values: List[str]) -> str:
+    return hashlib.sha256(json.dumps(values).encode()).hexdigest()
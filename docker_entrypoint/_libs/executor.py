@@ -0,0 +1,519 @@
+import io
+import os
+import resource
+import shlex
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from contextlib import ExitStack
+from functools import lru_cache
+from typing import Callable, List, Optional, Set
+
+from docker_entrypoint._libs.decompress import (DecompressedInput,
+                                                DecompressionError, open_input)
+from docker_entrypoint._libs.ExitCodes import ExitCode
+
+D8_EXECUTABLE = 'd8'
+
+# The d8 flags that the `d8` and `shell` commands document.
+D8_Recommended_OPTIONS = {
+    '--harmony': 'Enables support for some of the experimental ES6 features that are not yet fully standardized',
+    '--allow-natives-syntax': 'Enables the use of V8-specific syntax in JavaScript code',
+    '--trace-opt': 'Enables logging of V8\'s optimization process',
+    '--print-bytecode': 'Prints the generated bytecode for JavaScript functions',
+    '--print-opt-code': 'Prints the generated optimized machine code for JavaScript functions',
+    '--trace': 'Enables detailed logging of V8 internals',
+    '--log-timer-events': 'Enables logging of timer events',
+    '--log-gc': 'Enables logging of garbage collection events',
+    '--prof': 'Enables CPU profiling',
+    '--trace-deopt': 'Enables logging of V8\'s deoptimization process',
+    '--trace-ic': 'Enables logging of inline caching events',
+}
+
+_STREAM_CHUNK_SIZE = 64 * 1024
+
+# The signals that a process that runs out of memory usually dies with: V8 aborts or traps on a failed allocation,
+# and the OOM killer of the kernel sends SIGKILL.
+_OUT_OF_MEMORY_SIGNALS = (signal.SIGABRT, signal.SIGSEGV, signal.SIGBUS, signal.SIGILL, signal.SIGTRAP, signal.SIGKILL)
+
+# The process groups of the processes that run with resource limits and are not reaped yet.
+_running_groups: Set['ProcessGroup'] = set()
+_running_groups_lock = threading.Lock()
+
+
+class ResourceUsage:
+    """
+    Stores the resources that a process used, as reported by `wait4`. Only the wall time is known when the program
+    did not run in its own process.
+    """
+
+    # In seconds.
+    wall_time: float
+    user_time: Optional[float]
+    system_time: Optional[float]
+    # The peak resident set size, in KiB.
+    max_rss: Optional[int]
+    voluntary_switches: Optional[int]
+    involuntary_switches: Optional[int]
+
+    def __init__(self, wall_time: float, user_time: Optional[float] = None, system_time: Optional[float] = None,
+                 max_rss: Optional[int] = None, voluntary_switches: Optional[int] = None,
+                 involuntary_switches: Optional[int] = None):
+        self.wall_time = wall_time
+        self.user_time = user_time
+        self.system_time = system_time
+        self.max_rss = max_rss
+        self.voluntary_switches = voluntary_switches
+        self.involuntary_switches = involuntary_switches
+
+
+class ResourceLimits:
+    """
+    The class `ResourceLimits` groups the limits of a process. The limits that are None are not enforced.
+    """
+
+    # The wall time, in seconds.
+    timeout: Optional[float]
+    # The data segment of the process (`RLIMIT_DATA`), in bytes. It covers the heaps of V8, but not the address space
+    # that V8 only reserves.
+    memory: Optional[int]
+    # The CPU time (`RLIMIT_CPU`), in seconds.
+    cpu_time: Optional[int]
+    # The size of each output file (`RLIMIT_FSIZE`) and of the stdout that is streamed, in bytes.
+    max_output_bytes: Optional[int]
+
+    def __init__(self, timeout: Optional[float] = None, memory: Optional[int] = None, cpu_time: Optional[int] = None,
+                 max_output_bytes: Optional[int] = None):
+        self.timeout = timeout
+        self.memory = memory
+        self.cpu_time = cpu_time
+        self.max_output_bytes = max_output_bytes
+
+    def has_limits(self) -> bool:
+        """
+        Checks whether any limit is enforced.
+        """
+
+        return any(value is not None for value in (self.timeout, self.memory, self.cpu_time, self.max_output_bytes))
+
+
+class LimitStatus:
+    """
+    Defines the statuses of a process that was stopped because it exceeded one of its resource limits.
+    """
+
+    # The process ran longer than its timeout or its CPU time limit.
+    TIMEOUT = 'TIMEOUT'
+
+    # The process crashed while a memory limit was set.
+    OOM = 'OOM'
+
+    # The process wrote more than its output limit.
+    OUTPUT_LIMIT = 'OUTPUT LIMIT'
+
+
+class ProcessResult:
+    """
+    Stores the outcome of a process that is spawned by `run_process`.
+    """
+
+    # The exit status like a shell reports it: the exit code of the process, or 128 + N when signal N killed it.
+    code: int
+    stdout: Optional[bytes]
+    stderr: Optional[bytes]
+    # It is None when the process could not be spawned.
+    usage: Optional[ResourceUsage]
+    # One of `LimitStatus` when the process exceeded one of its resource limits, otherwise None.
+    limit: Optional[str]
+
+    def __init__(self, code: int, stdout: Optional[bytes] = None, stderr: Optional[bytes] = None,
+                 usage: Optional[ResourceUsage] = None, limit: Optional[str] = None):
+        self.code = code
+        self.stdout = stdout
+        self.stderr = stderr
+        self.usage = usage
+        self.limit = limit
+
+
+def build_d8_command(program: Optional[str] = None, args: Optional[List[str]] = None,
+                     flags: Optional[List[str]] = None) -> List[str]:
+    """
+    Builds the argv of a d8 process that executes the program with the given arguments.
+
+    :param program: The path of the javascript program. If it is None, d8 starts the shell.
+    :type program: Optional[str]
+
+    :param args: The arguments that are passed to d8 after the program.
+    :type args: Optional[List[str]]
+
+    :param flags: The V8 flags that are passed to d8 before the program.
+    :type flags: Optional[List[str]]
+    """
+
+    command = [D8_EXECUTABLE] + (flags or [])
+    if program is not None:
+        command.append(program)
+    return command + (args or [])
+
+
+def format_command(command: List[str], stdin_path: Optional[str] = None) -> str:
+    """
+    Formats an argv list as a shell command line, only for logging.
+    """
+
+    result = shlex.join(command)
+    if stdin_path is not None:
+        result += f" < {shlex.quote(stdin_path)}"
+    return result
+
+
+def exit_status(returncode: int) -> int:
+    """
+    Converts the `returncode` of `subprocess` to the exit status that a shell reports.
+
+    :param returncode: The exit code of the process, or -N when signal N killed it.
+    :type returncode: int
+    """
+
+    return returncode if returncode >= 0 else ExitCode.FATAL_ERROR_SIGNAL + -returncode
+
+
+def run_process(command: List[str], stdin_path: Optional[str] = None, capture: bool = False,  # pylint: disable=R0914
+                stdout_path: Optional[str] = None, stderr_path: Optional[str] = None,
+                on_stdout: Optional[Callable[[bytes], bool]] = None,
+                limits: Optional[ResourceLimits] = None,
+                groups: Optional[List['ProcessGroup']] = None) -> ProcessResult:
+    """
+    Spawns the command directly from its argv list, without a shell, and waits for it with `wait4` to measure the
+    resources it used.
+
+    :param command: The argv of the process. The first item is looked up in the PATH.
+    :type command: List[str]
+
+    :param stdin_path: If it is given, the file is opened and passed to the process as its stdin. A compressed file,
+    like `.gz`, `.xz`, `.bz2` or `.zst`, is decompressed into a pipe while the process reads it. When it can not be
+    decompressed, the exit status is `IO_ERROR` and the error is written after the stderr of the process.
+    :type stdin_path: Optional[str]
+
+    :param capture: If it is true, stdout and stderr of the process are captured, otherwise the process writes
+    directly to the stdout and stderr of this process.
+    :type capture: bool
+
+    :param stdout_path: If it is given, the stdout of the process is written straight to this file through the file
+    descriptor of the child, and it is not captured.
+    :type stdout_path: Optional[str]
+
+    :param stderr_path: Like `stdout_path`, for stderr.
+    :type stderr_path: Optional[str]
+
+    :param on_stdout: If it is given, the stdout of the process is read chunk by chunk and passed to this function
+    instead of being captured or printed. It is still written to `stdout_path` if that is given. When the function
+    returns False, the process is killed.
+    :type on_stdout: Optional[Callable[[bytes], bool]]
+
+    :param limits: If it is given, the process runs in its own process group with these limits. The whole group is
+    killed when the process exits, when a limit is exceeded, or when this function is interrupted, for example by
+    Ctrl-C, so no process of the group is left behind.
+    :type limits: Optional[ResourceLimits]
+
+    :param groups: If it is given and the process runs in its own process group, the group is appended to it as soon
+    as the process is spawned, so the caller can kill the process from another thread.
+    :type groups: Optional[List[ProcessGroup]]
+    """
+
+    executable = _find_executable(command[0], os.environ.get('PATH', os.defpath))
+    if executable is None:
+        return _not_spawned(ExitCode.COMMAND_NOT_FOUND, f"{command[0]}: command not found\n", capture,
+                            stdout_path, stderr_path)
+
+    with ExitStack() as stack:
+        try:
+            stdin = stack.enter_context(open_input(stdin_path)) if stdin_path is not None else None
+        except DecompressionError as e:
+            return _not_spawned(ExitCode.IO_ERROR, f"{stdin_path}: {e}\n", capture, stdout_path, stderr_path)
+        # Captured outputs are buffered in temporary files instead of pipes, so the process can be waited for with
+        # `wait4`, which also reports its resource usage, without draining pipes at the same time.
+        stdout, captured_stdout = _open_output(stack, stdout_path, capture and on_stdout is None)
+        stderr, captured_stderr = _open_output(stack, stderr_path, capture)
+
+        try:
+            result = _spawn_and_wait(command, executable, stdin, stdout, stderr, on_stdout, limits, groups)
+        except OSError as e:  # For example, permission denied or an invalid executable format.
+            return _not_spawned(ExitCode.COMMAND_CANNOT_EXECUTE, f"{command[0]}: {e.strerror}\n", capture,
+                                stdout_path, stderr_path)
+        if isinstance(stdin, DecompressedInput):
+            stdin.close()
+            if stdin.error is not None:
+                # The program only read the part of the input before the error, so its result is not trusted.
+                result.code = ExitCode.IO_ERROR
+                _write_message(stderr, f"{stdin.error}\n")
+        result.stdout = _read_captured(captured_stdout)
+        result.stderr = _read_captured(captured_stderr)
+        return result
+
+
+def _spawn_and_wait(command: List[str], executable: str, stdin, stdout, stderr,
+                    on_stdout: Optional[Callable[[bytes], bool]], limits: Optional[ResourceLimits],
+                    groups: Optional[List['ProcessGroup']]) -> ProcessResult:
+    start = time.perf_counter()
+    # `close_fds=False` lets `subprocess` use `posix_spawn`. Python creates its own descriptors as non-inheritable,
+    # so nothing leaks into the child.
+    with subprocess.Popen(command, executable=executable, stdin=stdin, stderr=stderr, close_fds=False,
+                          stdout=subprocess.PIPE if on_stdout is not None else stdout,
+                          start_new_session=limits is not None) as process:
+        group = ProcessGroup(process.pid, limits) if limits is not None else None
+        if group is not None and groups is not None:
+            groups.append(group)
+        try:
+            if on_stdout is not None:
+                _stream_stdout(process, stdout, on_stdout, group)
+            return _wait(process, start, group)
+        except BaseException:
+            # `Popen` waits for the process when the `with` statement exits, so it must not keep running.
+            if group is not None:
+                group.close()
+            else:
+                process.kill()
+            raise
+
+
+class ProcessGroup:
+    """
+    Applies the resource limits to a process that leads its own process group, and kills the group when the timeout
+    expires or when it is closed. The groups are killed by `kill_running_processes` until they are closed. Once it is
+    closed, a group is not killed anymore, because its id may belong to another group after the process is reaped.
+    """
+
+    # The status of the limit that the process exceeded, if it was killed because of it.
+    exceeded: Optional[str]
+    # Whether this process killed the group before the process exited.
+    killed: bool
+
+    def __init__(self, pid: int, limits: ResourceLimits):
+        self.pid = pid
+        self.limits = limits
+        self.exceeded = None
+        self.killed = False
+        self._closed = False
+        self._lock = threading.Lock()
+        with _running_groups_lock:
+            _running_groups.add(self)
+        # The limits are applied from the parent instead of a `preexec_fn`, which is not safe in a process that runs
+        # threads. The process has just been spawned, so it can not use much of any resource before.
+        _set_limit(pid, resource.RLIMIT_DATA, limits.memory)
+        _set_limit(pid, resource.RLIMIT_FSIZE, limits.max_output_bytes)
+        # The process receives SIGXCPU at the soft limit, and SIGKILL one second later if it handles the signal.
+        _set_limit(pid, resource.RLIMIT_CPU, limits.cpu_time, extra=1)
+        self._timer = None
+        if limits.timeout is not None:
+            self._timer = threading.Timer(limits.timeout, self.kill, args=(LimitStatus.TIMEOUT,))
+            self._timer.daemon = True
+            self._timer.start()
+
+    def kill(self, exceeded: Optional[str] = None) -> None:
+        """
+        Kills all processes of the group.
+
+        :param exceeded: The status of the limit that the process exceeded, if it is killed because of it.
+        :type exceeded: Optional[str]
+        """
+
+        with self._lock:
+            if self._closed:
+                return
+            if not self.killed:
+                self.killed = True
+                self.exceeded = exceeded
+            _kill_group(self.pid)
+
+    def kill_processes(self) -> None:
+        """
+        Kills all processes of the group, like `kill`, but without a reason, for example when the caller is
+        interrupted.
+        """
+
+        with self._lock:
+            if not self._closed:
+                _kill_group(self.pid)
+
+    def close(self) -> None:
+        """
+        Stops the timer and kills the processes of the group that are still running. The process that leads the
+        group must not be reaped yet, so its id can not be reused by another group.
+        """
+
+        if self._timer is not None:
+            self._timer.cancel()
+        with self._lock:
+            if not self._closed:
+                _kill_group(self.pid)
+                self._closed = True
+        with _running_groups_lock:
+            _running_groups.discard(self)
+
+    def exceeded_limit(self, returncode: int) -> Optional[str]:
+        """
+        Returns the status of the limit that the process exceeded, from the way it was killed, or None.
+
+        :param returncode: The exit code of the process, or -N when signal N killed it.
+        :type returncode: int
+        """
+
+        if self.killed:
+            return self.exceeded
+        if returncode == -signal.SIGXCPU:
+            return LimitStatus.TIMEOUT
+        if returncode == -signal.SIGXFSZ:
+            return LimitStatus.OUTPUT_LIMIT
+        if self.limits.memory is not None and -returncode in _OUT_OF_MEMORY_SIGNALS:
+            return LimitStatus.OOM
+        return None
+
+
+def kill_running_processes() -> None:
+    """
+    Kills the process groups of all processes that `run_process` runs with resource limits at the moment, also the
+    ones of other threads, when the entrypoint is interrupted. A caller that only stops its own processes kills
+    their groups instead.
+    """
+
+    with _running_groups_lock:
+        groups = list(_running_groups)
+    for group in groups:
+        group.kill_processes()
+
+
+def _kill_group(pid: int) -> None:
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
+def _set_limit(pid: int, limit_resource: int, value: Optional[int], extra: int = 0) -> None:
+    if value is None:
+        return
+    soft, hard = value, value + extra
+    try:
+        _, current_hard = resource.prlimit(pid, limit_resource)
+        # An unprivileged process can not raise its hard limit.
+        if current_hard != resource.RLIM_INFINITY:
+            soft, hard = min(soft, current_hard), min(hard, current_hard)
+        resource.prlimit(pid, limit_resource, (soft, hard))
+    except ProcessLookupError:  # pragma: no cover
+        pass  # The process has already exited.
+
+
+def _open_output(stack: ExitStack, path: Optional[str], capture: bool):
+    if path is not None:
+        return stack.enter_context(open(path, 'wb')), None
+    if capture:
+        file = stack.enter_context(tempfile.TemporaryFile())
+        return file, file
+    return None, None
+
+
+def _stream_stdout(process: subprocess.Popen, stdout, on_stdout: Callable[[bytes], bool],
+                   group: Optional[ProcessGroup]) -> None:
+    max_bytes = group.limits.max_output_bytes if group is not None else None
+    total = 0
+    while True:
+        chunk = os.read(process.stdout.fileno(), _STREAM_CHUNK_SIZE)
+        if not chunk:
+            return
+        total += len(chunk)
+        exceeded = max_bytes is not None and total > max_bytes
+        if exceeded:
+            chunk = chunk[:len(chunk) - (total - max_bytes)]
+        if stdout is not None:
+            stdout.write(chunk)
+        if not on_stdout(chunk) or exceeded:
+            if group is not None:
+                group.kill(LimitStatus.OUTPUT_LIMIT if exceeded else None)
+            else:
+                process.kill()
+            return
+
+
+def _wait(process: subprocess.Popen, start: float, group: Optional[ProcessGroup]) -> ProcessResult:
+    if group is not None:
+        # Waits for the process without reaping it, and kills the rest of its group while its id is still reserved.
+        os.waitid(os.P_PID, process.pid, os.WEXITED | os.WNOWAIT)
+        group.close()
+    _, status, rusage = os.wait4(process.pid, 0)
+    wall_time = time.perf_counter() - start
+    # The process is already reaped, so `Popen` must not wait for it again.
+    process.returncode = -os.WTERMSIG(status) if os.WIFSIGNALED(status) else os.WEXITSTATUS(status)
+    usage = ResourceUsage(wall_time=wall_time, user_time=rusage.ru_utime, system_time=rusage.ru_stime,
+                          max_rss=rusage.ru_maxrss, voluntary_switches=rusage.ru_nvcsw,
+                          involuntary_switches=rusage.ru_nivcsw)
+    limit = group.exceeded_limit(process.returncode) if group is not None else None
+    return ProcessResult(code=exit_status(process.returncode), usage=usage, limit=limit)
+
+
+def _read_captured(file) -> Optional[bytes]:
+    if file is None:
+        return None
+    file.seek(0)
+    return file.read()
+
+
+def copy_file_to(path: str, output) -> None:
+    """
+    Copies the content of a file to an output stream. On Linux the data is copied by the kernel with `sendfile`.
+
+    :param path: The path of the file
+    :type path: str
+
+    :param output: A binary stream that has a file descriptor, like `sys.stdout.buffer`.
+    """
+
+    output.flush()
+    with open(path, 'rb') as file:
+        size = os.fstat(file.fileno()).st_size
+        offset = 0
+        try:
+            while offset < size:
+                sent = os.sendfile(output.fileno(), file.fileno(), offset, size - offset)
+                if sent == 0:  # pragma: no cover
+                    break
+                offset += sent
+        except (OSError, io.UnsupportedOperation):
+            file.seek(offset)
+            shutil.copyfileobj(file, output)
+            output.flush()
+
+
+@lru_cache(maxsize=32)
+def _find_executable(name: str, path: str) -> Optional[str]:
+    return shutil.which(name, path=path)
+
+
+def _write_message(file, message: str) -> None:
+    # Writes after the output of the process, to its stderr file or to the terminal.
+    if file is not None:
+        file.write(message.encode())
+    else:
+        sys.stderr.write(message)
+        sys.stderr.flush()
+
+
+def _not_spawned(code: int, message: str, capture: bool, stdout_path: Optional[str],
+                 stderr_path: Optional[str]) -> ProcessResult:
+    stdout = b'' if capture else None
+    stderr = message.encode() if capture else None
+    if stdout_path is not None:
+        with open(stdout_path, 'wb'):
+            stdout = None
+    if stderr_path is not None:
+        with open(stderr_path, 'wb') as file:
+            file.write(message.encode())
+        stderr = None
+    elif not capture:
+        sys.stderr.write(message)
+        sys.stderr.flush()
+    return ProcessResult(code=code, stdout=stdout, stderr=stderr)
@@ -0,0 +1,268 @@
+import json
+import math
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from docker_entrypoint._libs.bench_stats import percentile
+
+GC_REPORTS = ('table', 'json')
+
+# The kinds of the collections: the scavenges (and the minor mark-sweeps) of the young generation, and the
+# mark-compacts (and the mark-sweeps) of the whole heap.
+SCAVENGE = 'scavenge'
+MARK_COMPACT = 'mark-compact'
+GC_KINDS = (SCAVENGE, MARK_COMPACT)
+
+# [pid:isolate]  <time> ms: <name> <used> (<committed>) -> <used> (<committed>) MB, [pooled: <n> MB, ]<pause> / ...
+_EVENT_PATTERN = re.compile(
+    r'(?:\[(?P<isolate>[^\]]*)\])?\s*(?P<time>\d+(?:\.\d+)?) ms: (?P<name>[A-Z][A-Za-z -]*?(?: \([a-z ]+\))?) '
+    r'(?P<before>\d+(?:\.\d+)?) \(\d+(?:\.\d+)?\) -> (?P<after>\d+(?:\.\d+)?) \((?P<committed>\d+(?:\.\d+)?)\) MB, '
+    r'(?:pooled: \d+(?:\.\d+)? MB, )?(?P<pause>\d+(?:\.\d+)?) / ')
+
+# The heap flags are only suggested when the collections of their generation take at least this share of the time.
+_SIGNIFICANT_SHARE = 0.05
+# The suggested semi-space holds the allocations of this many seconds, so a scavenge happens about this often.
+_SCAVENGE_INTERVAL = 0.05
+_MIN_SEMI_SPACE, _MAX_SEMI_SPACE = 16, 256
+# The suggested old space holds the live objects and the objects that are promoted in this many seconds.
+_MARK_COMPACT_INTERVAL = 1.0
+_OLD_SPACE_STEP = 64
+
+# The number of points of the heap timeline.
+_TIMELINE_POINTS = 10
+
+
+class GcEvent:
+    """
+    One collection of a `--trace-gc` trace. The sizes are in MB, and the times in milliseconds.
+    """
+
+    # Since the isolate started.
+    time: float
+    # SCAVENGE or MARK_COMPACT.
+    kind: str
+    # The used heap before and after the collection, and the committed heap after it.
+    before: float
+    after: float
+    committed: float
+    pause: float
+
+    def __init__(self, time: float, kind: str, before: float, after: float, committed: float, pause: float):
+        self.time = time
+        self.kind = kind
+        self.before = before
+        self.after = after
+        self.committed = committed
+        self.pause = pause
+
+
+def parse_gc_event(line: str) -> Tuple[Optional[str], Optional[GcEvent]]:
+    """
+    Parses a line of the output of d8 with `--trace-gc`. Returns the isolate of the line and its event, or
+    (None, None) if the line is not a collection, like the output of the program.
+    """
+
+    match = _EVENT_PATTERN.search(line)
+    if match is None:
+        return None, None
+    name = match.group('name')
+    kind = SCAVENGE if name.startswith(('Scavenge', 'Minor')) else MARK_COMPACT
+    return match.group('isolate') or '', GcEvent(float(match.group('time')), kind, float(match.group('before')),
+                                                 float(match.group('after')), float(match.group('committed')),
+                                                 float(match.group('pause')))
+
+
+class GcTrace:
+    """
+    The class `GcTrace` collects the collections of the `--trace-gc` outputs of several runs, per isolate, with the
+    wall time of the runs.
+    """
+
+    # The events of each isolate of each run, in the order they happened.
+    isolates: List[List[GcEvent]]
+    # In seconds. The runs whose wall time is not known do not count.
+    wall_time: float
+
+    def __init__(self):
+        self.isolates = []
+        self.wall_time = 0.0
+
+    def add_file(self, path: str, wall_time: Optional[float] = None) -> None:
+        """
+        Adds the collections of a file that d8 wrote with `--trace-gc`.
+        """
+
+        with open(path, encoding='utf-8', errors='replace') as file:
+            self.add_lines(file, wall_time)
+
+    def add_lines(self, lines: Iterable[str], wall_time: Optional[float] = None) -> None:
+        """
+        Adds the collections of the lines of one run, and the wall time of the run, in seconds.
+        """
+
+        isolates: Dict[str, List[GcEvent]] = {}
+        for line in lines:
+            isolate, event = parse_gc_event(line)
+            if event is not None:
+                isolates.setdefault(isolate, []).append(event)
+        self.isolates.extend(isolates.values())
+        self.wall_time += wall_time or 0.0
+
+    def events(self, kind: Optional[str] = None) -> List[GcEvent]:
+        """
+        Returns the events of all isolates, or only the events of one kind.
+        """
+
+        return [event for events in self.isolates for event in events if kind in (None, event.kind)]
+
+
+class GcStats:  # pylint: disable=R0902  # One attribute per section of the GC report.
+    """
+    The statistics of a `GcTrace`: the pauses of each kind, the share of the wall time in the collections, the
+    growth of the heap and the allocation rate, and the heap flags that they suggest.
+    """
+
+    # The number of collections, and their pauses in milliseconds: sum, p50, p99 and max, for each kind and 'all'.
+    pauses: Dict[str, Dict[str, float]]
+    # The share of the wall time in the pauses of each kind and 'all', or None if the wall time is not known.
+    shares: Dict[str, Optional[float]]
+    # In MB: the peak of the used and the committed heap, and the largest heap after a mark-compact (the live
+    # objects), which is None without mark-compacts.
+    peak_used: float
+    peak_committed: float
+    live: Optional[float]
+    # In MB/s: the allocations, and the growth of the heap after the scavenges (the promoted objects).
+    allocation_rate: Optional[float]
+    promotion_rate: Optional[float]
+    # The heap after each collection of the isolate with the most collections, as (time, used, committed), at most
+    # `_TIMELINE_POINTS` of them.
+    timeline: List[Tuple[float, float, float]]
+    # The suggested flags, and why.
+    recommendations: List[Tuple[str, str]]
+
+    def __init__(self, trace: GcTrace):
+        self.pauses = {kind: _pause_stats([event.pause for event in trace.events(kind)])
+                       for kind in GC_KINDS + (None,)}
+        self.pauses['all'] = self.pauses.pop(None)
+        self.shares = {kind: stats['total'] / 1000 / trace.wall_time if trace.wall_time else None
+                       for kind, stats in self.pauses.items()}
+
+        events = trace.events()
+        self.peak_used = max((event.before for event in events), default=0.0)
+        self.peak_committed = max((event.committed for event in events), default=0.0)
+        self.live = max((event.after for event in trace.events(MARK_COMPACT)), default=None)
+
+        allocated = promoted = span = 0.0
+        for isolate_events in trace.isolates:
+            allocated += isolate_events[0].before
+            for previous, event in zip(isolate_events, isolate_events[1:]):
+                allocated += max(0.0, event.before - previous.after)
+                if event.kind == SCAVENGE:
+                    promoted += max(0.0, event.after - previous.after)
+            span += isolate_events[-1].time / 1000
+        self.allocation_rate = allocated / span if span else None
+        self.promotion_rate = promoted / span if span else None
+
+        longest = max(trace.isolates, key=len, default=[])
+        step = max(1, math.ceil(len(longest) / _TIMELINE_POINTS))
+        self.timeline = [(event.time, event.after, event.committed) for event in longest[step - 1::step]]
+        self.recommendations = self._recommend()
+
+    def _recommend(self) -> List[Tuple[str, str]]:
+        recommendations = []
+        share = self.shares[SCAVENGE]
+        if share is not None and share >= _SIGNIFICANT_SHARE and self.allocation_rate:
+            size = 2 ** math.ceil(math.log2(max(1.0, self.allocation_rate * _SCAVENGE_INTERVAL)))
+            size = min(_MAX_SEMI_SPACE, max(_MIN_SEMI_SPACE, size))
+            recommendations.append((
+                f"--max-semi-space-size={size}",
+                f"The scavenges take {share:.1%} of the wall time at {self.allocation_rate:.1f} MB/s of "
+                f"allocations. A semi-space of {size} MB fills in about "
+                f"{size / self.allocation_rate * 1000:.0f} ms, so fewer scavenges run."))
+
+        share = self.shares[MARK_COMPACT]
+        if share is not None and share >= _SIGNIFICANT_SHARE and self.live is not None:
+            needed = max(2 * self.live, self.live + (self.promotion_rate or 0.0) * _MARK_COMPACT_INTERVAL)
+            size = _OLD_SPACE_STEP * math.ceil(needed / _OLD_SPACE_STEP)
+            recommendations.append((
+                f"--max-old-space-size={size}",
+                f"The mark-compacts take {share:.1%} of the wall time with {self.live:.1f} MB of live objects and "
+                f"{self.promotion_rate or 0.0:.1f} MB/s of promotions. An old space of {size} MB holds them for "
+                f"about {_MARK_COMPACT_INTERVAL:g} s between mark-compacts."))
+        return recommendations
+
+    def to_dict(self) -> Dict:
+        """
+        Returns the statistics as a dictionary that can be serialized to JSON.
+        """
+
+        return {
+            'pauses': self.pauses,
+            'wall_time_shares': self.shares,
+            'heap': {'peak_used_mb': self.peak_used, 'peak_committed_mb': self.peak_committed,
+                     'live_mb': self.live,
+                     'timeline': [{'time_ms': time, 'used_mb': used, 'committed_mb': committed}
+                                  for time, used, committed in self.timeline]},
+            'allocation_rate_mb_per_s': self.allocation_rate,
+            'promotion_rate_mb_per_s': self.promotion_rate,
+            'recommendations': [{'flag': flag, 'reason': reason} for flag, reason in self.recommendations],
+        }
+
+
+def format_gc_report(stats: GcStats) -> str:
+    """
+    Formats the statistics as a table of the pauses of each kind, followed by the heap, its timeline, and the
+    suggested flags.
+    """
+
+    rows = [('Kind', 'Count', 'Total', 'p50', 'p99', 'Max', 'Wall %')]
+    for kind, pauses in stats.pauses.items():
+        share = stats.shares[kind]
+        rows.append((kind, str(int(pauses['count'])), *(f"{pauses[key]:.2f} ms" for key in ('total', 'p50', 'p99',
+                                                                                                 'max')),
+                     '-' if share is None else f"{share:.1%}"))
+    widths = [max(len(row[column]) for row in rows) for column in range(len(rows[0]))]
+    lines = ['  '.join([row[0].ljust(widths[0])] + [cell.rjust(width) for cell, width in zip(row[1:], widths[1:])])
+             for row in rows]
+
+    lines.append('')
+    live = '-' if stats.live is None else f"{stats.live:.1f} MB"
+    lines.append(f"Heap: peak {stats.peak_used:.1f} MB used, {stats.peak_committed:.1f} MB committed, {live} live "
+                 f"after the mark-compacts.")
+    lines.append(f"Allocation rate: {_format_rate(stats.allocation_rate)}, promotion rate: "
+                 f"{_format_rate(stats.promotion_rate)}.")
+    if stats.timeline:
+        lines.append('Heap after the collections:')
+        lines.extend(f"  {time:8.0f} ms  {used:8.1f} MB used  {committed:8.1f} MB committed"
+                     for time, used, committed in stats.timeline)
+
+    lines.append('')
+    if stats.recommendations:
+        lines.append('Suggested flags:')
+        lines.extend(f"  {flag}: {reason}" for flag, reason in stats.recommendations)
+    elif stats.shares['all'] is None:
+        lines.append('No heap flags are suggested: the wall time of the runs is not known.')
+    else:
+        lines.append('No heap flags are suggested: the collections take less than '
+                     f"{_SIGNIFICANT_SHARE:.0%} of the wall time of each generation.")
+    return '\n'.join(lines)
+
+
+def format_gc_json(stats: GcStats) -> str:
+    """
+    Formats the statistics as JSON.
+    """
+
+    return json.dumps(stats.to_dict(), indent=2)
+
+
+def _pause_stats(pauses: List[float]) -> Dict[str, float]:
+    pauses = sorted(pauses)
+    if not pauses:
+        return {'count': 0, 'total': 0.0, 'p50': 0.0, 'p99': 0.0, 'max': 0.0}
+    return {'count': len(pauses), 'total': sum(pauses), 'p50': percentile(pauses, 0.5),
+            'p99': percentile(pauses, 0.99), 'max': pauses[-1]}
+
+
+def _format_rate(rate: Optional[float]) -> str:
+    return '-' if rate is None else f"{rate:.1f} MB/s"
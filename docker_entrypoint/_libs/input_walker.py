@@ -0,0 +1,174 @@
+import fnmatch
+import os
+import queue
+import re
+import stat
+import threading
+from typing import Iterable, Iterator, List, Optional, Set, Tuple, TypeVar
+
+# Only the files directly in the given directories are inputs, unless a larger depth is given.
+DEFAULT_MAX_DEPTH = 1
+DEFAULT_QUEUE_SIZE = 1024
+
+_DIGITS_PATTERN = re.compile(r'(\d+)')
+# How often a full queue checks whether its consumer stopped, in seconds.
+_PUT_INTERVAL = 0.1
+
+_ITEM = 'item'
+_ERROR = 'error'
+_END = 'end'
+
+T = TypeVar('T')
+
+
+def natural_sort_key(name: str) -> Tuple[List, str]:
+    """
+    Returns a key that sorts the numbers in names by their values, so `2.txt` comes before `10.txt`. Names that only
+    differ in leading zeros are ordered by the name itself.
+    """
+
+    # The split always puts the numbers at the odd indices, so the parts of two keys are compared with the same types.
+    parts = _DIGITS_PATTERN.split(name)
+    return [int(part) if index % 2 else part for index, part in enumerate(parts)], name
+
+
+def walk_inputs(files_and_dirs: Iterable[str], include: Optional[List[str]] = None,
+                exclude: Optional[List[str]] = None, max_depth: int = DEFAULT_MAX_DEPTH) -> Iterator[str]:
+    """
+    Yields the input files while the directories are walked, so the first inputs can be executed before the walk
+    ends. The given files are yielded as they are. Each directory is walked depth-first with `os.scandir`: its files
+    come in natural order before its subdirectories. A file that is reached twice, through a symlink or because it
+    was given twice, is yielded once, and a symlink loop is not followed. The paths that do not exist, and the
+    directories that can not be read, are skipped.
+
+    :param files_and_dirs: The input files and directories.
+    :type files_and_dirs: Iterable[str]
+
+    :param include: If it is not empty, only the files that match one of these globs are yielded from directories.
+    A glob with a `/` matches the path relative to the given directory, the others match the name of the file.
+    :type include: Optional[List[str]]
+
+    :param exclude: The files and the directories that match one of these globs are skipped.
+    :type exclude: Optional[List[str]]
+
+    :param max_depth: The depth of the files that are yielded from a directory: 1 for the files directly in it, 2 to
+    also include the files of its subdirectories, and so on.
+    :type max_depth: int
+    """
+
+    seen_files: Set[Tuple[int, int]] = set()
+    visited_directories: Set[Tuple[int, int]] = set()
+    for path in files_and_dirs:
+        try:
+            path_stat = os.stat(path)
+        except OSError:
+            continue
+        if stat.S_ISDIR(path_stat.st_mode):
+            yield from _walk_directory(path, include or [], exclude or [], max_depth, seen_files,
+                                       visited_directories)
+        elif _is_new(seen_files, (path_stat.st_dev, path_stat.st_ino)):
+            yield path
+
+
+def prefetch(items: Iterable[T], size: int = DEFAULT_QUEUE_SIZE) -> Iterator[T]:
+    """
+    Iterates over the items in a background thread and yields them from a bounded queue. A slow producer, like the
+    walk of a large directory, keeps running while the consumer is busy, but never gets more than `size` items
+    ahead. An exception of the producer is raised in the consumer, and the producer stops when the consumer does.
+    """
+
+    buffer: queue.Queue = queue.Queue(maxsize=size)
+    stopped = threading.Event()
+
+    def put(kind: str, value) -> bool:
+        while not stopped.is_set():
+            try:
+                buffer.put((kind, value), timeout=_PUT_INTERVAL)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce() -> None:
+        try:
+            for item in items:
+                if not put(_ITEM, item):
+                    return
+        except Exception as e:  # pylint: disable=broad-except
+            put(_ERROR, e)
+            return
+        put(_END, None)
+
+    threading.Thread(target=produce, name='prefetch', daemon=True).start()
+    try:
+        while True:
+            kind, value = buffer.get()
+            if kind == _END:
+                return
+            if kind == _ERROR:
+                raise value
+            yield value
+    finally:
+        stopped.set()
+
+
+def _walk_directory(root: str, include: List[str], exclude: List[str], max_depth: int,
+                    seen_files: Set[Tuple[int, int]], visited_directories: Set[Tuple[int, int]]) -> Iterator[str]:
+    # Each entry holds a directory, its path relative to the root, and the depth of its files.
+    stack = [(root, '', 1)]
+    while stack:
+        directory, relative_directory, depth = stack.pop()
+        try:
+            device, entries = _scan_new_directory(directory, visited_directories)
+        except OSError:
+            continue
+
+        subdirectories = []
+        for entry in entries:
+            relative_path = relative_directory + entry.name
+            try:
+                if entry.is_dir():
+                    if depth < max_depth and not _matches_any(relative_path, exclude):
+                        subdirectories.append((entry.path, relative_path + '/', depth + 1))
+                elif entry.is_file() and _is_selected(relative_path, include, exclude) and \
+                        _is_new(seen_files, _file_identity(entry, device)):
+                    yield entry.path
+            except OSError:  # pragma: no cover
+                continue  # The entry was removed during the walk.
+        stack.extend(reversed(subdirectories))
+
+
+def _scan_new_directory(directory: str, visited_directories: Set[Tuple[int, int]]) -> Tuple[int, List[os.DirEntry]]:
+    # A directory that was already walked, for example through a symlink loop, has no entries.
+    directory_stat = os.stat(directory)
+    if not _is_new(visited_directories, (directory_stat.st_dev, directory_stat.st_ino)):
+        return directory_stat.st_dev, []
+    with os.scandir(directory) as iterator:
+        return directory_stat.st_dev, sorted(iterator, key=lambda entry: natural_sort_key(entry.name))
+
+
+def _file_identity(entry: os.DirEntry, device: int) -> Tuple[int, int]:
+    # The inode of a directory entry is known without a system call. Only a symlink has to be followed to the file
+    # that it points to.
+    if entry.is_symlink():
+        target_stat = entry.stat()
+        return target_stat.st_dev, target_stat.st_ino
+    return device, entry.inode()
+
+
+def _is_selected(relative_path: str, include: List[str], exclude: List[str]) -> bool:
+    if include and not _matches_any(relative_path, include):
+        return False
+    return not _matches_any(relative_path, exclude)
+
+
+def _matches_any(relative_path: str, patterns: List[str]) -> bool:
+    name = relative_path.rsplit('/', 1)[-1]
+    return any(fnmatch.fnmatchcase(relative_path if '/' in pattern else name, pattern) for pattern in patterns)
+
+
+def _is_new(seen: Set[Tuple[int, int]], identity: Tuple[int, int]) -> bool:
+    if identity in seen:
+        return False
+    seen.add(identity)
+    return True
@@ -0,0 +1,68 @@
+// Runs one program against many inputs inside a single long-lived d8 process.
+//
+// Usage: d8 realm_harness.js -- <program> [program arguments...]
+//
+// The program source is read once. Each request is one JSON line on stdin, e.g. {"id": 1, "input": "/path"}.
+// The program is evaluated in a fresh Realm for every request, with readline() reading the input file and
+// print()/write()/console.* collecting the output. Each response is one JSON line on stdout:
+// {"id": 1, "status": 0, "stdout": "...", "stderr": "..."}.
+
+(function (harnessArguments) {
+    const programPath = harnessArguments[0];
+    const programArguments = harnessArguments.slice(1);
+    const source = read(programPath);
+
+    // Installed in the global object of every new Realm before the program runs.
+    const prelude = `(function (global) {
+        const request = JSON.parse(Realm.shared);
+        const lines = request.input.split('\\n');
+        if (lines.length > 0 && lines[lines.length - 1] === '') {
+            lines.pop();
+        }
+        let nextLine = 0;
+        const stdout = [];
+        const stderr = [];
+        const format = (values) => Array.prototype.map.call(values, (value) => String(value)).join(' ');
+
+        global.arguments = request.args;
+        global.readline = () => (nextLine < lines.length ? lines[nextLine++] : undefined);
+        global.print = function () { stdout.push(format(arguments) + '\\n'); };
+        global.write = function () { stdout.push(format(arguments)); };
+        global.printErr = function () { stderr.push(format(arguments) + '\\n'); };
+        global.console = {
+            log: global.print, info: global.print, debug: global.print,
+            warn: global.printErr, error: global.printErr,
+        };
+        global.__harnessRecordError = (error) => {
+            stderr.push(String(error && error.stack ? error.stack : error) + '\\n');
+        };
+        global.__harnessTakeOutput = () => JSON.stringify({ stdout: stdout.join(''), stderr: stderr.join('') });
+    })(this);`;
+
+    while (true) {
+        const line = readline();
+        if (line === undefined || line === null || line === '') {
+            break;
+        }
+        const request = JSON.parse(line);
+
+        const realm = Realm.create();
+        Realm.shared = JSON.stringify({ input: read(request.input), args: programArguments });
+        Realm.eval(realm, prelude);
+
+        let status = 0;
+        try {
+            Realm.eval(realm, source);
+        } catch (error) {
+            status = 1;
+            Realm.shared = error;
+            Realm.eval(realm, '__harnessRecordError(Realm.shared)');
+        }
+
+        const output = JSON.parse(Realm.eval(realm, '__harnessTakeOutput()'));
+        Realm.dispose(realm);
+        Realm.shared = undefined;
+
+        print(JSON.stringify({ id: request.id, status: status, stdout: output.stdout, stderr: output.stderr }));
+    }
+})(arguments);
@@ -0,0 +1,280 @@
+import mmap
+import os
+import re
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Iterator, List, Optional
+
+from docker_entrypoint._libs.decompress import is_compressed
+from docker_entrypoint._libs.executor import (ProcessGroup, ProcessResult,
+                                              ResourceLimits, run_process)
+
+# The extensions of the expected output files, in the order they are looked up.
+EXPECTED_EXTENSIONS = ('.ans', '.out')
+
+COMPARATORS = ('exact', 'whitespace', 'float')
+DEFAULT_FLOAT_TOLERANCE = 1e-6
+
+# Expected files that are smaller than this are read into memory, larger ones are mapped.
+_MMAP_THRESHOLD = 1024 * 1024
+_TOKEN_PATTERN = re.compile(rb'\S+')
+
+
+class Verdict:
+    """
+    Defines the verdicts of a judged input. An input that exceeded a resource limit gets the `LimitStatus` of the
+    limit as its verdict.
+    """
+
+    # The program exited successfully and its output matches the expected output.
+    ACCEPTED = 'ACCEPTED'
+
+    # The output of the program does not match the expected output.
+    WRONG_ANSWER = 'WRONG ANSWER'
+
+    # The output matched so far, but the program exited with a non-zero code.
+    RUNTIME_ERROR = 'RUNTIME ERROR'
+
+
+class JudgedResult(ProcessResult):
+    """
+    Stores the outcome of a process whose output is compared with the expected output.
+    """
+
+    verdict: str
+    # Describes the first difference when the verdict is not accepted.
+    message: Optional[str]
+
+    def __init__(self, result: ProcessResult, verdict: str, message: Optional[str] = None):
+        super().__init__(code=result.code, stdout=result.stdout, stderr=result.stderr, usage=result.usage,
+                         limit=result.limit)
+        self.verdict = verdict
+        self.message = message
+
+
+class Comparator(ABC):
+    """
+    The base class of comparators. A comparator receives the output of the program chunk by chunk while it is
+    produced, so a wrong answer is detected at the first difference.
+    """
+
+    # Describes the first difference, once it is found.
+    mismatch: Optional[str]
+
+    def __init__(self, expected):
+        """
+        :param expected: The expected output, as bytes or a read-only mmap.
+        """
+
+        self._expected = expected
+        self.mismatch = None
+
+    @abstractmethod
+    def feed(self, chunk: bytes) -> bool:
+        """
+        Compares the next chunk of the output. Returns False as soon as the output differs from the expected output.
+        """
+
+    @abstractmethod
+    def finish(self) -> bool:
+        """
+        Compares the end of the output. Returns False if the expected output has more data.
+        """
+
+
+class ExactComparator(Comparator):
+    """
+    Requires the output to be byte for byte equal to the expected output.
+    """
+
+    def __init__(self, expected):
+        super().__init__(expected)
+        self._offset = 0
+
+    def feed(self, chunk: bytes) -> bool:
+        end = self._offset + len(chunk)
+        expected = self._expected[self._offset:end]
+        if expected != chunk:
+            index = next((i for i, (a, b) in enumerate(zip(chunk, expected)) if a != b), len(expected))
+            self.mismatch = f"The output differs from the expected output at byte {self._offset + index}."
+            return False
+        self._offset = end
+        return True
+
+    def finish(self) -> bool:
+        if self._offset < len(self._expected):
+            self.mismatch = f"The output ended after {self._offset} bytes, but the expected output has " \
+                            f"{len(self._expected)} bytes."
+            return False
+        return True
+
+
+class WhitespaceComparator(Comparator):
+    """
+    Compares the output and the expected output token by token, so the amount and the kind of whitespace between
+    tokens does not matter.
+    """
+
+    def __init__(self, expected):
+        super().__init__(expected)
+        self._expected_tokens = (match.group(0) for match in _TOKEN_PATTERN.finditer(expected))
+        self._token_count = 0
+        # The last token of a chunk may continue in the next chunk.
+        self._partial_token = b''
+
+    def feed(self, chunk: bytes) -> bool:
+        data = self._partial_token + chunk
+        tokens = data.split()
+        self._partial_token = tokens.pop() if tokens and not data[-1:].isspace() else b''
+        return all(self._match_next(token) for token in tokens)
+
+    def finish(self) -> bool:
+        if self._partial_token and not self._match_next(self._partial_token):
+            return False
+        self._partial_token = b''
+        expected = next(self._expected_tokens, None)
+        if expected is not None:
+            self.mismatch = f"The output ended after {self._token_count} tokens, but the expected output " \
+                            f"continues with '{_preview(expected)}'."
+            return False
+        return True
+
+    def _match_next(self, token: bytes) -> bool:
+        self._token_count += 1
+        expected = next(self._expected_tokens, None)
+        if expected is None:
+            self.mismatch = f"Token {self._token_count}: expected the end of the output, found '{_preview(token)}'."
+            return False
+        if not self._tokens_match(expected, token):
+            self.mismatch = f"Token {self._token_count}: expected '{_preview(expected)}', found '{_preview(token)}'."
+            return False
+        return True
+
+    def _tokens_match(self, expected: bytes, actual: bytes) -> bool:
+        return expected == actual
+
+
+class FloatComparator(WhitespaceComparator):
+    """
+    Like `WhitespaceComparator`, but numeric tokens match when their absolute or relative difference is not more
+    than the tolerance.
+    """
+
+    def __init__(self, expected, tolerance: float = DEFAULT_FLOAT_TOLERANCE):
+        super().__init__(expected)
+        self._tolerance = tolerance
+
+    def _tokens_match(self, expected: bytes, actual: bytes) -> bool:
+        if expected == actual:
+            return True
+        try:
+            expected_number, actual_number = float(expected), float(actual)
+        except ValueError:
+            return False
+        return abs(expected_number - actual_number) <= self._tolerance * max(1.0, abs(expected_number))
+
+
+class Expectation:
+    """
+    The class `Expectation` holds the expected output of one input and how the output of the program is compared
+    with it.
+    """
+
+    path: str
+    comparator: str
+    tolerance: float
+
+    def __init__(self, path: str, comparator: str = 'exact', tolerance: float = DEFAULT_FLOAT_TOLERANCE):
+        self.path = path
+        self.comparator = comparator
+        self.tolerance = tolerance
+
+    @contextmanager
+    def open_comparator(self) -> Iterator[Comparator]:
+        """
+        Opens the expected file and yields a new comparator for it. Large files are mapped instead of read.
+        """
+
+        with open(self.path, 'rb') as file:
+            size = os.fstat(file.fileno()).st_size
+            if size < _MMAP_THRESHOLD:
+                yield self._create_comparator(file.read())
+                return
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as expected:
+                yield self._create_comparator(expected)
+
+    def _create_comparator(self, expected) -> Comparator:
+        if self.comparator == 'whitespace':
+            return WhitespaceComparator(expected)
+        if self.comparator == 'float':
+            return FloatComparator(expected, self.tolerance)
+        return ExactComparator(expected)
+
+
+def find_expected_file(expected_dir: str, input_file: str) -> Optional[str]:
+    """
+    Finds the expected output of an input file: `<expected_dir>/<name>.ans` or `<expected_dir>/<name>.out`, where
+    `name` is the name of the input file without its extension. The suffix of a compressed input, like `.gz`, is
+    removed first, so `1.in.gz` is judged like `1.in`.
+
+    :return: The path of the expected file, or None if there is no such file.
+    """
+
+    name = os.path.basename(input_file)
+    if is_compressed(name):
+        name = os.path.splitext(name)[0]
+    name = os.path.splitext(name)[0]
+    for extension in EXPECTED_EXTENSIONS:
+        path = os.path.join(expected_dir, name + extension)
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+def judge_process(command: List[str], stdin_path: str, expectation: Expectation, capture: bool = False,
+                  stdout_path: Optional[str] = None, stderr_path: Optional[str] = None,
+                  limits: Optional[ResourceLimits] = None,
+                  groups: Optional[List[ProcessGroup]] = None) -> JudgedResult:
+    """
+    Runs the command like `run_process` and compares its stdout with the expected output while it is produced. The
+    process is killed at the first difference.
+
+    :param expectation: The expected output and the comparator.
+    :type expectation: Expectation
+
+    The other parameters are passed to `run_process`. The stdout is never captured or printed, but it is written to
+    `stdout_path` if it is given.
+    """
+
+    with expectation.open_comparator() as comparator:
+        result = run_process(command, stdin_path=stdin_path, capture=capture, stdout_path=stdout_path,
+                             stderr_path=stderr_path, on_stdout=comparator.feed, limits=limits, groups=groups)
+        return _judge(result, comparator)
+
+
+def judge_output(result: ProcessResult, expectation: Expectation) -> JudgedResult:
+    """
+    Compares the captured stdout of a finished process with the expected output.
+    """
+
+    with expectation.open_comparator() as comparator:
+        comparator.feed(result.stdout or b'')
+        return _judge(result, comparator)
+
+
+def _judge(result: ProcessResult, comparator: Comparator) -> JudgedResult:
+    # The output of a process that was stopped by a limit is incomplete, so the limit is the verdict.
+    if result.limit is not None:
+        return JudgedResult(result, result.limit, f"The program was stopped with code {result.code}.")
+    if comparator.mismatch is not None:
+        return JudgedResult(result, Verdict.WRONG_ANSWER, comparator.mismatch)
+    if result.code != 0:
+        return JudgedResult(result, Verdict.RUNTIME_ERROR, f"The program exited with code {result.code}.")
+    if not comparator.finish():
+        return JudgedResult(result, Verdict.WRONG_ANSWER, comparator.mismatch)
+    return JudgedResult(result, Verdict.ACCEPTED)
+
+
+def _preview(token: bytes, limit: int = 32) -> str:
+    text = token.decode(errors='replace')
+    return text if len(text) <= limit else text[:limit] + '...'
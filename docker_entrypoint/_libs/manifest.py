@@ -0,0 +1,168 @@
+import json
+import os
+import re
+from typing import Dict, List, Optional
+
+from schema import And
+from schema import Optional as OptionalKey
+from schema import Or, Schema, SchemaError
+
+from docker_entrypoint._libs.executor import ProcessResult
+from docker_entrypoint._libs.ExitCodes import ExitCode
+from docker_entrypoint._libs.judge import JudgedResult, Verdict
+
+# The ids of the jobs name their output directories.
+_ID_PATTERN = re.compile(r'^[\w.-]+$')
+
+_JOB_SCHEMA = Schema({
+    OptionalKey('id'): And(Or(str, int), lambda value: _ID_PATTERN.match(str(value)) and str(value) not in ('.', '..'),
+                           error="The id must be a string of letters, digits, '.', '_' and '-', or an integer."),
+    'program': And(str, str.strip, error='The program must be a non-empty string.'),
+    OptionalKey('inputs'): And([And(str, str.strip)], error='The inputs must be a list of non-empty strings.'),
+    OptionalKey('args'): And([str], error='The args must be a list of strings.'),
+    OptionalKey('flags'): And([str], error='The flags must be a list of strings.'),
+    OptionalKey('priority'): And(int, lambda n: not isinstance(n, bool), error='The priority must be an integer.'),
+    OptionalKey('timeout'): Or(None, And(Or(int, float), lambda n: not isinstance(n, bool) and n > 0),
+                               error='The timeout must be null or a positive number.'),
+    OptionalKey('expected'): Or(None, And(str, str.strip), error='The expected must be null or a non-empty string.'),
+})
+_FIELDS = ('id', 'program', 'inputs', 'args', 'flags', 'priority', 'timeout', 'expected')
+
+
+class ManifestError(Exception):
+    """
+    Raised when a manifest can not be read, or when one of its lines is not a valid job.
+    """
+
+
+class ManifestJob:  # pylint: disable=R0902  # One attribute per key of a manifest line.
+    """
+    One line of a manifest: a program that is executed with each of its inputs. The relative paths of the line are
+    relative to the directory of the manifest.
+    """
+
+    # The id of the job in the result lines and the name of its output directory: the `id` of the line, or its
+    # number.
+    id: str
+    program: str
+    # The input files and directories. Without inputs, the program is executed once with an empty stdin.
+    inputs: List[str]
+    # The arguments of the program, and the d8 flags before it.
+    args: List[str]
+    flags: List[str]
+    # The inputs of the jobs with a higher priority start first. The default is 0.
+    priority: int
+    # The timeout of each input, in seconds, instead of the one of the run.
+    timeout: Optional[float]
+    # The directory of the expected outputs, instead of the one of the run.
+    expected: Optional[str]
+
+    def __init__(self, job_id: str, program: str, inputs: Optional[List[str]] = None,
+                 args: Optional[List[str]] = None, flags: Optional[List[str]] = None, priority: int = 0,
+                 timeout: Optional[float] = None, expected: Optional[str] = None):
+        self.id = job_id
+        self.program = program
+        self.inputs = inputs or []
+        self.args = args or []
+        self.flags = flags or []
+        self.priority = priority
+        self.timeout = timeout
+        self.expected = expected
+
+
+def read_manifest(path: str) -> List[ManifestJob]:
+    """
+    Reads the jobs of a manifest, a JSON lines file with one job object per line. The empty lines are skipped.
+
+    :raises ManifestError: If the manifest can not be read or is not UTF-8, if a line is not a valid job, or if two
+    jobs have the same id.
+    """
+
+    base = os.path.dirname(path)
+    jobs: List[ManifestJob] = []
+    ids = set()
+    try:
+        with open(path, encoding='utf-8') as file:
+            for number, line in enumerate(file, start=1):
+                if line.strip():
+                    job = _parse_job(line, number, base)
+                    if job.id in ids:
+                        raise ManifestError(f"Line {number} of '{path}': The id '{job.id}' is not unique.")
+                    ids.add(job.id)
+                    jobs.append(job)
+    except OSError as e:
+        raise ManifestError(f"The manifest '{path}' can not be read: {e.strerror}.") from e
+    except UnicodeDecodeError as e:
+        # The file is decoded in blocks, so the number of the line is not known.
+        raise ManifestError(f"The manifest '{path}' can not be read: It is not valid UTF-8.") from e
+    except ValueError as e:
+        raise ManifestError(f"Line {number} of '{path}': {e}") from e
+    return jobs
+
+
+def _parse_job(line: str, number: int, base: str) -> ManifestJob:
+    # Raises a ValueError that describes the first problem of the line.
+    fields = json.loads(line)
+    if not isinstance(fields, dict):
+        raise ValueError('The line is not a JSON object.')
+    unknown = sorted(set(fields) - set(_FIELDS))
+    if unknown:
+        raise ValueError(f"Unknown field '{unknown[0]}'. The fields are: {', '.join(_FIELDS)}.")
+    try:
+        fields = _JOB_SCHEMA.validate(fields)
+    except SchemaError as e:
+        raise ValueError(e.code) from e
+
+    def resolve(path: Optional[str]) -> Optional[str]:
+        return os.path.join(base, path) if path is not None else None
+
+    return ManifestJob(str(fields.get('id', number)), resolve(fields['program']),
+                       [resolve(path) for path in fields.get('inputs', [])], fields.get('args'), fields.get('flags'),
+                       fields.get('priority', 0), fields.get('timeout'), resolve(fields.get('expected')))
+
+
+class JobResult:
+    """
+    The results of the inputs of a job, which are added as they finish. The job is finished when all its inputs
+    are.
+    """
+
+    job: ManifestJob
+    # The number of inputs that did not finish yet.
+    remaining: int
+    # The last exit status that is not 0. A wrong answer fails the job even if the program exited successfully.
+    code: int
+    # When it is set, the job could not be executed.
+    error: Optional[str]
+
+    def __init__(self, job: ManifestJob, inputs: int = 0, error: Optional[str] = None):
+        self.job = job
+        self.remaining = inputs
+        self.code = ExitCode.IO_ERROR if error is not None else 0
+        self.error = error
+        self._inputs: List[Dict] = []
+
+    def add(self, file: str, result: ProcessResult) -> None:
+        """
+        Adds the result of one input. Only its status is kept, not its outputs.
+        """
+
+        entry = {'file': file, 'code': result.code, 'status': result.limit,
+                 'wall_time': result.usage.wall_time if result.usage is not None else None}
+        code = result.code
+        if isinstance(result, JudgedResult):
+            entry.update(verdict=result.verdict, message=result.message)
+            code = ExitCode.GENERAL_ERROR if result.verdict == Verdict.WRONG_ANSWER else code
+        self._inputs.append(entry)
+        self.code = code or self.code
+        self.remaining -= 1
+
+    def to_dict(self) -> Dict:
+        """
+        Returns the result as a dictionary that can be serialized to JSON, with the inputs in the order they finished.
+        """
+
+        result = {'id': self.job.id, 'program': self.job.program, 'code': self.code, 'inputs': self._inputs}
+        if self.error is not None:
+            result['error'] = self.error
+        return result
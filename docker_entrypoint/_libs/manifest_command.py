@@ -0,0 +1,134 @@
+import json
+import logging
+import os
+from typing import Dict, Iterator, List, Optional
+
+from on_rails import Result
+from schema import And, Or, Schema
+
+from docker_entrypoint._libs.commands import (find_expectation,
+                                              mirrored_output_path)
+from docker_entrypoint._libs.executor import ResourceLimits, build_d8_command
+from docker_entrypoint._libs.ExitCodes import ExitCode
+from docker_entrypoint._libs.input_walker import walk_inputs
+from docker_entrypoint._libs.manifest import (JobResult, ManifestError,
+                                              ManifestJob, read_manifest)
+from docker_entrypoint._libs.ResultDetails.FailResult import FailResult
+from docker_entrypoint._libs.runner import InputTask, run_inputs_as_completed
+from docker_entrypoint._libs.RunOptions import RunOptions
+from docker_entrypoint._libs.utility import convert_code_to_result
+from docker_entrypoint._libs.validation import validate_func_params
+
+
+@validate_func_params(Schema({
+    'logger': And(logging.Logger, error='logger is required and must be a logging.Logger object'),
+    'manifest': And(And(str, error='The manifest must be a string'), And(str.strip, lambda s: len(s) > 0,
+                    error='The manifest can not be empty or whitespace')),
+    'options': Or(None, RunOptions, error='options must be an instance of `RunOptions` or None'),
+}))
+def command_run_manifest(logger: logging.Logger, manifest: str, options: Optional[RunOptions] = None) -> Result:
+    """
+    Runs the jobs of a manifest in one process. Each line of the manifest is a JSON object that gives a program, its
+    inputs, its arguments and d8 flags, and optionally its id, priority, timeout and expected outputs. The inputs of
+    all jobs share one pool of workers, and the jobs with a higher priority start first. When all inputs of a job
+    finish, a JSON line with their exit codes, statuses and verdicts is printed to stdout, so the results stream in
+    the order the jobs finish.
+
+    :param logger: A logging.Logger object used for logging messages
+    :type logger: logging.Logger
+
+    :param manifest: The path to the manifest. The relative paths of its lines are relative to its directory.
+    :type manifest: str
+
+    :param options: The number of parallel inputs, the directory of the outputs, the default expected outputs, the
+    comparator, the resource limits and the globs of the input directories. The outputs of an input are written to
+    `output_dir/<job id>/<input path>.out` and `.err`, and are discarded without `output_dir`. If it is not
+    provided, the default options are used.
+    :type options: Optional[RunOptions]
+    """
+
+    options = options or RunOptions()
+    try:
+        jobs = read_manifest(manifest)
+    except ManifestError as e:
+        return Result.fail(FailResult(code=ExitCode.IO_ERROR, message=str(e)))
+    _warn_ignored_manifest_options(logger, options)
+    # The sort is stable, so the jobs with the same priority start in the order of the manifest.
+    jobs.sort(key=lambda job: -job.priority)
+    logger.info(f"{len(jobs)} jobs from '{manifest}' on {options.jobs} workers.")
+    if options.output_dir is not None:
+        logger.info(f"The outputs are written to '{options.output_dir}'.")
+
+    finished: List[JobResult] = []
+    runnable: List[ManifestJob] = []
+    for job in jobs:
+        missing = next((path for path in [job.program] + job.inputs if not os.path.exists(path)), None)
+        if missing is None:
+            runnable.append(job)
+        else:
+            finished.append(_print_job_result(JobResult(job, error=f"File or directory '{missing}' does not exists.")))
+
+    # The job of each task that did not finish.
+    running: Dict[InputTask, JobResult] = {}
+    for input_result in run_inputs_as_completed(_create_manifest_tasks(logger, runnable, options, running),
+                                                options.jobs):
+        job_result = running.pop(input_result.task)
+        job_result.add(input_result.task.file, input_result.result)
+        if job_result.remaining == 0:
+            finished.append(_print_job_result(job_result))
+
+    failed = [job_result.code for job_result in finished if job_result.code != 0]
+    logger.info(f"Jobs: {len(finished)} finished, {len(failed)} failed.")
+    return convert_code_to_result(failed[-1] if failed else 0)
+
+
+def _print_job_result(job_result: JobResult) -> JobResult:
+    print(json.dumps(job_result.to_dict()), flush=True)
+    return job_result
+
+
+def _warn_ignored_manifest_options(logger: logging.Logger, options: RunOptions) -> None:
+    ignored = [name for name, used in (('--reuse-process', options.reuse_process), ('--tee', options.tee),
+                                       ('--stats', options.stats is not None), ('--watch', options.watch),
+                                       ('--module', options.module)) if used]
+    if ignored:
+        logger.warning(f"{', '.join(ignored)} can not be used with a manifest and are ignored.")
+
+
+def _create_manifest_tasks(logger: logging.Logger, jobs: List[ManifestJob], options: RunOptions,
+                           running: Dict[InputTask, JobResult]) -> Iterator[InputTask]:
+    # The inputs of a job are listed before its first task starts, so the job knows how many results it waits for.
+    for job in jobs:
+        files = list(walk_inputs(job.inputs, options.include, options.exclude, options.max_depth)) or [os.devnull]
+        job_result = JobResult(job, len(files))
+        command = build_d8_command(job.program, job.args, job.flags)
+        limits = ResourceLimits(timeout=job.timeout or options.limits.timeout, memory=options.limits.memory,
+                                cpu_time=options.limits.cpu_time, max_output_bytes=options.limits.max_output_bytes)
+        for file in files:
+            task = _create_manifest_task(logger, job, file, command, limits, options)
+            running[task] = job_result
+            yield task
+
+
+def _create_manifest_task(logger: logging.Logger, job: ManifestJob, file: str, command: List[str],
+                          limits: ResourceLimits, options: RunOptions) -> InputTask:
+    expected_dir = job.expected or options.expected_dir
+    expected = None
+    if expected_dir is not None and file != os.devnull:
+        expected = find_expectation(logger, expected_dir, file, options)
+    output_path = _manifest_output_path(options.output_dir, job, file)
+    stdout_path, stderr_path = (output_path + '.out', output_path + '.err') if output_path is not None \
+        else (os.devnull, os.devnull)
+    return InputTask(file=file, command=command, stdout_path=stdout_path, stderr_path=stderr_path,
+                     expected=expected, limits=limits)
+
+
+def _manifest_output_path(output_dir: Optional[str], job: ManifestJob, file: str) -> Optional[str]:
+    # The outputs of a job without inputs are `output_dir/<job id>.out` and `.err`. They are discarded without
+    # `output_dir`.
+    if output_dir is None:
+        return None
+    if file == os.devnull:
+        os.makedirs(output_dir, exist_ok=True)
+        return os.path.join(output_dir, job.id)
+    return mirrored_output_path(os.path.join(output_dir, job.id), file)
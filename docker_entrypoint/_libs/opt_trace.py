@@ -0,0 +1,296 @@
+import json
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from docker_entrypoint._libs.profiler import (UNKNOWN_FRAME, CodeMap,
+                                              TickProfile)
+
+OPT_REPORTS = ('table', 'json')
+
+ANONYMOUS_FUNCTION = '(anonymous)'
+
+# A function that is optimized again after this many deopts is in a deopt loop.
+DEOPT_LOOP_COUNT = 3
+
+# With `--trace-file-names`, the name of the function is followed by its script.
+_FUNCTION_PATTERN = re.compile(r'<JSFunction (?P<name>.*?) ?(?:<(?P<script>[^>]*)> )?\(sfi = ')
+_MARKING_PATTERN = re.compile(r'^\[(?:manually )?marking .* for optimization to ')
+_COMPILING_PATTERN = re.compile(r'^\[compiling method .*\(target (?P<tier>\w+)\)(?P<osr> OSR)?')
+_OPTIMIZED_PATTERN = re.compile(r'^\[completed optimizing .*\(target (?P<tier>\w+)\)(?P<osr> OSR)?')
+_ABORTED_PATTERN = re.compile(r'^\[aborted optimizing .* because: (?P<reason>.*?)(?: - took .*)?\]$')
+_BAILOUT_PATTERN = re.compile(r'^\[bailout \(kind: (?P<kind>[^,]+), reason: (?P<reason>.*?)\): begin\. ')
+# The code of the lazy deopts is marked before, with their reason.
+_DEPENDENT_CODE_PATTERN = re.compile(
+    r'^\[marking dependent code .*<SharedFunctionInfo ?(?P<name>[^>]*)>.* for deoptimization, reason: (?P<reason>.*)\]$')
+_UNKNOWN_REASON = '(unknown)'
+
+# The `--log-ic` events: <type>,<pc>,<time>,<line>,<column>,<old state>,<new state>,<map>,<key>,<modifier>,...
+_IC_EVENT_PATTERN = re.compile(r'^(?:Keyed)?(?:Load|Store|Define)[A-Za-z]*IC$')
+# The states of the inline caches that the report shows, from the least to the most costly.
+_IC_STATES = {'P': 'polymorphic', 'N': 'megamorphic', 'G': 'generic'}
+_IC_SEVERITY = {'P': 1, 'N': 2, 'G': 2}
+
+
+class FunctionOptimizations:  # pylint: disable=R0902  # One attribute per column of the report, and the deopt state.
+    """
+    The optimizations and the deopts of one function, by its name.
+    """
+
+    name: str
+    # The number of times the function was marked for optimization, and the number of compilations that started.
+    requests: int
+    attempts: int
+    # The number of optimizations that completed for each tier, like 'TURBOFAN' or 'MAGLEV OSR'.
+    tiers: Counter
+    # The number of aborted optimizations and of deopts for each reason.
+    aborts: Counter
+    deopts: Counter
+    # The number of optimizations that completed after a deopt.
+    reoptimizations: int
+
+    def __init__(self, name: str):
+        self.name = name
+        self.requests = 0
+        self.attempts = 0
+        self.tiers = Counter()
+        self.aborts = Counter()
+        self.deopts = Counter()
+        self.reoptimizations = 0
+        self._deoptimized = False
+
+    def add_optimization(self, tier: str) -> None:
+        """
+        Adds an optimization that completed for the tier.
+        """
+
+        self.tiers[tier] += 1
+        self.reoptimizations += self._deoptimized
+        self._deoptimized = False
+
+    def add_deopt(self, reason: str) -> None:
+        """
+        Adds a deopt, whose reason starts with its kind, like 'deopt-eager: wrong map'.
+        """
+
+        self.deopts[reason] += 1
+        self._deoptimized = True
+
+    @property
+    def deopt_loop(self) -> bool:
+        """
+        Whether the function was deoptimized and optimized again at least `DEOPT_LOOP_COUNT` times.
+        """
+
+        return self.reoptimizations >= DEOPT_LOOP_COUNT
+
+    def to_dict(self) -> Dict:
+        """
+        Returns the optimizations as a dictionary that can be serialized to JSON.
+        """
+
+        return {'name': self.name, 'requests': self.requests, 'attempts': self.attempts, 'tiers': dict(self.tiers),
+                'aborts': dict(self.aborts), 'deopts': dict(self.deopts), 'reoptimizations': self.reoptimizations,
+                'deopt_loop': self.deopt_loop}
+
+
+class IcSite:  # pylint: disable=R0902  # One attribute per column of the inline cache report.
+    """
+    An inline cache that became polymorphic or megamorphic: a property access of a function, at a position of its
+    script.
+    """
+
+    function: str
+    ic_type: str
+    key: str
+    line: int
+    column: int
+    # The number of state transitions, and the most costly state, one of the keys of `_IC_STATES`.
+    transitions: int
+    state: str
+    # The self ticks of the function, which rank the sites by their impact.
+    ticks: int
+
+    def __init__(self, function: str, ic_type: str, key: str, line: int, column: int):
+        self.function = function
+        self.ic_type = ic_type
+        self.key = key
+        self.line = line
+        self.column = column
+        self.transitions = 0
+        self.state = ''
+        self.ticks = 0
+
+    def to_dict(self) -> Dict:
+        """
+        Returns the site as a dictionary that can be serialized to JSON.
+        """
+
+        return {'function': self.function, 'type': self.ic_type, 'key': self.key, 'line': self.line,
+                'column': self.column, 'state': _IC_STATES[self.state], 'transitions': self.transitions,
+                'ticks': self.ticks}
+
+
+class OptTrace:
+    """
+    The class `OptTrace` aggregates the `--trace-opt` and `--trace-deopt` outputs of several runs per function, and
+    the inline cache transitions of their `--log-ic` logs per site. The ticks of the logs rank the sites.
+    """
+
+    functions: Dict[str, FunctionOptimizations]
+    profile: TickProfile
+
+    def __init__(self):
+        self.functions = {}
+        self.profile = TickProfile()
+        self._ic_sites: Dict[Tuple[str, str, str, int, int], IcSite] = {}
+
+    def add_trace_file(self, path: str) -> None:
+        """
+        Adds the optimizations and the deopts of a file that d8 wrote with `--trace-opt` and `--trace-deopt`.
+        """
+
+        with open(path, encoding='utf-8', errors='replace') as file:
+            self.add_trace_lines(file)
+
+    def add_trace_lines(self, lines: Iterable[str]) -> None:
+        """
+        Adds the optimizations and the deopts of the lines of one run. The other lines are ignored.
+        """
+
+        # The reasons of the lazy deopts, by the name of the function without its script.
+        lazy_reasons: Dict[str, str] = {}
+        for line in lines:
+            line = line.rstrip()
+            match = _DEPENDENT_CODE_PATTERN.match(line)
+            if match is not None:
+                lazy_reasons[match.group('name')] = match.group('reason')
+                continue
+            match = _FUNCTION_PATTERN.search(line)
+            if match is not None:
+                self._add_trace_event(line, match.group('name'), match.group('script'), lazy_reasons)
+
+    def add_log(self, path: str) -> None:
+        """
+        Adds the inline cache transitions and the ticks of a log that d8 wrote with `--log-ic` and `--prof`.
+        """
+
+        self.profile.add_log(path, self._add_ic_event)
+
+    def ranked_functions(self) -> List[FunctionOptimizations]:
+        """
+        Returns the functions that were deoptimized or whose optimizations were aborted, the deopt loops first, then
+        by their number of deopts and aborts.
+        """
+
+        functions = [function for function in self.functions.values() if function.deopts or function.aborts]
+        functions.sort(key=lambda function: (not function.deopt_loop, -sum(function.deopts.values()),
+                                             -sum(function.aborts.values()), function.name))
+        return functions
+
+    def ranked_ic_sites(self) -> List[IcSite]:
+        """
+        Returns the polymorphic and megamorphic sites by their impact: the self ticks of their function, then the most
+        costly state, then their number of transitions.
+        """
+
+        ticks = {entry.name: entry.self_ticks for entry in self.profile.entries() if entry.name != UNKNOWN_FRAME}
+        sites = list(self._ic_sites.values())
+        for site in sites:
+            site.ticks = ticks.get(site.function, 0)
+        sites.sort(key=lambda site: (-site.ticks, -_IC_SEVERITY[site.state], -site.transitions, site.function,
+                                     site.line, site.column, site.key))
+        return sites
+
+    def _add_trace_event(self, line: str, name: str, script: Optional[str], lazy_reasons: Dict[str, str]) -> None:
+        full_name = f"{name or ANONYMOUS_FUNCTION} {script}" if script else name or ANONYMOUS_FUNCTION
+        function = self.functions.get(full_name)
+        if function is None:
+            function = self.functions[full_name] = FunctionOptimizations(full_name)
+
+        if _MARKING_PATTERN.match(line):
+            function.requests += 1
+            return
+        if _COMPILING_PATTERN.match(line):
+            function.attempts += 1
+            return
+        match = _OPTIMIZED_PATTERN.match(line)
+        if match is not None:
+            function.add_optimization(match.group('tier') + (match.group('osr') or ''))
+            return
+        match = _ABORTED_PATTERN.match(line)
+        if match is not None:
+            function.aborts[match.group('reason')] += 1
+            return
+        match = _BAILOUT_PATTERN.match(line)
+        if match is not None:
+            reason = match.group('reason')
+            if reason == _UNKNOWN_REASON:
+                reason = lazy_reasons.pop(name, _UNKNOWN_REASON)
+            function.add_deopt(f"{match.group('kind')}: {reason}")
+
+    def _add_ic_event(self, code_map: CodeMap, fields: List[str]) -> None:
+        if not _IC_EVENT_PATTERN.match(fields[0]) or fields[6] not in _IC_STATES:
+            return
+        code = code_map.find(int(fields[1], 16))
+        function = code[0] if code is not None else UNKNOWN_FRAME
+        key = (function, fields[0], fields[8], int(fields[3]), int(fields[4]))
+        site = self._ic_sites.get(key)
+        if site is None:
+            site = self._ic_sites[key] = IcSite(*key)
+        site.transitions += 1
+        if _IC_SEVERITY[fields[6]] >= _IC_SEVERITY.get(site.state, 0):
+            site.state = fields[6]
+
+
+def format_opt_report(trace: OptTrace, top: int) -> str:
+    """
+    Formats the functions with the most deopts, with their optimizations and the reasons of their deopts, and the
+    polymorphic and megamorphic inline cache sites with the most impact.
+
+    :param trace: The optimizations, the deopts and the inline caches.
+    :type trace: OptTrace
+
+    :param top: The number of functions and of sites that are shown.
+    :type top: int
+    """
+
+    optimized = sum(1 for function in trace.functions.values() if function.tiers)
+    lines = [f"Functions: {len(trace.functions)} traced, {optimized} optimized, "
+             f"{sum(1 for function in trace.functions.values() if function.deopt_loop)} in a deopt loop."]
+
+    functions = trace.ranked_functions()[:top]
+    if functions:
+        lines.append('')
+        lines.append('Deopts and aborted optimizations:')
+    for function in functions:
+        tiers = ', '.join(f"{tier} x{count}" for tier, count in sorted(function.tiers.items())) or 'none'
+        loop = ' (deopt loop)' if function.deopt_loop else ''
+        lines.append(f"  {function.name}{loop}: {function.requests} requests, {function.attempts} attempts, "
+                     f"optimized: {tiers}")
+        lines.extend(f"    {count:5}  deopt {reason}" for reason, count in function.deopts.most_common())
+        lines.extend(f"    {count:5}  aborted: {reason}" for reason, count in function.aborts.most_common())
+
+    sites = trace.ranked_ic_sites()[:top]
+    if sites:
+        rows = [('State', 'Ticks', 'Transitions', 'IC', 'Key', 'Position', 'Function')]
+        rows.extend((_IC_STATES[site.state], str(site.ticks), str(site.transitions), site.ic_type, site.key,
+                     f"{site.line}:{site.column}", site.function) for site in sites)
+        widths = [max(len(row[column]) for row in rows) for column in range(len(rows[0]) - 1)]
+        lines.append('')
+        lines.append('Polymorphic and megamorphic inline caches:')
+        lines.extend('  ' + '  '.join([cell.ljust(width) for cell, width in zip(row, widths)] + [row[-1]])
+                     for row in rows)
+    return '\n'.join(lines)
+
+
+def format_opt_json(trace: OptTrace, top: Optional[int] = None) -> str:
+    """
+    Formats the ranked functions and inline cache sites as JSON.
+    """
+
+    return json.dumps({
+        'functions': [function.to_dict() for function in trace.ranked_functions()[:top]],
+        'optimized_functions': sorted(name for name, function in trace.functions.items() if function.tiers),
+        'ic_sites': [site.to_dict() for site in trace.ranked_ic_sites()[:top]],
+    }, indent=2)
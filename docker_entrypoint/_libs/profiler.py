@@ -0,0 +1,384 @@
+import bisect
+import csv
+import json
+import os
+import re
+from collections import Counter
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+PROFILE_REPORTS = ('table', 'folded', 'speedscope')
+
+# The frame of the ticks whose code is not known, and the frame that replaces the code of the garbage collector.
+UNKNOWN_FRAME = '(unknown)'
+GC_FRAME = '(garbage collector)'
+
+# The states of the VM that the ticks record, in the order of V8's `StateTag`.
+_VM_STATES = ('JS', 'GC', 'parser', 'bytecode compiler', 'compiler', 'other', 'external', 'atomics wait', 'idle',
+              'logging')
+_GC_STATE = 1
+
+# The types of the `code-creation` events of JavaScript functions, in the logs of the recent and the older V8s.
+_JS_CODE_TYPES = {'JS', 'Function', 'LazyCompile', 'Script', 'Eval'}
+_CODE_KINDS = {'Builtin': 'builtin', 'BytecodeHandler': 'bytecode handler', 'RegExp': 'regexp'}
+# The markers of the code that Maglev (+) and TurboFan (*) optimized.
+_OPTIMIZED_MARKERS = ('+', '*')
+
+_ESCAPE_PATTERN = re.compile(r'\\(?:x([0-9A-Fa-f]{2})|u([0-9A-Fa-f]{4})|(.))', re.S)
+_JS_NAME_PATTERN = re.compile(r'(?P<name>.*) (?P<file>[^ ]+):(?P<line>\d+):(?P<column>\d+)$')
+
+# The bottom-up tree shows the callers whose share of all ticks is at least this, down to this depth.
+_TREE_THRESHOLD = 0.01
+_TREE_DEPTH = 8
+
+
+class ProfileEntry:
+    """
+    One function of the flat profile, with the number of ticks in the function itself (self), and in the function
+    or in the functions it called (total).
+    """
+
+    name: str
+    # JS, builtin, bytecode handler, regexp, stub, C++ (a shared library, like d8 itself) or unknown.
+    kind: str
+    self_ticks: int
+    total_ticks: int
+    # The self ticks in code that Maglev or TurboFan optimized.
+    optimized_ticks: int
+
+    def __init__(self, name: str, kind: str, self_ticks: int, total_ticks: int, optimized_ticks: int):
+        self.name = name
+        self.kind = kind
+        self.self_ticks = self_ticks
+        self.total_ticks = total_ticks
+        self.optimized_ticks = optimized_ticks
+
+
+# Called with the code map and the fields of the events of a log that `TickProfile` does not handle.
+EventListener = Callable[['CodeMap', List[str]], None]
+
+
+class TickProfile:
+    """
+    The class `TickProfile` collects the ticks of the logs that d8 writes with `--prof`, as the call stacks they
+    sampled. The logs are read line by line, so their size does not matter, and the ticks of several logs add up.
+    """
+
+    ticks: int
+    # The number of ticks in each state of the VM.
+    states: Counter
+    # The number of ticks of each call stack, whose outermost frame is the first.
+    stacks: Counter
+    # The kind of the code of each frame.
+    kinds: Dict[str, str]
+
+    def __init__(self):
+        self.ticks = 0
+        self.states = Counter()
+        self.stacks = Counter()
+        self.kinds = {UNKNOWN_FRAME: 'unknown', GC_FRAME: 'GC'}
+        self._optimized = Counter()
+
+    def add_log(self, path: str, on_event: Optional[EventListener] = None) -> None:
+        """
+        Adds the ticks of a log file that d8 wrote with `--prof`.
+        """
+
+        with open(path, encoding='utf-8', errors='replace') as file:
+            self.add_lines(file, on_event)
+
+    def add_lines(self, lines: Iterable[str], on_event: Optional[EventListener] = None) -> None:
+        """
+        Adds the ticks of the lines of one log. The addresses of the code are only valid in the log they come from.
+        The fields of the other events, like the `--log-ic` events, are passed to `on_event` with the code map of the
+        log at that point, so the log is read once.
+        """
+
+        code_map = CodeMap()
+        for line in lines:
+            fields = split_log_fields(line.rstrip('\n'))
+            event = fields[0]
+            try:
+                if event == 'tick':
+                    self._add_tick(code_map, fields)
+                elif event == 'code-creation':
+                    code_map.add_code(fields)
+                elif event == 'code-move':
+                    code_map.move(int(fields[1], 16), int(fields[2], 16))
+                elif event == 'code-delete':
+                    code_map.delete(int(fields[1], 16))
+                elif event == 'shared-library':
+                    code_map.add_library(fields)
+                elif on_event is not None:
+                    on_event(code_map, fields)
+            except (IndexError, ValueError):
+                continue  # A truncated line, like the last one of a process that was killed.
+
+    def entries(self) -> List[ProfileEntry]:
+        """
+        Returns the functions of the ticks, sorted by their self ticks, then by their total ticks.
+        """
+
+        self_ticks, total_ticks = Counter(), Counter()
+        for stack, count in self.stacks.items():
+            self_ticks[stack[-1]] += count
+            for name in set(stack):
+                total_ticks[name] += count
+        entries = [ProfileEntry(name, self.kinds[name], self_ticks[name], total, self._optimized[name])
+                   for name, total in total_ticks.items()]
+        entries.sort(key=lambda entry: (-entry.self_ticks, -entry.total_ticks, entry.name))
+        return entries
+
+    def _add_tick(self, code_map: 'CodeMap', fields: List[str]) -> None:
+        # tick,<pc>,<time>,<is external callback>,<top of stack or external callback>,<vm state>,<frames>...
+        pc, top_of_stack = int(fields[1], 16), int(fields[4], 16)
+        state = int(fields[5])
+        if int(fields[3]):
+            # The pc may be inside the external callback, which would look like the callback calls itself.
+            addresses = [top_of_stack]
+        else:
+            addresses = [pc]
+            if (code_map.find(top_of_stack) or ('', '', False))[1] == 'JS':
+                addresses.append(top_of_stack)  # A JS function that called the pc without a frame.
+        previous = pc
+        # The frames of a deep stack end with 'overflow'.
+        for frame in fields[6:-1] if fields[-1] == 'overflow' else fields[6:]:
+            # A frame is an address, or an offset from the previous frame.
+            previous = previous + int(frame, 16) if frame[:1] in ('+', '-') else int(frame, 16)
+            addresses.append(previous)
+
+        frames = self._resolve(code_map, addresses)
+        if state == _GC_STATE:
+            while frames and self.kinds[frames[0]] in ('C++', 'unknown'):
+                frames.pop(0)
+            frames.insert(0, GC_FRAME)
+        stack = tuple(reversed(frames))
+        self.ticks += 1
+        self.states[_VM_STATES[state] if 0 <= state < len(_VM_STATES) else f"state {state}"] += 1
+        self.stacks[stack] += 1
+        leaf = code_map.find(addresses[0])
+        if leaf is not None and leaf[2] and state != _GC_STATE:
+            self._optimized[stack[-1]] += 1
+
+    def _resolve(self, code_map: 'CodeMap', addresses: List[int]) -> List[str]:
+        # Returns the names of the frames, the innermost first. The unknown frames are skipped, except the innermost,
+        # and the frames of a shared library that follow each other are merged.
+        frames: List[str] = []
+        for index, address in enumerate(addresses):
+            code = code_map.find(address)
+            if code is None:
+                if index == 0:
+                    frames.append(UNKNOWN_FRAME)
+            elif code[1] != 'C++' or not frames or frames[-1] != code[0]:
+                self.kinds[code[0]] = code[1]
+                frames.append(code[0])
+        return frames
+
+
+class CodeMap:
+    """
+    The code of one log, by its address: the code that V8 created, moved and deleted, and the shared libraries.
+    """
+
+    def __init__(self):
+        self._starts: List[int] = []
+        # The size, and the name, the kind and whether it is optimized, of the code at each start.
+        self._codes: Dict[int, Tuple[int, Tuple[str, str, bool]]] = {}
+        self._libraries: List[Tuple[int, int, Tuple[str, str, bool]]] = []
+
+    def add_code(self, fields: List[str]) -> None:
+        """
+        Adds the code of a `code-creation` event, which replaces the code that it overlaps.
+        """
+
+        # code-creation,<type>,<kind>,<time>,<start>,<size>,<name>[,<shared function info>,<tier marker>]. The logs
+        # of the older V8s do not have the time.
+        offset = 3 if fields[3].startswith('0x') else 4
+        start, size, name = int(fields[offset], 16), int(fields[offset + 1]), unescape_log_field(fields[offset + 2])
+        code_type = fields[1]
+        if code_type in _JS_CODE_TYPES:
+            kind = 'JS'
+            if name.startswith(' '):
+                name = '(anonymous)' + name
+        else:
+            kind = _CODE_KINDS.get(code_type, 'stub')
+        marker = fields[offset + 4] if len(fields) > offset + 4 else ''
+        self._remove_range(start, start + size)
+        self._insert(start, size, (name, kind, marker in _OPTIMIZED_MARKERS))
+
+    def add_library(self, fields: List[str]) -> None:
+        """
+        Adds a shared library of a `shared-library` event. Its code is named after the file of the library.
+        """
+
+        start, end = int(fields[2], 16), int(fields[3], 16)
+        name = f"[{os.path.basename(unescape_log_field(fields[1]))}]"
+        self._libraries.append((start, end, (name, 'C++', False)))
+
+    def move(self, source: int, target: int) -> None:
+        """
+        Moves the code that starts at `source` to `target`.
+        """
+
+        code = self._codes.get(source)
+        if code is not None:
+            self.delete(source)
+            self._remove_range(target, target + code[0])
+            self._insert(target, *code)
+
+    def delete(self, start: int) -> None:
+        """
+        Deletes the code that starts at `start`.
+        """
+
+        if self._codes.pop(start, None) is not None:
+            del self._starts[bisect.bisect_left(self._starts, start)]
+
+    def find(self, address: int) -> Optional[Tuple[str, str, bool]]:
+        """
+        Returns the name, the kind and whether it is optimized, of the code that contains the address, or None.
+        """
+
+        index = bisect.bisect_right(self._starts, address) - 1
+        if index >= 0:
+            size, code = self._codes[self._starts[index]]
+            if address < self._starts[index] + size:
+                return code
+        for start, end, library in self._libraries:
+            if start <= address < end:
+                return library
+        return None
+
+    def _insert(self, start: int, size: int, code: Tuple[str, str, bool]) -> None:
+        bisect.insort(self._starts, start)
+        self._codes[start] = (size, code)
+
+    def _remove_range(self, start: int, end: int) -> None:
+        index = bisect.bisect_left(self._starts, start)
+        while index < len(self._starts) and self._starts[index] < end:
+            del self._codes[self._starts.pop(index)]
+
+
+def format_flat_profile(profile: TickProfile, top: int) -> str:
+    """
+    Formats the functions with the most self ticks as a table, after a line with the number of ticks in each state
+    of the VM. The table shows the self ticks, their share of all ticks, the share of the total ticks, the share of
+    the self ticks in optimized code, and the kind of the code.
+
+    :param profile: The ticks.
+    :type profile: TickProfile
+
+    :param top: The number of functions that are shown.
+    :type top: int
+    """
+
+    states = ', '.join(f"{state} {count / profile.ticks:.1%}" for state, count in profile.states.most_common())
+    rows = [('Self', 'Self %', 'Total %', 'Optimized %', 'Kind', 'Function')]
+    for entry in [entry for entry in profile.entries() if entry.self_ticks][:top]:
+        optimized = f"{entry.optimized_ticks / entry.self_ticks:.1%}" if entry.kind == 'JS' else '-'
+        rows.append((str(entry.self_ticks), f"{entry.self_ticks / profile.ticks:.1%}",
+                     f"{entry.total_ticks / profile.ticks:.1%}", optimized, entry.kind, entry.name))
+    widths = [max(len(row[column]) for row in rows) for column in range(4)]
+    lines = [f"Ticks: {profile.ticks} ({states})"]
+    for row in rows:
+        lines.append('  '.join([cell.rjust(width) for cell, width in zip(row[:4], widths)] +
+                               [row[4].ljust(16), row[5]]).rstrip())
+    return '\n'.join(lines)
+
+
+def format_bottom_up_tree(profile: TickProfile, top: int) -> str:
+    """
+    Formats the bottom-up (heavy) profile: the functions with the most self ticks, each followed by the functions
+    that called it, indented, with their share of the ticks of the line above. Only the callers with at least 1% of
+    all ticks are shown.
+
+    :param profile: The ticks.
+    :type profile: TickProfile
+
+    :param top: The number of functions whose callers are shown.
+    :type top: int
+    """
+
+    roots: Dict[str, list] = {}
+    for stack, count in profile.stacks.items():
+        children = roots
+        for name in reversed(stack):
+            node = children.setdefault(name, [0, {}])
+            node[0] += count
+            children = node[1]
+
+    lines = ['Bottom-up profile (callers of the functions with the most self ticks):', '  Ticks  Parent %  Function']
+
+    def add_lines(children: Dict[str, list], parent_ticks: int, depth: int, limit: Optional[int]) -> None:
+        ordered = sorted(children.items(), key=lambda item: (-item[1][0], item[0]))[:limit]
+        for name, (ticks, grandchildren) in ordered:
+            if depth > 0 and ticks < profile.ticks * _TREE_THRESHOLD:
+                break
+            lines.append(f"{ticks:7}  {ticks / parent_ticks:8.1%}  {'  ' * depth}{name}")
+            if depth + 1 < _TREE_DEPTH:
+                add_lines(grandchildren, ticks, depth + 1, None)
+
+    add_lines(roots, profile.ticks, 0, top)
+    return '\n'.join(lines)
+
+
+def format_folded(profile: TickProfile) -> str:
+    """
+    Formats the call stacks in the folded format of flame graphs: the frames, outermost first, separated by `;`, and
+    the number of ticks, one stack per line.
+    """
+
+    lines = [f"{';'.join(name.replace(';', ':') for name in stack)} {count}"
+             for stack, count in sorted(profile.stacks.items())]
+    return '\n'.join(lines) + '\n'
+
+
+def format_speedscope(profile: TickProfile, name: str) -> str:
+    """
+    Formats the call stacks as a sampled profile of speedscope (https://www.speedscope.app). The identical stacks are
+    merged into one sample, whose weight is their number of ticks.
+    """
+
+    frames: Dict[str, int] = {}
+    samples, weights = [], []
+    for stack, count in sorted(profile.stacks.items()):
+        samples.append([frames.setdefault(frame, len(frames)) for frame in stack])
+        weights.append(count)
+    return json.dumps({
+        '$schema': 'https://www.speedscope.app/file-format-schema.json',
+        'shared': {'frames': [_speedscope_frame(frame) for frame in frames]},
+        'profiles': [{'type': 'sampled', 'name': name, 'unit': 'none', 'startValue': 0, 'endValue': profile.ticks,
+                      'samples': samples, 'weights': weights}],
+        'name': name,
+        'exporter': 'd8 docker entrypoint',
+    })
+
+
+def _speedscope_frame(frame: str) -> Dict:
+    match = _JS_NAME_PATTERN.match(frame)
+    if match is None:
+        return {'name': frame}
+    return {'name': match.group('name'), 'file': match.group('file'), 'line': int(match.group('line')),
+            'col': int(match.group('column'))}
+
+
+def split_log_fields(line: str) -> List[str]:
+    """
+    Splits a line of a V8 log into its fields. The recent V8s escape the commas of the names, the older ones quote
+    the names.
+    """
+
+    if '"' not in line:
+        return line.split(',')
+    return next(csv.reader([line]))
+
+
+def unescape_log_field(value: str) -> str:
+    """
+    Replaces the escape sequences of a field of a V8 log, like `\\x2c` for a comma, with their characters.
+    """
+
+    def replace(match: re.Match) -> str:
+        code = match.group(1) or match.group(2)
+        return chr(int(code, 16)) if code else {'n': '\n'}.get(match.group(3), match.group(3))
+
+    return _ESCAPE_PATTERN.sub(replace, value) if '\\' in value else value
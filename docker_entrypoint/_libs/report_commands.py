@@ -0,0 +1,354 @@
+import logging
+import os
+import shutil
+import tempfile
+from typing import Callable, Iterator, List, Optional, Tuple, Union
+
+from on_rails import Result
+from schema import And, Or, Schema
+
+from docker_entrypoint._libs.bytecode_trace import (CodeTrace,
+                                                    format_code_diff,
+                                                    format_code_json,
+                                                    format_code_report,
+                                                    load_code_report)
+from docker_entrypoint._libs.CodeReportOptions import CodeReportOptions
+from docker_entrypoint._libs.commands import check_input_paths
+from docker_entrypoint._libs.executor import build_d8_command, format_command
+from docker_entrypoint._libs.ExitCodes import ExitCode
+from docker_entrypoint._libs.gc_trace import (GcStats, GcTrace, format_gc_json,
+                                              format_gc_report)
+from docker_entrypoint._libs.GcReportOptions import GcReportOptions
+from docker_entrypoint._libs.input_walker import walk_inputs
+from docker_entrypoint._libs.opt_trace import (OptTrace, format_opt_json,
+                                               format_opt_report)
+from docker_entrypoint._libs.OptReportOptions import OptReportOptions
+from docker_entrypoint._libs.ProfileOptions import ProfileOptions
+from docker_entrypoint._libs.profiler import (TickProfile,
+                                              format_bottom_up_tree,
+                                              format_flat_profile,
+                                              format_folded, format_speedscope)
+from docker_entrypoint._libs.ResultDetails.FailResult import FailResult
+from docker_entrypoint._libs.runner import InputResult, InputTask, run_inputs
+from docker_entrypoint._libs.utility import convert_code_to_result
+from docker_entrypoint._libs.validation import validate_func_params
+
+
+@validate_func_params(Schema({
+    'logger': And(logging.Logger, error='logger is required and must be a logging.Logger object'),
+    'program': And(And(str, error='The program must be a string'), And(str.strip, lambda s: len(s) > 0,
+                   error='The program can not be empty or whitespace')),
+    'files_and_dirs': Or(None, [str], error='files_and_dirs must be a list of strings or None'),
+    'args': Or(None, [str], error='args must be a list of strings or None'),
+    'options': Or(None, ProfileOptions, error='options must be an instance of `ProfileOptions` or None'),
+}))
+def command_profile(logger: logging.Logger, program: str, files_and_dirs: Optional[List[str]] = None,
+                    args: Optional[List[str]] = None, options: Optional[ProfileOptions] = None) -> Result:
+    """
+    Samples a javascript program with the `--prof` flag of d8, once per input file, and reports where its ticks
+    were spent: as a flat profile and a bottom-up tree, as folded stacks for flame graphs, or as a speedscope
+    profile. Each run writes its log to a directory of its own, so the runs can be parallel.
+
+    :param logger: A logging.Logger object used for logging messages
+    :type logger: logging.Logger
+
+    :param program: The path to the JavaScript program that needs to be profiled
+    :type program: str
+
+    :param files_and_dirs: The input files and directories. The ticks of all inputs add up. If no input is given,
+    the program is executed once with an empty stdin.
+    :type files_and_dirs: Optional[List[str]]
+
+    :param args: The command line arguments that are passed to the program.
+    :type args: Optional[List[str]]
+
+    :param options: The number of parallel runs and the report. If it is not provided, the default options are used.
+    :type options: Optional[ProfileOptions]
+    """
+
+    result = _collect_traced_inputs(program, files_and_dirs)
+    if not result.success:
+        return result
+    options = options or ProfileOptions()
+
+    profile = TickProfile()
+    code = 0
+    for input_result, run_dir in _run_traced(logger, program, result.value, args or [], options.jobs, _profile_flags):
+        code = input_result.result.code or code
+        try:
+            profile.add_log(os.path.join(run_dir, 'v8.log'))
+        except OSError as e:
+            logger.warning(f"The profile of '{input_result.task.file}' can not be read: {e.strerror}.")
+        logger.debug(f"Profiled '{input_result.task.file}': {profile.ticks} ticks so far.")
+
+    if profile.ticks == 0:
+        logger.warning("No ticks were recorded.")
+    elif options.report == 'table':
+        _write_report(logger, format_flat_profile(profile, options.top) + '\n\n' +
+                      format_bottom_up_tree(profile, options.top), options, f"table profile of {profile.ticks} ticks")
+    elif options.report == 'folded':
+        _write_report(logger, format_folded(profile), options, f"folded profile of {profile.ticks} ticks")
+    else:
+        _write_report(logger, format_speedscope(profile, os.path.basename(program)), options,
+                      f"speedscope profile of {profile.ticks} ticks")
+    return convert_code_to_result(code)
+
+
+def _profile_flags(run_dir: str) -> List[str]:
+    # One log file for all isolates, because the name of the per-isolate logs is a prefix of the whole path.
+    return ['--prof', '--no-logfile-per-isolate', f"--logfile={os.path.join(run_dir, 'v8.log')}"]
+
+
+@validate_func_params(Schema({
+    'logger': And(logging.Logger, error='logger is required and must be a logging.Logger object'),
+    'program': And(And(str, error='The program must be a string'), And(str.strip, lambda s: len(s) > 0,
+                   error='The program can not be empty or whitespace')),
+    'files_and_dirs': Or(None, [str], error='files_and_dirs must be a list of strings or None'),
+    'args': Or(None, [str], error='args must be a list of strings or None'),
+    'options': Or(None, GcReportOptions, error='options must be an instance of `GcReportOptions` or None'),
+}))
+def command_gc_report(logger: logging.Logger, program: str, files_and_dirs: Optional[List[str]] = None,
+                      args: Optional[List[str]] = None, options: Optional[GcReportOptions] = None) -> Result:
+    """
+    Runs a javascript program with the `--trace-gc` flag of d8, once per input file, and reports its collections:
+    the number and the pauses of the scavenges and the mark-compacts, their share of the wall time, the growth of
+    the heap, the allocation rate, and the `--max-semi-space-size` and `--max-old-space-size` that they suggest.
+
+    :param logger: A logging.Logger object used for logging messages
+    :type logger: logging.Logger
+
+    :param program: The path to the JavaScript program whose collections are traced
+    :type program: str
+
+    :param files_and_dirs: The input files and directories. The collections of all inputs add up. If no input is
+    given, the program is executed once with an empty stdin.
+    :type files_and_dirs: Optional[List[str]]
+
+    :param args: The command line arguments that are passed to the program.
+    :type args: Optional[List[str]]
+
+    :param options: The number of parallel runs and the report. If it is not provided, the default options are used.
+    :type options: Optional[GcReportOptions]
+    """
+
+    result = _collect_traced_inputs(program, files_and_dirs)
+    if not result.success:
+        return result
+    options = options or GcReportOptions()
+
+    trace = GcTrace()
+    code = 0
+    for input_result, run_dir in _run_traced(logger, program, result.value, args or [], options.jobs,
+                                             lambda _: ['--trace-gc'], capture_stdout=True):
+        code = input_result.result.code or code
+        usage = input_result.result.usage
+        # The trace is printed to stdout, between the outputs of the program.
+        trace.add_file(os.path.join(run_dir, 'stdout'), usage.wall_time if usage is not None else None)
+        logger.debug(f"Traced '{input_result.task.file}': {len(trace.events())} collections so far.")
+
+    collections = len(trace.events())
+    if collections == 0:
+        logger.warning("No collections were traced.")
+    else:
+        stats = GcStats(trace)
+        report = format_gc_report(stats) if options.report == 'table' else format_gc_json(stats)
+        _write_report(logger, report, options, f"{options.report} GC report of {collections} collections")
+    return convert_code_to_result(code)
+
+
+@validate_func_params(Schema({
+    'logger': And(logging.Logger, error='logger is required and must be a logging.Logger object'),
+    'program': And(And(str, error='The program must be a string'), And(str.strip, lambda s: len(s) > 0,
+                   error='The program can not be empty or whitespace')),
+    'files_and_dirs': Or(None, [str], error='files_and_dirs must be a list of strings or None'),
+    'args': Or(None, [str], error='args must be a list of strings or None'),
+    'options': Or(None, OptReportOptions, error='options must be an instance of `OptReportOptions` or None'),
+}))
+def command_opt_report(logger: logging.Logger, program: str, files_and_dirs: Optional[List[str]] = None,
+                       args: Optional[List[str]] = None, options: Optional[OptReportOptions] = None) -> Result:
+    """
+    Runs a javascript program with the `--trace-opt`, `--trace-deopt` and `--log-ic` flags of d8, once per input
+    file, and reports per function the optimizations that were attempted, the tiers they reached and the deopts by
+    reason, with the deopt loops first, and the polymorphic and megamorphic inline cache sites, ranked by the ticks
+    of their function.
+
+    :param logger: A logging.Logger object used for logging messages
+    :type logger: logging.Logger
+
+    :param program: The path to the JavaScript program whose optimizations are traced
+    :type program: str
+
+    :param files_and_dirs: The input files and directories. The traces of all inputs add up. If no input is given,
+    the program is executed once with an empty stdin.
+    :type files_and_dirs: Optional[List[str]]
+
+    :param args: The command line arguments that are passed to the program.
+    :type args: Optional[List[str]]
+
+    :param options: The number of parallel runs and the report. If it is not provided, the default options are used.
+    :type options: Optional[OptReportOptions]
+    """
+
+    result = _collect_traced_inputs(program, files_and_dirs)
+    if not result.success:
+        return result
+    options = options or OptReportOptions()
+
+    trace = OptTrace()
+    code = 0
+    for input_result, run_dir in _run_traced(logger, program, result.value, args or [], options.jobs,
+                                             _opt_report_flags, capture_stdout=True):
+        code = input_result.result.code or code
+        trace.add_trace_file(os.path.join(run_dir, 'stdout'))
+        try:
+            trace.add_log(os.path.join(run_dir, 'v8.log'))
+        except OSError as e:
+            logger.warning(f"The inline caches of '{input_result.task.file}' can not be read: {e.strerror}.")
+        logger.debug(f"Traced '{input_result.task.file}': {len(trace.functions)} functions so far.")
+
+    if not trace.functions and not trace.ranked_ic_sites():
+        logger.warning("No optimizations or inline cache transitions were traced.")
+    else:
+        report = format_opt_report(trace, options.top) if options.report == 'table' \
+            else format_opt_json(trace, options.top)
+        _write_report(logger, report, options, f"{options.report} optimization report of {len(trace.functions)} "
+                                               "functions")
+    return convert_code_to_result(code)
+
+
+def _opt_report_flags(run_dir: str) -> List[str]:
+    # The ticks of --prof rank the inline cache sites, which --log-ic writes to the same log.
+    return ['--trace-opt', '--trace-deopt', '--trace-file-names', '--log-ic'] + _profile_flags(run_dir)
+
+
+@validate_func_params(Schema({
+    'logger': And(logging.Logger, error='logger is required and must be a logging.Logger object'),
+    'program': And(And(str, error='The program must be a string'), And(str.strip, lambda s: len(s) > 0,
+                   error='The program can not be empty or whitespace')),
+    'files_and_dirs': Or(None, [str], error='files_and_dirs must be a list of strings or None'),
+    'args': Or(None, [str], error='args must be a list of strings or None'),
+    'options': Or(None, CodeReportOptions, error='options must be an instance of `CodeReportOptions` or None'),
+}))
+def command_code_report(logger: logging.Logger, program: str, files_and_dirs: Optional[List[str]] = None,
+                        args: Optional[List[str]] = None, options: Optional[CodeReportOptions] = None) -> Result:
+    """
+    Runs a javascript program with the `--print-bytecode` and `--log-function-events` flags of d8, once per input
+    file, and reports per function its bytecode length, register count and constant pool size, whether it was
+    compiled lazily or eagerly, and its parse and compile times, or the functions that changed since a previous JSON
+    report.
+
+    :param logger: A logging.Logger object used for logging messages
+    :type logger: logging.Logger
+
+    :param program: The path to the JavaScript program whose bytecode is traced
+    :type program: str
+
+    :param files_and_dirs: The input files and directories. The times of all inputs add up. If no input is given,
+    the program is executed once with an empty stdin.
+    :type files_and_dirs: Optional[List[str]]
+
+    :param args: The command line arguments that are passed to the program.
+    :type args: Optional[List[str]]
+
+    :param options: The number of parallel runs, the sort key, the report, and the previous report. If it is not
+    provided, the default options are used.
+    :type options: Optional[CodeReportOptions]
+    """
+
+    result = _collect_traced_inputs(program, files_and_dirs)
+    if not result.success:
+        return result
+    options = options or CodeReportOptions()
+    previous = None
+    if options.diff is not None:
+        try:
+            previous = load_code_report(options.diff)
+        except (OSError, ValueError) as e:
+            return Result.fail(FailResult(code=ExitCode.IO_ERROR,
+                                          message=f"The previous report '{options.diff}' can not be read: {e}."))
+
+    trace = CodeTrace()
+    code = 0
+    for input_result, run_dir in _run_traced(logger, program, result.value, args or [], options.jobs,
+                                             _code_report_flags, capture_stdout=True):
+        code = input_result.result.code or code
+        try:
+            trace.add_run(os.path.join(run_dir, 'stdout'), os.path.join(run_dir, 'v8.log'))
+        except OSError as e:
+            logger.warning(f"The function events of '{input_result.task.file}' can not be read: {e.strerror}.")
+        logger.debug(f"Traced '{input_result.task.file}': {len(trace.functions)} functions so far.")
+    if trace.unmatched:
+        logger.warning(f"{trace.unmatched} printed bytecodes have no compilation event and are not reported.")
+
+    if not trace.functions:
+        logger.warning("No functions were traced.")
+    else:
+        if options.report == 'json':
+            report = format_code_json(trace, previous, options.sort)
+        elif previous is not None:
+            report = format_code_diff(previous, trace, options.sort, options.top)
+        else:
+            report = format_code_report(trace, options.sort, options.top)
+        _write_report(logger, report, options, f"{options.report} code report of {len(trace.functions)} functions")
+    return convert_code_to_result(code)
+
+
+def _code_report_flags(run_dir: str) -> List[str]:
+    # The bytecode is printed to stdout, between the outputs of the program.
+    return ['--print-bytecode', '--log-function-events', '--no-logfile-per-isolate',
+            f"--logfile={os.path.join(run_dir, 'v8.log')}"]
+
+
+def _collect_traced_inputs(program: str, files_and_dirs: Optional[List[str]]) -> Result:
+    # Returns the input files, or the null device to run the program once without an input.
+    if not os.path.isfile(program):
+        return Result.fail(FailResult(code=ExitCode.IO_ERROR, message=f"File '{program}' does not exists."))
+    result = check_input_paths(files_and_dirs or [])
+    if not result.success:
+        return result
+    return Result.ok(list(walk_inputs(files_and_dirs or [])) or [os.devnull])
+
+
+def _run_traced(logger: logging.Logger, program: str, inputs: List[str], args: List[str], jobs: int,
+                trace_flags: Callable[[str], List[str]],
+                capture_stdout: bool = False) -> Iterator[Tuple[InputResult, str]]:
+    """
+    Executes the program with each input in parallel, with the flags that `trace_flags` returns for the directory
+    of the run, and yields the results in order with their directories. Each run writes its traces and, if
+    `capture_stdout` is true, its stdout (to `stdout`) to a temporary directory of its own, which is removed after
+    it is yielded. The other outputs are discarded.
+    """
+
+    with tempfile.TemporaryDirectory(prefix='d8-trace-') as traces_dir:
+        run_dirs = [os.path.join(traces_dir, str(index)) for index in range(len(inputs))]
+        tasks = (_create_traced_task(program, args, file, run_dir, trace_flags(run_dir), capture_stdout)
+                 for file, run_dir in zip(inputs, run_dirs))
+        for input_result, run_dir in zip(run_inputs(tasks, min(jobs, len(inputs))), run_dirs):
+            task, result = input_result.task, input_result.result
+            if result.code != 0:
+                lines = (result.stderr or b'').decode(errors='replace').strip().splitlines()
+                logger.warning(f"'{format_command(task.command, task.file)}' exited with code {result.code}."
+                               + (f" {lines[-1]}" if lines else ""))
+            yield input_result, run_dir
+            shutil.rmtree(run_dir, ignore_errors=True)
+
+
+def _create_traced_task(program: str, args: List[str], file: str, run_dir: str, flags: List[str],
+                        capture_stdout: bool) -> InputTask:
+    os.makedirs(run_dir)
+    stdout_path = os.path.join(run_dir, 'stdout') if capture_stdout else os.devnull
+    return InputTask(file, build_d8_command(program, args, flags), stdout_path=stdout_path)
+
+
+def _write_report(logger: logging.Logger, report: str,
+                  options: Union[ProfileOptions, GcReportOptions, OptReportOptions, CodeReportOptions],
+                  description: str) -> None:
+    # The tables are logged, the machine-readable reports are printed to stdout, unless they go to a file.
+    if options.output is not None:
+        with open(options.output, 'w', encoding='utf-8') as file:
+            file.write(report)
+        logger.info(f"The {description} is written to '{options.output}'.")
+    elif options.report == 'table':
+        logger.info(report)
+    else:
+        print(report, end='' if report.endswith('\n') else '\n', flush=True)
@@ -0,0 +1,242 @@
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Tuple
+
+from docker_entrypoint._libs.executor import ProcessResult
+from docker_entrypoint._libs.judge import judge_output
+from docker_entrypoint._libs.runner import (ExecuteFunction, InputTask,
+                                            redirect_to_files)
+
+DEFAULT_CACHE_SIZE = 1024 ** 3
+
+# Changes when the format of the entries changes, so old entries are not read.
+_CACHE_VERSION = '1'
+_HASH_CHUNK_SIZE = 1024 * 1024
+_LOCK_FILE = '.lock'
+
+
+class ResultCache:
+    """
+    The class `ResultCache` stores the outputs and the exit code of each executed input in a directory, keyed by a
+    hash of everything that determines them: the bytes of the program and of the input, the argv, which holds the
+    arguments and the d8 flags, and the identity of the d8 binary. A stored result is replayed instead of executing
+    the input again.
+
+    Several processes, also in different containers, can share the directory. Entries are written to a temporary
+    file and renamed, so they are never read half-written, and the eviction holds an exclusive lock on the directory
+    while the other operations hold a shared one.
+    """
+
+    directory: str
+    # When the entries are larger than this, in bytes, the least recently used ones are evicted.
+    max_bytes: int
+    hits: int
+    misses: int
+
+    def __init__(self, directory: str, max_bytes: int = DEFAULT_CACHE_SIZE):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._counter_lock = threading.Lock()
+        self._closed = False
+        os.makedirs(directory, exist_ok=True)
+
+    def wrap(self, execute: ExecuteFunction, program: str, refresh: bool = False,
+             dependencies: Optional[List[str]] = None) -> ExecuteFunction:
+        """
+        Returns an `ExecuteFunction` that replays the stored result of an input, or executes it with the given
+        function and stores its result.
+
+        The outputs of a new result are always captured, so they can be stored, and an expected output is compared
+        after the input instead of while it runs. The results of inputs that exceeded a resource limit are not
+        stored.
+
+        :param execute: The function that executes an input on a cache miss.
+        :type execute: ExecuteFunction
+
+        :param program: The path of the program, whose content is part of the keys.
+        :type program: str
+
+        :param refresh: If it is true, the stored results are ignored, and the new results replace them.
+        :type refresh: bool
+
+        :param dependencies: The files that the program imports, whose contents are also part of the keys.
+        :type dependencies: Optional[List[str]]
+        """
+
+        program_digest = _file_digest(program)
+        if dependencies:
+            program_digest = hashlib.sha256(json.dumps(
+                [program_digest] + [_file_digest(path) for path in dependencies]).encode()).hexdigest()
+
+        def execute_cached(task: InputTask, _capture: bool = False) -> ProcessResult:
+            key = self.key(task, program_digest)
+            result = None if refresh else self.load(key)
+            self._count(hit=result is not None)
+            if result is None:
+                # The task is executed without its files and expected output, so its outputs are captured.
+                result = execute(InputTask(file=task.file, command=task.command, limits=task.limits,
+                                           groups=task.groups), True)
+                if result.limit is None:
+                    self.store(key, result)
+            if task.expected is not None:
+                result = judge_output(result, task.expected)
+            return redirect_to_files(task, result)
+
+        return execute_cached
+
+    def key(self, task: InputTask, program_digest: str) -> str:
+        """
+        Returns the key of the result of a task.
+
+        :param task: The task, whose argv and input file are part of the key.
+        :type task: InputTask
+
+        :param program_digest: The SHA-256 of the content of the program.
+        :type program_digest: str
+        """
+
+        identity = json.dumps([_CACHE_VERSION, task.command, program_digest, _file_digest(task.file),
+                               _executable_identity(task.command[0])])
+        return hashlib.sha256(identity.encode()).hexdigest()
+
+    def load(self, key: str) -> Optional[ProcessResult]:
+        """
+        Returns the stored result of the key, or None if there is none. A loaded entry becomes the most recently
+        used one.
+        """
+
+        path = self._entry_path(key)
+        with lock_directory(self.directory, fcntl.LOCK_SH):
+            try:
+                with open(path, 'rb') as file:
+                    header = json.loads(file.readline())
+                    stdout = file.read(header['stdout'])
+                    stderr = file.read()
+            except (OSError, ValueError, KeyError):
+                return None
+            try:
+                os.utime(path)
+            except OSError:  # pragma: no cover
+                pass  # The entry was evicted in the meantime.
+        return ProcessResult(code=header['code'], stdout=stdout, stderr=stderr)
+
+    def store(self, key: str, result: ProcessResult) -> None:
+        """
+        Stores the captured outputs and the exit code of a result.
+        """
+
+        stdout, stderr = result.stdout or b'', result.stderr or b''
+        path = self._entry_path(key)
+        with lock_directory(self.directory, fcntl.LOCK_SH):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            descriptor, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+            try:
+                with os.fdopen(descriptor, 'wb') as file:
+                    file.write(json.dumps({'code': result.code, 'stdout': len(stdout)}).encode() + b'\n')
+                    file.write(stdout)
+                    file.write(stderr)
+                os.replace(temp_path, path)
+            except BaseException:
+                os.unlink(temp_path)
+                raise
+
+    def evict(self) -> int:
+        """
+        Removes the least recently used entries until the entries fit in `max_bytes`.
+
+        :return: The number of removed entries.
+        """
+
+        with lock_directory(self.directory, fcntl.LOCK_EX):
+            entries = self._entries()
+            total = sum(size for _, _, size in entries)
+            removed = 0
+            for _, path, size in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:  # pragma: no cover
+                    pass
+                total -= size
+                removed += 1
+            return removed
+
+    def close(self) -> None:
+        """
+        Evicts the entries that do not fit in `max_bytes`, once.
+        """
+
+        if not self._closed:
+            self._closed = True
+            self.evict()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _count(self, hit: bool) -> None:
+        with self._counter_lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def _entry_path(self, key: str) -> str:
+        # The entries are spread over subdirectories, so no directory gets too large.
+        return os.path.join(self.directory, key[:2], key)
+
+    def _entries(self) -> List[Tuple[float, str, int]]:
+        entries = []
+        for subdirectory in os.scandir(self.directory):
+            if not subdirectory.is_dir(follow_symlinks=False):
+                continue
+            for entry in os.scandir(subdirectory.path):
+                try:
+                    stat = entry.stat(follow_symlinks=False)
+                except FileNotFoundError:  # pragma: no cover
+                    continue
+                entries.append((stat.st_mtime, entry.path, stat.st_size))
+        return entries
+
+
+@contextmanager
+def lock_directory(directory: str, operation: int) -> Iterator[None]:
+    """
+    Holds the lock of a cache directory: shared (`fcntl.LOCK_SH`) while entries are read and written, and exclusive
+    (`fcntl.LOCK_EX`) while they are evicted.
+    """
+
+    # The lock file is opened for each lock, because the threads that share one open file would also share its lock,
+    # and the first one that finishes would release it for the others.
+    with open(os.path.join(directory, _LOCK_FILE), 'ab') as lock_file:
+        fcntl.flock(lock_file.fileno(), operation)
+        yield
+
+
+def _file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(_HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _executable_identity(name: str) -> Optional[List]:
+    # Hashing the d8 binary for every input would be slow, so a binary is identified by its path, size and
+    # modification time, like `make` does.
+    path = shutil.which(name)
+    if path is None:
+        return None
+    stat = os.stat(path)
+    return [os.path.realpath(path), stat.st_size, stat.st_mtime_ns]
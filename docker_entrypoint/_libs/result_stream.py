@@ -0,0 +1,122 @@
+import os
+from typing import Iterator, List, Optional
+
+from schema import And, Or, Schema
+
+from docker_entrypoint._libs.executor import (ResourceLimits, ResourceUsage,
+                                              build_d8_command)
+from docker_entrypoint._libs.input_walker import prefetch, walk_inputs
+from docker_entrypoint._libs.runner import (InputResult, InputTask,
+                                            get_available_cpus, run_inputs,
+                                            run_inputs_as_completed)
+from docker_entrypoint._libs.validation import validate_func_params
+
+
+class RunRecord:
+    """
+    The outcome of the program with one input, as `iter_results` yields it.
+    """
+
+    # The input file, or `os.devnull` when the program runs without inputs.
+    file: str
+    # The exit status like a shell reports it.
+    code: int
+    # One of `LimitStatus` when the input exceeded one of its limits, otherwise None.
+    limit: Optional[str]
+    # The wall time, the CPU times and the peak memory of the process. It is None when d8 could not be spawned.
+    usage: Optional[ResourceUsage]
+    stdout: bytes
+    stderr: bytes
+
+    def __init__(self, file: str, code: int, stdout: bytes, stderr: bytes, usage: Optional[ResourceUsage] = None,
+                 limit: Optional[str] = None):
+        self.file = file
+        self.code = code
+        self.stdout = stdout
+        self.stderr = stderr
+        self.usage = usage
+        self.limit = limit
+
+    @staticmethod
+    def from_input_result(input_result: InputResult) -> 'RunRecord':
+        """
+        Creates the record of the captured result of an input.
+        """
+
+        result = input_result.result
+        return RunRecord(input_result.task.file, result.code, result.stdout, result.stderr, result.usage,
+                         result.limit)
+
+
+@validate_func_params(schema=Schema({
+    'program': And(str, str.strip, error='The program must be a non-empty string.'),
+    'files_and_dirs': Or(None, [And(str, os.path.exists)],
+                         error='The files_and_dirs must be None or a list of existing paths.'),
+    'args': Or(None, [str], error='The args must be None or a list of strings.'),
+    'flags': Or(None, [str], error='The flags must be None or a list of strings.'),
+    'jobs': Or(None, And(int, lambda n: n > 0), error='The jobs must be None or a positive integer.'),
+    'ordered': And(bool, error='The ordered must be a boolean.'),
+    'timeout': Or(None, And(Or(int, float), lambda n: not isinstance(n, bool) and n > 0),
+                  error='The timeout must be None or a positive number.'),
+    'memory_limit': Or(None, And(int, lambda n: n > 0), error='The memory_limit must be None or a positive integer.'),
+    'cpu_limit': Or(None, And(int, lambda n: n > 0), error='The cpu_limit must be None or a positive integer.'),
+    'max_output_bytes': Or(None, And(int, lambda n: n > 0),
+                           error='The max_output_bytes must be None or a positive integer.'),
+}), raise_exception=True)
+def iter_results(program: str, files_and_dirs: Optional[List[str]] = None, args: Optional[List[str]] = None,
+                 flags: Optional[List[str]] = None, jobs: Optional[int] = None, ordered: bool = True,
+                 timeout: Optional[float] = None, memory_limit: Optional[int] = None,
+                 cpu_limit: Optional[int] = None, max_output_bytes: Optional[int] = None) -> Iterator[RunRecord]:
+    """
+    Executes the program with each input file concurrently and yields a `RunRecord` for each of them, so the first
+    results can be processed while the other inputs still run. Like the `run` command, the directories are walked
+    while the first inputs run, each input runs in its own process group, and at most `2 * jobs` inputs are in
+    flight, so the outputs that are held at the same time are bounded. A yielded record is not kept. When the
+    iteration stops early, the inputs that did not finish are killed.
+
+    :param program: The path of the javascript program.
+    :type program: str
+
+    :param files_and_dirs: The input files and directories. Without inputs, the program runs once with an empty stdin.
+    :type files_and_dirs: Optional[List[str]]
+
+    :param args: The arguments that are passed to d8 after the program.
+    :type args: Optional[List[str]]
+
+    :param flags: The V8 flags that are passed to d8 before the program.
+    :type flags: Optional[List[str]]
+
+    :param jobs: The number of inputs that run at the same time. The default is the number of available CPUs.
+    :type jobs: Optional[int]
+
+    :param ordered: If it is true, the records are yielded in the order of the inputs. Otherwise, they are yielded as
+    the inputs finish, and a slow input does not hold back the records of the next ones.
+    :type ordered: bool
+
+    :param timeout: The wall time limit of each input, in seconds.
+    :type timeout: Optional[float]
+
+    :param memory_limit: The memory limit of each input (`RLIMIT_DATA`), in bytes.
+    :type memory_limit: Optional[int]
+
+    :param cpu_limit: The CPU time limit of each input, in seconds.
+    :type cpu_limit: Optional[int]
+
+    :param max_output_bytes: The size limit of each output of each input, in bytes.
+    :type max_output_bytes: Optional[int]
+
+    :raises ValueError: When a parameter is not valid. It is raised by the call, before the iteration starts.
+    """
+
+    command = build_d8_command(program, args, flags)
+    limits = ResourceLimits(timeout=timeout, memory=memory_limit, cpu_time=cpu_limit,
+                            max_output_bytes=max_output_bytes)
+    files = prefetch(walk_inputs(files_and_dirs)) if files_and_dirs else iter([os.devnull])
+    tasks = (InputTask(file=file, command=command, limits=limits) for file in files)
+    jobs = jobs if jobs is not None else get_available_cpus()
+    results = (run_inputs if ordered else run_inputs_as_completed)(tasks, jobs)
+    try:
+        yield from map(RunRecord.from_input_result, results)
+    finally:
+        # The runner kills the inputs that did not finish when the iteration stops early.
+        results.close()
@@ -0,0 +1,198 @@
+import os
+from collections import deque
+from concurrent.futures import (FIRST_COMPLETED, Future, ThreadPoolExecutor,
+                                wait)
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from docker_entrypoint._libs.executor import (ProcessGroup, ProcessResult,
+                                              ResourceLimits, run_process)
+from docker_entrypoint._libs.judge import Expectation, judge_process
+
+# How often the running processes of the tasks are killed again while the tasks of an interrupted run finish, in seconds.
+_KILL_INTERVAL = 0.1
+
+
+class InputTask:
+    """
+    Describes how the program is executed with one input file.
+    """
+
+    file: str
+    command: List[str]
+    # When they are set, the outputs are written straight to these files instead of the terminal.
+    stdout_path: Optional[str]
+    stderr_path: Optional[str]
+    # When it is set, the stdout is compared with the expected output instead of being printed.
+    expected: Optional[Expectation]
+    # When it is set, the input runs in its own process group with these limits.
+    limits: Optional[ResourceLimits]
+    # The process groups that the task spawned, so an interrupted run kills only the processes of its own tasks.
+    groups: List[ProcessGroup]
+
+    def __init__(self, file: str, command: List[str], stdout_path: Optional[str] = None,
+                 stderr_path: Optional[str] = None, expected: Optional[Expectation] = None,
+                 limits: Optional[ResourceLimits] = None, groups: Optional[List[ProcessGroup]] = None):
+        self.file = file
+        self.command = command
+        self.stdout_path = stdout_path
+        self.stderr_path = stderr_path
+        self.expected = expected
+        self.limits = limits
+        self.groups = groups if groups is not None else []
+
+
+class InputResult:
+    """
+    Stores the outcome of executing the program with one input file.
+    """
+
+    task: InputTask
+    result: ProcessResult
+
+    def __init__(self, task: InputTask, result: ProcessResult):
+        self.task = task
+        self.result = result
+
+
+def get_available_cpus() -> int:
+    """
+    Returns the number of CPUs the current process is allowed to run on.
+    """
+
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:  # pragma: no cover
+        return os.cpu_count() or 1
+
+
+ExecuteFunction = Callable[[InputTask, bool], ProcessResult]
+
+
+def execute_input(task: InputTask, capture: bool = False) -> ProcessResult:
+    """
+    Executes the program with one input file in its own process. The signature is `ExecuteFunction`.
+
+    :param task: The input file is opened and passed to the process as its stdin. If the task has an expected
+    output, the stdout is judged while it is produced and a `JudgedResult` is returned.
+    :type task: InputTask
+
+    :param capture: If it is true, the outputs that are not redirected to a file are captured, otherwise they are
+    written to the terminal.
+    :type capture: bool
+    """
+
+    if task.expected is not None:
+        return judge_process(task.command, task.file, task.expected, capture=capture,
+                             stdout_path=task.stdout_path, stderr_path=task.stderr_path, limits=task.limits,
+                             groups=task.groups)
+    return run_process(task.command, stdin_path=task.file, capture=capture, stdout_path=task.stdout_path,
+                       stderr_path=task.stderr_path, limits=task.limits, groups=task.groups)
+
+
+def redirect_to_files(task: InputTask, result: ProcessResult) -> ProcessResult:
+    """
+    Writes the captured outputs of a result to the output files of its task, if they are set, and removes them from
+    the result.
+    """
+
+    if task.stdout_path is not None:
+        with open(task.stdout_path, 'wb') as file:
+            file.write(result.stdout)
+        result.stdout = None
+    if task.stderr_path is not None:
+        with open(task.stderr_path, 'wb') as file:
+            file.write(result.stderr)
+        result.stderr = None
+    return result
+
+
+def run_inputs(tasks: Iterable[InputTask], jobs: int, execute: ExecuteFunction = execute_input) -> Iterator[InputResult]:
+    """
+    Executes the tasks concurrently on a bounded pool and yields their results in the given order.
+
+    At most `2 * jobs` tasks are in flight at the same time, so the captured outputs that wait for an earlier
+    task to finish are bounded too.
+
+    :param tasks: The inputs to execute.
+    :type tasks: Iterable[InputTask]
+
+    :param jobs: The maximum number of tasks that run at the same time.
+    :type jobs: int
+
+    :param execute: The function that executes one input. By default, each input is executed in its own process.
+    :type execute: ExecuteFunction
+    """
+
+    window = jobs * 2
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        pending = deque()
+        try:
+            for task in tasks:
+                pending.append((task, executor.submit(execute, task, True)))
+                if len(pending) >= window:
+                    yield _to_input_result(*pending.popleft())
+            while pending:
+                yield _to_input_result(*pending.popleft())
+        except BaseException:
+            _stop(list(pending))
+            raise
+
+
+def run_inputs_as_completed(tasks: Iterable[InputTask], jobs: int,
+                            execute: ExecuteFunction = execute_input) -> Iterator[InputResult]:
+    """
+    Executes the tasks concurrently on a bounded pool, like `run_inputs`, but yields their results as soon as they
+    finish. The tasks start in the given order, so the order of the tasks is also their priority.
+
+    :param tasks: The inputs to execute.
+    :type tasks: Iterable[InputTask]
+
+    :param jobs: The maximum number of tasks that run at the same time.
+    :type jobs: int
+
+    :param execute: The function that executes one input. By default, each input is executed in its own process.
+    :type execute: ExecuteFunction
+    """
+
+    window = jobs * 2
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        pending: Dict[Future, InputTask] = {}
+        try:
+            for task in tasks:
+                pending[executor.submit(execute, task, True)] = task
+                if len(pending) >= window:
+                    yield from _pop_completed(pending)
+            while pending:
+                yield from _pop_completed(pending)
+        except BaseException:
+            _stop([(task, future) for future, task in pending.items()])
+            raise
+
+
+def _pop_completed(pending: Dict[Future, InputTask]) -> Iterator[InputResult]:
+    # Waits for at least one task, and yields the results of the tasks that finished.
+    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+    for future in done:
+        yield _to_input_result(pending.pop(future), future)
+
+
+def _stop(pending: List[Tuple[InputTask, Future]]) -> None:
+    # The executor waits for its threads when the `with` statement exits, so after an interruption, like Ctrl-C, or
+    # when the results are not iterated anymore, the tasks that did not start are cancelled and the processes of the
+    # others are killed. Only the groups of these tasks are killed, because other runs may use the executor at the
+    # same time. The killing is repeated, because a task may spawn its process in the meantime.
+    running = [(task, future) for task, future in pending if not future.cancel()]
+    futures = [future for _, future in running]
+    _kill_tasks(running)
+    while not wait(futures, timeout=_KILL_INTERVAL).done.issuperset(futures):
+        _kill_tasks(running)
+
+
+def _kill_tasks(running: List[Tuple[InputTask, Future]]) -> None:
+    for task, _ in running:
+        for group in list(task.groups):
+            group.kill_processes()
+
+
+def _to_input_result(task: InputTask, future: Future) -> InputResult:
+    return InputResult(task=task, result=future.result())
@@ -0,0 +1,101 @@
+import logging
+import os
+import signal
+import tempfile
+import threading
+from typing import List, Optional
+
+from on_rails import Result
+from schema import And, Or, Schema
+
+from docker_entrypoint._libs.ExitCodes import ExitCode
+from docker_entrypoint._libs.ResultDetails.FailResult import FailResult
+from docker_entrypoint._libs.ServeOptions import ServeOptions
+from docker_entrypoint._libs.server import ListenError, RunServer, RunService
+from docker_entrypoint._libs.validation import validate_func_params
+
+
+@validate_func_params(Schema({
+    'logger': And(logging.Logger, error='logger is required and must be a logging.Logger object'),
+    'options': Or(None, ServeOptions, error='options must be an instance of `ServeOptions` or None'),
+}))
+def command_serve(logger: logging.Logger, options: Optional[ServeOptions] = None) -> Result:
+    """
+    Accepts run requests on a Unix domain socket and on a localhost HTTP port until SIGTERM or Ctrl-C, so a program
+    can be executed without starting a container and the entrypoint for each run. Each request gives a program or
+    its source, its stdin, arguments, d8 flags and limits, and is answered with the exit code, the outputs and the
+    timings of the run. On SIGTERM, the server stops accepting requests and lets the admitted ones finish.
+
+    :param logger: A logging.Logger object used for logging messages
+    :type logger: logging.Logger
+
+    :param options: The socket and the port, the number of parallel requests and of queued requests, the warm
+    workers and the limits of the requests. If it is not provided, the default options are used, which do not
+    listen anywhere.
+    :type options: Optional[ServeOptions]
+    """
+
+    options = options or ServeOptions()
+    if options.socket is None and options.http_port is None:
+        return Result.fail(FailResult(code=ExitCode.MISUSE_SHELL_BUILTINS,
+                                      message="Give a socket with --socket, or a port with --http."))
+    missing = next((program for program in options.preload if not os.path.isfile(program)), None)
+    if missing is not None:
+        return Result.fail(FailResult(code=ExitCode.IO_ERROR, message=f"File '{missing}' does not exists."))
+    limits = options.limits
+    if options.reuse_process and limits.has_limits():
+        logger.warning("The resource limits can not be enforced in a reused d8 process. "
+                       "Each request is executed in its own process.")
+
+    with tempfile.TemporaryDirectory(prefix='d8-serve-') as work_dir, \
+            RunService(work_dir, options.jobs, options.queue_size, limits, options.reuse_process) as service:
+        server = RunServer(service)
+        try:
+            endpoints = _listen(server, options)
+        except ListenError as e:
+            server.drain()
+            return Result.fail(FailResult(code=ExitCode.IO_ERROR, message=str(e)))
+        try:
+            for program in options.preload:
+                workers = service.preload(program)
+                if workers:
+                    logger.info(f"{workers} warm workers are running '{program}'.")
+                else:
+                    logger.warning(f"The program '{program}' can not be preloaded, because it can not run in a "
+                                   "reused d8 process or the limits are enforced.")
+
+            _serve_until_stopped(logger, service, endpoints, options)
+        finally:
+            # The threads of the server keep the process alive, so they are stopped also when Ctrl-C or SIGTERM
+            # arrives before the handlers of `_serve_until_stopped` are installed, for example while preloading.
+            server.drain()
+    logger.info(f"Stopped after {service.served} requests. {service.refused} requests were refused.")
+    return Result.ok()
+
+
+def _listen(server: RunServer, options: ServeOptions) -> List[str]:
+    endpoints = []
+    if options.socket is not None:
+        server.listen_unix(options.socket)
+        endpoints.append(f"'{options.socket}'")
+    if options.http_port is not None:
+        endpoints.append(f"http://127.0.0.1:{server.listen_http(options.http_port)}/run")
+    return endpoints
+
+
+def _serve_until_stopped(logger: logging.Logger, service: RunService, endpoints: List[str],
+                         options: ServeOptions) -> None:
+    # The requests are served by the threads of the server. The main thread waits for SIGTERM or Ctrl-C, whose
+    # handlers only run in the main thread.
+    stopped = threading.Event()
+    previous_handlers = {signum: signal.signal(signum, lambda *_: stopped.set())
+                         for signum in (signal.SIGTERM, signal.SIGINT)}
+    try:
+        logger.info(f"Listening on {' and '.join(endpoints)} with {options.jobs} workers and a queue of "
+                    f"{options.queue_size} requests.")
+        stopped.wait()
+    finally:
+        for signum, handler in previous_handlers.items():
+            signal.signal(signum, handler)
+        status = service.status()
+        logger.info(f"Draining: {status['running']} requests are running and {status['queued']} are waiting.")
@@ -0,0 +1,555 @@
+import base64
+import binascii
+import hashlib
+import http.server
+import json
+import os
+import socket
+import socketserver
+import stat
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set, Tuple, Union
+
+from schema import And
+from schema import Optional as OptionalKey
+from schema import Or, Schema, SchemaError
+
+from docker_entrypoint._libs.executor import (ProcessResult, ResourceLimits,
+                                              build_d8_command)
+from docker_entrypoint._libs.runner import InputTask, execute_input
+from docker_entrypoint._libs.worker_pool import (WorkerPool,
+                                                 find_global_state_usage)
+
+# The number of requests that wait for a free worker before the next ones are refused.
+DEFAULT_QUEUE_SIZE = 64
+
+# A larger request line or body is refused, so a client can not fill the memory of the server.
+MAX_REQUEST_BYTES = 64 * 1024 ** 2
+
+# The warm pools of the programs that were used last. The pool of an older program is closed.
+_MAX_WARM_PROGRAMS = 8
+
+_POSITIVE_INT = And(int, lambda n: not isinstance(n, bool) and n > 0)
+_REQUEST_SCHEMA = Schema({
+    OptionalKey('id'): Or(None, str, int, error='The id must be a string or an integer.'),
+    OptionalKey('program'): And(str, str.strip, error='The program must be a non-empty string.'),
+    OptionalKey('source'): And(str, error='The source must be a string.'),
+    OptionalKey('stdin'): And(str, error='The stdin must be a string.'),
+    OptionalKey('stdin_base64'): And(str, error='The stdin_base64 must be a string.'),
+    OptionalKey('args'): And([str], error='The args must be a list of strings.'),
+    OptionalKey('flags'): And([str], error='The flags must be a list of strings.'),
+    OptionalKey('timeout'): And(Or(int, float), lambda n: not isinstance(n, bool) and n > 0,
+                                error='The timeout must be a positive number.'),
+    OptionalKey('memory_limit'): And(_POSITIVE_INT, error='The memory_limit must be a positive integer.'),
+    OptionalKey('cpu_limit'): And(_POSITIVE_INT, error='The cpu_limit must be a positive integer.'),
+    OptionalKey('max_output_bytes'): And(_POSITIVE_INT, error='The max_output_bytes must be a positive integer.'),
+})
+_FIELDS = ('id', 'program', 'source', 'stdin', 'stdin_base64', 'args', 'flags', 'timeout', 'memory_limit',
+           'cpu_limit', 'max_output_bytes')
+
+
+class RequestError(Exception):
+    """
+    Raised when a run request is not valid.
+    """
+
+
+class ServerBusyError(Exception):
+    """
+    Raised when a run request is refused, because the queue is full or the server is shutting down. The client can
+    try again later.
+    """
+
+
+class ListenError(Exception):
+    """
+    Raised when the server can not listen on its socket or port.
+    """
+
+
+class RunRequest:
+    """
+    A request to run a program once with the given stdin.
+    """
+
+    request_id: Optional[Union[str, int]]
+    # The path of the program in the container, or its source. Exactly one of them is set.
+    program: Optional[str]
+    source: Optional[str]
+    stdin: bytes
+    args: List[str]
+    flags: List[str]
+    # The limits of the request, which can not exceed the limits of the server.
+    limits: ResourceLimits
+
+    def __init__(self, request_id: Optional[Union[str, int]], program: Optional[str], source: Optional[str],
+                 stdin: bytes, args: List[str], flags: List[str], limits: ResourceLimits):
+        self.request_id = request_id
+        self.program = program
+        self.source = source
+        self.stdin = stdin
+        self.args = args
+        self.flags = flags
+        self.limits = limits
+
+
+def parse_request(fields, limits: ResourceLimits) -> RunRequest:
+    """
+    Validates the JSON object of a run request.
+
+    :param fields: The decoded JSON of the request.
+
+    :param limits: The limits of the server. A request can only lower them.
+    :type limits: ResourceLimits
+
+    :raises RequestError: If the request is not valid.
+    """
+
+    if not isinstance(fields, dict):
+        raise RequestError('The request is not a JSON object.')
+    unknown = sorted(set(fields) - set(_FIELDS))
+    if unknown:
+        raise RequestError(f"Unknown field '{unknown[0]}'. The fields are: {', '.join(_FIELDS)}.")
+    try:
+        fields = _REQUEST_SCHEMA.validate(fields)
+    except SchemaError as e:
+        raise RequestError(e.code) from e
+    if ('program' in fields) == ('source' in fields):
+        raise RequestError('Exactly one of program and source must be given.')
+    if 'stdin' in fields and 'stdin_base64' in fields:
+        raise RequestError('Only one of stdin and stdin_base64 can be given.')
+
+    try:
+        stdin = base64.b64decode(fields['stdin_base64'], validate=True) if 'stdin_base64' in fields \
+            else fields.get('stdin', '').encode()
+    except binascii.Error as e:
+        raise RequestError("The stdin_base64 is not valid base64.") from e
+    request_limits = ResourceLimits(timeout=_lower(fields.get('timeout'), limits.timeout),
+                                    memory=_lower(fields.get('memory_limit'), limits.memory),
+                                    cpu_time=_lower(fields.get('cpu_limit'), limits.cpu_time),
+                                    max_output_bytes=_lower(fields.get('max_output_bytes'), limits.max_output_bytes))
+    return RunRequest(fields.get('id'), fields.get('program'), fields.get('source'), stdin, fields.get('args', []),
+                      fields.get('flags', []), request_limits)
+
+
+def _lower(requested, maximum):
+    if requested is None or maximum is None:
+        return maximum if requested is None else requested
+    return min(requested, maximum)
+
+
+class RunService:  # pylint: disable=R0902  # The counters, the slots and the warm pools of the server.
+    """
+    The class `RunService` executes the run requests of the `serve` command. At most `jobs` requests run at the same
+    time and at most `queue_size` more wait for a free worker. The other requests are refused at once with a
+    `ServerBusyError`, so the clients back off instead of piling up.
+
+    With `reuse_process`, the programs that can share a d8 process run in the warm workers of a `WorkerPool`, which
+    keeps d8 running with the program loaded between requests. A request with flags or limits runs in its own
+    process.
+    """
+
+    # The number of requests that were executed and that were refused.
+    served: int
+    refused: int
+
+    def __init__(self, work_dir: str, jobs: int, queue_size: int = DEFAULT_QUEUE_SIZE,
+                 limits: Optional[ResourceLimits] = None, reuse_process: bool = False):
+        self.served = 0
+        self.refused = 0
+        self._work_dir = work_dir
+        self._jobs = jobs
+        self._capacity = jobs + queue_size
+        self._limits = limits or ResourceLimits()
+        self._reuse_process = reuse_process
+        self._slots = threading.Semaphore(jobs)
+        # Guards the counters, the connections and the draining state.
+        self._condition = threading.Condition()
+        self._admitted = 0
+        self._running = 0
+        self._draining = False
+        self._connections: Set[socket.socket] = set()
+        # The warm pool of each program by its path, its version and its arguments. None if it can not be reused.
+        self._pools: 'OrderedDict[Tuple, Optional[WorkerPool]]' = OrderedDict()
+        self._pools_lock = threading.Lock()
+
+    def answer(self, payload: bytes) -> Tuple[int, Dict]:
+        """
+        Executes a JSON request and returns the HTTP status of its answer with the JSON object of the answer: 200 with
+        the result, 400 if the request is not valid, or 503 if it is refused.
+        """
+
+        try:
+            fields = json.loads(payload)
+        except ValueError as e:
+            return 400, {'id': None, 'error': f"The request is not valid JSON: {e}."}
+        request_id = fields.get('id') if isinstance(fields, dict) else None
+        try:
+            return 200, self.execute(parse_request(fields, self._limits))
+        except RequestError as e:
+            return 400, {'id': request_id, 'error': str(e)}
+        except ServerBusyError as e:
+            return 503, {'id': request_id, 'error': str(e), 'busy': True}
+
+    def execute(self, request: RunRequest) -> Dict:
+        """
+        Executes a request once a worker is free, and returns its exit code, limit status, outputs and timings.
+
+        :raises ServerBusyError: If the queue is full or the server is shutting down.
+        """
+
+        start = time.perf_counter()
+        self._admit()
+        try:
+            with self._slots:
+                with self._condition:
+                    self._running += 1
+                queue_time = time.perf_counter() - start
+                try:
+                    result, warm = self._run(request)
+                finally:
+                    with self._condition:
+                        self._running -= 1
+        finally:
+            with self._condition:
+                self._admitted -= 1
+                self.served += 1
+                self._condition.notify_all()
+        return _to_answer(request, result, warm, queue_time)
+
+    def preload(self, program: str, args: Optional[List[str]] = None) -> int:
+        """
+        Starts a warm worker for each job, with the program loaded.
+
+        :return: The number of warm workers, 0 if the program can not run in a reused d8 process. With limits, every
+        request runs in its own process, so no worker is started.
+        """
+
+        if self._limits.has_limits():
+            return 0
+        pool = self._warm_pool(program, args or [])
+        return pool.start_workers(self._jobs) if pool is not None else 0
+
+    def status(self) -> Dict:
+        """
+        Returns the number of running, queued, served and refused requests, and whether the server is shutting down.
+        """
+
+        with self._condition:
+            return {'running': self._running, 'queued': self._admitted - self._running, 'served': self.served,
+                    'refused': self.refused, 'draining': self._draining}
+
+    def add_connection(self, connection: socket.socket) -> None:
+        """
+        Registers an open connection, so it stops reading requests when the server drains.
+        """
+
+        with self._condition:
+            if self._draining:
+                _shutdown_read(connection)
+            self._connections.add(connection)
+
+    def remove_connection(self, connection: socket.socket) -> None:
+        """
+        Unregisters a connection that is closed.
+        """
+
+        with self._condition:
+            self._connections.discard(connection)
+
+    def drain(self) -> None:
+        """
+        Refuses the new requests, stops reading from the open connections and waits until the admitted requests
+        finish.
+        """
+
+        with self._condition:
+            self._draining = True
+            for connection in self._connections:
+                _shutdown_read(connection)
+            self._condition.wait_for(lambda: self._admitted == 0)
+
+    def close(self) -> None:
+        """
+        Stops the warm workers.
+        """
+
+        with self._pools_lock:
+            pools, self._pools = list(self._pools.values()), OrderedDict()
+        for pool in pools:
+            if pool is not None:
+                pool.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _admit(self) -> None:
+        with self._condition:
+            if self._draining or self._admitted >= self._capacity:
+                self.refused += 1
+                raise ServerBusyError('The server is shutting down.' if self._draining else
+                                      f"The queue is full: {self._admitted} requests are running or waiting.")
+            self._admitted += 1
+
+    def _run(self, request: RunRequest) -> Tuple[ProcessResult, bool]:
+        program = request.program if request.program is not None else self._write_source(request.source)
+        with tempfile.NamedTemporaryFile(dir=self._work_dir, prefix='stdin-') as stdin_file:
+            stdin_file.write(request.stdin)
+            stdin_file.flush()
+            # Each request runs in its own process group, even without limits, so nothing it spawns outlives it.
+            task = InputTask(file=stdin_file.name, command=build_d8_command(program, request.args, request.flags),
+                             limits=request.limits)
+            pool = None
+            if self._reuse_process and not request.flags and not request.limits.has_limits():
+                pool = self._warm_pool(program, request.args)
+            if pool is None:
+                return execute_input(task, capture=True), False
+            return pool.execute(task, capture=True), True
+
+    def _write_source(self, source: str) -> str:
+        # The programs are named by their content, so the same source is written once and keeps its warm pool.
+        digest = hashlib.sha256(source.encode()).hexdigest()
+        path = os.path.join(self._work_dir, f"program-{digest}.js")
+        if not os.path.exists(path):
+            with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=self._work_dir, delete=False) as file:
+                file.write(source)
+            os.replace(file.name, path)
+        return path
+
+    def _warm_pool(self, program: str, args: List[str]) -> Optional[WorkerPool]:
+        try:
+            program_stat = os.stat(program)
+            key = (os.path.abspath(program), program_stat.st_mtime_ns, program_stat.st_size, tuple(args))
+        except OSError:
+            return None  # d8 reports the missing program.
+        with self._pools_lock:
+            if key in self._pools:
+                self._pools.move_to_end(key)
+                return self._pools[key]
+            with open(program, encoding='utf-8', errors='replace') as program_file:
+                reusable = find_global_state_usage(program_file.read()) is None
+            pool = self._pools[key] = WorkerPool(program, args) if reusable else None
+            evicted = self._pools.popitem(last=False)[1] if len(self._pools) > _MAX_WARM_PROGRAMS else None
+        if evicted is not None:
+            # A request that still runs in a closed worker is executed again in its own process.
+            evicted.close()
+        return pool
+
+
+def _to_answer(request: RunRequest, result: ProcessResult, warm: bool, queue_time: float) -> Dict:
+    usage = result.usage
+    return {
+        'id': request.request_id,
+        'code': result.code,
+        'status': result.limit,
+        'stdout': (result.stdout or b'').decode('utf-8', errors='replace'),
+        'stderr': (result.stderr or b'').decode('utf-8', errors='replace'),
+        'warm': warm,
+        'timings': {
+            'queue': queue_time,
+            'wall': usage.wall_time if usage is not None else None,
+            'user': usage.user_time if usage is not None else None,
+            'system': usage.system_time if usage is not None else None,
+        },
+        'max_rss': usage.max_rss if usage is not None else None,
+    }
+
+
+def _shutdown_read(connection: socket.socket) -> None:
+    try:
+        connection.shutdown(socket.SHUT_RD)
+    except OSError:
+        pass  # The client has already closed the connection.
+
+
+class _LineHandler(socketserver.StreamRequestHandler):
+    # Answers each request line with one line, until the client closes the connection or the server drains.
+
+    server: '_UnixServer'
+
+    def handle(self):
+        service = self.server.service
+        service.add_connection(self.connection)
+        try:
+            for line in iter(lambda: self.rfile.readline(MAX_REQUEST_BYTES + 1), b''):
+                if len(line) > MAX_REQUEST_BYTES:
+                    # The rest of the line can not be told apart from the next requests.
+                    self._write({'id': None, 'error': f"The request is larger than {MAX_REQUEST_BYTES} bytes."})
+                    break
+                if line.strip():
+                    self._write(service.answer(line)[1])
+        finally:
+            service.remove_connection(self.connection)
+
+    def _write(self, answer: Dict) -> None:
+        self.wfile.write(json.dumps(answer).encode() + b'\n')
+        self.wfile.flush()
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    # `server_close` waits for the threads of the connections.
+    daemon_threads = False
+    block_on_close = True
+
+    def __init__(self, path: str, service: RunService):
+        self.service = service
+        super().__init__(path, _LineHandler)
+
+
+class _HttpHandler(http.server.BaseHTTPRequestHandler):
+    server: '_HttpServer'
+
+    def setup(self):
+        super().setup()
+        # Like the connections of the socket, an idle or slow client stops being read when the server drains, so it
+        # does not hold back the end of the server.
+        self.server.service.add_connection(self.connection)
+
+    def finish(self):
+        try:
+            super().finish()
+        finally:
+            self.server.service.remove_connection(self.connection)
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        """
+        Executes the JSON request of POST /run.
+        """
+
+        if self.path != '/run':
+            self._send(404, {'error': f"There is no endpoint '{self.path}'. Use POST /run."})
+            return
+        try:
+            length = int(self.headers.get('Content-Length', ''))
+        except ValueError:
+            self._send(411, {'id': None, 'error': 'The Content-Length of the request is required.'})
+            return
+        if length > MAX_REQUEST_BYTES:
+            self._send(413, {'id': None, 'error': f"The request is larger than {MAX_REQUEST_BYTES} bytes."})
+            return
+        self._send(*self.server.service.answer(self.rfile.read(length)))
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """
+        Returns the status of the service for GET /health.
+        """
+
+        if self.path != '/health':
+            self._send(404, {'error': f"There is no endpoint '{self.path}'. Use GET /health."})
+            return
+        self._send(200, self.server.service.status())
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        # The requests are not logged, like the requests of the socket.
+        pass
+
+    def _send(self, status: int, answer: Dict) -> None:
+        body = json.dumps(answer).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        if status == 503:
+            self.send_header('Retry-After', '1')
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class _HttpServer(http.server.ThreadingHTTPServer):
+    daemon_threads = False
+    block_on_close = True
+
+    def __init__(self, port: int, service: RunService):
+        self.service = service
+        super().__init__(('127.0.0.1', port), _HttpHandler)
+
+
+class RunServer:
+    """
+    The class `RunServer` accepts the requests of a `RunService` on a Unix domain socket, one JSON request per line,
+    and on a localhost HTTP port. Each listener accepts in its own thread, and each connection is handled in its own
+    thread.
+    """
+
+    def __init__(self, service: RunService):
+        self._service = service
+        self._servers: List[socketserver.BaseServer] = []
+        self._threads: List[threading.Thread] = []
+        self._socket_path: Optional[str] = None
+
+    def listen_unix(self, path: str) -> None:
+        """
+        Listens on a Unix domain socket. A socket that is left from a server that stopped is replaced.
+
+        :raises ListenError: If the path is not a socket, if another server listens on it, or if it can not be
+        created.
+        """
+
+        _remove_stale_socket(path)
+        try:
+            server = _UnixServer(path, self._service)
+        except OSError as e:
+            raise ListenError(f"The socket '{path}' can not be created: {e.strerror}.") from e
+        self._socket_path = path
+        self._start(server)
+
+    def listen_http(self, port: int) -> int:
+        """
+        Listens on a port of 127.0.0.1. The port 0 is replaced with a free port.
+
+        :return: The port.
+
+        :raises ListenError: If the port can not be used.
+        """
+
+        try:
+            server = _HttpServer(port, self._service)
+        except OSError as e:
+            raise ListenError(f"The port {port} can not be used: {e.strerror}.") from e
+        self._start(server)
+        return server.server_address[1]
+
+    def drain(self) -> None:
+        """
+        Stops accepting connections, lets the admitted requests finish, closes the connections and removes the
+        socket.
+        """
+
+        for server in self._servers:
+            server.shutdown()
+        self._service.drain()
+        for server in self._servers:
+            server.server_close()
+        for thread in self._threads:
+            thread.join()
+        if self._socket_path is not None:
+            os.unlink(self._socket_path)
+            self._socket_path = None
+        self._servers, self._threads = [], []
+
+    def _start(self, server: socketserver.BaseServer) -> None:
+        thread = threading.Thread(target=server.serve_forever, name=f"serve-{len(self._servers)}")
+        thread.start()
+        self._servers.append(server)
+        self._threads.append(thread)
+
+
+def _remove_stale_socket(path: str) -> None:
+    try:
+        mode = os.lstat(path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise ListenError(f"The path '{path}' exists and is not a socket.")
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        try:
+            probe.connect(path)
+        except ConnectionRefusedError:
+            os.unlink(path)
+            return
+    raise ListenError(f"Another server listens on '{path}'.")
@@ -0,0 +1,72 @@
+import json
+from typing import List, Optional
+
+from docker_entrypoint._libs.runner import InputResult
+
+STATS_FORMATS = ('table', 'json')
+
+_TABLE_HEADER = ('Input', 'Code', 'Wall (s)', 'User (s)', 'Sys (s)', 'Max RSS (MiB)', 'Vol CS', 'Invol CS', 'Status')
+
+
+def format_stats_table(results: List[InputResult]) -> str:
+    """
+    Formats the resource usage of the executed inputs as a compact table, one row per input.
+
+    :param results: The executed inputs, in the order they are shown.
+    :type results: List[InputResult]
+    """
+
+    rows = [_TABLE_HEADER] + [_table_row(input_result) for input_result in results]
+    widths = [max(len(row[column]) for row in rows) for column in range(len(_TABLE_HEADER))]
+    lines = []
+    for row in rows:
+        # The first column is the input path and the last one is the status, the others are numbers.
+        cells = [row[0].ljust(widths[0])] + [cell.rjust(width) for cell, width in zip(row[1:-1], widths[1:-1])] + \
+                [row[-1].ljust(widths[-1])]
+        lines.append('  '.join(cells).rstrip())
+    return '\n'.join(lines)
+
+
+def format_stats_json(results: List[InputResult]) -> str:
+    """
+    Formats the resource usage of the executed inputs as a JSON document in one line. The values that were not
+    measured are null, and so is the status of the inputs that did not exceed a resource limit.
+
+    :param results: The executed inputs, in the order they are shown.
+    :type results: List[InputResult]
+    """
+
+    inputs = []
+    for input_result in results:
+        usage = input_result.result.usage
+        inputs.append({
+            'file': input_result.task.file,
+            'code': input_result.result.code,
+            'wall_time': usage.wall_time if usage else None,
+            'user_time': usage.user_time if usage else None,
+            'system_time': usage.system_time if usage else None,
+            'max_rss_kib': usage.max_rss if usage else None,
+            'voluntary_context_switches': usage.voluntary_switches if usage else None,
+            'involuntary_context_switches': usage.involuntary_switches if usage else None,
+            'status': input_result.result.limit,
+        })
+    return json.dumps({'inputs': inputs})
+
+
+def _table_row(input_result: InputResult) -> tuple:
+    usage = input_result.result.usage
+    status = input_result.result.limit or '-'
+    if usage is None:
+        return (input_result.task.file, str(input_result.result.code)) + ('-',) * 6 + (status,)
+    return (input_result.task.file, str(input_result.result.code), _format_seconds(usage.wall_time),
+            _format_seconds(usage.user_time), _format_seconds(usage.system_time),
+            '-' if usage.max_rss is None else f"{usage.max_rss / 1024:.1f}",
+            _format_count(usage.voluntary_switches), _format_count(usage.involuntary_switches), status)
+
+
+def _format_seconds(value: Optional[float]) -> str:
+    return '-' if value is None else f"{value:.3f}"
+
+
+def _format_count(value: Optional[int]) -> str:
+    return '-' if value is None else str(value)
@@ -3,32 +3,18 @@ from typing import Callable, Optional
 
 from on_rails import Result, ValidationError, def_result, try_func
 from pylity import String
-from pylity.decorators.validate_func_params import validate_func_params
 from schema import And, Or, Schema, SchemaError
 
 from docker_entrypoint._libs.DockerEnvironments import DockerEnvironments
 from docker_entrypoint._libs.ResultDetails.FailResult import FailResult
-
-D8_Recommended_OPTIONS = {
-    '--harmony': 'Enables support for some of the experimental ES6 features that are not yet fully standardized',
-    '--allow-natives-syntax': 'Enables the use of V8-specific syntax in JavaScript code',
-    '--trace-opt': 'Enables logging of V8\'s optimization process',
-    '--print-bytecode': 'Prints the generated bytecode for JavaScript functions',
-    '--print-opt-code': 'Prints the generated optimized machine code for JavaScript functions',
-    '--trace': 'Enables detailed logging of V8 internals',
-    '--log-timer-events': 'Enables logging of timer events',
-    '--log-gc': 'Enables logging of garbage collection events',
-    '--prof': 'Enables CPU profiling',
-    '--trace-deopt': 'Enables logging of V8\'s deoptimization process',
-    '--trace-ic': 'Enables logging of inline caching events',
-}
+from docker_entrypoint._libs.validation import validate_func_params
 
 
 @def_result()
 @validate_func_params(schema=Schema({
     'logger': And(logging.Logger, error='The logger is required and must be type of logging.'),
     'result': And(Result, error='The result is required and must be type of Result.'),
-}))
+}), internal=True)
 def log_result(logger: logging.Logger, result: Result) -> Result:
     """
     Logs unexpected errors. Results that isn't success and isn't type of FailResult
@@ -61,7 +47,7 @@ def log_result(logger: logging.Logger, result: Result) -> Result:
     'logger': And(logging.Logger, error='The logger is required and must be type of logging.'),
     'fail_result': And(Result, lambda result: not result.success,
                        error='The fail_result is required and must be type of Result.fail()'),
-}))
+}), internal=True)
 def log_error(logger: logging.Logger, fail_result: Result) -> Result:
     """
     This function logs an error message and returns a support message if a failure result is encountered.
@@ -97,7 +83,7 @@ def get_support_message() -> Result[str]:
 @validate_func_params(schema=Schema({
     'environments': And(DockerEnvironments,
                         error='environments is required and must be an instance of `DockerEnvironments`')
-}))
+}), internal=True)
 def _get_support_message(environments: DockerEnvironments) -> Result[str]:
     return Result.ok(value="Support:\n"
                            f"\tMaintainer: {environments.maintainer}\n"
@@ -113,7 +99,7 @@ def _get_support_message(environments: DockerEnvironments) -> Result[str]:
     'class_object': And(object, lambda param: param is not None,
                         error='The class object is required and must be an instance of a class'),
     'title': Or(None, And(str, lambda s: len(s.strip()) > 0, error='The title must be None or non-empty string'))
-}))
+}), internal=True)
 def class_properties_to_str(class_object, title: Optional[str] = None) -> Result[str]:
     """
     The function converts the properties of a class object to a string format with an optional title.
@@ -142,7 +128,7 @@ def class_properties_to_str(class_object, title: Optional[str] = None) -> Result
 @def_result()
 @validate_func_params(schema=Schema({
     'code': And(int, error='The code is required and must be integer')
-}))
+}), internal=True)
 def convert_code_to_result(code: int) -> Result:
     """
     The function converts a code to a Result object, returning an OK result if the code is 0 and a FailResult object
@@ -160,7 +146,7 @@ def convert_code_to_result(code: int) -> Result:
 @def_result()
 @validate_func_params(schema=Schema({
     'validation_func': And(lambda x: callable(x), error='The validation_func is required and must be a function')
-}))
+}), internal=True)
 def try_validation(validation_func: Callable) -> Result:
     """
     It executes the validation_func function. If an SchemaError is raised, it returns the error result
@@ -0,0 +1,105 @@
+import functools
+import inspect
+import os
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from on_rails import (BreakFunctionException, BreakRailsException, Result,
+                      ValidationError, generate_error)
+from schema import Schema, SchemaError
+
+# With `boundary`, the functions that are only called inside the entrypoint run without validating their parameters.
+# The public functions, like the commands and the option classes, are always validated.
+VALIDATION_ENVIRONMENT = 'D8_VALIDATION'
+BOUNDARY_VALIDATION = 'boundary'
+
+_internal_validation = os.environ.get(VALIDATION_ENVIRONMENT, '').strip().lower() != BOUNDARY_VALIDATION
+
+
+def set_internal_validation(enabled: bool) -> None:
+    """
+    Enables or disables the validation of the parameters of the internal functions. It is disabled at the start when
+    the `D8_VALIDATION` environment variable is `boundary`.
+    """
+
+    global _internal_validation  # pylint: disable=global-statement
+    _internal_validation = enabled
+
+
+def is_internal_validation_enabled() -> bool:
+    """
+    Returns whether the parameters of the internal functions are validated.
+    """
+
+    return _internal_validation
+
+
+def validate_func_params(schema: Schema, raise_exception: bool = False, internal: bool = False):
+    """
+    Validates the parameters of a function with a schema, like `pylity`'s `validate_func_params`, and returns the same
+    results for the same calls. The signature of the function and its defaults are read once, when the function is
+    decorated, instead of on each call, and the function runs without the Result chains of the validation.
+
+    :param schema: The schema of the parameters.
+    :type schema: Schema
+
+    :param raise_exception: If it is true, a failed validation raises a `ValueError` and the function is called as it
+    is. Otherwise, the failed validation and the exceptions of the function are returned as a failed Result.
+    :type raise_exception: bool
+
+    :param internal: If it is true, the function is only called inside the entrypoint, and its validation is skipped
+    when the internal validation is disabled.
+    :type internal: bool
+    """
+
+    def decorator(func: Callable):
+        signature = inspect.signature(func)
+        defaults = [(parameter.name, parameter.default) for parameter in signature.parameters.values()
+                    if parameter.default is not inspect.Parameter.empty]
+        drop_self = 'self' in signature.parameters and 'self' not in schema.schema
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not internal or _internal_validation:
+                error = _validate(schema, signature, defaults, drop_self, args, kwargs)
+                if error is not None:
+                    if raise_exception:
+                        raise ValueError(error.message)
+                    return Result.fail(error)
+            if raise_exception:
+                return func(*args, **kwargs)
+            return _call(func, args, kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def _validate(schema: Schema, signature: inspect.Signature, defaults: List[Tuple[str, Any]], drop_self: bool,
+              args: tuple, kwargs: Dict[str, Any]) -> Optional[ValidationError]:
+    try:
+        arguments = dict(signature.bind(*args, **kwargs).arguments)
+    except TypeError as e:
+        return ValidationError(message=str(e))
+    arguments.update(kwargs)
+    for name, default in defaults:
+        arguments.setdefault(name, default)
+    if drop_self:
+        del arguments['self']
+
+    try:
+        schema.validate(arguments)
+    except SchemaError as e:
+        return ValidationError(message=str(e))
+    return None
+
+
+def _call(func: Callable, args: tuple, kwargs: Dict[str, Any]) -> Result:
+    # The same conversion as `on_rails.try_func`, without inspecting the function on each call.
+    try:
+        return Result.convert_to_result(func(*args, **kwargs))
+    except BreakFunctionException:
+        raise  # It is handled by the `def_result` decorator of the caller.
+    except BreakRailsException as e:
+        return e.result
+    except Exception as e:  # pylint: disable=broad-except
+        return Result.fail(generate_error([e], num_of_try=1))
@@ -0,0 +1,180 @@
+import ctypes
+import os
+import re
+import select
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+DEFAULT_POLL_INTERVAL = 1.0
+DEFAULT_DEBOUNCE = 0.2
+
+# The events of inotify that change the content or the list of the files in a directory.
+_IN_MODIFY = 0x2
+_IN_ATTRIB = 0x4
+_IN_CLOSE_WRITE = 0x8
+_IN_MOVED_FROM = 0x40
+_IN_MOVED_TO = 0x80
+_IN_CREATE = 0x100
+_IN_DELETE = 0x200
+_WATCH_MASK = _IN_MODIFY | _IN_ATTRIB | _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE
+_IN_NONBLOCK = os.O_NONBLOCK
+_IN_CLOEXEC = os.O_CLOEXEC
+_EVENTS_BUFFER_SIZE = 64 * 1024
+
+_LOAD_PATTERN = re.compile(r'''\b(load|loadRelativeToScript)\s*\(\s*(['"])(.+?)\2\s*\)''')
+
+# The modification time and the size of each file, by its path.
+Snapshot = Dict[str, Tuple[int, int]]
+
+
+def find_load_dependencies(program: str) -> List[str]:
+    """
+    Finds the scripts that a program loads with `load()` or `loadRelativeToScript()` with a literal path, and the
+    scripts that they load in turn. Like d8 does, `load()` resolves the path from the current directory and
+    `loadRelativeToScript()` from the directory of the script.
+
+    :param program: The path of the javascript program
+    :type program: str
+
+    :return: The absolute paths of the loaded scripts that exist, in the order they are found.
+    """
+
+    dependencies: List[str] = []
+    pending = [os.path.abspath(program)]
+    visited = set(pending)
+    while pending:
+        script = pending.pop(0)
+        try:
+            with open(script, encoding='utf-8', errors='replace') as file:
+                source = file.read()
+        except OSError:
+            continue
+        for function, _, path in _LOAD_PATTERN.findall(source):
+            base = os.path.dirname(script) if function == 'loadRelativeToScript' else os.getcwd()
+            dependency = os.path.normpath(os.path.join(base, path))
+            if dependency not in visited and os.path.isfile(dependency):
+                visited.add(dependency)
+                dependencies.append(dependency)
+                pending.append(dependency)
+    return dependencies
+
+
+def take_snapshot(paths: Iterable[str]) -> Snapshot:
+    """
+    Records the modification time and the size of the files. The files that do not exist are left out.
+    """
+
+    snapshot = {}
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+    return snapshot
+
+
+def changed_paths(before: Snapshot, after: Snapshot) -> Set[str]:
+    """
+    Returns the paths that were added, modified or removed between two snapshots.
+    """
+
+    return {path for path in before.keys() | after.keys() if before.get(path) != after.get(path)}
+
+
+class Watcher:
+    """
+    The class `Watcher` waits until a snapshot of files changes. It wakes up as soon as inotify reports an event in a
+    watched directory, and it also polls, because inotify does not see the changes that are made on the host in some
+    bind mounts, and some file systems do not support it at all.
+    """
+
+    poll_interval: float
+    # A change is only reported when the files stay unchanged this long, so rapid saves cause one run.
+    debounce: float
+
+    def __init__(self, poll_interval: float = DEFAULT_POLL_INTERVAL, debounce: float = DEFAULT_DEBOUNCE):
+        self.poll_interval = poll_interval
+        self.debounce = debounce
+        self._watched: Set[str] = set()
+        self._libc = ctypes.CDLL(None, use_errno=True)
+        descriptor = self._libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        self._inotify: Optional[int] = descriptor if descriptor >= 0 else None
+
+    @property
+    def uses_inotify(self) -> bool:
+        """
+        Whether the watcher is woken by inotify, instead of polling only.
+        """
+
+        return self._inotify is not None
+
+    def watch(self, directories: Iterable[str]) -> None:
+        """
+        Adds inotify watches to the directories that are not watched yet. The directories that can not be watched
+        are still polled.
+        """
+
+        if self._inotify is None:
+            return
+        for directory in set(directories) - self._watched:
+            if self._libc.inotify_add_watch(self._inotify, os.fsencode(directory), _WATCH_MASK) >= 0:
+                self._watched.add(directory)
+
+    def wait_for_change(self, snapshot_function: Callable[[], Snapshot], previous: Snapshot) -> Snapshot:
+        """
+        Blocks until the snapshot differs from the previous one and then stays the same for `debounce` seconds.
+
+        :param snapshot_function: Takes a new snapshot of the watched files.
+        :type snapshot_function: Callable[[], Snapshot]
+
+        :param previous: The snapshot to compare with.
+        :type previous: Snapshot
+
+        :return: The new snapshot.
+        """
+
+        current = previous
+        while current == previous:
+            self._sleep(self.poll_interval)
+            current = snapshot_function()
+        while True:
+            time.sleep(self.debounce)
+            self._drain()
+            latest = snapshot_function()
+            if latest == current:
+                return latest
+            current = latest
+
+    def close(self) -> None:
+        """
+        Releases the inotify instance.
+        """
+
+        if self._inotify is not None:
+            os.close(self._inotify)
+            self._inotify = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _sleep(self, timeout: float) -> None:
+        if self._inotify is None:
+            time.sleep(timeout)
+            return
+        readable, _, _ = select.select([self._inotify], [], [], timeout)
+        if readable:
+            self._drain()
+
+    def _drain(self) -> None:
+        # Only the fact that something happened matters, the snapshots tell what changed.
+        if self._inotify is None:
+            return
+        try:
+            while True:
+                os.read(self._inotify, _EVENTS_BUFFER_SIZE)
+        except BlockingIOError:
+            pass
@@ -0,0 +1,193 @@
+import json
+import os
+import queue
+import re
+import subprocess
+import threading
+import time
+from typing import List, Optional
+
+from docker_entrypoint._libs.decompress import is_compressed
+from docker_entrypoint._libs.executor import (D8_EXECUTABLE, ProcessResult,
+                                              ResourceUsage)
+from docker_entrypoint._libs.judge import judge_output
+from docker_entrypoint._libs.runner import (InputTask, execute_input,
+                                            redirect_to_files)
+
+HARNESS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'js', 'realm_harness.js')
+
+# Programs that use any of these features can not share a d8 process between inputs: they exit the process, load
+# other scripts into it, depend on its event loop or microtasks, or touch the realms and workers of the harness.
+_GLOBAL_STATE_PATTERN = re.compile(
+    r'\b(?:quit|load|loadRelativeToScript|setTimeout|Worker|Realm|d8|import|async|await|Promise)\b|\bos\s*\.')
+
+
+def find_global_state_usage(source: str) -> Optional[str]:
+    """
+    Checks whether a program uses a feature that touches the global state of the d8 process.
+
+    :param source: The source code of the javascript program
+    :type source: str
+
+    :return: The first usage that is found, or None if the program can run in a shared d8 process.
+    """
+
+    match = _GLOBAL_STATE_PATTERN.search(source)
+    return match.group(0) if match else None
+
+
+class WorkerCrashedError(Exception):
+    """
+    Raised when a d8 worker exits before it answers a request.
+    """
+
+
+class D8Worker:
+    """
+    The class `D8Worker` keeps one d8 process alive that has the program loaded, and runs each input in a fresh Realm
+    of that process.
+    """
+
+    def __init__(self, program: str, args: List[str]):
+        # The process lives as long as the worker, so it can not be managed by a `with` statement.
+        self._process = subprocess.Popen([D8_EXECUTABLE, HARNESS_PATH, '--', program] + args,  # pylint: disable=R1732
+                                         stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                         stderr=subprocess.DEVNULL)
+        self._next_id = 0
+
+    def run(self, file: str) -> ProcessResult:
+        """
+        Runs the program with the given input file.
+        """
+
+        self._next_id += 1
+        start = time.perf_counter()
+        request = json.dumps({'id': self._next_id, 'input': os.path.abspath(file)})
+        try:
+            self._process.stdin.write(request.encode() + b'\n')
+            self._process.stdin.flush()
+        except (BrokenPipeError, ValueError) as e:
+            raise WorkerCrashedError("The d8 worker is not running.") from e
+
+        line = self._process.stdout.readline()
+        if not line:
+            raise WorkerCrashedError("The d8 worker exited before answering the request.")
+        response = json.loads(line)
+        # The realm shares the process with other runs, so only its wall time can be measured.
+        return ProcessResult(code=response['status'], stdout=response['stdout'].encode(),
+                             stderr=response['stderr'].encode(),
+                             usage=ResourceUsage(wall_time=time.perf_counter() - start))
+
+    def close(self) -> None:
+        """
+        Stops the d8 process of the worker.
+        """
+
+        if self._process.poll() is None:
+            self._process.stdin.close()
+            try:
+                self._process.wait(timeout=1)
+            except subprocess.TimeoutExpired:
+                self._process.kill()
+                self._process.wait()
+        self._process.stdout.close()
+
+
+class WorkerPool:
+    """
+    The class `WorkerPool` lends a `D8Worker` to every input that is executed, and starts a new worker when none is
+    idle. When a worker can not be started or crashes, the input is executed in its own d8 process instead.
+    """
+
+    def __init__(self, program: str, args: List[str]):
+        self._program = program
+        self._args = args
+        self._idle_workers: queue.SimpleQueue = queue.SimpleQueue()
+        self._workers: List[D8Worker] = []
+        self._lock = threading.Lock()
+        self._can_start_workers = True
+
+    def execute(self, task: InputTask, capture: bool = False) -> ProcessResult:
+        """
+        Executes the program with the input file of the task in a reused d8 process. The signature is
+        `ExecuteFunction`.
+
+        :param task: The input file and the argv that executes it in its own process, which is used as a fallback.
+        :type task: InputTask
+
+        :param capture: It is only used by the fallback. The output of a reused process is always captured, judged
+        after the run if the task has an expected output, and written to the output files of the task if they are
+        set.
+        :type capture: bool
+        """
+
+        if is_compressed(task.file):
+            # The realm reads the input file by its path, so a compressed input is decompressed into its own process.
+            return execute_input(task, capture)
+        worker = self._acquire()
+        if worker is None:
+            return execute_input(task, capture)
+        try:
+            result = worker.run(task.file)
+        except WorkerCrashedError:
+            self._discard(worker)
+            return execute_input(task, capture)
+        self._idle_workers.put(worker)
+        if task.expected is not None:
+            result = judge_output(result, task.expected)
+        return redirect_to_files(task, result)
+
+    def start_workers(self, count: int) -> int:
+        """
+        Starts idle workers until the pool has `count` of them, so the first inputs do not wait for d8 to start and to
+        load the program.
+
+        :return: The number of workers of the pool, which is smaller than `count` if d8 can not be started.
+        """
+
+        while len(self._workers) < count:
+            worker = self._start_worker()
+            if worker is None:
+                break
+            self._idle_workers.put(worker)
+        return len(self._workers)
+
+    def close(self) -> None:
+        """
+        Stops all workers of the pool.
+        """
+
+        with self._lock:
+            workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _acquire(self) -> Optional[D8Worker]:
+        try:
+            return self._idle_workers.get_nowait()
+        except queue.Empty:
+            pass
+        return self._start_worker()
+
+    def _start_worker(self) -> Optional[D8Worker]:
+        if not self._can_start_workers:
+            return None
+        try:
+            worker = D8Worker(self._program, self._args)
+        except OSError:
+            self._can_start_workers = False
+            return None
+        with self._lock:
+            self._workers.append(worker)
+        return worker
+
+    def _discard(self, worker: D8Worker) -> None:
+        with self._lock:
+            self._workers.remove(worker)
+        worker.close()
@@ -0,0 +1,11 @@
+"""
+The functions that run javascript programs with d8 from other Python programs. Unlike the entrypoint, they are a
+library: they return the outcome of the programs instead of printing it.
+"""
+
+from docker_entrypoint._libs.async_runner import run_program
+from docker_entrypoint._libs.executor import (LimitStatus, ProcessResult,
+                                              ResourceUsage)
+from docker_entrypoint._libs.result_stream import RunRecord, iter_results
+
+__all__ = ['run_program', 'iter_results', 'RunRecord', 'ProcessResult', 'ResourceUsage', 'LimitStatus']
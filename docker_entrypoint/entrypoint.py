@@ -1,144 +1,140 @@
-import logging
-from typing import List, Optional
-
-from on_rails import Result, def_result
-from pylity.decorators.validate_func_params import validate_func_params
-from schema import And, Or, Schema
-
-from docker_entrypoint._libs.cli_parser import create_cli_parser
-from docker_entrypoint._libs.commands import (command_about, command_bash,
-                                              command_d8, command_run,
-                                              command_samples, command_shell)
-from docker_entrypoint._libs.DockerEnvironments import DockerEnvironments
+import os
+import signal
+import sys
+import threading
+from typing import TYPE_CHECKING, Iterable, List, Optional
+
 from docker_entrypoint._libs.ExitCodes import ExitCode
-from docker_entrypoint._libs.Logger import Logger
-from docker_entrypoint._libs.ResultDetails.FailResult import FailResult
-from docker_entrypoint._libs.utility import class_properties_to_str, log_result
+
+if TYPE_CHECKING:  # pragma: no cover
+    import logging
+
+# The commands that run a program with the rest of the arguments. Without other options, they and `--version` are
+# handled before the command-line parser and the libraries of the other commands are imported, because they run on
+# every start of a container.
+_PASSTHROUGH_COMMANDS = ('d8', 'bash')
 
 
-def main(args: Optional[List[str]] = None, logger: Optional[logging.Logger] = None) -> int:
+def main(args: Optional[List[str]] = None, logger: Optional['logging.Logger'] = None) -> int:
     """
     This is a main function that creates a command-line interface parser, parses the arguments, runs the program, and logs
     the result.
     """
 
-    result = _inner_main(args, logger)
-
-    if not result.success and result.detail and not result.detail.is_instance_of(FailResult):
-        print(repr(result))  # Print unexpected error
-
-    if result.success:
-        return 0
-    return result.code()
-
+    # `docker stop` sends SIGTERM. It is raised as `SystemExit`, so the running inputs are killed on the way out like
+    # they are for Ctrl-C. A signal handler can only be installed by the main thread, and the other threads that call
+    # `main` leave the signals to their program.
+    if threading.current_thread() is not threading.main_thread():
+        return _run(args, logger)
+    previous_handler = signal.signal(signal.SIGTERM, _exit_on_signal)
+    try:
+        return _run(args, logger)
+    except (KeyboardInterrupt, SystemExit):
+        _kill_running_processes()
+        raise
+    finally:
+        signal.signal(signal.SIGTERM, previous_handler)
 
-@def_result()
-@validate_func_params(schema=Schema({
-    'logger': Or(None, logging.Logger, error='The logger must be None or type of logging.Logger'),
-    'args': Or(None, [str], error='The args must be None or be a list of strings'),
-}))
-def _inner_main(args: Optional[List[str]] = None, logger: Optional[logging.Logger] = None) -> Result:
-    if not logger:
-        logger = Logger.get(__name__) \
-            .on_fail_break_function() \
-            .value
-
-    return create_cli_parser() \
-        .on_success(lambda parser: (parser.parse_known_args(args), parser)) \
-        .on_success(lambda values: run(values[0], values[1], logger)) \
-        .finally_tee(lambda prev_result: log_result(logger, prev_result)
-                     .on_fail(lambda res: logger.error("An error occurred while logging Result.\n"
-                                                       f"Current Error: {res}\n"
-                                                       f"Previous Result: {prev_result}"))
-                     ) \
-        .on_fail_new_detail(lambda prev_result: FailResult(code=prev_result.code())) \
-        .on_success_new_detail(None)
-
-
-@def_result()
-@validate_func_params(schema=Schema({
-    'arguments': And(lambda param: param is not None, error='The arguments is required'),
-    'parser': And(lambda param: param is not None, error='The parser is required'),
-    'logger': And(logging.Logger, error='The logger is required and must be type of logging.Logger'),
-}))
-def run(arguments, parser, logger: logging.Logger) -> Result:
-    """
-    This function runs a command with given arguments and logs information about Docker environments and known parameters.
 
-    :param arguments: The `arguments` parameter is a tuple containing two elements: `known_params` and `args`.
-    `known_params` is a namespace object containing the parsed command-line arguments that were recognized by the parser,
-    while `args` is a list of positional arguments that were not recognized by the parser
+def _run(args: Optional[List[str]], logger: Optional['logging.Logger']) -> int:
+    exit_code = _run_fast_path(sys.argv[1:] if args is None else args, logger)
+    if exit_code is None:
+        exit_code = _run_cli(args, logger)
+    return exit_code
 
-    :param parser: `parser` is an instance of the `argparse.ArgumentParser` class, which is used to define and parse
-    command-line arguments for the script. It is typically used to define the expected arguments and options, and to
-    generate help messages and usage information
 
-    :param logger: The logger parameter is an instance of the logging.Logger class, which is used for logging messages
-    during the execution of the run function. It allows the function to output messages of different levels (e.g. debug,
-    info, warning, error) to a specified output stream
-    :type logger: logging.Logger
-    """
+def _exit_on_signal(signum: int, _frame) -> None:
+    raise SystemExit(ExitCode.FATAL_ERROR_SIGNAL + signum)
 
-    known_params, args = arguments
 
-    return Logger.set_level(debug=known_params.debug) \
-        .on_success(lambda: DockerEnvironments.get_environments()) \
-        .on_success_tee(lambda environments:
-                        (logger.debug(class_properties_to_str(environments, "Environments")),
-                         logger.debug(f"known params: {known_params}\nArgs: {args}"))
-                        ) \
-        .on_success(lambda environments: _run(known_params, args, parser, environments, logger))
+def _kill_running_processes() -> None:
+    # The entrypoint exits, so every process group that it started is killed, also the ones of the threads that do
+    # not stop their own inputs. The executor is not imported if no command used it.
+    executor = sys.modules.get('docker_entrypoint._libs.executor')
+    if executor is not None:
+        executor.kill_running_processes()
 
 
-@def_result()
-def _run(known_params, args, parser, environments: DockerEnvironments, logger: logging.Logger) -> Result:
-    """
-    Processes commands and arguments passed to it and executes the corresponding command function.
+def _run_cli(args: Optional[List[str]], logger: Optional['logging.Logger']) -> int:
+    # pylint: disable=import-outside-toplevel
+    from docker_entrypoint._libs.dispatcher import run_cli
+    from docker_entrypoint._libs.ResultDetails.FailResult import FailResult
 
-    :param known_params: `known_params` is a named tuple that contains the parsed command line arguments and
-    options that are known to the program. It is used to determine which command to execute and what arguments
-    to pass to that command.
+    result = run_cli(args, logger)
+    if not result.success and result.detail and not result.detail.is_instance_of(FailResult):
+        print(repr(result))  # Print unexpected error
 
-    :param args: `args` is a list of additional arguments passed to the program.
-    It is used in the `_run` function to pass additional arguments to the specific command being executed
+    if result.success:
+        return 0
+    return result.code()
 
-    :param parser: `parser` is an instance of the `argparse.ArgumentParser` class, which is used to define
-    and parse command-line arguments. It is used to define the expected arguments and options for the
-    command-line interface of the program
 
-    :param environments: `environments` is an object of type `DockerEnvironments`, which is a class that
-    contains information about the Docker environment being used by the program.
-    :type environments: DockerEnvironments
+def _run_fast_path(args, logger: Optional['logging.Logger']) -> Optional[int]:
+    """
+    Handles `--version` and the passthrough commands like the command-line parser would. Returns None for the other
+    arguments, for the ones that the parser would treat differently, like `--help`, and for a logger that shows the
+    debug logs of the parser.
     """
 
-    args = args or []
-    if not known_params.command:
-        if known_params.version:
-            logger.info(f"Program Version: {environments.docker_version}")
-            return Result.ok()
-
-        # Print the list of available commands
-        parser.print_help()
-        return Result.fail(detail=FailResult(code=ExitCode.MISUSE_SHELL_BUILTINS, message="No command specified."))
-
-    # Process the command
-    known_params.command = known_params.command.lower()
-    if known_params.command == 'run':
-        files_and_dirs = known_params.file or []
-        files_and_dirs += known_params.directory or []
-        return command_run(logger, program=known_params.program, files_and_dirs=files_and_dirs, args=args)
-    if known_params.command == 'd8':
-        return command_d8(logger, args)
-    if known_params.command == 'shell':
-        return command_shell(logger, args)
-    if known_params.command == 'bash':
-        return command_bash(logger, args)
-    if known_params.command == 'samples':
-        return command_samples(logger, environments)
-    if known_params.command == 'about':
-        return command_about(logger, environments)
-
-    return Result.ok()  # pragma: no cover
+    if not isinstance(args, list) or not args or not all(isinstance(arg, str) for arg in args):
+        return None
+    if logger is not None and not _is_info_logger(logger):
+        return None
+
+    if args == ['--version']:
+        # The same default as `DockerEnvironments.get_environments`.
+        _log(logger, 'INFO', f"Program Version: {os.environ.get('DOCKER_VERSION', 'latest')}")
+        return 0
+    if args[0] not in _PASSTHROUGH_COMMANDS:
+        return None
+
+    # pylint: disable=import-outside-toplevel
+    from docker_entrypoint._libs.executor import (D8_Recommended_OPTIONS,
+                                                  build_d8_command,
+                                                  run_process)
+
+    if args[0] == 'd8':
+        if not _is_passed_through(args[1:], list(D8_Recommended_OPTIONS) + ['--help']):
+            return None
+        command = build_d8_command(args=args[1:])
+        _log(logger, 'INFO', "Use quit() or Ctrl-D (i.e. EOF) to exit the D8 Shell")
+    else:
+        if not _is_passed_through(args[1:], ['--help']):
+            return None
+        command = args
+        _log(logger, 'INFO', "Running bash command. Use --help to see other commands.")
+    exit_code = run_process(command).code
+    if exit_code != 0:
+        _log(logger, 'ERROR', f"Operation failed with code {exit_code}.")
+    return exit_code
+
+
+def _is_passed_through(arguments: List[str], options: Iterable[str]) -> bool:
+    # argparse takes the options of the command also when they are abbreviated, and `-h` also with more letters. With
+    # `--`, the parser decides which arguments are options.
+    for argument in arguments:
+        if argument == '--' or argument.startswith('-h'):
+            return False
+        name = argument.split('=', 1)[0]
+        if argument.startswith('--') and any(option.startswith(name) for option in options):
+            return False
+    return True
+
+
+def _is_info_logger(logger) -> bool:
+    # A logger object can only exist if `logging` is imported already, so the import costs nothing here.
+    import logging  # pylint: disable=import-outside-toplevel
+    return isinstance(logger, logging.Logger) and not logger.isEnabledFor(logging.DEBUG)
+
+
+def _log(logger: Optional['logging.Logger'], level: str, message: str) -> None:
+    # Without a logger, the message is written like the default logger of `Logger.get` writes it.
+    if logger is None:
+        print(f"[{level}] {message}", file=sys.stderr, flush=True)
+    elif level == 'ERROR':
+        logger.error(message)
+    else:
+        logger.info(message)
 
 
 # `if __name__ == '__main__':` is a common Python idiom that checks whether the current script is being
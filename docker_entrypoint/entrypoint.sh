@@ -1,3 +1,3 @@
 #!/bin/bash
 
-entrypoint $*
+exec entrypoint "$@"
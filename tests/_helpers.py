@@ -1,7 +1,12 @@
 import io
 import logging
+import os
+import stat
+import sys
 import unittest
+from contextlib import contextmanager
 from typing import Optional
+from unittest import mock
 
 from docker_entrypoint._libs.ResultDetails.FailResult import FailResult
 
@@ -23,3 +28,17 @@ def get_logger():
 
     logger.addHandler(stream_handler)
     return logger, logging_stream
+
+
+@contextmanager
+def fake_d8(directory: str, source: str):
+    """
+    Puts an executable called `d8` that runs the given python source in front of the PATH.
+    """
+
+    path = os.path.join(directory, 'd8')
+    with open(path, 'w') as f:
+        f.write(f"#!{sys.executable}\n{source}")
+    os.chmod(path, os.stat(path).st_mode | stat.S_IEXEC)
+    with mock.patch.dict(os.environ, {'PATH': directory + os.pathsep + os.environ.get('PATH', '')}):
+        yield path
@@ -1,10 +1,18 @@
+import io
+import json
 import logging
 import os
+import signal
 import tempfile
+import threading
+import time
 import unittest
+from contextlib import redirect_stderr, redirect_stdout
+from unittest import mock
 
-from docker_entrypoint.entrypoint import main
-from tests._helpers import get_logger
+from docker_entrypoint._libs.ExitCodes import ExitCode
+from docker_entrypoint.entrypoint import _run_fast_path, main
+from tests._helpers import fake_d8, get_logger
 
 
 class TestEntrypoint(unittest.TestCase):
@@ -66,10 +74,8 @@ class TestEntrypoint(unittest.TestCase):
             with open(file2, "w") as f:
                 f.write("")
 
-            try:
-                main(['run'])
-            except SystemExit as e:
-                assert e.code == 2  # program param is required
+            # The program is required without a manifest.
+            self.assertEqual(ExitCode.MISUSE_SHELL_BUILTINS, main(['run']))
 
             logger, logging_stream = get_logger()
             code = main('run invalid_program_path'.split(' '), logger)
@@ -79,15 +85,15 @@ class TestEntrypoint(unittest.TestCase):
             logger, logging_stream = get_logger()
             code = main(f'--debug run {program_file}'.split(' '), logger)
             self.assertIn("[WARNING] No file provided.\n"
-                          f"[DEBUG] command: bash -c 'd8 {program_file}'\n"
+                          f"[DEBUG] command: d8 {program_file}\n"
                           f"[DEBUG] Return Code: {code}\n"
                           f"[ERROR] Operation failed with code {code}.\n", logging_stream.getvalue())
 
             logger, logging_stream = get_logger()
             code = main(f'--debug run {program_file} -f invalid'.split(' '), logger)
             self.assertIn(
-                "[DEBUG] known params: Namespace(command='run', debug=True, directory=None, "
-                f"file=['invalid'], program='{program_file}', version=False)\n"
+                "[DEBUG] known params: Namespace(cache_dir=None, cache_size=1073741824, command='run', compare='exact', cpu_limit=None, debug=True, directory=None, exclude=None, expected=None, "
+                f"file=['invalid'], float_tolerance=1e-06, include=None, jobs=None, manifest=None, max_depth=1, max_output_bytes=None, memory_limit=None, module=False, no_cache=False, output_dir=None, program='{program_file}', refresh=False, reuse_process=False, stats=None, tee=False, timeout=None, version=False, watch=False)\n"
                 "Args: []\n"
                 f"[ERROR] Operation failed with code {code}.\n"
                 "Title: File or directory is not valid.\n"
@@ -96,48 +102,175 @@ class TestEntrypoint(unittest.TestCase):
             logger, logging_stream = get_logger()
             code = main(f'--debug run {program_file} -f {file1}'.split(' '), logger)
             self.assertIn(
-                f"[DEBUG] known params: Namespace(command='run', debug=True, directory=None, file=['{file1}'], program='{program_file}', version=False)\n"
+                f"[DEBUG] known params: Namespace(cache_dir=None, cache_size=1073741824, command='run', compare='exact', cpu_limit=None, debug=True, directory=None, exclude=None, expected=None, file=['{file1}'], float_tolerance=1e-06, include=None, jobs=None, manifest=None, max_depth=1, max_output_bytes=None, memory_limit=None, module=False, no_cache=False, output_dir=None, program='{program_file}', refresh=False, reuse_process=False, stats=None, tee=False, timeout=None, version=False, watch=False)\n"
                 "Args: []\n"
-                "[DEBUG] Number of input files: 1\n"
+                "[DEBUG] Number of parallel jobs: 1\n"
                 f"[INFO] file 1: {file1}\n"
-                f"[DEBUG] command: bash -c 'd8 {program_file}  < {file1}'\n"
+                f"[DEBUG] command: d8 {program_file} < {file1}\n"
                 f"[DEBUG] Return Code: {code}\n"
+                "[DEBUG] Number of input files: 1\n"
                 f"[ERROR] Operation failed with code {code}.", logging_stream.getvalue())
 
             logger, logging_stream = get_logger()
             code = main(f'--debug run {program_file} arg1 arg2 -f {file1}'.split(' '), logger)
             self.assertIn(
-                f"[DEBUG] known params: Namespace(command='run', debug=True, directory=None, file=['{file1}'], program='{program_file}', version=False)\n"
+                f"[DEBUG] known params: Namespace(cache_dir=None, cache_size=1073741824, command='run', compare='exact', cpu_limit=None, debug=True, directory=None, exclude=None, expected=None, file=['{file1}'], float_tolerance=1e-06, include=None, jobs=None, manifest=None, max_depth=1, max_output_bytes=None, memory_limit=None, module=False, no_cache=False, output_dir=None, program='{program_file}', refresh=False, reuse_process=False, stats=None, tee=False, timeout=None, version=False, watch=False)\n"
                 "Args: ['arg1', 'arg2']\n"
-                "[DEBUG] Number of input files: 1\n"
+                "[DEBUG] Number of parallel jobs: 1\n"
                 f"[INFO] file 1: {file1}\n"
-                f"[DEBUG] command: bash -c 'd8 {program_file} arg1 arg2 < {file1}'\n"
+                f"[DEBUG] command: d8 {program_file} arg1 arg2 < {file1}\n"
                 f"[DEBUG] Return Code: {code}\n"
+                "[DEBUG] Number of input files: 1\n"
                 f"[ERROR] Operation failed with code {code}.", logging_stream.getvalue())
 
             logger, logging_stream = get_logger()
             code = main(f'--debug run {program_file} -f {file1} -d invalid'.split(' '), logger)
             self.assertIn(
-                f"[DEBUG] known params: Namespace(command='run', debug=True, directory=['invalid'], file=['{file1}'], program='{program_file}', version=False)\n"
+                f"[DEBUG] known params: Namespace(cache_dir=None, cache_size=1073741824, command='run', compare='exact', cpu_limit=None, debug=True, directory=['invalid'], exclude=None, expected=None, file=['{file1}'], float_tolerance=1e-06, include=None, jobs=None, manifest=None, max_depth=1, max_output_bytes=None, memory_limit=None, module=False, no_cache=False, output_dir=None, program='{program_file}', refresh=False, reuse_process=False, stats=None, tee=False, timeout=None, version=False, watch=False)\n"
                 "Args: []\n"
                 f"[ERROR] Operation failed with code {code}.\n"
                 "Title: File or directory is not valid.\n"
                 "Message: The (invalid) is not valid.\n", logging_stream.getvalue())
 
             logger, logging_stream = get_logger()
-            code = main(f'--debug run {program_file} -f {file1} -d {dir1}'.split(' '), logger)
+            code = main(f'--debug run {program_file} -f {file1} -d {dir1} -j 2'.split(' '), logger)
             self.assertIn(
-                f"[DEBUG] known params: Namespace(command='run', debug=True, directory=['{dir1}'], file=['{file1}'], program='{program_file}', version=False)\n"
+                f"[DEBUG] known params: Namespace(cache_dir=None, cache_size=1073741824, command='run', compare='exact', cpu_limit=None, debug=True, directory=['{dir1}'], exclude=None, expected=None, file=['{file1}'], float_tolerance=1e-06, include=None, jobs=2, manifest=None, max_depth=1, max_output_bytes=None, memory_limit=None, module=False, no_cache=False, output_dir=None, program='{program_file}', refresh=False, reuse_process=False, stats=None, tee=False, timeout=None, version=False, watch=False)\n"
                 "Args: []\n"
-                "[DEBUG] Number of input files: 2\n"
-                f"[INFO] file 1: {file2}\n"
-                f"[DEBUG] command: bash -c 'd8 {program_file}  < {file2}'\n"
+                "[DEBUG] Number of parallel jobs: 2\n"
+                f"[INFO] file 1: {file1}\n"
+                f"[DEBUG] command: d8 {program_file} < {file1}\n"
                 f"[DEBUG] Return Code: {code}\n"
-                f"[INFO] file 2: {file1}\n"
-                f"[DEBUG] command: bash -c 'd8 {program_file}  < {file1}'\n"
+                f"[INFO] file 2: {file2}\n"
+                f"[DEBUG] command: d8 {program_file} < {file2}\n"
                 f"[DEBUG] Return Code: {code}\n"
+                "[DEBUG] Number of input files: 2\n"
                 f"[ERROR] Operation failed with code {code}.", logging_stream.getvalue())
 
+    def test_main_bench_command(self):
+        with tempfile.TemporaryDirectory() as tmp_dir_name:
+            program_file = os.path.join(tmp_dir_name, "program.js")
+            with open(program_file, "w") as f:
+                f.write("")
+
+            logger, logging_stream = get_logger()
+            with fake_d8(tmp_dir_name, "print('ok')\n"):
+                code = main(['bench', program_file, '-f', program_file, '-n', '2', '-w', '0', '--random-seed', '7',
+                             '--no-baseline'], logger)
+            self.assertEqual(0, code)
+            self.assertIn(f"[INFO] Benchmark of {program_file}: 2 runs after 0 warm-ups, 1 process(es) per run.\n",
+                          logging_stream.getvalue())
+
+    def test_main_profile_command(self):
+        with tempfile.TemporaryDirectory() as tmp_dir_name:
+            program_file = os.path.join(tmp_dir_name, "program.js")
+            with open(program_file, "w") as f:
+                f.write("")
+
+            logger, logging_stream = get_logger()
+            with fake_d8(tmp_dir_name, "print('ok')\n"):
+                code = main(['profile', program_file, '-f', program_file, '--top', '5'], logger)
+            self.assertEqual(0, code)
+            self.assertIn("[WARNING] No ticks were recorded.", logging_stream.getvalue())
+
+    def test_main_gc_report_command(self):
+        with tempfile.TemporaryDirectory() as tmp_dir_name:
+            program_file = os.path.join(tmp_dir_name, "program.js")
+            with open(program_file, "w") as f:
+                f.write("")
+
+            logger, logging_stream = get_logger()
+            with fake_d8(tmp_dir_name, "print('[1:0x1]  5 ms: Scavenge 2.0 (3.0) -> 1.0 (3.0) MB, 0.50 / 0.00 ms')\n"):
+                code = main(['gc-report', program_file, '-d', tmp_dir_name, '-o',
+                             os.path.join(tmp_dir_name, 'gc.txt')], logger)
+            self.assertEqual(0, code)
+            self.assertIn(f"[INFO] The table GC report of 2 collections is written to '{tmp_dir_name}/gc.txt'.",
+                          logging_stream.getvalue())
+
+    def test_main_opt_report_command(self):
+        with tempfile.TemporaryDirectory() as tmp_dir_name:
+            program_file = os.path.join(tmp_dir_name, "program.js")
+            with open(program_file, "w") as f:
+                f.write("")
+
+            logger, logging_stream = get_logger()
+            trace = "[completed optimizing 0x1 <JSFunction f (sfi = 0x2)> (target MAGLEV)]"
+            with fake_d8(tmp_dir_name, f"print('{trace}')\n"):
+                code = main(['opt-report', program_file, '--top', '5'], logger)
+            self.assertEqual(0, code)
+            self.assertIn("[INFO] Functions: 1 traced, 1 optimized, 0 in a deopt loop.", logging_stream.getvalue())
+
+    def test_main_code_report_command(self):
+        with tempfile.TemporaryDirectory() as tmp_dir_name:
+            program_file = os.path.join(tmp_dir_name, "program.js")
+            with open(program_file, "w") as f:
+                f.write("")
+
+            logger, logging_stream = get_logger()
+            with fake_d8(tmp_dir_name, "import sys\n"
+                                       "log = next(arg[10:] for arg in sys.argv if arg.startswith('--logfile='))\n"
+                                       "with open(log, 'w') as f:\n"
+                                       "    f.write('function,interpreter,1,0,10,0.25,1,f\\n')\n"):
+                code = main(['code-report', program_file, '--sort', 'compile'], logger)
+            self.assertEqual(0, code)
+            self.assertIn("[INFO] 1 functions, 1 compiled (0 lazily), 0 bytes of bytecode, 0.250 ms of compilation "
+                          "per run.", logging_stream.getvalue())
+
+    def test_main_run_manifest_command(self):
+        with tempfile.TemporaryDirectory() as tmp_dir_name:
+            manifest = os.path.join(tmp_dir_name, "jobs.jsonl")
+            with open(manifest, "w") as f:
+                f.write('{"id": "a", "program": "jobs.jsonl"}\n')
+
+            logger, logging_stream = get_logger()
+            with fake_d8(tmp_dir_name, ""), mock.patch('sys.stdout', new_callable=io.StringIO) as stdout:
+                code = main(['run', '--manifest', manifest], logger)
+            self.assertEqual(0, code)
+            self.assertEqual('a', json.loads(stdout.getvalue())['id'])
+
+            code = main(['run', manifest, '--manifest', manifest], logger)
+            self.assertEqual(ExitCode.MISUSE_SHELL_BUILTINS, code)
+            self.assertIn("The programs, inputs and arguments of a manifest are given by its lines.\n",
+                          logging_stream.getvalue())
+
+            code = main(['run', '-j', '2'], logger)
+            self.assertEqual(ExitCode.MISUSE_SHELL_BUILTINS, code)
+            self.assertIn("The program is required, unless a manifest is given.\n", logging_stream.getvalue())
+
+    def test_main_serve_command(self):
+        logger, logging_stream = get_logger()
+        self.assertEqual(ExitCode.MISUSE_SHELL_BUILTINS, main(['serve'], logger))
+        self.assertIn("Give a socket with --socket, or a port with --http.\n", logging_stream.getvalue())
+
+        self.assertEqual(ExitCode.MISUSE_SHELL_BUILTINS, main(['serve', '--http', '0', 'extra'], logger))
+        self.assertIn("Unknown arguments of the serve command: extra\n", logging_stream.getvalue())
+
+    def test_main_run_command_terminated(self):
+        with tempfile.TemporaryDirectory() as tmp_dir_name:
+            program_file = os.path.join(tmp_dir_name, "program.js")
+            with open(program_file, "w") as f:
+                f.write("")
+
+            logger, _ = get_logger()
+            start = time.monotonic()
+            # Like `docker stop`, the d8 process sends SIGTERM to the entrypoint.
+            with fake_d8(tmp_dir_name, "import os, signal, time\n"
+                                       "os.kill(os.getppid(), signal.SIGTERM)\n"
+                                       "time.sleep(30)\n"), \
+                    self.assertRaises(SystemExit) as context:
+                main(['run', program_file, '-f', program_file, '-j', '1'], logger)
+            self.assertEqual(143, context.exception.code)
+            self.assertLess(time.monotonic() - start, 10)
+            self.assertEqual(signal.SIG_DFL, signal.getsignal(signal.SIGTERM))
+
+    def test_main_from_a_thread(self):
+        results = []
+        thread = threading.Thread(target=lambda: results.append(main(['bash', '-c', 'exit 3'])))
+        thread.start()
+        thread.join()
+        self.assertEqual([3], results)
+        self.assertEqual(signal.SIG_DFL, signal.getsignal(signal.SIGTERM))
+
     def test_main_shell_command(self):
         logger, logging_stream = get_logger()
         logger.setLevel(logging.INFO)
@@ -153,7 +286,7 @@ class TestEntrypoint(unittest.TestCase):
             "harmony=False, log_gc=False, log_timer_events=False, print_bytecode=False, print_opt_code=False, "
             "prof=False, trace=False, trace_deopt=False, trace_ic=False, trace_opt=False, version=False)\n"
             "Args: []\n"
-            "[DEBUG] Command: bash -c 'sleep 0.5; rlwrap -m -pgreen d8 --harmony --allow-natives-syntax'\n"
+            "[DEBUG] Command: rlwrap -m -pgreen d8 --harmony --allow-natives-syntax\n"
             "[INFO] Default options: ['--harmony', '--allow-natives-syntax']\n"
             "[INFO] Use quit() or Ctrl-D (i.e. EOF) to exit the D8 Shell\n"
             f"[DEBUG] Return code: {code}\n"
@@ -162,7 +295,7 @@ class TestEntrypoint(unittest.TestCase):
         logger, logging_stream = get_logger()
         code = main('--debug shell -a arg1 arg2'.split(' '), logger)
         self.assertIn("Args: ['-a', 'arg1', 'arg2']\n"
-                      "[DEBUG] Command: bash -c 'sleep 0.5; rlwrap -m -pgreen d8 --harmony --allow-natives-syntax -a arg1 arg2'\n"
+                      "[DEBUG] Command: rlwrap -m -pgreen d8 --harmony --allow-natives-syntax -a arg1 arg2\n"
                       "[INFO] Default options: ['--harmony', '--allow-natives-syntax']\n"
                       "[INFO] Use quit() or Ctrl-D (i.e. EOF) to exit the D8 Shell\n"
                       f"[DEBUG] Return code: {code}\n"
@@ -187,6 +320,34 @@ class TestEntrypoint(unittest.TestCase):
                       f"[DEBUG] Return code: {code}\n"
                       f"[ERROR] Operation failed with code {code}.", logging_stream.getvalue())
 
+    def test_main_fast_path(self):
+        with tempfile.TemporaryDirectory() as tmp_dir_name, \
+                fake_d8(tmp_dir_name, "import sys\nsys.exit(len(sys.argv))\n"):
+            for args in (['d8'], ['d8', '-e', 'x', '--trace-gc'], ['d8', '--harm', 'x'], ['d8', '-h'],
+                         ['bash', '-c', 'true'], ['bash', '-c', 'exit 3'], ['bash', '--', '-c', 'exit 4'],
+                         ['--version']):
+                outputs = []
+                for fast_path in (True, False):
+                    logger, logging_stream = get_logger()
+                    logger.setLevel(logging.INFO)
+                    with mock.patch('docker_entrypoint.entrypoint._run_fast_path',
+                                    wraps=_run_fast_path if fast_path else lambda *_: None), \
+                            redirect_stdout(io.StringIO()):
+                        try:
+                            code = main(args, logger)
+                        except SystemExit as e:
+                            code = e.code
+                    outputs.append((code, logging_stream.getvalue()))
+                self.assertEqual(outputs[1], outputs[0], args)
+
+        stderr = io.StringIO()
+        with redirect_stderr(stderr):
+            self.assertEqual(0, main(['--version']))
+            self.assertEqual(3, main(['bash', '-c', 'exit 3']))
+        self.assertEqual("[INFO] Program Version: latest\n"
+                         "[INFO] Running bash command. Use --help to see other commands.\n"
+                         "[ERROR] Operation failed with code 3.\n", stderr.getvalue())
+
     def test_main_samples_command(self):
         code = main('samples'.split(' '))
         assert code == 0
@@ -0,0 +1,33 @@
+import unittest
+
+from docker_entrypoint._libs.BenchOptions import BenchOptions
+
+
+class TestBenchOptions(unittest.TestCase):
+    def test_default_options(self):
+        options = BenchOptions()
+        self.assertEqual((10, 2, True), (options.runs, options.warmup, options.subtract_baseline))
+        self.assertEqual([], options.d8_flags())
+        self.assertEqual({}, options.variants)
+
+    def test_d8_flags(self):
+        options = BenchOptions(random_seed=42, predictable=True)
+        self.assertEqual(['--random-seed=42', '--predictable'], options.d8_flags())
+
+    def test_invalid_options(self):
+        with self.assertRaises(ValueError) as context:
+            BenchOptions(runs=0)
+        self.assertEqual('The runs must be a positive integer.', str(context.exception))
+
+        with self.assertRaises(ValueError) as context:
+            BenchOptions(variants={' ': '--no-opt'})
+        self.assertEqual('The variants must be None or a dictionary of non-empty names to flags.',
+                         str(context.exception))
+
+        with self.assertRaises(ValueError) as context:
+            BenchOptions(cpu=-1)
+        self.assertEqual('The cpu must be None or a non-negative integer.', str(context.exception))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+
+from docker_entrypoint._libs.runner import get_available_cpus
+from docker_entrypoint._libs.RunOptions import RunOptions
+
+
+class TestRunOptions(unittest.TestCase):
+    def test_default_jobs(self):
+        self.assertEqual(get_available_cpus(), RunOptions().jobs)
+
+    def test_jobs(self):
+        self.assertEqual(4, RunOptions(jobs=4).jobs)
+
+    def test_invalid_jobs(self):
+        with self.assertRaises(ValueError) as context:
+            RunOptions(jobs=0)
+        self.assertEqual('The jobs must be None or a positive integer.', str(context.exception))
+
+    def test_output_dir(self):
+        options = RunOptions(output_dir='out', tee=True)
+        self.assertEqual(('out', True), (options.output_dir, options.tee))
+
+    def test_invalid_output_dir(self):
+        with self.assertRaises(ValueError) as context:
+            RunOptions(output_dir=' ')
+        self.assertEqual('The output_dir must be None or a non-empty string.', str(context.exception))
+
+    def test_judge_options(self):
+        options = RunOptions(expected_dir='answers', comparator='float', float_tolerance=0.01)
+        self.assertEqual(('answers', 'float', 0.01), (options.expected_dir, options.comparator, options.float_tolerance))
+
+    def test_invalid_stats(self):
+        self.assertEqual('json', RunOptions(stats='json').stats)
+        with self.assertRaises(ValueError) as context:
+            RunOptions(stats='csv')
+        self.assertEqual('The stats must be None or one of table, json.', str(context.exception))
+
+    def test_invalid_comparator(self):
+        with self.assertRaises(ValueError) as context:
+            RunOptions(comparator='fuzzy')
+        self.assertEqual('The comparator must be one of exact, whitespace, float.', str(context.exception))
+
+    def test_resource_limits(self):
+        limits = RunOptions(timeout=2.5, memory_limit=1024, cpu_limit=3, max_output_bytes=10).limits
+        self.assertEqual((2.5, 1024, 3, 10), (limits.timeout, limits.memory, limits.cpu_time, limits.max_output_bytes))
+        self.assertFalse(RunOptions().limits.has_limits())
+
+    def test_invalid_resource_limits(self):
+        with self.assertRaises(ValueError) as context:
+            RunOptions(timeout=0)
+        self.assertEqual('The timeout must be None or a positive number.', str(context.exception))
+        with self.assertRaises(ValueError) as context:
+            RunOptions(memory_limit=1.5)
+        self.assertEqual('The memory_limit must be None or a positive integer.', str(context.exception))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,136 @@
+import asyncio
+import os
+import stat
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from docker_entrypoint._libs.executor import LimitStatus
+from docker_entrypoint.api import run_program
+from tests._helpers import fake_d8
+
+# It prints the upper-case stdin and its arguments, and exits with 3.
+ECHO_D8 = """
+import sys
+sys.stdout.write(sys.stdin.read().upper())
+sys.stderr.write(' '.join(sys.argv[1:]))
+sys.exit(3)
+"""
+
+
+def _is_running(pid: int) -> bool:
+    # A killed process that is not reaped yet is a zombie.
+    try:
+        with open(f'/proc/{pid}/stat', encoding='utf-8') as file:
+            return file.read().rsplit(')', 1)[1].split()[0] != 'Z'
+    except FileNotFoundError:
+        return False
+
+
+class TestRunProgram(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_run_program(self):
+        with fake_d8(self.tmp_dir.name, ECHO_D8):
+            result = asyncio.run(run_program('a.js', stdin='abc', args=['x'], flags=['--jitless']))
+            self.assertEqual((3, b'ABC', b'--jitless a.js x', None),
+                             (result.code, result.stdout, result.stderr, result.limit))
+            self.assertGreater(result.usage.wall_time, 0)
+
+            result = asyncio.run(run_program('a.js', stdin=b'bytes'))
+            self.assertEqual((b'BYTES', b'a.js'), (result.stdout, result.stderr))
+            # Without stdin, the program reads an empty input.
+            result = asyncio.run(run_program('a.js'))
+            self.assertEqual((3, b''), (result.code, result.stdout))
+
+    def test_run_program_invalid_params(self):
+        with self.assertRaisesRegex(ValueError, 'The program must be a non-empty string.'):
+            run_program('')
+        with self.assertRaisesRegex(ValueError, 'The timeout must be None or a positive number.'):
+            run_program('a.js', timeout=0)
+        with self.assertRaisesRegex(ValueError, 'The semaphore must be None or an asyncio.Semaphore.'):
+            run_program('a.js', semaphore=2)
+
+    def test_run_program_not_spawned(self):
+        with mock.patch.dict(os.environ, {'PATH': self.tmp_dir.name}):
+            result = asyncio.run(run_program('a.js'))
+        self.assertEqual((127, b'', b'd8: command not found\n', None),
+                         (result.code, result.stdout, result.stderr, result.usage))
+
+        with fake_d8(self.tmp_dir.name, ''):
+            with open(os.path.join(self.tmp_dir.name, 'd8'), 'wb') as file:
+                file.write(b'\x00\x01\x02')
+            os.chmod(os.path.join(self.tmp_dir.name, 'd8'), stat.S_IRWXU)
+            result = asyncio.run(run_program('a.js'))
+        self.assertEqual((126, b'd8: Exec format error\n'), (result.code, result.stderr))
+
+    def test_run_program_limits(self):
+        source = "import sys, time\nsys.stdout.write('x' * 100000)\nsys.stdout.flush()\ntime.sleep(30)\n"
+        with fake_d8(self.tmp_dir.name, source):
+            start = time.monotonic()
+            result = asyncio.run(run_program('a.js', timeout=0.5))
+            self.assertEqual((137, LimitStatus.TIMEOUT, 100000), (result.code, result.limit, len(result.stdout)))
+
+            result = asyncio.run(run_program('a.js', max_output_bytes=10))
+            self.assertEqual((137, LimitStatus.OUTPUT_LIMIT, b'x' * 10), (result.code, result.limit, result.stdout))
+            self.assertLess(time.monotonic() - start, 10)
+
+    def test_run_program_does_not_read_the_input(self):
+        with fake_d8(self.tmp_dir.name, "print('done')"):
+            result = asyncio.run(run_program('a.js', stdin=b'x' * (4 * 1024 * 1024)))
+        self.assertEqual((0, b'done\n'), (result.code, result.stdout))
+
+    def test_run_program_semaphore(self):
+        # Each program counts the programs that run with it.
+        running = os.path.join(self.tmp_dir.name, 'running')
+        os.mkdir(running)
+        source = (f"import os, time\n"
+                  f"path = os.path.join({running!r}, str(os.getpid()))\n"
+                  f"open(path, 'w').close()\n"
+                  f"print(len(os.listdir({running!r})))\n"
+                  f"time.sleep(0.1)\n"
+                  f"os.remove(path)\n")
+
+        async def run_all():
+            semaphore = asyncio.Semaphore(2)
+            return await asyncio.gather(*(run_program('a.js', semaphore=semaphore) for _ in range(6)))
+
+        with fake_d8(self.tmp_dir.name, source):
+            results = asyncio.run(run_all())
+        self.assertEqual([0] * 6, [result.code for result in results])
+        self.assertLessEqual(max(int(result.stdout) for result in results), 2)
+
+    def test_run_program_cancelled(self):
+        pids = os.path.join(self.tmp_dir.name, 'pids')
+        source = (f"import os, subprocess\n"
+                  f"child = subprocess.Popen(['sleep', '30'])\n"
+                  f"with open({pids!r} + '.tmp', 'w') as f:\n"
+                  f"    f.write(f'{{os.getpid()}} {{child.pid}}')\n"
+                  f"os.rename({pids!r} + '.tmp', {pids!r})\n"
+                  f"child.wait()\n")
+
+        async def cancel():
+            task = asyncio.ensure_future(run_program('a.js'))
+            while not os.path.exists(pids):
+                await asyncio.sleep(0.01)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+        with fake_d8(self.tmp_dir.name, source):
+            asyncio.run(asyncio.wait_for(cancel(), 10))
+        with open(pids, encoding='utf-8') as file:
+            d8_pid, child_pid = map(int, file.read().split())
+        deadline = time.monotonic() + 5
+        while _is_running(child_pid) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual((False, False), (_is_running(d8_pid), _is_running(child_pid)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from docker_entrypoint._libs.bench import (BenchmarkError, BenchTarget,
+                                           collect_samples, format_comparison,
+                                           format_summary, measure_once,
+                                           noise_controls)
+from docker_entrypoint._libs.bench_stats import Summary
+from tests._helpers import get_logger
+
+
+class TestBench(unittest.TestCase):
+    def test_measure_once(self):
+        with tempfile.TemporaryDirectory() as tmp_dir_name:
+            file = os.path.join(tmp_dir_name, "input.txt")
+            with open(file, "w") as f:
+                f.write("input\n")
+
+            elapsed = measure_once(BenchTarget('cat', ['sh', '-c', 'cat; sleep 0.01'], [file, file]))
+            self.assertGreaterEqual(elapsed, 0.02)
+            self.assertGreater(measure_once(BenchTarget('true', ['true'])), 0)
+
+    def test_measure_once_fails(self):
+        with self.assertRaises(BenchmarkError) as context:
+            measure_once(BenchTarget('fail', ['sh', '-c', 'echo first >&2; echo reason >&2; exit 3']))
+        self.assertEqual(3, context.exception.code)
+        self.assertEqual("'sh -c 'echo first >&2; echo reason >&2; exit 3'' exited with code 3. reason",
+                         str(context.exception))
+
+        with self.assertRaises(BenchmarkError) as context:
+            measure_once(BenchTarget('fail', ['false'], ['/dev/null']))
+        self.assertEqual("'false < /dev/null' exited with code 1.", str(context.exception))
+
+    def test_collect_samples_interleaves_targets(self):
+        logger, logging_stream = get_logger()
+        targets = [BenchTarget('a', ['true']), BenchTarget('b', ['true'])]
+        samples = collect_samples(targets, runs=3, warmup=1, logger=logger)
+
+        self.assertEqual({'a': 3, 'b': 3}, {name: len(values) for name, values in samples.items()})
+        order = [line.split(' ')[1] + ' ' + line.split(' ')[2] for line in logging_stream.getvalue().splitlines()]
+        self.assertEqual(['a warm-up', 'b warm-up', 'b run', 'a run', 'a run', 'b run', 'b run', 'a run'], order)
+        self.assertEqual(1, len(collect_samples(targets[:1], runs=1, warmup=0)['a']))
+
+    def test_noise_controls_pin_cpu(self):
+        logger, _ = get_logger()
+        original = os.sched_getaffinity(0)
+        cpu = min(original)
+        with noise_controls(logger, cpu=cpu):
+            self.assertEqual({cpu}, os.sched_getaffinity(0))
+        self.assertEqual(original, os.sched_getaffinity(0))
+
+        with self.assertRaises(BenchmarkError) as context:
+            with noise_controls(logger, cpu=100000):
+                pass  # pragma: no cover
+        self.assertEqual("Can not pin to CPU 100000: Invalid argument.", str(context.exception))
+        self.assertEqual(original, os.sched_getaffinity(0))
+
+    def test_noise_controls_disable_aslr(self):
+        logger, logging_stream = get_logger()
+        with mock.patch('docker_entrypoint._libs.bench._personality', side_effect=[0, 0x0040000, 0]) as personality:
+            with noise_controls(logger, disable_aslr=True):
+                pass
+        self.assertEqual([mock.call(0xffffffff), mock.call(0x0040000), mock.call(0)], personality.call_args_list)
+        self.assertIn("[DEBUG] ASLR is disabled.\n", logging_stream.getvalue())
+
+        with mock.patch('docker_entrypoint._libs.bench._personality', side_effect=[0, -1]) as personality:
+            with noise_controls(logger, disable_aslr=True):
+                pass
+        self.assertEqual(2, personality.call_count)
+        self.assertIn("[WARNING] Can not disable ASLR: ", logging_stream.getvalue())
+
+    def test_noise_controls_real_personality(self):
+        logger, _ = get_logger()
+        with noise_controls(logger, disable_aslr=True):
+            # Whether the personality can be changed depends on the seccomp profile, but the run goes on either way.
+            self.assertGreater(measure_once(BenchTarget('true', ['true'])), 0)
+
+    def test_format_summary(self):
+        summary = Summary(count=9, outliers=1, median=0.0123, mean=0.0125, stddev=0.0004, p95=0.0131,
+                          ci_low=0.0121, ci_high=0.0126)
+        self.assertEqual("median: 12.300 ms (95% CI 12.100 ms - 12.600 ms)\n"
+                         "mean: 12.500 ms ± 0.400 ms (stddev)\n"
+                         "p95: 13.100 ms\n"
+                         "samples: 9 (1 outliers rejected)", format_summary(summary))
+
+    def test_format_comparison(self):
+        fast, slow = [0.010, 0.011, 0.009, 0.010, 0.012], [0.020, 0.021, 0.019, 0.022, 0.020]
+        self.assertEqual("B vs A: 2.000x faster (median 10.000 ms vs 20.000 ms), Mann-Whitney U = 0, p = 0.0117 "
+                         "(significant at 0.05)", format_comparison('B', fast, 'A', slow))
+        self.assertEqual("A vs B: 2.000x slower (median 20.000 ms vs 10.000 ms), Mann-Whitney U = 25, p = 0.0117 "
+                         "(significant at 0.05)", format_comparison('A', slow, 'B', fast))
+        self.assertEqual("A vs B: speedup unknown (median 0.000 ms vs 0.000 ms), Mann-Whitney U = 0.5, p = 1.0000 "
+                         "(not significant at 0.05)", format_comparison('A', [0.0], 'B', [0.0]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import unittest
+
+from docker_entrypoint._libs.bench_stats import (bootstrap_ci, mann_whitney_u,
+                                                 percentile, reject_outliers,
+                                                 summarize)
+
+
+class TestBenchStats(unittest.TestCase):
+    def test_percentile(self):
+        values = [1.0, 2.0, 3.0, 4.0, 5.0]
+        self.assertEqual(1.0, percentile(values, 0))
+        self.assertEqual(3.0, percentile(values, 0.5))
+        self.assertAlmostEqual(4.8, percentile(values, 0.95))
+        self.assertEqual(5.0, percentile(values, 1))
+        self.assertEqual(7.0, percentile([7.0], 0.95))
+
+    def test_reject_outliers(self):
+        kept, outliers = reject_outliers([10.0, 11.0, 10.5, 30.0, 10.2, 9.8, 1.0])
+        self.assertEqual([10.0, 11.0, 10.5, 10.2, 9.8], kept)
+        self.assertEqual([30.0, 1.0], outliers)
+
+        self.assertEqual(([1.0, 100.0, 2.0], []), reject_outliers([1.0, 100.0, 2.0]))
+
+    def test_bootstrap_ci(self):
+        samples = [10.0, 11.0, 10.5, 10.2, 9.8, 10.1, 10.4]
+        low, high = bootstrap_ci(samples)
+        self.assertLessEqual(low, 10.2)
+        self.assertGreaterEqual(high, 10.2)
+        self.assertGreaterEqual(low, 9.8)
+        self.assertLessEqual(high, 11.0)
+        # The interval is reproducible.
+        self.assertEqual((low, high), bootstrap_ci(samples))
+
+    def test_summarize(self):
+        summary = summarize([10.0, 11.0, 10.5, 30.0, 10.2, 9.8])
+        self.assertEqual((5, 1), (summary.count, summary.outliers))
+        self.assertEqual(10.2, summary.median)
+        self.assertAlmostEqual(10.3, summary.mean)
+        self.assertAlmostEqual(0.469041576, summary.stddev)
+        self.assertAlmostEqual(10.9, summary.p95)
+        self.assertLessEqual(summary.ci_low, summary.median)
+        self.assertGreaterEqual(summary.ci_high, summary.median)
+
+        summary = summarize([5.0])
+        self.assertEqual((1, 5.0, 0.0, 5.0, 5.0), (summary.count, summary.median, summary.stddev, summary.ci_low,
+                                                   summary.ci_high))
+
+    def test_mann_whitney_u(self):
+        u_statistic, p_value = mann_whitney_u([1.0, 2.0, 3.0], [4.0, 5.0, 6.0])
+        self.assertEqual(0, u_statistic)
+        self.assertAlmostEqual(0.0808556, p_value, places=6)
+
+        u_statistic, p_value = mann_whitney_u([1.0, 2.0, 2.0, 3.0], [2.0, 3.0, 4.0, 5.0])
+        self.assertEqual(2.5, u_statistic)
+        self.assertAlmostEqual(0.1366582, p_value, places=6)
+
+        self.assertEqual((2.0, 1.0), mann_whitney_u([1.0, 1.0], [1.0, 1.0]))
+
+
+if __name__ == '__main__':
+    unittest.main()
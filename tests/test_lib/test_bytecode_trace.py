@@ -0,0 +1,175 @@
+import json
+import os
+import tempfile
+import unittest
+
+from docker_entrypoint._libs.bytecode_trace import (CodeTrace, diff_functions,
+                                                    format_code_diff,
+                                                    format_code_json,
+                                                    format_code_report,
+                                                    load_code_report)
+
+LOG = """script,create,3,100
+script-details,3,/app/a.js,0,0,
+function,preparse-resolution,3,12,36,0.014,1,add
+function,parse,3,48,60,0.002,2,arrow function
+function,preparse-resolution,3,77,93,0.001,3,unused
+function,full-parse,3,108,124,0.001,4,iife
+function,full-parse,3,0,176,0.037,5,
+function,parse-eval,3,-1,-1,0.047,6,
+function,interpreter-eval,3,0,176,0.057,7,
+function,interpreter,3,0,176,0.321,8,
+function,interpreter,3,108,124,0.035,9,iife
+function,first-execution,3,0,176,0,10,
+function,full-parse,3,12,36,0.002,11,add
+function,parse-function,3,12,36,0.006,12,add
+function,interpreter,3,12,36,0.046,13,add
+function,parse-function,3,48,60,0.005,14,sq
+function,interpreter,3,48,60,0.052,15,sq
+function,baseline,3,12,36,0.01,16,add
+function,full-parse,4,5,9,0.001,17,
+function,full-parse,4,20,30,0.001,18,
+function,interpreter,3,,,,,
+function,interpreter,3,140
+"""
+
+BYTECODE = """Bytecode length: 1
+[generated bytecode for function:  (0x1 <SharedFunctionInfo>)]
+Bytecode length: 5
+Register count 0
+Constant pool (size = 1)
+[generated bytecode for function:  (0x2 <SharedFunctionInfo>)]
+Bytecode length: 62
+Parameter count 1
+Register count 6
+Frame size 48
+Bytecode age: 0
+    0 E> 0x3 @    0 : 80 00 00 00       CreateClosure [0], [0], #0
+Constant pool (size = 6)
+Handler Table (size = 0)
+Source Position Table (size = 9)
+[generated bytecode for function: iife (0x4 <SharedFunctionInfo iife>)]
+Bytecode length: 3
+Register count 0
+Constant pool (size = 0)
+output of the program
+[generated bytecode for function: add (0x5 <SharedFunctionInfo add>)]
+Bytecode length: 6
+Register count 0
+Constant pool (size = 0)
+Register count 9
+[generated bytecode for function: other (0x6 <SharedFunctionInfo other>)]
+Bytecode length: 4
+[generated bytecode for function: extra (0x7 <SharedFunctionInfo extra>)]
+Bytecode length: 8
+"""
+
+
+class TestCodeTrace(unittest.TestCase):
+    def setUp(self):
+        self.trace = CodeTrace()
+        self.trace.add_run_lines(BYTECODE.splitlines(keepends=True), LOG.splitlines(keepends=True))
+
+    def _function(self, key: str) -> tuple:
+        function = self.trace.functions[key].to_dict(self.trace.runs)
+        return (function['bytecode_length'], function['register_count'], function['constant_pool_size'],
+                function['compilation'], round(function['parse_ms'], 3), round(function['compile_ms'], 3))
+
+    def test_functions(self):
+        self.assertEqual(['(top-level) /app/a.js', '(top-level) /app/a.js #2', 'add /app/a.js', 'sq /app/a.js',
+                          'unused /app/a.js', 'iife /app/a.js', '(anonymous) <script 4>',
+                          '(anonymous) <script 4> #2'], list(self.trace.functions))
+        # The eval of the script comes before its function.
+        self.assertEqual((5, 0, 1, 'eager', 0.0, 0.057), self._function('(top-level) /app/a.js'))
+        self.assertEqual((62, 6, 6, 'eager', 0.037, 0.321), self._function('(top-level) /app/a.js #2'))
+        self.assertEqual((3, 0, 0, 'eager', 0.001, 0.035), self._function('iife /app/a.js'))
+        # The output of the program after the bytecode does not change it, and the baseline code is compiled too.
+        self.assertEqual((6, 0, 0, 'lazy', 0.016, 0.056), self._function('add /app/a.js'))
+        # The bytecode that is printed for another function is not matched.
+        self.assertEqual((None, None, None, 'lazy', 0.002, 0.052), self._function('sq /app/a.js'))
+        self.assertEqual((None, None, None, None, 0.001, 0.0), self._function('unused /app/a.js'))
+        self.assertEqual(2, self.trace.unmatched)
+
+    def test_add_run(self):
+        with tempfile.TemporaryDirectory() as tmp_dir_name:
+            bytecode_path, log_path = os.path.join(tmp_dir_name, 'stdout'), os.path.join(tmp_dir_name, 'v8.log')
+            with open(bytecode_path, 'w', encoding='utf-8') as file:
+                file.write(BYTECODE)
+            with open(log_path, 'w', encoding='utf-8') as file:
+                file.write(LOG)
+            self.trace.add_run(bytecode_path, log_path)
+
+        # The times are per run.
+        self.assertEqual(2, self.trace.runs)
+        self.assertEqual(8, len(self.trace.functions))
+        self.assertEqual((6, 0, 0, 'lazy', 0.016, 0.056), self._function('add /app/a.js'))
+        self.assertEqual(4, self.trace.unmatched)
+
+    def test_sorted_functions(self):
+        self.assertEqual(['(top-level) /app/a.js #2', 'add /app/a.js', '(top-level) /app/a.js', 'iife /app/a.js'],
+                         [function['key'] for function in self.trace.sorted_functions('bytecode')[:4]])
+        self.assertEqual(['(top-level) /app/a.js #2', '(top-level) /app/a.js', 'add /app/a.js', 'sq /app/a.js'],
+                         [function['key'] for function in self.trace.sorted_functions('compile')[:4]])
+        self.assertEqual(['(anonymous) <script 4>', '(anonymous) <script 4> #2', '(top-level) /app/a.js'],
+                         [function['key'] for function in self.trace.sorted_functions('name')[:3]])
+
+    def test_format_code_report(self):
+        lines = format_code_report(self.trace, 'bytecode', 3).splitlines()
+        self.assertEqual([
+            '8 functions, 5 compiled (2 lazily), 76 bytes of bytecode, 0.521 ms of compilation per run.',
+            '',
+            'Bytecode  Registers  Constants  Compile  Parse ms  Compile ms  Function',
+            '      62          6          6    eager     0.037       0.321  (top-level) /app/a.js #2',
+            '       6          0          0     lazy     0.016       0.056  add /app/a.js',
+            '       5          0          1    eager     0.000       0.057  (top-level) /app/a.js',
+        ], lines)
+
+    def test_diff(self):
+        with tempfile.TemporaryDirectory() as tmp_dir_name:
+            path = os.path.join(tmp_dir_name, 'code.json')
+            with open(path, 'w', encoding='utf-8') as file:
+                file.write(format_code_json(self.trace))
+            previous = load_code_report(path)
+
+        self.assertEqual([], diff_functions(previous, self.trace))
+        previous['add /app/a.js'].update(bytecode_length=2, compilation='eager')
+        gone = previous['gone /app/a.js'] = dict(previous['iife /app/a.js'], key='gone /app/a.js', bytecode_length=40)
+        del previous['iife /app/a.js']
+
+        changes = diff_functions(previous, self.trace)
+        self.assertEqual(['gone /app/a.js', 'add /app/a.js', 'iife /app/a.js'], [change['key'] for change in changes])
+        self.assertEqual((gone, None), (changes[0]['before'], changes[0]['after']))
+        self.assertEqual(['add /app/a.js', 'gone /app/a.js', 'iife /app/a.js'],
+                         [change['key'] for change in diff_functions(previous, self.trace, 'name')])
+
+        lines = format_code_diff(previous, self.trace, 'bytecode', 2).splitlines()
+        self.assertEqual([
+            'Before: 8 functions, 5 compiled (1 lazily), 109 bytes of bytecode, 0.521 ms of compilation per run.',
+            'After:  8 functions, 5 compiled (2 lazily), 76 bytes of bytecode, 0.521 ms of compilation per run.',
+            'Changed functions: 3, 1 new, 1 removed.',
+            '',
+            'Bytecode  Registers  Constants        Compile  Parse ms  Compile ms  Function',
+            '      40          0          0          eager     0.001       0.035  gone /app/a.js (removed)',
+            '  2 -> 6          0          0  eager -> lazy     0.016       0.056  add /app/a.js',
+        ], lines)
+
+        report = json.loads(format_code_json(self.trace, previous))
+        self.assertEqual((1, 8), (report['runs'], len(report['functions'])))
+        self.assertEqual(['gone /app/a.js', 'add /app/a.js', 'iife /app/a.js'],
+                         [change['key'] for change in report['diff']])
+
+    def test_load_code_report_errors(self):
+        with tempfile.TemporaryDirectory() as tmp_dir_name:
+            path = os.path.join(tmp_dir_name, 'code.json')
+            with open(path, 'w', encoding='utf-8') as file:
+                file.write('{"runs": 1}')
+            with self.assertRaisesRegex(ValueError, 'is not a JSON code report'):
+                load_code_report(path)
+            with open(path, 'w', encoding='utf-8') as file:
+                file.write('not json')
+            with self.assertRaises(ValueError):
+                load_code_report(path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,9 @@
 import argparse
+import io
 import unittest
+from contextlib import redirect_stderr
 
-from docker_entrypoint._libs.cli_parser import create_cli_parser
+from docker_entrypoint._libs.cli_parser import create_cli_parser, find_command
 
 
 class TestCliParser(unittest.TestCase):
@@ -12,6 +14,152 @@ class TestCliParser(unittest.TestCase):
         assert isinstance(result.value, argparse.ArgumentParser)
         self.assertIsNone(result.detail)
 
+    def test_only_the_used_command_gets_its_arguments(self):
+        self.assertIs(create_cli_parser('run').value, create_cli_parser('run').value)
+
+        known_params, args = create_cli_parser().value.parse_known_args(['run', 'program.js', '-j', '3'])
+        self.assertEqual(('run', ['program.js', '-j', '3']), (known_params.command, args))
+        known_params, args = create_cli_parser('run').value.parse_known_args(['run', 'program.js', '-j', '3'])
+        self.assertEqual(('program.js', 3, []), (known_params.program, known_params.jobs, args))
+
+    def test_find_command(self):
+        self.assertEqual('run', find_command(['--debug', 'run', 'program.js']))
+        self.assertEqual('d8', find_command(['d8', '--harmony']))
+        self.assertIsNone(find_command(['--version']))
+
+    def test_run_jobs_must_be_positive(self):
+        parser = create_cli_parser('run').value
+
+        known_params, _ = parser.parse_known_args(['run', 'program.js', '-j', '3'])
+        self.assertEqual(3, known_params.jobs)
+
+        for value in ['0', '-2', 'many']:
+            with self.assertRaises(SystemExit), redirect_stderr(io.StringIO()):
+                parser.parse_known_args(['run', 'program.js', '--jobs', value])
+
+    def test_run_limits(self):
+        parser = create_cli_parser('run').value
+
+        known_params, _ = parser.parse_known_args(['run', 'program.js', '--timeout', '1.5', '--memory-limit', '512M',
+                                                   '--cpu-limit', '2', '--max-output-bytes', '64k'])
+        self.assertEqual((1.5, 512 * 1024 ** 2, 2, 64 * 1024), (known_params.timeout, known_params.memory_limit,
+                                                                known_params.cpu_limit, known_params.max_output_bytes))
+        known_params, _ = parser.parse_known_args(['run', 'program.js', '--memory-limit', '1.5G',
+                                                   '--max-output-bytes', '100'])
+        self.assertEqual((int(1.5 * 1024 ** 3), 100), (known_params.memory_limit, known_params.max_output_bytes))
+
+        for option, value in [('--timeout', '0'), ('--timeout', 'inf'), ('--timeout', 'x'),
+                              ('--memory-limit', '0'), ('--memory-limit', '12X'), ('--memory-limit', 'infG'),
+                              ('--max-output-bytes', '')]:
+            with self.assertRaises(SystemExit), redirect_stderr(io.StringIO()):
+                parser.parse_known_args(['run', 'program.js', option, value])
+
+    def test_run_input_discovery(self):
+        parser = create_cli_parser('run').value
+
+        known_params, _ = parser.parse_known_args(['run', 'program.js', '-d', 'inputs', '--include', '*.txt',
+                                                   '--include', '*.in', '--exclude', 'tmp', '--max-depth', '3'])
+        self.assertEqual((['*.txt', '*.in'], ['tmp'], 3), (known_params.include, known_params.exclude,
+                                                          known_params.max_depth))
+        with self.assertRaises(SystemExit), redirect_stderr(io.StringIO()):
+            parser.parse_known_args(['run', 'program.js', '--max-depth', '0'])
+
+    def test_bench_options(self):
+        parser = create_cli_parser('bench').value
+
+        known_params, args = parser.parse_known_args(['bench', 'program.js', '-n', '5', '-w', '0', '--cpu', '1',
+                                                      '--predictable', 'arg'])
+        self.assertEqual((5, 0, 1, True, False), (known_params.runs, known_params.warmup, known_params.cpu,
+                                                  known_params.predictable, known_params.no_baseline))
+        self.assertEqual(['arg'], args)
+
+        for value in ['-1', 'none']:
+            with self.assertRaises(SystemExit), redirect_stderr(io.StringIO()):
+                parser.parse_known_args(['bench', 'program.js', '--warmup', value])
+
+    def test_bench_variants(self):
+        parser = create_cli_parser('bench').value
+
+        known_params, _ = parser.parse_known_args(['bench', 'program.js', '--variant', 'A=', '--variant',
+                                                   ' B =--no-opt --max-lazy'])
+        self.assertEqual([('A', ''), ('B', '--no-opt --max-lazy')], known_params.variant)
+
+        for value in ['no-separator', '=--flag']:
+            with self.assertRaises(SystemExit), redirect_stderr(io.StringIO()):
+                parser.parse_known_args(['bench', 'program.js', '--variant', value])
+
+    def test_profile_options(self):
+        parser = create_cli_parser('profile').value
+
+        known_params, args = parser.parse_known_args(['profile', 'program.js', '-d', 'inputs', '--top', '5',
+                                                      '--report', 'folded', '-o', 'out.txt', 'arg'])
+        self.assertEqual((['inputs'], 5, 'folded', 'out.txt'), (known_params.directory, known_params.top,
+                                                               known_params.report, known_params.output))
+        self.assertEqual(['arg'], args)
+        known_params, _ = parser.parse_known_args(['profile', 'program.js'])
+        self.assertEqual((20, 'table', None), (known_params.top, known_params.report, known_params.output))
+
+        for option, value in [('--top', '0'), ('--report', 'html')]:
+            with self.assertRaises(SystemExit), redirect_stderr(io.StringIO()):
+                parser.parse_known_args(['profile', 'program.js', option, value])
+
+    def test_gc_report_options(self):
+        parser = create_cli_parser('gc-report').value
+
+        known_params, args = parser.parse_known_args(['gc-report', 'program.js', '-f', 'input', '-j', '2',
+                                                      '--report', 'json', 'arg'])
+        self.assertEqual((['input'], 2, 'json', None), (known_params.file, known_params.jobs, known_params.report,
+                                                        known_params.output))
+        self.assertEqual(['arg'], args)
+
+        with self.assertRaises(SystemExit), redirect_stderr(io.StringIO()):
+            parser.parse_known_args(['gc-report', 'program.js', '--report', 'html'])
+
+    def test_opt_report_options(self):
+        parser = create_cli_parser('opt-report').value
+
+        known_params, args = parser.parse_known_args(['opt-report', 'program.js', '-d', 'inputs', '--top', '3',
+                                                      '-o', 'report.txt', 'arg'])
+        self.assertEqual((['inputs'], 3, 'table', 'report.txt'), (known_params.directory, known_params.top,
+                                                                 known_params.report, known_params.output))
+        self.assertEqual(['arg'], args)
+
+        with self.assertRaises(SystemExit), redirect_stderr(io.StringIO()):
+            parser.parse_known_args(['opt-report', 'program.js', '--top', '0'])
+
+    def test_code_report_options(self):
+        parser = create_cli_parser('code-report').value
+
+        known_params, args = parser.parse_known_args(['code-report', 'program.js', '--sort', 'compile', '--diff',
+                                                      'code.json', '--report', 'json', 'arg'])
+        self.assertEqual(('compile', 'code.json', 'json', 20), (known_params.sort, known_params.diff,
+                                                                known_params.report, known_params.top))
+        self.assertEqual(['arg'], args)
+
+        with self.assertRaises(SystemExit), redirect_stderr(io.StringIO()):
+            parser.parse_known_args(['code-report', 'program.js', '--sort', 'size'])
+
+    def test_run_manifest(self):
+        parser = create_cli_parser('run').value
+
+        known_params, args = parser.parse_known_args(['run', '--manifest', 'jobs.jsonl', '-j', '4'])
+        self.assertEqual((None, 'jobs.jsonl', 4), (known_params.program, known_params.manifest, known_params.jobs))
+        self.assertEqual([], args)
+
+    def test_serve_options(self):
+        parser = create_cli_parser('serve').value
+
+        known_params, args = parser.parse_known_args(['serve', '--socket', '/run/d8.sock', '--http', '8080',
+                                                      '--queue-size', '0', '--preload', 'a.js', '--memory-limit',
+                                                      '64M'])
+        self.assertEqual(('/run/d8.sock', 8080, 0, ['a.js'], 64 * 1024 ** 2, None),
+                         (known_params.socket, known_params.http_port, known_params.queue_size, known_params.preload,
+                          known_params.memory_limit, known_params.timeout))
+        self.assertEqual([], args)
+
+        with self.assertRaises(SystemExit), redirect_stderr(io.StringIO()):
+            parser.parse_known_args(['serve', '--http', '65536'])
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -1,18 +1,26 @@
+import gzip
+import io
+import json
 import logging
 import os
+import sys
 import tempfile
 import unittest
+from unittest import mock
 
 from on_rails import (ValidationError, assert_error_detail, assert_result,
                       assert_result_with_type)
 
+from docker_entrypoint._libs.BenchOptions import BenchOptions
 from docker_entrypoint._libs.commands import (command_about, command_bash,
-                                              command_d8, command_run,
-                                              command_samples, command_shell)
+                                              command_bench, command_d8,
+                                              command_run, command_samples,
+                                              command_shell)
 from docker_entrypoint._libs.DockerEnvironments import DockerEnvironments
 from docker_entrypoint._libs.ExitCodes import ExitCode
 from docker_entrypoint._libs.ResultDetails.FailResult import FailResult
-from tests._helpers import assert_fail_result_detail, get_logger
+from docker_entrypoint._libs.RunOptions import RunOptions
+from tests._helpers import assert_fail_result_detail, fake_d8, get_logger
 
 
 class TestCommands(unittest.TestCase):
@@ -99,7 +107,7 @@ class TestCommands(unittest.TestCase):
             result = command_run(logger, file)
 
             expected_log = f"[WARNING] No file provided.\n" \
-                           f"[DEBUG] command: bash -c 'd8 {file}'\n" \
+                           f"[DEBUG] command: d8 {file}\n" \
                            f"[DEBUG] Return Code: {result.code()}\n"
             self.assertEqual(expected_log, logging_stream.getvalue())
 
@@ -114,15 +122,16 @@ class TestCommands(unittest.TestCase):
 
             logger, logging_stream = get_logger()
 
-            result = command_run(logger, file1, [file1, file1, file2])
+            result = command_run(logger, file1, [file1, file1, file2], options=RunOptions(jobs=1))
 
-            expected_log = "[DEBUG] Number of input files: 2\n" \
+            expected_log = "[DEBUG] Number of parallel jobs: 1\n" \
                            f"[INFO] file 1: {file1}\n" \
-                           f"[DEBUG] command: bash -c 'd8 {file1}  < {file1}'\n" \
+                           f"[DEBUG] command: d8 {file1} < {file1}\n" \
                            f"[DEBUG] Return Code: {result.code()}\n" \
                            f"[INFO] file 2: {file2}\n" \
-                           f"[DEBUG] command: bash -c 'd8 {file1}  < {file2}'\n" \
-                           f"[DEBUG] Return Code: {result.code()}\n"
+                           f"[DEBUG] command: d8 {file1} < {file2}\n" \
+                           f"[DEBUG] Return Code: {result.code()}\n" \
+                           "[DEBUG] Number of input files: 2\n"
             self.assertEqual(expected_log, logging_stream.getvalue())
 
     def test_command_run_give_files_and_args(self):
@@ -135,12 +144,560 @@ class TestCommands(unittest.TestCase):
 
             result = command_run(logger, file, [file], ['arg1', 'arg2'])
 
-            expected_log = "[DEBUG] Number of input files: 1\n" \
+            expected_log = "[DEBUG] Number of parallel jobs: 1\n" \
                            f"[INFO] file 1: {file}\n" \
-                           f"[DEBUG] command: bash -c 'd8 {file} arg1 arg2 < {file}'\n" \
-                           f"[DEBUG] Return Code: {result.code()}\n"
+                           f"[DEBUG] command: d8 {file} arg1 arg2 < {file}\n" \
+                           f"[DEBUG] Return Code: {result.code()}\n" \
+                           "[DEBUG] Number of input files: 1\n"
+            self.assertEqual(expected_log, logging_stream.getvalue())
+
+    def test_command_run_give_invalid_options(self):
+        with tempfile.TemporaryDirectory() as tmp_dir_name:
+            file = os.path.join(tmp_dir_name, "program.js")
+            with open(file, "w") as f:
+                f.write("")
+
+            result = command_run(logging.getLogger(), file, None, None, "not options")
+            assert_result_with_type(self, result, expected_success=False, expected_detail_type=ValidationError)
+            assert_error_detail(self, result.detail, expected_title="One or more validation errors occurred",
+                                expected_message="options must be an instance of `RunOptions` or None",
+                                expected_code=400)
+
+    def test_command_run_parallel(self):
+        with tempfile.TemporaryDirectory() as tmp_dir_name:
+            file1 = os.path.join(tmp_dir_name, "program.js")
+            with open(file1, "w") as f:
+                f.write("")
+            file2 = os.path.join(tmp_dir_name, "program2.js")
+            with open(file2, "w") as f:
+                f.write("")
+
+            logger, logging_stream = get_logger()
+
+            result = command_run(logger, file1, [file2, file1], options=RunOptions(jobs=2))
+
+            # The given files keep their order.
+            expected_log = "[DEBUG] Number of parallel jobs: 2\n" \
+                           f"[INFO] file 1: {file2}\n" \
+                           f"[DEBUG] command: d8 {file1} < {file2}\n" \
+                           f"[DEBUG] Return Code: {result.code()}\n" \
+                           f"[INFO] file 2: {file1}\n" \
+                           f"[DEBUG] command: d8 {file1} < {file1}\n" \
+                           f"[DEBUG] Return Code: {result.code()}\n" \
+                           "[DEBUG] Number of input files: 2\n"
             self.assertEqual(expected_log, logging_stream.getvalue())
 
+    def test_command_run_reuse_process(self):
+        with tempfile.TemporaryDirectory() as tmp_dir_name:
+            program = os.path.join(tmp_dir_name, "program.js")
+            with open(program, "w") as f:
+                f.write("print(readline());")
+            input_file = os.path.join(tmp_dir_name, "input.txt")
+            with open(input_file, "w") as f:
+                f.write("hello")
+
+            logger, logging_stream = get_logger()
+            with fake_d8(tmp_dir_name, "import json, sys\n"
+                                       "for line in sys.stdin:\n"
+                                       "    print(json.dumps({'status': 0, 'stdout': 'out', 'stderr': ''}))\n"):
+                result = command_run(logger, program, [input_file], options=RunOptions(jobs=1, reuse_process=True))
+
+            assert_result(self, result, expected_success=True)
+            self.assertNotIn("[WARNING]", logging_stream.getvalue())
+
+    def test_command_run_reuse_process_falls_back(self):
+        with tempfile.TemporaryDirectory() as tmp_dir_name:
+            program = os.path.join(tmp_dir_name, "program.js")
+            with open(program, "w") as f:
+                f.write("print(readline());\nquit(1);")
+
+            logger, logging_stream = get_logger()
+            result = command_run(logger, program, [program, tmp_dir_name], options=RunOptions(reuse_process=True))
+
+            assert_result_with_type(self, result, expected_success=False, expected_detail_type=FailResult)
+            self.assertIn("[WARNING] The program uses 'quit', which touches the global state of the d8 process. "
+                          "Each input is executed in its own process.\n", logging_stream.getvalue())
+
+    def test_command_run_limits(self):
+        with tempfile.TemporaryDirectory() as tmp_dir_name:
+            program = os.path.join(tmp_dir_name, "program.js")
+            with open(program, "w") as f:
+                f.write("")
+            answers = os.path.join(tmp_dir_name, "answers")
+            os.makedirs(answers)
+            inputs = []
+            for name, content in (("1", "fast"), ("2", "slow"), ("3", "loud")):
+                inputs.append(os.path.join(tmp_dir_name, f"{name}.txt"))
+                with open(inputs[-1], "w") as f:
+                    f.write(content)
+            with open(os.path.join(answers, "2.ans"), "w") as f:
+                f.write("slow\n")
+
+            logger, logging_stream = get_logger()
+            stdout = io.TextIOWrapper(io.BytesIO())
+            # Python ignores SIGXFSZ, unlike d8.
+            with fake_d8(tmp_dir_name, "import signal, sys, time\n"
+                                       "signal.signal(signal.SIGXFSZ, signal.SIG_DFL)\n"
+                                       "content = sys.stdin.read()\n"
+                                       "print(content * (1000 if content == 'loud' else 1), flush=True)\n"
+                                       "time.sleep(30 if content == 'slow' else 0)\n"), \
+                    mock.patch.object(sys, 'stdout', stdout):
+                result = command_run(logger, program, inputs,
+                                     options=RunOptions(jobs=1, expected_dir=answers, timeout=1,
+                                                        max_output_bytes=100))
+                stdout.flush()
+
+            assert_fail_result_detail(self, result.detail, 153)
+            log = logging_stream.getvalue()
+            self.assertIn("[INFO] Verdict: TIMEOUT - The program was stopped with code 137.\n", log)
+            self.assertIn("[WARNING] Status: OUTPUT LIMIT\n", log)
+            self.assertIn(f"[INFO] Summary: 0 passed, 1 failed, 2 without an expected output.\n"
+                          f"[INFO] TIMEOUT: {inputs[1]}\n", log)
+            # The output is captured in a file to enforce the limit, and printed after the input.
+            self.assertEqual(b"fast\n" + b"loud" * 25 + b"\n",
+                             stdout.buffer.getvalue().replace(b"-", b"").replace(b"\n\n", b""))
+
+    def test_command_run_limits_without_inputs_and_reuse(self):
+        with tempfile.TemporaryDirectory() as tmp_dir_name:
+            program = os.path.join(tmp_dir_name, "program.js")
+            with open(program, "w") as f:
+                f.write("")
+
+            logger, logging_stream = get_logger()
+            with fake_d8(tmp_dir_name, "import time\ntime.sleep(30)\n"):
+                result = command_run(logger, program, options=RunOptions(timeout=0.2))
+                assert_fail_result_detail(self, result.detail, 137)
+                self.assertIn("[WARNING] Status: TIMEOUT\n", logging_stream.getvalue())
+
+                result = command_run(logger, program, [program], options=RunOptions(reuse_process=True, timeout=0.2))
+                assert_fail_result_detail(self, result.detail, 137)
+                self.assertIn("[WARNING] The resource limits can not be enforced in a reused d8 process. "
+                              "Each input is executed in its own process.\n", logging_stream.getvalue())
+
+    def test_command_run_cache(self):
+        with tempfile.TemporaryDirectory() as tmp_dir_name:
+            program = os.path.join(tmp_dir_name, "program.js")
+            with open(program, "w") as f:
+                f.write("")
+            cache_dir = os.path.join(tmp_dir_name, "cache")
+
+            with fake_d8(tmp_dir_name, "import sys\nprint(sys.stdin.read().upper())\n"):
+                for expected_log in ("[INFO] Result cache: 0 hits, 1 misses.\n",
+                                     "[INFO] Result cache: 1 hits, 0 misses.\n"):
+                    logger, logging_stream = get_logger()
+                    stdout = io.TextIOWrapper(io.BytesIO())
+                    with mock.patch.object(sys, 'stdout', stdout):
+                        result = command_run(logger, program, [program], options=RunOptions(cache_dir=cache_dir))
+                        stdout.flush()
+                    assert_result(self, result, expected_success=True)
+                    self.assertIn(expected_log, logging_stream.getvalue())
+                    self.assertTrue(stdout.buffer.getvalue().startswith(b"\n"))
+
+    def test_command_run_cache_with_loaded_script(self):
+        with tempfile.TemporaryDirectory() as tmp_dir_name:
+            program = os.path.join(tmp_dir_name, "program.js")
+            dependency = os.path.join(tmp_dir_name, "lib.js")
+            with open(program, "w") as f:
+                f.write("loadRelativeToScript('lib.js');")
+            cache_dir = os.path.join(tmp_dir_name, "cache")
+
+            with fake_d8(tmp_dir_name, "import sys\nsys.stdin.read()\n"):
+                # The loaded script is part of the keys, so a change of it is not replayed from the cache.
+                for lib, expected_log in (("", "[INFO] Result cache: 0 hits, 1 misses.\n"),
+                                          ("// changed", "[INFO] Result cache: 0 hits, 1 misses.\n"),
+                                          ("// changed", "[INFO] Result cache: 1 hits, 0 misses.\n")):
+                    with open(dependency, "w") as f:
+                        f.write(lib)
+                    logger, logging_stream = get_logger()
+                    result = command_run(logger, program, [program], options=RunOptions(cache_dir=cache_dir))
+                    assert_result(self, result, expected_success=True)
+                    self.assertIn(expected_log, logging_stream.getvalue())
+
+    def test_command_run_watch(self):
+        with tempfile.TemporaryDirectory() as tmp_dir_name:
+            program = os.path.join(tmp_dir_name, "program.js")
+            dependency = os.path.join(tmp_dir_name, "lib.js")
+            with open(program, "w") as f:
+                f.write("loadRelativeToScript('lib.js');")
+            inputs_dir = os.path.join(tmp_dir_name, "inputs")
+            os.makedirs(inputs_dir)
+            for name in ("a", "b", "c"):
+                with open(os.path.join(inputs_dir, name), "w") as f:
+                    f.write(name)
+
+            def change(path: str, content: str):
+                with open(path, "w") as f:
+                    f.write(content)
+
+            changes = [lambda: change(os.path.join(inputs_dir, "d"), "d"),
+                       lambda: change(dependency, "// changed"),
+                       lambda: change(os.path.join(tmp_dir_name, "ignored.txt"), "ignored")]
+
+            def wait_for_change(snapshot_function, previous):
+                self.assertNotEqual({}, previous)
+                if not changes:
+                    raise KeyboardInterrupt
+                changes.pop(0)()
+                return snapshot_function()
+
+            logger, logging_stream = get_logger()
+            change(dependency, "")
+            with fake_d8(tmp_dir_name, "import sys\nsys.exit(1 if sys.stdin.read() == 'c' else 0)\n"), \
+                    mock.patch('docker_entrypoint._libs.commands.Watcher.wait_for_change',
+                               side_effect=wait_for_change):
+                result = command_run(logger, program, [inputs_dir], options=RunOptions(jobs=1, watch=True))
+
+            assert_fail_result_detail(self, result.detail, 1)
+            # The added input is executed alone, and after the dependency changed, the failed input comes first.
+            logs = logging_stream.getvalue()
+            executed = [line.rsplit(os.sep, 1)[1] for line in logs.splitlines() if line.startswith("[INFO] file ")]
+            self.assertEqual(list("abcdcabd"), executed)
+            self.assertIn("[INFO] 1 changed inputs are executed again.\n", logs)
+            self.assertIn("[INFO] The program changed. All 4 inputs are executed again.\n", logs)
+            self.assertIn("[INFO] 0 changed inputs are executed again.\n", logs)
+            self.assertIn("[INFO] Stopped watching.\n", logs)
+
+    @staticmethod
+    def _write_modules(directory: str, **modules: str) -> str:
+        for name, source in modules.items():
+            with open(os.path.join(directory, name + ".mjs"), "w") as f:
+                f.write(source)
+        return os.path.join(directory, "main.mjs")
+
+    @staticmethod
+    def _read_commands(directory: str):
+        with open(os.path.join(directory, "commands.log")) as f:
+            return [json.loads(line) for line in f]
+
+    def _fake_d8_logging_commands(self, directory: str):
+        return fake_d8(directory, "import json, os, sys\n"
+                                  f"with open({os.path.join(directory, 'commands.log')!r}, 'a') as f:\n"
+                                  "    f.write(json.dumps(sys.argv[1:]) + '\\n')\n")
+
+    def test_command_run_module(self):
+        with tempfile.TemporaryDirectory() as tmp_dir_name:
+            program = self._write_modules(tmp_dir_name, main="import { x } from './lib.mjs';\nprint(x);",
+                                          lib="export const x = 1;")
+            input_file = os.path.join(tmp_dir_name, "input.txt")
+            with open(input_file, "w") as f:
+                f.write("input")
+
+            logger, logging_stream = get_logger()
+            with self._fake_d8_logging_commands(tmp_dir_name):
+                assert_result(self, command_run(logger, program, [input_file], options=RunOptions(module=True)),
+                              expected_success=True)
+                assert_result(self, command_run(logger, program, options=RunOptions(module=True)),
+                              expected_success=True)
+
+            self.assertEqual([["--module", program]] * 2, self._read_commands(tmp_dir_name))
+
+    def test_command_run_module_with_cache(self):
+        with tempfile.TemporaryDirectory() as tmp_dir_name:
+            program = self._write_modules(tmp_dir_name, main="import { x } from './lib.mjs';\nprint(x);",
+                                          lib="export const x = 1;")
+            cache_dir = os.path.join(tmp_dir_name, "cache")
+            options = RunOptions(module=True, cache_dir=cache_dir)
+
+            with self._fake_d8_logging_commands(tmp_dir_name):
+                for expected_log in ("[INFO] Result cache: 0 hits, 1 misses.\n",
+                                     "[INFO] Result cache: 1 hits, 0 misses.\n"):
+                    logger, logging_stream = get_logger()
+                    assert_result(self, command_run(logger, program, [program], options=options),
+                                  expected_success=True)
+                    self.assertIn(expected_log, logging_stream.getvalue())
+
+                # A graph that can not be bundled is executed by d8, and its modules are part of the keys.
+                self._write_modules(tmp_dir_name, main="import { x } from './lib.mjs';\nawait x;")
+                for lib, expected_log in (("export const x = 1;", "[INFO] Result cache: 0 hits, 1 misses.\n"),
+                                          ("export const x = 2;", "[INFO] Result cache: 0 hits, 1 misses.\n"),
+                                          ("export const x = 2;", "[INFO] Result cache: 1 hits, 0 misses.\n")):
+                    self._write_modules(tmp_dir_name, lib=lib)
+                    logger, logging_stream = get_logger()
+                    assert_result(self, command_run(logger, program, [program], options=options),
+                                  expected_success=True)
+                    self.assertIn(expected_log, logging_stream.getvalue())
+                self.assertIn("[DEBUG] The modules can not be bundled, so d8 loads them one by one.\n",
+                              logging_stream.getvalue())
+
+            commands = self._read_commands(tmp_dir_name)
+            self.assertEqual(3, len(commands))
+            bundle = commands[0][1]
+            self.assertEqual(os.path.join(cache_dir, "modules"), os.path.dirname(bundle))
+            self.assertEqual([["--module", bundle], ["--module", program], ["--module", program]], commands)
+
+    def test_command_run_module_errors(self):
+        with tempfile.TemporaryDirectory() as tmp_dir_name:
+            program = self._write_modules(tmp_dir_name, main="import { x } from './none.mjs';")
+
+            for options in (RunOptions(module=True), RunOptions(module=True, cache_dir=tmp_dir_name)):
+                result = command_run(logging.getLogger(), program, [program], options=options)
+                assert_fail_result_detail(self, result.detail, ExitCode.IO_ERROR,
+                                          f"The module './none.mjs' that '{program}' imports does not exist.")
+
+            self._write_modules(tmp_dir_name, main="print(1);")
+            logger, logging_stream = get_logger()
+            with self._fake_d8_logging_commands(tmp_dir_name):
+                result = command_run(logger, program, [program], options=RunOptions(module=True, reuse_process=True))
+            assert_result(self, result, expected_success=True)
+            self.assertIn("[WARNING] ES modules can not be executed in a Realm of a reused d8 process. "
+                          "Each input is executed in its own process.\n", logging_stream.getvalue())
+
+    def test_command_run_module_watch(self):
+        with tempfile.TemporaryDirectory() as tmp_dir_name:
+            program = self._write_modules(tmp_dir_name, main="import { x } from './lib.mjs';\nprint(x);",
+                                          lib="export const x = 1;")
+            input_file = os.path.join(tmp_dir_name, "input.txt")
+            with open(input_file, "w") as f:
+                f.write("input")
+
+            changes = [lambda: self._write_modules(tmp_dir_name, lib="import './none.mjs';\nexport const x = 2;"),
+                       lambda: self._write_modules(tmp_dir_name, lib="export const x = 3;")]
+
+            def wait_for_change(snapshot_function, _previous):
+                if not changes:
+                    raise KeyboardInterrupt
+                changes.pop(0)()
+                return snapshot_function()
+
+            logger, logging_stream = get_logger()
+            with self._fake_d8_logging_commands(tmp_dir_name), \
+                    mock.patch('docker_entrypoint._libs.commands.Watcher.wait_for_change',
+                               side_effect=wait_for_change):
+                result = command_run(logger, program, [input_file], options=RunOptions(module=True, watch=True))
+
+            assert_result(self, result, expected_success=True)
+            # The input is not executed while a module is missing.
+            self.assertEqual([["--module", program]] * 2, self._read_commands(tmp_dir_name))
+            self.assertIn(f"[ERROR] The module './none.mjs' that '{os.path.join(tmp_dir_name, 'lib.mjs')}' imports "
+                          f"does not exist.\n", logging_stream.getvalue())
+
+    def test_command_run_output_dir(self):
+        with tempfile.TemporaryDirectory() as tmp_dir_name:
+            program = os.path.join(tmp_dir_name, "program.js")
+            with open(program, "w") as f:
+                f.write("")
+            os.makedirs(os.path.join(tmp_dir_name, "work", "inputs"))
+            inside_input = os.path.join(tmp_dir_name, "work", "inputs", "1.txt")
+            outside_input = os.path.join(tmp_dir_name, "2.txt")
+            for path in (inside_input, outside_input):
+                with open(path, "w") as f:
+                    f.write("hello")
+            output_dir = os.path.join(tmp_dir_name, "out")
+
+            logger, logging_stream = get_logger()
+            stdout = io.TextIOWrapper(io.BytesIO())
+            with fake_d8(tmp_dir_name, "import sys\n"
+                                       "print(sys.stdin.read().upper())\n"
+                                       "print('log', file=sys.stderr)\n"
+                                       "sys.exit(3)\n"), \
+                    mock.patch('os.getcwd', return_value=os.path.join(tmp_dir_name, "work")), \
+                    mock.patch.object(sys, 'stdout', stdout):
+                result = command_run(logger, program, [inside_input, outside_input],
+                                     options=RunOptions(jobs=1, output_dir=output_dir, tee=True))
+                stdout.flush()
+
+            assert_fail_result_detail(self, result.detail, 3)
+            self.assertIn(f"[INFO] The outputs are written to '{output_dir}'.\n", logging_stream.getvalue())
+            inside_output = os.path.join(output_dir, "inputs", "1.txt")
+            outside_output = os.path.join(output_dir, outside_input.lstrip(os.sep))
+            for path in (inside_output, outside_output):
+                with open(path + ".out") as f:
+                    self.assertEqual("HELLO\n", f.read())
+                with open(path + ".err") as f:
+                    self.assertEqual("log\n", f.read())
+            self.assertEqual(2, stdout.buffer.getvalue().count(b"HELLO\n"))
+
+    def test_command_run_stats(self):
+        with tempfile.TemporaryDirectory() as tmp_dir_name:
+            program = os.path.join(tmp_dir_name, "program.js")
+            with open(program, "w") as f:
+                f.write("")
+            input_file = os.path.join(tmp_dir_name, "1.txt")
+            with open(input_file, "w") as f:
+                f.write("")
+
+            for stats_format, jobs in (('table', 1), ('json', 2)):
+                stdout = io.StringIO()
+                with fake_d8(tmp_dir_name, "import sys\nsys.exit(2)\n"), mock.patch.object(sys, 'stdout', stdout):
+                    result = command_run(get_logger()[0], program, [input_file, program],
+                                         options=RunOptions(jobs=jobs, stats=stats_format))
+                assert_fail_result_detail(self, result.detail, 2)
+                last_line = stdout.getvalue().splitlines()[-1]
+                if stats_format == 'table':
+                    self.assertTrue(last_line.startswith(f"{program}     2  "))
+                else:
+                    inputs = json.loads(last_line)['inputs']
+                    self.assertEqual([input_file, program], [item['file'] for item in inputs])
+                    self.assertEqual([2, 2], [item['code'] for item in inputs])
+                    self.assertGreater(inputs[0]['max_rss_kib'], 0)
+
+    def test_command_run_expected(self):
+        with tempfile.TemporaryDirectory() as tmp_dir_name:
+            program = os.path.join(tmp_dir_name, "program.js")
+            with open(program, "w") as f:
+                f.write("")
+            answers = os.path.join(tmp_dir_name, "answers")
+            os.makedirs(answers)
+            contents = {"1": ("a", "A\n"), "2": ("b", "X\n"), "3": ("crash", "CRASH\n"), "4": ("c", None)}
+            inputs = []
+            for name, (content, answer) in contents.items():
+                inputs.append(os.path.join(tmp_dir_name, f"{name}.txt"))
+                with open(inputs[-1], "w") as f:
+                    f.write(content)
+                if answer is not None:
+                    with open(os.path.join(answers, f"{name}.ans"), "w") as f:
+                        f.write(answer)
+
+            logger, logging_stream = get_logger()
+            stdout = io.TextIOWrapper(io.BytesIO())
+            with fake_d8(tmp_dir_name, "import sys\n"
+                                       "content = sys.stdin.read()\n"
+                                       "print(content.upper())\n"
+                                       "sys.exit(4 if content == 'crash' else 0)\n"), \
+                    mock.patch.object(sys, 'stdout', stdout):
+                result = command_run(logger, program, inputs,
+                                     options=RunOptions(jobs=2, expected_dir=answers, comparator='whitespace'))
+                stdout.flush()
+
+            # Like other failures, the code of the last failed input is returned.
+            assert_fail_result_detail(self, result.detail, 4)
+            log = logging_stream.getvalue()
+            self.assertIn(f"[WARNING] There is no expected output for '{inputs[3]}' in '{answers}'.\n", log)
+            self.assertIn("[INFO] Verdict: ACCEPTED\n", log)
+            self.assertIn("[INFO] Verdict: WRONG ANSWER - Token 1: expected 'X', found 'B'.\n", log)
+            self.assertIn("[INFO] Verdict: RUNTIME ERROR - The program exited with code 4.\n", log)
+            self.assertIn("[INFO] Summary: 1 passed, 2 failed, 1 without an expected output.\n"
+                          f"[INFO] WRONG ANSWER: {inputs[1]}\n"
+                          f"[INFO] RUNTIME ERROR: {inputs[2]}\n", log)
+            # Only the output of the input without an expected output is printed.
+            self.assertEqual(b"C\n", stdout.buffer.getvalue().replace(b"-", b"").strip() + b"\n")
+
+    def test_command_run_expected_compressed_input(self):
+        with tempfile.TemporaryDirectory() as tmp_dir_name:
+            program = os.path.join(tmp_dir_name, "program.js")
+            with open(program, "w") as f:
+                f.write("")
+            answers = os.path.join(tmp_dir_name, "answers")
+            os.makedirs(answers)
+            input_file = os.path.join(tmp_dir_name, "1.in.gz")
+            with gzip.open(input_file, "wb") as f:
+                f.write(b"a")
+            with open(os.path.join(answers, "1.ans"), "w") as f:
+                f.write("A\n")
+
+            logger, logging_stream = get_logger()
+            with fake_d8(tmp_dir_name, "import sys\nprint(sys.stdin.read().upper())\n"):
+                result = command_run(logger, program, [input_file], options=RunOptions(jobs=1, expected_dir=answers))
+
+            assert_result(self, result, expected_success=True)
+            self.assertIn("[INFO] Verdict: ACCEPTED\n", logging_stream.getvalue())
+
+    def test_command_run_expected_reuse_process(self):
+        with tempfile.TemporaryDirectory() as tmp_dir_name:
+            program = os.path.join(tmp_dir_name, "program.js")
+            with open(program, "w") as f:
+                f.write("print(readline());")
+            input_file = os.path.join(tmp_dir_name, "1.txt")
+            with open(input_file, "w") as f:
+                f.write("hello")
+            with open(os.path.join(tmp_dir_name, "1.out"), "w") as f:
+                f.write("wrong")
+
+            logger, logging_stream = get_logger()
+            with fake_d8(tmp_dir_name, "import json, sys\n"
+                                       "for line in sys.stdin:\n"
+                                       "    print(json.dumps({'status': 0, 'stdout': 'out', 'stderr': ''}))\n"):
+                result = command_run(logger, program, [input_file],
+                                     options=RunOptions(jobs=1, reuse_process=True, expected_dir=tmp_dir_name))
+
+            assert_fail_result_detail(self, result.detail, ExitCode.GENERAL_ERROR)
+            self.assertIn("[INFO] Verdict: WRONG ANSWER - The output differs from the expected output at byte 0.\n",
+                          logging_stream.getvalue())
+
+    # endregion
+
+    # region command_bench
+
+    def test_command_bench_invalid_params(self):
+        result = command_bench(None, None)
+        assert_result_with_type(self, result, expected_success=False, expected_detail_type=ValidationError)
+
+        logger, _ = get_logger()
+        result = command_bench(logger, 'no-such-program.js')
+        assert_fail_result_detail(self, result.detail, ExitCode.IO_ERROR, "File 'no-such-program.js' does not exists.")
+
+        with tempfile.TemporaryDirectory() as tmp_dir_name:
+            program = os.path.join(tmp_dir_name, "program.js")
+            with open(program, "w") as f:
+                f.write("")
+            result = command_bench(logger, program, [os.path.join(tmp_dir_name, "invalid")])
+            self.assertEqual(ExitCode.IO_ERROR, result.detail.code)
+
+    def test_command_bench(self):
+        with tempfile.TemporaryDirectory() as tmp_dir_name:
+            program = os.path.join(tmp_dir_name, "program.js")
+            with open(program, "w") as f:
+                f.write("")
+            inputs = []
+            for name in ("1.txt", "2.txt"):
+                inputs.append(os.path.join(tmp_dir_name, name))
+                with open(inputs[-1], "w") as f:
+                    f.write("")
+
+            logger, logging_stream = get_logger()
+            # The fake d8 is slower with the program than with the empty script of the baseline.
+            with fake_d8(tmp_dir_name, "import sys, time\n"
+                                       "time.sleep(0.02 if sys.argv[-2].endswith('program.js') else 0)\n"
+                                       "print(sys.argv[1:])\n"):
+                result = command_bench(logger, program, [tmp_dir_name + "/1.txt", inputs[1]], ['x'],
+                                       BenchOptions(runs=3, warmup=1, random_seed=1))
+
+            assert_result(self, result, expected_success=True)
+            log = logging_stream.getvalue()
+            self.assertIn(f"[INFO] Benchmark of {program}: 3 runs after 1 warm-ups, 2 process(es) per run.\n", log)
+            self.assertIn("[INFO] d8 startup baseline: ", log)
+            self.assertIn("[INFO] median: ", log)
+            self.assertEqual(3, log.count(f"[DEBUG] {program} run "))
+            self.assertEqual(3, log.count(f"[DEBUG] {program} (d8 startup) run "))
+            self.assertIn(f"[DEBUG] {program} run 3: ", log)
+
+    def test_command_bench_variants(self):
+        with tempfile.TemporaryDirectory() as tmp_dir_name:
+            program = os.path.join(tmp_dir_name, "program.js")
+            with open(program, "w") as f:
+                f.write("")
+
+            logger, logging_stream = get_logger()
+            with fake_d8(tmp_dir_name, ""):
+                result = command_bench(logger, program, options=BenchOptions(
+                    runs=6, warmup=0, predictable=True, variants={'slow': '--slow --predictable', 'fast': ''}))
+
+            assert_result(self, result, expected_success=True)
+            log = logging_stream.getvalue()
+            self.assertIn("[INFO] Variant slow (--slow --predictable):\n", log)
+            self.assertIn("[INFO] Variant fast (no flags):\n", log)
+            self.assertIn("[INFO] fast vs slow: ", log)
+            self.assertIn(", Mann-Whitney U = ", log)
+            self.assertEqual(6, log.count("[DEBUG] slow (d8 startup) run "))
+
+    def test_command_bench_without_baseline_and_failure(self):
+        with tempfile.TemporaryDirectory() as tmp_dir_name:
+            program = os.path.join(tmp_dir_name, "program.js")
+            with open(program, "w") as f:
+                f.write("")
+
+            logger, logging_stream = get_logger()
+            with fake_d8(tmp_dir_name, "import sys\nprint('ok')\n"):
+                result = command_bench(logger, program, options=BenchOptions(runs=2, warmup=0,
+                                                                            subtract_baseline=False))
+            assert_result(self, result, expected_success=True)
+            self.assertNotIn("baseline", logging_stream.getvalue())
+            self.assertIn("samples: 2 (0 outliers rejected)", logging_stream.getvalue())
+
+            with fake_d8(tmp_dir_name, "import sys\nsys.exit('crashed')\n"):
+                result = command_bench(logger, program)
+            assert_fail_result_detail(self, result.detail, 1, f"'d8 {program}' exited with code 1. crashed")
+
     # endregion
 
     # region command_d8
@@ -192,7 +749,7 @@ class TestCommands(unittest.TestCase):
         logger, logging_stream = get_logger()
         result = command_shell(logger, ['arg1', 'arg2'])
 
-        expected_log = "[DEBUG] Command: bash -c 'sleep 0.5; rlwrap -m -pgreen d8 --harmony --allow-natives-syntax arg1 arg2'\n" \
+        expected_log = "[DEBUG] Command: rlwrap -m -pgreen d8 --harmony --allow-natives-syntax arg1 arg2\n" \
                        "[INFO] Default options: ['--harmony', '--allow-natives-syntax']\n" \
                        "[INFO] Use quit() or Ctrl-D (i.e. EOF) to exit the D8 Shell\n" \
                        f"[DEBUG] Return code: {result.code()}\n"
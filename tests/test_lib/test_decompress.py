@@ -0,0 +1,114 @@
+import bz2
+import gzip
+import lzma
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+from docker_entrypoint._libs import decompress
+from docker_entrypoint._libs.decompress import (DecompressedInput,
+                                                DecompressionError,
+                                                is_compressed, open_input)
+from docker_entrypoint._libs.executor import ResourceLimits, run_process
+
+CONTENT = b'1 2\n3 4\n'
+
+
+class TestDecompress(unittest.TestCase):
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self.tmp_dir = self._tmp_dir.name
+
+    def tearDown(self):
+        self._tmp_dir.cleanup()
+
+    def _write(self, name: str, content: bytes) -> str:
+        path = os.path.join(self.tmp_dir, name)
+        with open(path, 'wb') as file:
+            file.write(content)
+        return path
+
+    def _write_zst(self, name: str, content: bytes) -> str:
+        path = self._write(name[:-len('.zst')], content)
+        subprocess.run(['zstd', '-q', '--rm', path], check=True)
+        return path + '.zst'
+
+    def test_is_compressed(self):
+        self.assertEqual([True, True, True, True, True, False, False],
+                         [is_compressed(name) for name in ('1.gz', '1.xz', '1.lzma', '1.bz2', '1.in.zst', '1.txt',
+                                                           'gz')])
+
+    def test_open_input(self):
+        plain = self._write('1.txt', CONTENT)
+        with open_input(plain) as file:
+            self.assertEqual(CONTENT, file.read())
+
+        for name, compress in (('1.gz', gzip.compress), ('1.xz', lzma.compress), ('1.bz2', bz2.compress)):
+            with open_input(self._write(name, compress(CONTENT))) as decompressed:
+                self.assertIsInstance(decompressed, DecompressedInput)
+                with open(decompressed.fileno(), 'rb', closefd=False) as pipe:
+                    self.assertEqual(CONTENT, pipe.read())
+            self.assertIsNone(decompressed.error)
+        # Closing twice does nothing.
+        decompressed.close()
+
+    def test_run_process_with_compressed_inputs(self):
+        inputs = [self._write('1.gz', gzip.compress(CONTENT)), self._write('1.xz', lzma.compress(CONTENT)),
+                  self._write('1.bz2', bz2.compress(CONTENT))]
+        with mock.patch.dict(sys.modules, {'zstandard': None}):
+            inputs.append(self._write_zst('1.zst', CONTENT))
+            for path in inputs:
+                result = run_process(['cat'], stdin_path=path, capture=True)
+                self.assertEqual((0, CONTENT, b''), (result.code, result.stdout, result.stderr))
+
+    def test_run_process_streams_large_inputs(self):
+        # 64 MiB of content are streamed through the pipe without being written anywhere.
+        path = self._write('large.gz', gzip.compress(b'\0' * (64 * 1024 * 1024)))
+        result = run_process(['wc', '-c'], stdin_path=path, capture=True, limits=ResourceLimits())
+        self.assertEqual((0, b'67108864'), (result.code, result.stdout.strip()))
+
+        # The process exits before it reads its whole input, and the decompression stops.
+        with mock.patch.dict(sys.modules, {'zstandard': None}):
+            for path in (path, self._write_zst('large.zst', b'\0' * (64 * 1024 * 1024))):
+                result = run_process(['head', '-c', '3'], stdin_path=path, capture=True, limits=ResourceLimits())
+                self.assertEqual((0, b'\0\0\0'), (result.code, result.stdout))
+
+    def test_run_process_with_corrupt_inputs(self):
+        path = self._write('1.gz', gzip.compress(os.urandom(200000))[:100000])
+        result = run_process(['wc', '-c'], stdin_path=path, capture=True)
+        self.assertEqual(5, result.code)
+        self.assertRegex(result.stderr.decode(), r"^'.*1\.gz' can not be decompressed: Compressed file ended before "
+                                                 r"the end-of-stream marker was reached\n$")
+        # The content before the error is read.
+        self.assertGreater(int(result.stdout), 0)
+
+        with mock.patch.dict(sys.modules, {'zstandard': None}):
+            path = self._write('1.zst', b'not zstd')
+            stderr_path = os.path.join(self.tmp_dir, 'err')
+            result = run_process(['cat'], stdin_path=path, stderr_path=stderr_path)
+            self.assertEqual(5, result.code)
+            with open(stderr_path, encoding='utf-8') as file:
+                self.assertIn("1.zst' can not be decompressed: ", file.read())
+
+            with mock.patch('sys.stderr') as stderr:
+                run_process(['cat'], stdin_path=path, capture=False, stdout_path=os.devnull)
+            stderr.write.assert_called_once()
+
+    def test_zstd_without_codec(self):
+        path = self._write_zst('1.zst', CONTENT)
+        with mock.patch.dict(sys.modules, {'zstandard': None}), \
+                mock.patch.object(decompress, 'ZSTD_EXECUTABLE', 'missing-zstd'):
+            with self.assertRaisesRegex(DecompressionError, "Reading '.zst' inputs needs the 'zstandard' package "
+                                                            "or the 'zstd' command."):
+                open_input(path)
+            result = run_process(['cat'], stdin_path=path, capture=True)
+        self.assertEqual((5, b'', f"{path}: Reading '.zst' inputs needs the 'zstandard' package or the 'zstd' "
+                                  f"command.\n".encode()),
+                         (result.code, result.stdout, result.stderr))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,287 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from docker_entrypoint._libs.es_modules import (ModuleBundleCache, ModuleError,
+                                                resolve_module_graph,
+                                                resolve_specifier)
+from docker_entrypoint._libs.result_cache import ResultCache
+
+MODULES = {
+    'main.mjs': "#!/usr/bin/env d8\n"
+                "import def, { a, b as bee } from './lib/a.mjs';\n"
+                "import * as ns from \"./lib/b.mjs\";\n"
+                "import './lib/side.mjs';\n"
+                "export { a };\n"
+                "const re = /import x from 'y'/g; // export nothing\n"
+                "const t = `template ${ns.value} with ${ {x: 1}.x } and \\` backtick`;\n"
+                "console.log(def(), bee(), t, re.source, 10 / 2 / 1);\n",
+    'lib/a.mjs': "export const a = 1;\n"
+                 "export function b() { return 'b'; }\n"
+                 "export default function () { return 'default'; }\n",
+    'lib/b.mjs': "import { a } from './a.mjs';\n"
+                 "export const value = a + 41;\n"
+                 "export default class extends Object { }\n"
+                 "export * from './c.mjs';\n"
+                 "export * as deep from './c.mjs';\n",
+    'lib/c.mjs': "export const star = 'star';\n",
+    'lib/side.mjs': "console.log('side effect first');\n",
+}
+
+
+class TestEsModules(unittest.TestCase):
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self.tmp_dir = self._tmp_dir.name
+        for name, source in MODULES.items():
+            self._write(name, source)
+        self.entry = os.path.join(self.tmp_dir, 'main.mjs')
+
+    def tearDown(self):
+        self._tmp_dir.cleanup()
+
+    def _write(self, name: str, source: str) -> str:
+        path = os.path.join(self.tmp_dir, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(source)
+        return path
+
+    def _bundle(self, source: str, **modules: str):
+        for name, module_source in modules.items():
+            self._write(name + '.mjs', module_source)
+        graph = resolve_module_graph(self._write('entry.mjs', source))
+        return graph, graph.bundle()
+
+    # region resolve_module_graph
+
+    def test_resolves_the_graph_in_evaluation_order(self):
+        graph = resolve_module_graph(self.entry)
+
+        names = ['lib/a.mjs', 'lib/c.mjs', 'lib/b.mjs', 'lib/side.mjs', 'main.mjs']
+        self.assertEqual([os.path.join(self.tmp_dir, name) for name in names], graph.paths)
+        self.assertEqual(5, len(graph.signatures))
+        self.assertEqual([], graph.missing)
+        self.assertIsNone(graph.unsupported)
+        graph.check_missing()
+
+    def test_resolve_specifier(self):
+        self.assertEqual('/a/c.mjs', resolve_specifier('/a/b/main.mjs', '../c.mjs'))
+        self.assertEqual('/c.mjs', resolve_specifier('/a/b/main.mjs', '/c.mjs'))
+
+    def test_missing_modules(self):
+        graph, bundle = self._bundle("import './none.mjs';\nconst later = import('./later.mjs');")
+
+        self.assertIsNone(bundle)
+        self.assertEqual([f"The module './none.mjs' that '{graph.paths[-1]}' imports does not exist."], graph.missing)
+        with self.assertRaises(ModuleError):
+            graph.check_missing()
+
+        graph = resolve_module_graph(os.path.join(self.tmp_dir, 'none.mjs'))
+        self.assertEqual([], graph.paths)
+        self.assertTrue(graph.missing[0].startswith(f"The module '{os.path.join(self.tmp_dir, 'none.mjs')}' can not "
+                                                    f"be read: "))
+
+    def test_follows_dynamic_imports(self):
+        graph, bundle = self._bundle("async function f() { return import('./dep.mjs'); }", dep="export const x = 1;")
+
+        self.assertIsNone(bundle)
+        self.assertEqual("'" + graph.paths[-1] + "' uses a dynamic import or import.meta", graph.unsupported)
+        self.assertEqual(os.path.join(self.tmp_dir, 'dep.mjs'), graph.paths[0])
+
+    def test_cyclic_imports_are_not_bundled(self):
+        graph, bundle = self._bundle("import { x } from './dep.mjs';\nexport const y = 2;",
+                                     dep="import { y } from './entry.mjs';\nexport const x = 1;")
+
+        self.assertIsNone(bundle)
+        self.assertIn("has a cyclic import of './entry.mjs'", graph.unsupported)
+        self.assertEqual(2, len(graph.paths))
+
+    # endregion
+
+    # region bundle
+
+    def test_bundle(self):
+        bundle = resolve_module_graph(self.entry).bundle()
+
+        lines = bundle.splitlines()
+        self.assertEqual(f"// The modules of {self.entry}, bundled by the entrypoint.", lines[0])
+        self.assertIn("const __d8_module_0 = (() => { \n", bundle)
+        self.assertIn("\n const a = 1;\n function b() { return 'b'; }\nfunction __d8_default () { return 'default'; }\n"
+                      "\nreturn __d8_namespace({\"a\": a, \"b\": b, \"default\": __d8_default}, \"__d8_default\");\n",
+                      bundle)
+        self.assertIn("const __d8_module_2 = (() => { const a = __d8_module_0.a;\n", bundle)
+        self.assertIn("class __d8_default extends Object { }", bundle)
+        self.assertIn("{\"value\": value, \"default\": __d8_default, \"deep\": __d8_module_1, "
+                      "\"star\": __d8_module_1.star}", bundle)
+        self.assertIn("const __d8_module_4 = (() => { const def = __d8_module_0.default; const a = __d8_module_0.a; "
+                      "const bee = __d8_module_0.b; const ns = __d8_module_2;\n\n", bundle)
+        # The syntax in strings, regular expressions and templates is kept.
+        self.assertIn("const re = /import x from 'y'/g; // export nothing\n", bundle)
+        self.assertIn("with ${ {x: 1}.x } and \\` backtick`", bundle)
+        self.assertIn("return __d8_namespace({\"a\": a}, \"__d8_default\");\n})();\n", bundle)
+        self.assertNotIn("#!", bundle)
+        self.assertNotIn("import ", bundle.replace("import x from", ""))
+
+    def test_bundle_keeps_the_lines_of_the_modules(self):
+        _, bundle = self._bundle("import {\n  x\n} from './dep.mjs';\nconsole.log(x);", dep="export {\n};")
+
+        self.assertIsNone(bundle)
+        _, bundle = self._bundle("import {\n  x\n} from './dep.mjs';\nconsole.log(x);", dep="export const x = 1;")
+        self.assertIn("= (() => { const x = __d8_module_0.x;\n\n\n\nconsole.log(x);\n", bundle)
+
+    def test_bundle_exports(self):
+        _, bundle = self._bundle("export default 42;\nexport async function* gen() {}\nconst x = 1;\nclass y {}\n"
+                                 "export { x as z, y, };\nexport { x as other } from './dep.mjs';\n"
+                                 "export * from './dep.mjs';\nexport * from './dep2.mjs';\nexport * as all from './dep.mjs';",
+                                 dep="export const x = 1;\nexport const shared = 2;\nexport default 3;",
+                                 dep2="export const shared = 3;\nexport const only = 4;")
+
+        self.assertIn("const __d8_default = 42;\n async function* gen() {}\n", bundle)
+        self.assertIn("{\"default\": __d8_default, \"gen\": gen, \"z\": x, \"y\": y, \"other\": __d8_module_0.x, "
+                      "\"all\": __d8_module_0, \"x\": __d8_module_0.x, \"only\": __d8_module_1.only}", bundle)
+
+    def test_bundle_with_unknown_bindings(self):
+        for source in ("import { none } from './dep.mjs';", "export { none } from './dep.mjs';",
+                       "export { none };"):
+            graph, bundle = self._bundle(source, dep="export const x = 1;")
+            self.assertIsNone(graph.unsupported)
+            self.assertIsNone(bundle)
+
+        _, bundle = self._bundle("import { x } from './dep.mjs';\nimport y, * as all from './dep.mjs';\n"
+                                 "import {} from './dep.mjs';\nexport { x, y };",
+                                 dep="export const x = 1;\nexport default function named() {}")
+        self.assertIn("const x = __d8_module_0.x; const y = __d8_module_0.default; const all = __d8_module_0;", bundle)
+
+    def test_scanner(self):
+        graph, bundle = self._bundle(
+            "const o = { import: 1, async m() { await o.m(); } };\n"
+            "o.import; o?.export; x?.5:1;\n"
+            "class C { async run() { await 1; } }\n"
+            "const f = async () => { await 2; };\n"
+            "for (const i of [1]) { if (i) { i / 2 / 3; } }\n"
+            "const r = typeof /a[/]b/; const d = (1) / 2 / 3; const n = .5 + 1e3;\n"
+            "const $ = `a${`b${1}`}c`;\n"
+            "/* import x from './none.mjs' */ // import y from './none.mjs'\n")
+
+        self.assertIsNone(graph.unsupported)
+        self.assertEqual([], graph.missing)
+        self.assertIsNotNone(bundle)
+
+    def test_unsupported_features(self):
+        cases = {
+            "await 1;": "top-level await",
+            "if (x) { await 1; }": "top-level await",
+            "await import.meta.url;": "top-level await",
+            "console.log(import.meta.url);": "a dynamic import or import.meta",
+            "const m = import('./dep.mjs');": "a dynamic import or import.meta",
+            "const m = import(name);": "a dynamic import or import.meta",
+            "f(() => import(name));": "a dynamic import or import.meta",
+            "if (x) { export const a = 1; }": "an export that is not at the top level",
+            "export let x = 1;": "an exported 'let', whose value can change",
+            "export var x = 1;": "an exported 'var', whose value can change",
+            "export const {a, b} = o;": "an exported destructuring declaration",
+            "export const a = 1, b = 2;": "an exported declaration of several names",
+            "export const a = [1, 2], b = { c: 3 };": "an exported declaration of several names",
+            "import data from './dep.mjs' with { type: 'json' };": "an import syntax that can not be bundled",
+            "import { 'a-b' as c } from './dep.mjs';": "an import syntax that can not be bundled",
+            "export { a as 'a-b' };": "an export syntax that can not be bundled",
+            "export = 1;": "an export syntax that can not be bundled",
+            "const s = 'unterminated;": "an unterminated string",
+            "const t = `unterminated;": "an unterminated template literal",
+            "const r = /unterminated;": "an unterminated regular expression",
+            "function f() {": "unbalanced brackets",
+            "f(]);": "unbalanced brackets",
+        }
+        for source, reason in cases.items():
+            with self.subTest(source=source):
+                graph, bundle = self._bundle(source, dep="export const x = 1;")
+                self.assertEqual(f"'{graph.paths[-1]}' uses {reason}", graph.unsupported, source)
+                self.assertIsNone(bundle)
+
+        graph, _ = self._bundle("#!/usr/bin/env d8")
+        self.assertIsNone(graph.unsupported)
+        # The commas inside the value of an exported declaration, and after its end, do not separate its names.
+        graph, _ = self._bundle("export const a = [1, (2, 3)];\nconst b = 1, c = 2;\n"
+                                "export class C { m(x, y) {} }\nf(), g();")
+        self.assertIsNone(graph.unsupported)
+        graph, _ = self._bundle("import data from './dep.mjs' with { type: 'json' };\n")
+        self.assertEqual([os.path.join(self.tmp_dir, 'dep.mjs'), graph.paths[-1]], graph.paths)
+
+    # endregion
+
+    # region ModuleBundleCache
+
+    def test_cache_stores_the_bundle(self):
+        cache = ModuleBundleCache(os.path.join(self.tmp_dir, 'cache'))
+        paths, bundle = cache.load(self.entry)
+
+        self.assertEqual(resolve_module_graph(self.entry).paths, paths)
+        self.assertEqual(cache.directory, os.path.dirname(bundle))
+        with open(bundle) as f:
+            self.assertEqual(resolve_module_graph(self.entry).bundle(), f.read())
+
+        # An unchanged graph is loaded from the manifest, without reading the modules.
+        with mock.patch('docker_entrypoint._libs.es_modules.resolve_module_graph') as resolve:
+            self.assertEqual((paths, bundle), cache.load(os.path.relpath(self.entry)))
+            resolve.assert_not_called()
+
+        self._write('lib/c.mjs', "export const star = 'changed';\n")
+        changed_paths, changed_bundle = cache.load(self.entry)
+        self.assertEqual(paths, changed_paths)
+        self.assertNotEqual(bundle, changed_bundle)
+
+        with mock.patch('docker_entrypoint._libs.es_modules.resolve_module_graph',
+                        wraps=resolve_module_graph) as resolve:
+            self.assertEqual((changed_paths, changed_bundle), cache.load(self.entry, refresh=True))
+            resolve.assert_called_once()
+
+    def test_cache_without_bundle(self):
+        entry = self._write('entry.mjs', "await 1;")
+        cache = ModuleBundleCache(os.path.join(self.tmp_dir, 'cache'))
+
+        self.assertEqual(([entry], None), cache.load(entry))
+        with mock.patch('docker_entrypoint._libs.es_modules.resolve_module_graph') as resolve:
+            self.assertEqual(([entry], None), cache.load(entry))
+            resolve.assert_not_called()
+
+        self._write('entry.mjs', "import './none.mjs';")
+        with self.assertRaises(ModuleError):
+            cache.load(entry)
+
+    def test_cache_ignores_invalid_manifests(self):
+        cache = ModuleBundleCache(os.path.join(self.tmp_dir, 'cache'))
+        expected = cache.load(self.entry)
+        manifest_path = [entry.path for entry in os.scandir(cache.directory) if entry.name.endswith('.json')][0]
+
+        for content in ("{", json.dumps({'version': '0'}), json.dumps({'version': '1'})):
+            with open(manifest_path, 'w') as f:
+                f.write(content)
+            self.assertEqual(expected, cache.load(self.entry))
+
+        os.unlink(expected[1])
+        self.assertEqual(expected, cache.load(self.entry))
+        self.assertTrue(os.path.isfile(expected[1]))
+
+    def test_cache_removes_unfinished_files(self):
+        cache = ModuleBundleCache(os.path.join(self.tmp_dir, 'cache'))
+        with mock.patch('docker_entrypoint._libs.es_modules.os.replace', side_effect=OSError("full")):
+            with self.assertRaises(OSError):
+                cache.load(self.entry)
+        self.assertEqual([], os.listdir(cache.directory))
+
+    def test_cache_is_evicted_with_the_results(self):
+        cache_dir = os.path.join(self.tmp_dir, 'cache')
+        cache = ModuleBundleCache(cache_dir)
+        cache.load(self.entry)
+
+        self.assertEqual(2, ResultCache(cache_dir, max_bytes=0).evict())
+        self.assertEqual([], os.listdir(cache.directory))
+
+    # endregion
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,258 @@
+import io
+import os
+import resource
+import subprocess
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from docker_entrypoint._libs import executor
+from docker_entrypoint._libs.executor import (LimitStatus, ResourceLimits,
+                                              build_d8_command, copy_file_to,
+                                              exit_status, format_command,
+                                              kill_running_processes,
+                                              run_process)
+
+
+def _is_running(pid: int) -> bool:
+    # A killed process that is not reaped yet is a zombie, which does not run anymore.
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            return f.read().rsplit(')', 1)[1].split()[0] not in ('Z', 'X')
+    except FileNotFoundError:
+        return False
+
+
+def _wait_until_stopped(pid: int, timeout: float = 5) -> bool:
+    deadline = time.monotonic() + timeout
+    while _is_running(pid):
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+class TestExecutor(unittest.TestCase):
+    def test_build_d8_command(self):
+        self.assertEqual(['d8'], build_d8_command())
+        self.assertEqual(['d8', 'program.js'], build_d8_command('program.js'))
+        self.assertEqual(['d8', 'program.js', '--trace-opt'], build_d8_command('program.js', ['--trace-opt']))
+        self.assertEqual(['d8', '-e', '1'], build_d8_command(args=['-e', '1']))
+
+    def test_format_command(self):
+        self.assertEqual("d8 program.js", format_command(['d8', 'program.js']))
+        self.assertEqual("d8 'my program.js' < 'input file'", format_command(['d8', 'my program.js'], 'input file'))
+
+    def test_exit_status(self):
+        self.assertEqual(0, exit_status(0))
+        self.assertEqual(3, exit_status(3))
+        self.assertEqual(137, exit_status(-9))
+
+    # region run_process
+
+    def test_run_process_real_exit_status(self):
+        self.assertEqual(3, run_process(['sh', '-c', 'exit 3']).code)
+        self.assertEqual(137, run_process(['sh', '-c', 'kill -9 $$']).code)
+
+    def test_run_process_capture(self):
+        result = run_process(['sh', '-c', 'echo out; echo err >&2'], capture=True)
+        self.assertEqual(0, result.code)
+        self.assertEqual(b"out\n", result.stdout)
+        self.assertEqual(b"err\n", result.stderr)
+
+    def test_run_process_stdin_path_with_special_characters(self):
+        with tempfile.TemporaryDirectory() as tmp_dir_name:
+            file = os.path.join(tmp_dir_name, "it's an input.txt")
+            with open(file, "w") as f:
+                f.write("input\n")
+
+            result = run_process(['cat'], stdin_path=file, capture=True)
+            self.assertEqual(b"input\n", result.stdout)
+
+    def test_run_process_resource_usage(self):
+        result = run_process(['sh', '-c', 'exit 3'])
+        self.assertEqual(3, result.code)
+        self.assertGreater(result.usage.wall_time, 0)
+        self.assertGreater(result.usage.max_rss, 0)
+        self.assertGreaterEqual(result.usage.user_time + result.usage.system_time, 0)
+        self.assertGreaterEqual(result.usage.voluntary_switches + result.usage.involuntary_switches, 0)
+
+        result = run_process(['sh', '-c', 'kill -9 $$'])
+        self.assertEqual(137, result.code)
+        self.assertIsNotNone(result.usage)
+
+    def test_run_process_command_not_found(self):
+        result = run_process(['no-such-command-for-test'], capture=True)
+        self.assertEqual(127, result.code)
+        self.assertEqual(b"no-such-command-for-test: command not found\n", result.stderr)
+
+        result = run_process(['no-such-command-for-test'])
+        self.assertEqual(127, result.code)
+        self.assertIsNone(result.stderr)
+
+    def test_run_process_can_not_execute(self):
+        with tempfile.TemporaryDirectory() as tmp_dir_name:
+            file = os.path.join(tmp_dir_name, "not-executable")
+            with open(file, "w") as f:
+                f.write("")
+            os.chmod(file, 0o755)
+
+            # `shutil.which` finds the file, but it can not be executed because it has no interpreter line.
+            with mock.patch.dict(os.environ, {'PATH': tmp_dir_name}):
+                result = run_process(['not-executable'], capture=True)
+            self.assertEqual(126, result.code)
+            self.assertEqual(b"not-executable: Exec format error\n", result.stderr)
+
+    def test_run_process_not_spawned_with_output_paths(self):
+        with tempfile.TemporaryDirectory() as tmp_dir_name:
+            stdout_path = os.path.join(tmp_dir_name, "input.out")
+            stderr_path = os.path.join(tmp_dir_name, "input.err")
+            with open(stdout_path, "w") as f:
+                f.write("old output")
+
+            result = run_process(['no-such-command-for-test'], capture=True, stdout_path=stdout_path,
+                                 stderr_path=stderr_path)
+            self.assertEqual((127, None, None), (result.code, result.stdout, result.stderr))
+            with open(stdout_path) as f:
+                self.assertEqual("", f.read())
+            with open(stderr_path) as f:
+                self.assertEqual("no-such-command-for-test: command not found\n", f.read())
+
+    # endregion
+
+    # region copy_file_to
+
+    # region resource limits
+
+    def test_resource_limits_has_limits(self):
+        self.assertFalse(ResourceLimits().has_limits())
+        self.assertTrue(ResourceLimits(max_output_bytes=1).has_limits())
+
+    def test_run_process_timeout_kills_the_group(self):
+        start = time.monotonic()
+        result = run_process(['sh', '-c', 'sleep 30 & echo $!; wait'], capture=True,
+                             limits=ResourceLimits(timeout=0.3))
+        self.assertLess(time.monotonic() - start, 10)
+        self.assertEqual((137, LimitStatus.TIMEOUT), (result.code, result.limit))
+        self.assertTrue(_wait_until_stopped(int(result.stdout)))
+
+    def test_run_process_kills_the_rest_of_the_group(self):
+        result = run_process(['sh', '-c', 'sleep 30 > /dev/null & echo $!'], capture=True, limits=ResourceLimits())
+        self.assertEqual((0, None), (result.code, result.limit))
+        self.assertTrue(_wait_until_stopped(int(result.stdout)))
+
+    def test_run_process_cpu_limit(self):
+        result = run_process(['sh', '-c', 'while :; do :; done'], limits=ResourceLimits(cpu_time=1))
+        self.assertEqual((152, LimitStatus.TIMEOUT), (result.code, result.limit))
+
+    def test_run_process_output_limit_of_files(self):
+        result = run_process(['sh', '-c', 'exec head -c 100000 /dev/zero'], capture=True,
+                             limits=ResourceLimits(max_output_bytes=1000))
+        self.assertEqual((153, LimitStatus.OUTPUT_LIMIT), (result.code, result.limit))
+        self.assertEqual(1000, len(result.stdout))
+
+    def test_run_process_output_limit_of_streamed_stdout(self):
+        chunks = []
+        with tempfile.TemporaryDirectory() as tmp_dir_name:
+            stdout_path = os.path.join(tmp_dir_name, 'out')
+            result = run_process(['sh', '-c', 'while :; do echo 123456789; done'], stdout_path=stdout_path,
+                                 on_stdout=lambda chunk: chunks.append(chunk) is None,
+                                 limits=ResourceLimits(max_output_bytes=25))
+            with open(stdout_path, 'rb') as f:
+                self.assertEqual(b"123456789\n123456789\n12345", f.read())
+        self.assertEqual((137, LimitStatus.OUTPUT_LIMIT), (result.code, result.limit))
+        self.assertEqual(b"123456789\n123456789\n12345", b''.join(chunks))
+
+    def test_run_process_out_of_memory(self):
+        result = run_process(['sh', '-c', 'kill -SEGV $$'], limits=ResourceLimits(memory=1024 ** 3))
+        self.assertEqual((139, LimitStatus.OOM), (result.code, result.limit))
+        # Without a memory limit, a crash is not related to the memory.
+        result = run_process(['sh', '-c', 'kill -SEGV $$'], limits=ResourceLimits())
+        self.assertEqual((139, None), (result.code, result.limit))
+        result = run_process(['sh', '-c', 'exit 3'], limits=ResourceLimits(memory=1024 ** 3))
+        self.assertEqual((3, None), (result.code, result.limit))
+        # The process is killed because its output is not needed anymore, not because of the memory.
+        result = run_process(['sh', '-c', 'while :; do echo 1; done'], on_stdout=lambda chunk: False,
+                             limits=ResourceLimits(memory=1024 ** 3))
+        self.assertEqual((137, None), (result.code, result.limit))
+
+    def test_run_process_limits_are_capped_by_the_hard_limits(self):
+        calls = []
+
+        def prlimit(pid, limit_resource, limits=None):
+            if limits is None:
+                return 0, 5
+            calls.append((limit_resource, limits))
+            return 0, 5
+
+        with mock.patch.object(resource, 'prlimit', side_effect=prlimit):
+            result = run_process(['true'], limits=ResourceLimits(cpu_time=10))
+        self.assertEqual(0, result.code)
+        self.assertEqual([(resource.RLIMIT_CPU, (5, 5))], calls)
+
+    def test_run_process_interrupted(self):
+        def interrupt(_chunk):
+            raise KeyboardInterrupt()
+
+        start = time.monotonic()
+        with self.assertRaises(KeyboardInterrupt):
+            run_process(['sh', '-c', 'echo 1; sleep 30'], on_stdout=interrupt, limits=ResourceLimits())
+        with self.assertRaises(KeyboardInterrupt):
+            run_process(['sh', '-c', 'echo 1; exec sleep 30'], on_stdout=interrupt)
+        self.assertLess(time.monotonic() - start, 10)
+        self.assertEqual(set(), executor._running_groups)
+
+    def test_process_group_keeps_the_first_reason_to_kill(self):
+        with subprocess.Popen(['sleep', '30'], start_new_session=True) as process:
+            group = executor.ProcessGroup(process.pid, ResourceLimits())
+            group.kill(LimitStatus.TIMEOUT)
+            group.kill()
+            group.close()
+        self.assertEqual((True, LimitStatus.TIMEOUT), (group.killed, group.exceeded))
+        self.assertEqual(-9, process.returncode)
+        # The group does not exist anymore.
+        group.close()
+
+    def test_kill_running_processes(self):
+        results = []
+        thread = threading.Thread(target=lambda: results.append(
+            run_process(['sleep', '30'], limits=ResourceLimits())))
+        thread.start()
+        deadline = time.monotonic() + 5
+        while not executor._running_groups and time.monotonic() < deadline:
+            time.sleep(0.01)
+        kill_running_processes()
+        thread.join(10)
+        self.assertEqual((137, None), (results[0].code, results[0].limit))
+
+    # endregion
+
+    def test_copy_file_to_file(self):
+        with tempfile.TemporaryDirectory() as tmp_dir_name:
+            source = os.path.join(tmp_dir_name, "source")
+            with open(source, "wb") as f:
+                f.write(b"x" * 100000)
+
+            with open(os.path.join(tmp_dir_name, "target"), "w+b") as target:
+                target.write(b"head:")
+                copy_file_to(source, target)
+                target.seek(0)
+                self.assertEqual(b"head:" + b"x" * 100000, target.read())
+
+    def test_copy_file_to_stream_without_descriptor(self):
+        with tempfile.TemporaryDirectory() as tmp_dir_name:
+            source = os.path.join(tmp_dir_name, "source")
+            with open(source, "wb") as f:
+                f.write(b"content")
+
+            target = io.BytesIO()
+            copy_file_to(source, target)
+            self.assertEqual(b"content", target.getvalue())
+
+    # endregion
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+import json
+import os
+import tempfile
+import unittest
+
+from docker_entrypoint._libs.gc_trace import (MARK_COMPACT, SCAVENGE, GcStats,
+                                              GcTrace, format_gc_json,
+                                              format_gc_report, parse_gc_event)
+
+TRACE = """[100:0x55]       10 ms: Scavenge 4.0 (6.0) -> 3.0 (7.0) MB, 1.00 / 0.00 ms  (average mu = 1.000, current mu = 1.000) allocation failure; 
+hello from the program
+[100:0x66]        5 ms: Mark-Compact 1.0 (2.0) -> 0.5 (2.0) MB, 0.50 / 0.00 ms  (+ 0.1 ms in 2 steps since start of marking, biggest step 0.1 ms, walltime since start of marking 1 ms) (average mu = 1.000, current mu = 1.000) finalize incremental marking via task; GC in old space requested
+[100:0x55]       20 ms: Scavenge (interleaved) 8.0 (10.0) -> 5.0 (10.0) MB, pooled: 0.0 MB, 2.00 / 0.00 ms (average mu = 1.000, current mu = 1.000) allocation failure;
+[100:0x55]       40 ms: Mark-Compact (reduce) 9.0 (12.0) -> 2.0 (8.0) MB, 4.00 / 0.00 ms  (average mu = 0.900, current mu = 0.900) low memory notification; GC in old space requested
+[100:0x55]       50 ms: Minor Mark-Sweep 6.0 (9.0) -> 4.0 (9.0) MB, 3.00 / 0.00 ms  (average mu = 0.900, current mu = 0.900) allocation failure;
+"""
+
+
+class TestGcTrace(unittest.TestCase):
+    def test_parse_gc_event(self):
+        isolate, event = parse_gc_event(TRACE.splitlines()[3])
+        self.assertEqual('100:0x55', isolate)
+        self.assertEqual((20.0, SCAVENGE, 8.0, 5.0, 10.0, 2.0), (event.time, event.kind, event.before, event.after,
+                                                               event.committed, event.pause))
+        self.assertEqual(MARK_COMPACT, parse_gc_event(TRACE.splitlines()[4])[1].kind)
+        self.assertEqual(SCAVENGE, parse_gc_event(TRACE.splitlines()[5])[1].kind)
+        self.assertEqual('', parse_gc_event('7 ms: Mark-Compact 1.0 (2.0) -> 0.5 (2.0) MB, 0.50 / 0.00 ms')[0])
+        self.assertEqual((None, None), parse_gc_event('hello from the program'))
+
+    def test_stats(self):
+        trace = GcTrace()
+        trace.add_lines(TRACE.splitlines(), 0.1)
+        self.assertEqual([4, 1], [len(events) for events in trace.isolates])
+        stats = GcStats(trace)
+
+        self.assertEqual({'count': 3, 'total': 6.0, 'p50': 2.0, 'p99': 2.98, 'max': 3.0},
+                         {key: round(value, 6) for key, value in stats.pauses[SCAVENGE].items()})
+        self.assertEqual({'count': 2, 'total': 4.5, 'p50': 2.25, 'p99': 3.965, 'max': 4.0},
+                         {key: round(value, 6) for key, value in stats.pauses[MARK_COMPACT].items()})
+        self.assertEqual(5, stats.pauses['all']['count'])
+        self.assertEqual([0.06, 0.045, 0.105], [round(share, 6) for share in stats.shares.values()])
+        self.assertEqual((9.0, 10.0, 2.0), (stats.peak_used, stats.peak_committed, stats.live))
+        # 18 MB allocated and 4 MB promoted in the 50 ms and the 5 ms of the isolates.
+        self.assertAlmostEqual(18 / 0.055, stats.allocation_rate)
+        self.assertAlmostEqual(4 / 0.055, stats.promotion_rate)
+        self.assertEqual([(10.0, 3.0, 7.0), (20.0, 5.0, 10.0), (40.0, 2.0, 8.0), (50.0, 4.0, 9.0)], stats.timeline)
+        # The mark-compacts take less than 5% of the wall time.
+        self.assertEqual(['--max-semi-space-size=32'], [flag for flag, _ in stats.recommendations])
+
+    def test_recommendations(self):
+        trace = GcTrace()
+        trace.add_lines(TRACE.splitlines(), 0.05)
+        recommendations = GcStats(trace).recommendations
+        self.assertEqual(['--max-semi-space-size=32', '--max-old-space-size=128'],
+                         [flag for flag, _ in recommendations])
+        self.assertEqual("The scavenges take 12.0% of the wall time at 327.3 MB/s of allocations. A semi-space of "
+                         "32 MB fills in about 98 ms, so fewer scavenges run.", recommendations[0][1])
+        self.assertEqual("The mark-compacts take 9.0% of the wall time with 2.0 MB of live objects and 72.7 MB/s of "
+                         "promotions. An old space of 128 MB holds them for about 1 s between mark-compacts.",
+                         recommendations[1][1])
+
+    def test_format_gc_report(self):
+        trace = GcTrace()
+        trace.add_lines(TRACE.splitlines(), 0.1)
+        self.assertEqual(
+            "Kind          Count     Total      p50      p99      Max  Wall %\n"
+            "scavenge          3   6.00 ms  2.00 ms  2.98 ms  3.00 ms    6.0%\n"
+            "mark-compact      2   4.50 ms  2.25 ms  3.96 ms  4.00 ms    4.5%\n"
+            "all               5  10.50 ms  2.00 ms  3.96 ms  4.00 ms   10.5%\n"
+            "\n"
+            "Heap: peak 9.0 MB used, 10.0 MB committed, 2.0 MB live after the mark-compacts.\n"
+            "Allocation rate: 327.3 MB/s, promotion rate: 72.7 MB/s.\n"
+            "Heap after the collections:\n"
+            "        10 ms       3.0 MB used       7.0 MB committed\n"
+            "        20 ms       5.0 MB used      10.0 MB committed\n"
+            "        40 ms       2.0 MB used       8.0 MB committed\n"
+            "        50 ms       4.0 MB used       9.0 MB committed\n"
+            "\n"
+            "Suggested flags:\n"
+            "  --max-semi-space-size=32: The scavenges take 6.0% of the wall time at 327.3 MB/s of allocations. A "
+            "semi-space of 32 MB fills in about 98 ms, so fewer scavenges run.",
+            format_gc_report(GcStats(trace)))
+
+    def test_unknown_wall_time(self):
+        trace = GcTrace()
+        trace.add_lines(["0 ms: Scavenge 2.0 (3.0) -> 1.0 (3.0) MB, 1.00 / 0.00 ms" for _ in range(25)])
+        stats = GcStats(trace)
+        self.assertEqual({SCAVENGE: None, MARK_COMPACT: None, 'all': None}, stats.shares)
+        self.assertEqual((None, None, None), (stats.live, stats.allocation_rate, stats.promotion_rate))
+        self.assertEqual(8, len(stats.timeline))
+        self.assertEqual([], stats.recommendations)
+
+        report = format_gc_report(stats)
+        self.assertIn("mark-compact      0   0.00 ms  0.00 ms  0.00 ms  0.00 ms       -\n", report)
+        self.assertIn("Heap: peak 2.0 MB used, 3.0 MB committed, - live after the mark-compacts.\n"
+                      "Allocation rate: -, promotion rate: -.\n", report)
+        self.assertTrue(report.endswith("\nNo heap flags are suggested: the wall time of the runs is not known."))
+
+        empty = format_gc_report(GcStats(GcTrace()))
+        self.assertNotIn("Heap after the collections:", empty)
+
+        trace.add_lines([], 1.0)
+        self.assertTrue(format_gc_report(GcStats(trace)).endswith(
+            "\nNo heap flags are suggested: the collections take less than 5% of the wall time of each generation."))
+
+    def test_add_file_and_json(self):
+        trace = GcTrace()
+        with tempfile.TemporaryDirectory() as tmp_dir_name:
+            path = os.path.join(tmp_dir_name, 'stdout')
+            with open(path, 'w', encoding='utf-8') as file:
+                file.write(TRACE)
+            trace.add_file(path, 0.05)
+            trace.add_file(path, 0.05)
+        self.assertEqual(4, len(trace.isolates))
+        self.assertEqual(0.1, trace.wall_time)
+
+        report = json.loads(format_gc_json(GcStats(trace)))
+        self.assertEqual(10, report['pauses']['all']['count'])
+        self.assertAlmostEqual(0.12, report['wall_time_shares'][SCAVENGE])
+        self.assertEqual({'time_ms': 10.0, 'used_mb': 3.0, 'committed_mb': 7.0}, report['heap']['timeline'][0])
+        self.assertEqual(2.0, report['heap']['live_mb'])
+        self.assertEqual('--max-semi-space-size=32', report['recommendations'][0]['flag'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from docker_entrypoint._libs.input_walker import (natural_sort_key, prefetch,
+                                                  walk_inputs)
+
+
+class TestInputWalker(unittest.TestCase):
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self.tmp_dir = self._tmp_dir.name
+
+    def tearDown(self):
+        self._tmp_dir.cleanup()
+
+    def _write(self, name: str) -> str:
+        path = os.path.join(self.tmp_dir, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(name)
+        return path
+
+    def _relative(self, paths):
+        return [os.path.relpath(path, self.tmp_dir) for path in paths]
+
+    def test_natural_sort_key(self):
+        names = ['10.txt', '2.txt', 'a10', 'a2b', 'a2a', '1.txt', '01.txt', 'b']
+        self.assertEqual(['01.txt', '1.txt', '2.txt', '10.txt', 'a2a', 'a2b', 'a10', 'b'],
+                         sorted(names, key=natural_sort_key))
+
+    def test_walk_inputs_depth_and_order(self):
+        for name in ('in/10.txt', 'in/2.txt', 'in/sub/1.txt', 'in/sub/deep/1.txt', 'in/a/1.txt'):
+            self._write(name)
+        inputs = os.path.join(self.tmp_dir, 'in')
+
+        self.assertEqual(['in/2.txt', 'in/10.txt'], self._relative(walk_inputs([inputs])))
+        self.assertEqual(['in/2.txt', 'in/10.txt', 'in/a/1.txt', 'in/sub/1.txt'],
+                         self._relative(walk_inputs([inputs], max_depth=2)))
+        self.assertEqual(['in/2.txt', 'in/10.txt', 'in/a/1.txt', 'in/sub/1.txt', 'in/sub/deep/1.txt'],
+                         self._relative(walk_inputs([inputs], max_depth=10)))
+
+    def test_walk_inputs_include_and_exclude(self):
+        for name in ('in/1.txt', 'in/1.ans', 'in/sub/2.txt', 'in/skip/3.txt', 'in/sub/skip.txt'):
+            self._write(name)
+        inputs = os.path.join(self.tmp_dir, 'in')
+
+        self.assertEqual(['in/1.txt', 'in/sub/2.txt'],
+                         self._relative(walk_inputs([inputs], include=['*.txt'], exclude=['skip*'], max_depth=2)))
+        self.assertEqual(['in/sub/2.txt', 'in/sub/skip.txt'],
+                         self._relative(walk_inputs([inputs], include=['sub/*'], max_depth=2)))
+        # The filters only apply to the files that are found in directories.
+        self.assertEqual(['in/1.ans'],
+                         self._relative(walk_inputs([os.path.join(inputs, '1.ans')], include=['*.txt'])))
+
+    def test_walk_inputs_deduplicates_files_and_skips_loops(self):
+        first = self._write('in/1.txt')
+        self._write('in/2.txt')
+        inputs = os.path.join(self.tmp_dir, 'in')
+        os.symlink(first, os.path.join(inputs, '3.txt'))
+        os.symlink(inputs, os.path.join(inputs, 'loop'))
+        os.symlink(os.path.join(self.tmp_dir, 'missing'), os.path.join(inputs, 'broken'))
+
+        self.assertEqual(['in/1.txt', 'in/2.txt'],
+                         self._relative(walk_inputs([first, first, inputs, inputs, 'missing'], max_depth=10)))
+
+    def test_walk_inputs_skips_unreadable_directories(self):
+        self._write('in/1.txt')
+        self._write('in/locked/2.txt')
+        locked = os.path.join(self.tmp_dir, 'in', 'locked')
+        scandir = os.scandir
+
+        def scandir_except_locked(path):
+            if path == locked:
+                raise PermissionError(path)
+            return scandir(path)
+
+        with mock.patch('os.scandir', side_effect=scandir_except_locked):
+            self.assertEqual(['in/1.txt'], self._relative(walk_inputs([os.path.join(self.tmp_dir, 'in')],
+                                                                      max_depth=2)))
+
+    def test_prefetch(self):
+        self.assertEqual(list(range(100)), list(prefetch(iter(range(100)), size=3)))
+
+        def fail():
+            yield 1
+            raise OSError("broken")
+
+        items = prefetch(fail())
+        self.assertEqual(1, next(items))
+        with self.assertRaises(OSError):
+            next(items)
+
+    def test_prefetch_stops_the_producer_when_the_consumer_stops(self):
+        produced = []
+        finished = threading.Event()
+
+        def produce():
+            try:
+                for index in range(1000):
+                    produced.append(index)
+                    yield index
+            finally:
+                finished.set()
+
+        with mock.patch('docker_entrypoint._libs.input_walker._PUT_INTERVAL', 0.01):
+            items = prefetch(produce(), size=2)
+            self.assertEqual(0, next(items))
+            # The producer waits for the full queue until the consumer stops.
+            while len(produced) < 4:
+                time.sleep(0.01)
+            time.sleep(0.05)
+            items.close()
+        self.assertTrue(finished.wait(5))
+        self.assertLess(len(produced), 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,189 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from docker_entrypoint._libs.executor import (LimitStatus, ProcessResult,
+                                              ResourceLimits)
+from docker_entrypoint._libs.judge import (Comparator, ExactComparator,
+                                           Expectation,
+                                           FloatComparator, Verdict,
+                                           WhitespaceComparator,
+                                           find_expected_file, judge_output,
+                                           judge_process)
+
+
+class TestJudge(unittest.TestCase):
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self.tmp_dir = self._tmp_dir.name
+
+    def tearDown(self):
+        self._tmp_dir.cleanup()
+
+    def _write(self, name: str, content: bytes) -> str:
+        path = os.path.join(self.tmp_dir, name)
+        with open(path, 'wb') as f:
+            f.write(content)
+        return path
+
+    # region comparators
+
+    def test_exact_comparator(self):
+        comparator = ExactComparator(b"1 2\n3\n")
+        self.assertTrue(comparator.feed(b"1 2"))
+        self.assertTrue(comparator.feed(b"\n3\n"))
+        self.assertTrue(comparator.finish())
+        self.assertIsNone(comparator.mismatch)
+
+    def test_exact_comparator_mismatch(self):
+        comparator = ExactComparator(b"1 2\n3\n")
+        self.assertTrue(comparator.feed(b"1 "))
+        self.assertFalse(comparator.feed(b"5\n"))
+        self.assertEqual("The output differs from the expected output at byte 2.", comparator.mismatch)
+
+    def test_exact_comparator_longer_and_shorter_output(self):
+        comparator = ExactComparator(b"1\n")
+        self.assertFalse(comparator.feed(b"1\n2\n"))
+        self.assertEqual("The output differs from the expected output at byte 2.", comparator.mismatch)
+
+        comparator = ExactComparator(b"1\n")
+        self.assertTrue(comparator.feed(b"1"))
+        self.assertFalse(comparator.finish())
+        self.assertEqual("The output ended after 1 bytes, but the expected output has 2 bytes.", comparator.mismatch)
+
+    def test_whitespace_comparator(self):
+        comparator = WhitespaceComparator(b"12 345\n6\n")
+        self.assertTrue(comparator.feed(b"12\t3"))
+        self.assertTrue(comparator.feed(b"45 "))
+        self.assertTrue(comparator.feed(b"  6"))
+        self.assertTrue(comparator.finish())
+
+    def test_whitespace_comparator_mismatch(self):
+        comparator = WhitespaceComparator(b"1 2 3")
+        self.assertFalse(comparator.feed(b"1 4 "))
+        self.assertEqual("Token 2: expected '2', found '4'.", comparator.mismatch)
+
+        comparator = WhitespaceComparator(b"1")
+        self.assertFalse(comparator.feed(b"1 " + b"x" * 40 + b" "))
+        self.assertEqual(f"Token 2: expected the end of the output, found '{'x' * 32}...'.", comparator.mismatch)
+
+        comparator = WhitespaceComparator(b"1 2")
+        self.assertTrue(comparator.feed(b"1"))
+        self.assertFalse(comparator.finish())
+        self.assertEqual("The output ended after 1 tokens, but the expected output continues with '2'.",
+                         comparator.mismatch)
+
+        comparator = WhitespaceComparator(b"12")
+        self.assertTrue(comparator.feed(b"13"))
+        self.assertFalse(comparator.finish())
+        self.assertEqual("Token 1: expected '12', found '13'.", comparator.mismatch)
+
+    def test_float_comparator(self):
+        comparator = FloatComparator(b"0.3333333 1000000 abc", tolerance=1e-6)
+        self.assertTrue(comparator.feed(b"0.33333333 1000000.5 abc"))
+        self.assertTrue(comparator.finish())
+
+        comparator = FloatComparator(b"0.5 abc", tolerance=1e-6)
+        self.assertFalse(comparator.feed(b"0.50001 abc"))
+        comparator = FloatComparator(b"abc", tolerance=1e-6)
+        self.assertFalse(comparator.feed(b"abd "))
+
+    # endregion
+
+    # region Expectation
+
+    def test_incomplete_comparator(self):
+        class FeedOnlyComparator(Comparator):
+            def feed(self, chunk: bytes) -> bool:
+                return True
+
+        with self.assertRaises(TypeError):
+            FeedOnlyComparator(b"")
+
+    def test_expectation_comparators(self):
+        path = self._write('1.ans', b"1.0\n")
+        with Expectation(path).open_comparator() as comparator:
+            self.assertIsInstance(comparator, ExactComparator)
+        with Expectation(path, 'whitespace').open_comparator() as comparator:
+            self.assertIsInstance(comparator, WhitespaceComparator)
+        with Expectation(path, 'float', 0.1).open_comparator() as comparator:
+            self.assertIsInstance(comparator, FloatComparator)
+            self.assertTrue(comparator.feed(b"1.05"))
+            self.assertTrue(comparator.finish())
+
+    def test_expectation_maps_large_files(self):
+        path = self._write('1.ans', b"12345\n" * 10)
+        with mock.patch('docker_entrypoint._libs.judge._MMAP_THRESHOLD', 16), \
+                Expectation(path, 'whitespace').open_comparator() as comparator:
+            self.assertTrue(comparator.feed(b"12345 " * 10))
+            self.assertTrue(comparator.finish())
+
+    def test_find_expected_file(self):
+        self.assertIsNone(find_expected_file(self.tmp_dir, 'inputs/1.txt'))
+        out_path = self._write('1.out', b"")
+        self.assertEqual(out_path, find_expected_file(self.tmp_dir, 'inputs/1.txt'))
+        ans_path = self._write('1.ans', b"")
+        self.assertEqual(ans_path, find_expected_file(self.tmp_dir, 'inputs/1.txt'))
+        # The suffix of a compressed input is not part of the name.
+        self.assertEqual(ans_path, find_expected_file(self.tmp_dir, 'inputs/1.in.gz'))
+        self.assertEqual(ans_path, find_expected_file(self.tmp_dir, 'inputs/1.zst'))
+
+    # endregion
+
+    # region judge
+
+    def test_judge_process_accepted(self):
+        input_file = self._write('1.txt', b"hello\n")
+        expected = Expectation(self._write('1.ans', b"hello\n"))
+        result = judge_process(['sh', '-c', 'cat; echo log >&2'], input_file, expected, capture=True)
+        self.assertEqual((Verdict.ACCEPTED, None, 0), (result.verdict, result.message, result.code))
+        self.assertEqual((None, b"log\n"), (result.stdout, result.stderr))
+
+    def test_judge_process_kills_wrong_answer(self):
+        input_file = self._write('1.txt', b"")
+        expected = Expectation(self._write('1.ans', b"1\n"))
+        # Without the early kill, the process would print forever.
+        result = judge_process(['sh', '-c', 'while true; do echo 2; done'], input_file, expected)
+        self.assertEqual((Verdict.WRONG_ANSWER, "The output differs from the expected output at byte 0."),
+                         (result.verdict, result.message))
+        self.assertEqual(137, result.code)
+
+    def test_judge_process_runtime_error_and_output_file(self):
+        input_file = self._write('1.txt', b"")
+        expected = Expectation(self._write('1.ans', b"1\n2\n"))
+        stdout_path = os.path.join(self.tmp_dir, '1.txt.out')
+        stderr_path = os.path.join(self.tmp_dir, '1.txt.err')
+        result = judge_process(['sh', '-c', 'echo 1; echo failed >&2; exit 3'], input_file, expected, capture=True,
+                               stdout_path=stdout_path, stderr_path=stderr_path)
+        self.assertEqual((Verdict.RUNTIME_ERROR, "The program exited with code 3."), (result.verdict, result.message))
+        self.assertEqual((None, None), (result.stdout, result.stderr))
+        with open(stdout_path) as f:
+            self.assertEqual("1\n", f.read())
+        with open(stderr_path) as f:
+            self.assertEqual("failed\n", f.read())
+
+    def test_judge_process_limit_is_the_verdict(self):
+        input_file = self._write('1.txt', b"")
+        expected = Expectation(self._write('1.ans', b"1\n"))
+        result = judge_process(['sh', '-c', 'echo 1; exec sleep 30'], input_file, expected,
+                               limits=ResourceLimits(timeout=0.2))
+        self.assertEqual((LimitStatus.TIMEOUT, "The program was stopped with code 137.", LimitStatus.TIMEOUT),
+                         (result.verdict, result.message, result.limit))
+
+    def test_judge_output(self):
+        expected = Expectation(self._write('1.ans', b"1\n2\n"), 'whitespace')
+        result = judge_output(ProcessResult(0, b"1 2", b""), expected)
+        self.assertEqual((Verdict.ACCEPTED, b"1 2"), (result.verdict, result.stdout))
+
+        result = judge_output(ProcessResult(0, b"1", b""), expected)
+        self.assertEqual(Verdict.WRONG_ANSWER, result.verdict)
+
+        result = judge_output(ProcessResult(1), expected)
+        self.assertEqual(Verdict.RUNTIME_ERROR, result.verdict)
+
+    # endregion
+
+
+if __name__ == '__main__':
+    unittest.main()
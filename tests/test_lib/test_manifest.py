@@ -0,0 +1,98 @@
+import os
+import tempfile
+import unittest
+
+from docker_entrypoint._libs.executor import ProcessResult, ResourceUsage
+from docker_entrypoint._libs.ExitCodes import ExitCode
+from docker_entrypoint._libs.judge import JudgedResult, Verdict
+from docker_entrypoint._libs.manifest import (JobResult, ManifestError,
+                                              ManifestJob, read_manifest)
+
+
+class TestManifest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, 'jobs.jsonl')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _read(self, content: str):
+        with open(self.path, 'w', encoding='utf-8') as file:
+            file.write(content)
+        return read_manifest(self.path)
+
+    def test_read_manifest(self):
+        jobs = self._read('{"program": "a.js"}\n'
+                          '\n'
+                          '{"id": "b", "program": "/src/b.js", "inputs": ["in", "/in/1.txt"], "args": ["x"], '
+                          '"flags": ["--jitless"], "priority": -2, "timeout": 1.5, "expected": "ans"}\n'
+                          '{"id": 7, "program": "c.js", "timeout": null}\n')
+
+        self.assertEqual(['1', 'b', '7'], [job.id for job in jobs])
+        first = jobs[0]
+        self.assertEqual((os.path.join(self.tmp_dir.name, 'a.js'), [], [], [], 0, None, None),
+                         (first.program, first.inputs, first.args, first.flags, first.priority, first.timeout,
+                          first.expected))
+        # The relative paths are relative to the directory of the manifest.
+        second = jobs[1]
+        self.assertEqual(('/src/b.js', [os.path.join(self.tmp_dir.name, 'in'), '/in/1.txt'], ['x'], ['--jitless'], -2,
+                          1.5, os.path.join(self.tmp_dir.name, 'ans')),
+                         (second.program, second.inputs, second.args, second.flags, second.priority, second.timeout,
+                          second.expected))
+
+    def test_read_manifest_errors(self):
+        for content, message in (
+                ('{"program": "a.js"}\nnot json\n', "Line 2 of '{path}': Expecting value: line 1 column 1 (char 0)"),
+                ('["a.js"]', "Line 1 of '{path}': The line is not a JSON object."),
+                ('{"program": "a.js", "input": []}',
+                 "Line 1 of '{path}': Unknown field 'input'. The fields are: id, program, inputs, args, flags, "
+                 "priority, timeout, expected."),
+                ('{"program": ""}', "Line 1 of '{path}': The program must be a non-empty string."),
+                ('{"program": "a.js", "priority": true}', "Line 1 of '{path}': The priority must be an integer."),
+                ('{"program": "a.js", "timeout": 0}',
+                 "Line 1 of '{path}': The timeout must be null or a positive number."),
+                ('{"id": "../x", "program": "a.js"}',
+                 "Line 1 of '{path}': The id must be a string of letters, digits, '.', '_' and '-', or an integer."),
+                ('{"id": 2, "program": "a.js"}\n{"program": "b.js"}',
+                 "Line 2 of '{path}': The id '2' is not unique."),
+        ):
+            with self.assertRaises(ManifestError) as context:
+                self._read(content)
+            self.assertEqual(message.format(path=self.path), str(context.exception))
+
+        with open(self.path, 'wb') as file:
+            file.write(b'\xff\xfe{}\n')
+        with self.assertRaisesRegex(ManifestError, f"The manifest '{self.path}' can not be read: It is not valid "
+                                                   "UTF-8."):
+            read_manifest(self.path)
+
+        missing = os.path.join(self.tmp_dir.name, 'missing.jsonl')
+        with self.assertRaisesRegex(ManifestError, f"The manifest '{missing}' can not be read: No such file or "
+                                                   "directory."):
+            read_manifest(missing)
+
+    def test_job_result(self):
+        job = ManifestJob('a', 'a.js')
+        job_result = JobResult(job, 3)
+        job_result.add('1.txt', ProcessResult(code=0, usage=ResourceUsage(wall_time=0.5)))
+        job_result.add('2.txt', ProcessResult(code=124, limit='TIMEOUT'))
+        self.assertEqual((1, 124), (job_result.remaining, job_result.code))
+        # A wrong answer fails the job.
+        job_result.add('3.txt', JudgedResult(ProcessResult(code=0), Verdict.WRONG_ANSWER, 'line 1 differs'))
+
+        self.assertEqual({'id': 'a', 'program': 'a.js', 'code': ExitCode.GENERAL_ERROR, 'inputs': [
+            {'file': '1.txt', 'code': 0, 'status': None, 'wall_time': 0.5},
+            {'file': '2.txt', 'code': 124, 'status': 'TIMEOUT', 'wall_time': None},
+            {'file': '3.txt', 'code': 0, 'status': None, 'wall_time': None, 'verdict': Verdict.WRONG_ANSWER,
+             'message': 'line 1 differs'},
+        ]}, job_result.to_dict())
+        self.assertEqual(0, job_result.remaining)
+
+        job_result = JobResult(job, error='The program is missing.')
+        self.assertEqual({'id': 'a', 'program': 'a.js', 'code': ExitCode.IO_ERROR, 'inputs': [],
+                          'error': 'The program is missing.'}, job_result.to_dict())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from on_rails import ValidationError, assert_result, assert_result_with_type
+
+from docker_entrypoint._libs.ExitCodes import ExitCode
+from docker_entrypoint._libs.manifest_command import command_run_manifest
+from docker_entrypoint._libs.RunOptions import RunOptions
+from tests._helpers import assert_fail_result_detail, fake_d8, get_logger
+
+
+class TestManifestCommand(unittest.TestCase):
+
+    # region command_run_manifest
+
+    _MANIFEST_D8 = ("import sys\n"
+                    "data = sys.stdin.read()\n"
+                    "print(' '.join(arg for arg in sys.argv[1:] if arg.startswith('-') or arg == 'x'))\n"
+                    "sys.exit(int(data) if data.strip() else 0)\n")
+
+    def test_command_run_manifest_invalid_params(self):
+        result = command_run_manifest(None, None)
+        assert_result_with_type(self, result, expected_success=False, expected_detail_type=ValidationError)
+
+        logger, _ = get_logger()
+        result = command_run_manifest(logger, 'no-such-manifest.jsonl')
+        assert_fail_result_detail(self, result.detail, ExitCode.IO_ERROR,
+                                  "The manifest 'no-such-manifest.jsonl' can not be read: No such file or directory.")
+
+    def test_command_run_manifest(self):
+        with tempfile.TemporaryDirectory() as tmp_dir_name:
+            for path, content in (('a.js', ''), ('in/1.txt', '0'), ('in/2.txt', '3'), ('ans/1.ans', '\n'),
+                                  ('jobs.jsonl', '{"id": "slow", "program": "a.js", "inputs": ["in"], "args": ["x"], '
+                                                 '"flags": ["--jitless"]}\n'
+                                                 '{"id": "fast", "program": "a.js", "priority": 5, "timeout": 9}\n'
+                                                 '{"id": "judged", "program": "a.js", "inputs": ["in/1.txt"], '
+                                                 '"expected": "ans"}\n'
+                                                 '{"id": "missing", "program": "b.js"}\n')):
+                os.makedirs(os.path.dirname(os.path.join(tmp_dir_name, path)), exist_ok=True)
+                with open(os.path.join(tmp_dir_name, path), 'w') as f:
+                    f.write(content)
+            output_dir = os.path.join(tmp_dir_name, 'out')
+
+            logger, logging_stream = get_logger()
+            with fake_d8(tmp_dir_name, self._MANIFEST_D8), \
+                    mock.patch('sys.stdout', new_callable=io.StringIO) as stdout:
+                result = command_run_manifest(logger, os.path.join(tmp_dir_name, 'jobs.jsonl'),
+                                              RunOptions(jobs=1, output_dir=output_dir, stats='table'))
+
+            # The last job that failed sets the exit code.
+            assert_fail_result_detail(self, result.detail, 3)
+            lines = [json.loads(line) for line in stdout.getvalue().splitlines()]
+            # The jobs that can not run come first, then the jobs by priority, in the order of the manifest.
+            self.assertEqual([('missing', ExitCode.IO_ERROR), ('fast', 0), ('slow', 3), ('judged', 0)],
+                             [(line['id'], line['code']) for line in lines])
+            self.assertEqual(f"File or directory '{os.path.join(tmp_dir_name, 'b.js')}' does not exists.",
+                             lines[0]['error'])
+            self.assertEqual([0, 3], [entry['code'] for entry in lines[2]['inputs']])
+            self.assertEqual(('ACCEPTED', os.path.join(tmp_dir_name, 'in/1.txt')),
+                             (lines[3]['inputs'][0]['verdict'], lines[3]['inputs'][0]['file']))
+
+            with open(os.path.join(output_dir, 'fast.out')) as f:
+                self.assertEqual('\n', f.read())
+            # The inputs outside of the current directory keep their absolute path.
+            slow_output = os.path.join(output_dir, 'slow', tmp_dir_name.lstrip(os.sep), 'in', '2.txt')
+            with open(slow_output + '.out') as f:
+                self.assertEqual('--jitless x\n', f.read())
+            log = logging_stream.getvalue()
+            self.assertIn("[WARNING] --stats can not be used with a manifest and are ignored.\n", log)
+            self.assertIn(f"[INFO] 4 jobs from '{os.path.join(tmp_dir_name, 'jobs.jsonl')}' on 1 workers.\n", log)
+            self.assertIn("[INFO] Jobs: 4 finished, 2 failed.\n", log)
+
+    def test_command_run_manifest_without_output_dir(self):
+        with tempfile.TemporaryDirectory() as tmp_dir_name:
+            manifest = os.path.join(tmp_dir_name, 'jobs.jsonl')
+            with open(manifest, 'w') as f:
+                f.write('{"program": "jobs.jsonl", "inputs": ["jobs.jsonl"]}\n')
+
+            logger, _ = get_logger()
+            with fake_d8(tmp_dir_name, "print('discarded')\n"), \
+                    mock.patch('sys.stdout', new_callable=io.StringIO) as stdout:
+                result = command_run_manifest(logger, manifest)
+            assert_result(self, result, expected_success=True)
+            # The outputs of the programs are discarded, so only the result lines are printed.
+            self.assertEqual([('1', 0)], [(line['id'], line['code'])
+                                          for line in map(json.loads, stdout.getvalue().splitlines())])
+
+    # endregion
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+import json
+import os
+import tempfile
+import unittest
+
+from docker_entrypoint._libs.opt_trace import (OptTrace, format_opt_json,
+                                               format_opt_report)
+
+ADD = '0x1 <JSFunction add </app/a.js> (sfi = 0x2)>'
+TRACE = f"""[marking {ADD} for optimization to MAGLEV, ConcurrencyMode::kConcurrent, reason: hot and stable]
+[compiling method {ADD} (target MAGLEV), mode: ConcurrencyMode::kConcurrent]
+[completed compiling {ADD} (target MAGLEV) - took 0.010, 0.500, 0.010 ms]
+[completed optimizing {ADD} (target MAGLEV)]
+output of the program
+""" + f"""[bailout (kind: deopt-eager, reason: not a Smi): begin. deoptimizing {ADD}, 0x3 <Code MAGLEV>, opt id 0, bytecode offset 2, deopt exit 0, FP to SP delta 32, caller SP 0x4, pc 0x5]
+[compiling method {ADD} (target TURBOFAN) OSR, mode: ConcurrencyMode::kConcurrent]
+[completed optimizing {ADD} (target TURBOFAN) OSR]
+""" * 3 + """[marking dependent code 0x5 <Code TURBOFAN> (0x6 <SharedFunctionInfo get>) (opt id 4) for deoptimization, reason: field-owner]
+[bailout (kind: deopt-lazy, reason: (unknown)): begin. deoptimizing 0x7 <JSFunction get </app/a.js> (sfi = 0x6)>, 0x5 <Code TURBOFAN>, opt id 4, bytecode offset 9, deopt exit 1, FP to SP delta 64, caller SP 0x4, pc 0x5]
+[bailout (kind: deopt-lazy, reason: (unknown)): begin. deoptimizing 0x8 <JSFunction (sfi = 0x9)>, 0x5 <Code TURBOFAN>, opt id 5, bytecode offset 9, deopt exit 1, FP to SP delta 64, caller SP 0x4, pc 0x5]
+[aborted optimizing 0xa <JSFunction big </app/a.js> (sfi = 0xb)> (target TURBOFAN) because: Function is too big - took 0.1, 0.2, 0.3 ms]
+[manually marking 0xc <JSFunction hot </app/a.js> (sfi = 0xd)> for optimization to TURBOFAN, ConcurrencyMode::kSynchronous]
+[completed optimizing 0xc <JSFunction hot </app/a.js> (sfi = 0xd)> (target TURBOFAN)]
+"""
+
+LOG = """code-creation,JS,10,100,0x1000,100,get /app/a.js:1:13,0x2000,~
+code-creation,JS,10,100,0x1100,100,add /app/a.js:4:13,0x2001,~
+code-source-info,0x1000,0,0,20,,,
+LoadIC,0x1010,200,1,28,1,P,0x3000,x,,
+LoadIC,0x1010,201,1,28,P,N,0x3001,x,,
+LoadIC,0x1010,202,1,28,N,P,0x3002,x,,
+KeyedLoadIC,0x1110,203,5,10,0,1,0x3003,0,,
+StoreIC,0x1120,204,6,3,1,P,0x3004,y,,
+LoadGlobalIC,0x9999,205,9,9,1,N,0x3005,z,,
+tick,0x1110,300,0,0x0,0
+tick,0x1110,301,0,0x0,0
+tick,0x1120,302,0,0x0,0
+tick,0x1010,303,0,0x0,0
+tick,0x9999,304,0,0x0,0
+"""
+
+
+class TestOptTrace(unittest.TestCase):
+    def setUp(self):
+        self.trace = OptTrace()
+        self.trace.add_trace_lines(TRACE.splitlines(keepends=True))
+        with tempfile.TemporaryDirectory() as tmp_dir_name:
+            path = os.path.join(tmp_dir_name, 'v8.log')
+            with open(path, 'w', encoding='utf-8') as file:
+                file.write(LOG)
+            self.trace.add_log(path)
+
+    def test_functions(self):
+        add = self.trace.functions['add /app/a.js']
+        self.assertEqual((1, 4, {'MAGLEV': 1, 'TURBOFAN OSR': 3}, {'deopt-eager: not a Smi': 3}, 3, True),
+                         (add.requests, add.attempts, add.tiers, add.deopts, add.reoptimizations, add.deopt_loop))
+        # The reason of a lazy deopt is the reason that its code was marked with.
+        self.assertEqual({'deopt-lazy: field-owner': 1}, self.trace.functions['get /app/a.js'].deopts)
+        self.assertEqual({'deopt-lazy: (unknown)': 1}, self.trace.functions['(anonymous)'].deopts)
+        self.assertEqual({'Function is too big': 1}, self.trace.functions['big /app/a.js'].aborts)
+        hot = self.trace.functions['hot /app/a.js']
+        self.assertEqual((1, 0, {'TURBOFAN': 1}, False), (hot.requests, hot.attempts, hot.tiers, hot.deopt_loop))
+
+        self.assertEqual(['add /app/a.js', '(anonymous)', 'get /app/a.js', 'big /app/a.js'],
+                         [function.name for function in self.trace.ranked_functions()])
+
+    def test_ic_sites(self):
+        sites = [(site.function, site.ic_type, site.key, site.line, site.column, site.state, site.transitions,
+                  site.ticks) for site in self.trace.ranked_ic_sites()]
+        self.assertEqual([
+            ('add /app/a.js:4:13', 'StoreIC', 'y', 6, 3, 'P', 1, 3),
+            ('get /app/a.js:1:13', 'LoadIC', 'x', 1, 28, 'N', 3, 1),
+            ('(unknown)', 'LoadGlobalIC', 'z', 9, 9, 'N', 1, 0),
+        ], sites)
+
+    def test_add_trace_file(self):
+        trace = OptTrace()
+        with tempfile.TemporaryDirectory() as tmp_dir_name:
+            path = os.path.join(tmp_dir_name, 'stdout')
+            with open(path, 'w', encoding='utf-8') as file:
+                file.write(TRACE)
+            trace.add_trace_file(path)
+            trace.add_trace_file(path)
+        self.assertEqual(5, len(trace.functions))
+        self.assertEqual(6, trace.functions['add /app/a.js'].reoptimizations)
+        self.assertEqual(5, self.trace.profile.ticks)
+
+    def test_format_opt_report(self):
+        self.assertEqual(
+            "Functions: 5 traced, 2 optimized, 1 in a deopt loop.\n"
+            "\n"
+            "Deopts and aborted optimizations:\n"
+            "  add /app/a.js (deopt loop): 1 requests, 4 attempts, optimized: MAGLEV x1, TURBOFAN OSR x3\n"
+            "        3  deopt deopt-eager: not a Smi\n"
+            "  (anonymous): 0 requests, 0 attempts, optimized: none\n"
+            "        1  deopt deopt-lazy: (unknown)\n"
+            "\n"
+            "Polymorphic and megamorphic inline caches:\n"
+            "  State        Ticks  Transitions  IC       Key  Position  Function\n"
+            "  polymorphic  3      1            StoreIC  y    6:3       add /app/a.js:4:13\n"
+            "  megamorphic  1      3            LoadIC   x    1:28      get /app/a.js:1:13",
+            format_opt_report(self.trace, 2))
+
+        trace = OptTrace()
+        trace.add_trace_lines(['[completed optimizing 0xc <JSFunction hot (sfi = 0xd)> (target TURBOFAN)]'])
+        self.assertEqual("Functions: 1 traced, 1 optimized, 0 in a deopt loop.", format_opt_report(trace, 2))
+
+    def test_format_opt_json(self):
+        report = json.loads(format_opt_json(self.trace))
+        self.assertEqual(4, len(report['functions']))
+        self.assertEqual({'name': 'big /app/a.js', 'requests': 0, 'attempts': 0, 'tiers': {},
+                          'aborts': {'Function is too big': 1}, 'deopts': {}, 'reoptimizations': 0,
+                          'deopt_loop': False}, report['functions'][-1])
+        self.assertEqual(['add /app/a.js', 'hot /app/a.js'], report['optimized_functions'])
+        self.assertEqual({'function': '(unknown)', 'type': 'LoadGlobalIC', 'key': 'z', 'line': 9, 'column': 9,
+                          'state': 'megamorphic', 'transitions': 1, 'ticks': 0}, report['ic_sites'][-1])
+        self.assertEqual(1, len(json.loads(format_opt_json(self.trace, 1))['ic_sites']))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,133 @@
+import json
+import os
+import tempfile
+import unittest
+
+from docker_entrypoint._libs.profiler import (GC_FRAME, TickProfile,
+                                              format_bottom_up_tree,
+                                              format_flat_profile,
+                                              format_folded, format_speedscope)
+
+FIB = 'fib /app/a.js:1:13'
+ANONYMOUS = '(anonymous) /app/a.js:5:1'
+MAIN = 'main /app/a.js:10:1'
+
+LOG = """v8-version,12,4,0,0,0,0
+shared-library,/usr/bin/d8,0x1000,0x2000,0
+code-creation,Builtin,2,100,0x3000,100,ArrayPush
+code-creation,Stub,2,90,0x4050,10,Overlapped
+code-creation,JS,10,110,0x4000,200,fib /app/a.js:1:13,0x5000,*
+code-creation,JS,10,120,0x4200,100, /app/a.js:5:1,0x5001,~
+code-creation,LazyCompile,0,0x4400,50,"main /app/a.js:10:1",0x5002,~
+code-creation,RegExp,3,130,0x4800,10,a\\x2cb\\u00e9\\\\
+code-creation,Handler,3,140,0x4900,10,CallIC
+tick,0x4010,1000,0,0x0,0,0x4210,0x4410
+tick,0x4010,1001,0,0x0,0,+0x200,+0x200
+tick,0x1010,1002,0,0x4005,0,0x4410
+tick,0x1010,1003,1,0x3010,6,0x4410
+tick,0x9999,1004,0,0x0,1,0x1010,0x1020,0x4410
+tick,0x4805,1005,0,0x0,12,overflow
+code-move,0x4200,0x4600
+code-move,0x7000,0x7100
+code-delete,0x4400
+code-delete,0x7000
+tick,0x4610,1006,0,0x0,0,0x4410
+tick,0x40
+"""
+
+
+class TestProfiler(unittest.TestCase):
+    def setUp(self):
+        self.profile = TickProfile()
+        self.profile.add_lines(LOG.splitlines(keepends=True))
+
+    def test_ticks(self):
+        profile = self.profile
+        self.assertEqual(7, profile.ticks)
+        self.assertEqual({'JS': 4, 'external': 1, 'GC': 1, 'state 12': 1}, profile.states)
+        self.assertEqual({
+            (MAIN, ANONYMOUS, FIB): 2,  # Absolute frames, then frames relative to the previous one.
+            (MAIN, FIB, '[d8]'): 1,  # The JS function on the top of the stack called d8 without a frame.
+            (MAIN, 'ArrayPush'): 1,  # The external callback.
+            (MAIN, GC_FRAME): 1,  # The frames of d8 and the unknown pc are replaced by the garbage collector.
+            ('a,bé\\',): 1,
+            (ANONYMOUS,): 1,  # The moved code is found, the deleted caller is not.
+        }, profile.stacks)
+
+    def test_entries(self):
+        entries = [(entry.name, entry.kind, entry.self_ticks, entry.total_ticks, entry.optimized_ticks)
+                   for entry in self.profile.entries()]
+        self.assertEqual([
+            (FIB, 'JS', 2, 3, 2),
+            (ANONYMOUS, 'JS', 1, 3, 0),
+            (GC_FRAME, 'GC', 1, 1, 0),
+            ('ArrayPush', 'builtin', 1, 1, 0),
+            ('[d8]', 'C++', 1, 1, 0),
+            ('a,bé\\', 'regexp', 1, 1, 0),
+            (MAIN, 'JS', 0, 5, 0),
+        ], entries)
+
+    def test_add_log(self):
+        with tempfile.TemporaryDirectory() as tmp_dir_name:
+            path = os.path.join(tmp_dir_name, 'v8.log')
+            with open(path, 'w', encoding='utf-8') as file:
+                file.write(LOG)
+            self.profile.add_log(path)
+        # The addresses of the second log do not depend on the code that the first log deleted.
+        self.assertEqual(14, self.profile.ticks)
+        self.assertEqual(4, self.profile.stacks[(MAIN, ANONYMOUS, FIB)])
+
+    def test_format_flat_profile(self):
+        self.assertEqual(
+            "Ticks: 7 (JS 57.1%, external 14.3%, GC 14.3%, state 12 14.3%)\n"
+            "Self  Self %  Total %  Optimized %  Kind              Function\n"
+            "   2   28.6%    42.9%       100.0%  JS                fib /app/a.js:1:13\n"
+            "   1   14.3%    42.9%         0.0%  JS                (anonymous) /app/a.js:5:1\n"
+            "   1   14.3%    14.3%            -  GC                (garbage collector)",
+            format_flat_profile(self.profile, 3))
+
+    def test_format_bottom_up_tree(self):
+        self.assertEqual(
+            "Bottom-up profile (callers of the functions with the most self ticks):\n"
+            "  Ticks  Parent %  Function\n"
+            "      2     28.6%  fib /app/a.js:1:13\n"
+            "      2    100.0%    (anonymous) /app/a.js:5:1\n"
+            "      2    100.0%      main /app/a.js:10:1\n"
+            "      1     14.3%  (anonymous) /app/a.js:5:1",
+            format_bottom_up_tree(self.profile, 2))
+
+    def test_format_bottom_up_tree_limits(self):
+        profile = TickProfile()
+        deep = tuple(f"f{index}" for index in range(10))
+        profile.stacks[deep] = 200
+        profile.stacks[('g', 'f9')] = 1
+        profile.ticks = 201
+        lines = format_bottom_up_tree(profile, 1).splitlines()[2:]
+        # The callers below 1% of the ticks are not shown, and the tree stops at its depth.
+        self.assertEqual(['    201    100.0%  f9'] + ["    200     99.5%    f8"] +
+                         [f"    200    100.0%  {'  ' * depth}f{9 - depth}" for depth in range(2, 8)], lines)
+
+    def test_format_folded(self):
+        profile = TickProfile()
+        profile.stacks[('a;b', 'c')] = 3
+        profile.stacks[('a;b',)] = 1
+        self.assertEqual("a:b 1\na:b;c 3\n", format_folded(profile))
+
+    def test_format_speedscope(self):
+        speedscope = json.loads(format_speedscope(self.profile, 'a.js'))
+        self.assertEqual('a.js', speedscope['name'])
+        frames = speedscope['shared']['frames']
+        self.assertIn({'name': 'fib', 'file': '/app/a.js', 'line': 1, 'col': 13}, frames)
+        self.assertIn({'name': GC_FRAME}, frames)
+
+        [sampled] = speedscope['profiles']
+        self.assertEqual(('sampled', 'none', 0, 7), (sampled['type'], sampled['unit'], sampled['startValue'],
+                                                      sampled['endValue']))
+        self.assertEqual(7, sum(sampled['weights']))
+        stacks = {tuple(frames[index]['name'] for index in sample): weight
+                  for sample, weight in zip(sampled['samples'], sampled['weights'])}
+        self.assertEqual(2, stacks[('main', '(anonymous)', 'fib')])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,340 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from on_rails import ValidationError, assert_result, assert_result_with_type
+
+from docker_entrypoint._libs.CodeReportOptions import CodeReportOptions
+from docker_entrypoint._libs.ExitCodes import ExitCode
+from docker_entrypoint._libs.GcReportOptions import GcReportOptions
+from docker_entrypoint._libs.OptReportOptions import OptReportOptions
+from docker_entrypoint._libs.ProfileOptions import ProfileOptions
+from docker_entrypoint._libs.report_commands import (command_code_report,
+                                                     command_gc_report,
+                                                     command_opt_report,
+                                                     command_profile)
+from tests._helpers import assert_fail_result_detail, fake_d8, get_logger
+
+
+class TestReportCommands(unittest.TestCase):
+
+    # region command_profile
+
+    _PROFILING_D8 = ("import sys\n"
+                     "log = next(arg[len('--logfile='):] for arg in sys.argv if arg.startswith('--logfile='))\n"
+                     "ticks = int(sys.stdin.read() or '1')\n"
+                     "with open(log, 'w') as f:\n"
+                     "    f.write('code-creation,JS,10,100,0x1000,100,hot /app/a.js:1:1,0x2000,*\\n')\n"
+                     "    f.write('code-creation,JS,10,100,0x1100,100,main /app/a.js:5:1,0x2001,~\\n')\n"
+                     "    f.write('tick,0x1010,1,0,0x0,0,0x1110\\n' * ticks)\n"
+                     "print('ignored output')\n")
+
+    def test_command_profile_invalid_params(self):
+        result = command_profile(None, None)
+        assert_result_with_type(self, result, expected_success=False, expected_detail_type=ValidationError)
+
+        logger, _ = get_logger()
+        result = command_profile(logger, 'no-such-program.js')
+        assert_fail_result_detail(self, result.detail, ExitCode.IO_ERROR, "File 'no-such-program.js' does not exists.")
+
+        with tempfile.TemporaryDirectory() as tmp_dir_name:
+            program = os.path.join(tmp_dir_name, "program.js")
+            with open(program, "w") as f:
+                f.write("")
+            result = command_profile(logger, program, [os.path.join(tmp_dir_name, "invalid")])
+            self.assertEqual(ExitCode.IO_ERROR, result.detail.code)
+
+    def test_command_profile_table(self):
+        with tempfile.TemporaryDirectory() as tmp_dir_name:
+            program = os.path.join(tmp_dir_name, "program.js")
+            with open(program, "w") as f:
+                f.write("")
+            inputs_dir = os.path.join(tmp_dir_name, "inputs")
+            os.mkdir(inputs_dir)
+            for name, ticks in (("1.txt", "2"), ("2.txt", "3")):
+                with open(os.path.join(inputs_dir, name), "w") as f:
+                    f.write(ticks)
+
+            logger, logging_stream = get_logger()
+            with fake_d8(tmp_dir_name, self._PROFILING_D8), \
+                    mock.patch('sys.stdout', new_callable=io.StringIO) as stdout:
+                result = command_profile(logger, program, [inputs_dir], options=ProfileOptions(jobs=2))
+
+            assert_result(self, result, expected_success=True)
+            self.assertEqual("", stdout.getvalue())
+            log = logging_stream.getvalue()
+            self.assertIn("[INFO] Ticks: 5 (JS 100.0%)\n", log)
+            self.assertIn("      5    100.0%  hot /app/a.js:1:1\n      5    100.0%    main /app/a.js:5:1", log)
+            self.assertIn(f"[DEBUG] Profiled '{os.path.join(inputs_dir, '2.txt')}': 5 ticks so far.", log)
+
+    def test_command_profile_reports(self):
+        with tempfile.TemporaryDirectory() as tmp_dir_name:
+            program = os.path.join(tmp_dir_name, "program.js")
+            with open(program, "w") as f:
+                f.write("")
+
+            logger, logging_stream = get_logger()
+            with fake_d8(tmp_dir_name, self._PROFILING_D8), \
+                    mock.patch('sys.stdout', new_callable=io.StringIO) as stdout:
+                result = command_profile(logger, program, options=ProfileOptions(report='folded'))
+            assert_result(self, result, expected_success=True)
+            self.assertEqual("main /app/a.js:5:1;hot /app/a.js:1:1 1\n", stdout.getvalue())
+
+            output = os.path.join(tmp_dir_name, "profile.json")
+            with fake_d8(tmp_dir_name, self._PROFILING_D8):
+                result = command_profile(logger, program, None, ['arg'],
+                                         ProfileOptions(report='speedscope', output=output))
+            assert_result(self, result, expected_success=True)
+            with open(output) as f:
+                self.assertEqual('program.js', json.load(f)['name'])
+            self.assertIn(f"[INFO] The speedscope profile of 1 ticks is written to '{output}'.",
+                          logging_stream.getvalue())
+
+    def test_command_profile_failures(self):
+        with tempfile.TemporaryDirectory() as tmp_dir_name:
+            program = os.path.join(tmp_dir_name, "program.js")
+            with open(program, "w") as f:
+                f.write("")
+
+            logger, logging_stream = get_logger()
+            # The ticks of a run that failed are still reported.
+            with fake_d8(tmp_dir_name, self._PROFILING_D8 + "sys.exit('crashed')\n"):
+                result = command_profile(logger, program)
+            assert_fail_result_detail(self, result.detail, 1, None)
+            log = logging_stream.getvalue()
+            self.assertIn("[WARNING] 'd8 --prof --no-logfile-per-isolate --logfile=", log)
+            self.assertIn(f" {program} < {os.devnull}' exited with code 1. crashed\n", log)
+            self.assertIn("[INFO] Ticks: 1 (JS 100.0%)\n", log)
+
+            logger, logging_stream = get_logger()
+            with fake_d8(tmp_dir_name, "import sys\nsys.exit(2)\n"):
+                result = command_profile(logger, program)
+            assert_fail_result_detail(self, result.detail, 2, None)
+            log = logging_stream.getvalue()
+            self.assertIn("' exited with code 2.\n", log)
+            self.assertIn(f"[WARNING] The profile of '{os.devnull}' can not be read: No such file or directory.\n",
+                          log)
+            self.assertIn("[WARNING] No ticks were recorded.", log)
+
+    # endregion
+
+    # region command_gc_report
+
+    _GC_TRACING_D8 = ("import sys\n"
+                      "assert '--trace-gc' in sys.argv\n"
+                      "pause = sys.stdin.read() or '1.00'\n"
+                      "print('output of the program')\n"
+                      "print('[1:0x1]  10 ms: Scavenge 4.0 (6.0) -> 3.0 (7.0) MB, ' + pause + ' / 0.00 ms  allocation "
+                      "failure;')\n"
+                      "print('[1:0x1]  20 ms: Mark-Compact 8.0 (10.0) -> 2.0 (8.0) MB, 2.00 / 0.00 ms  (average mu = "
+                      "1.000, current mu = 1.000) allocation failure;')\n")
+
+    def test_command_gc_report_invalid_params(self):
+        result = command_gc_report(None, None)
+        assert_result_with_type(self, result, expected_success=False, expected_detail_type=ValidationError)
+
+        logger, _ = get_logger()
+        result = command_gc_report(logger, 'no-such-program.js')
+        assert_fail_result_detail(self, result.detail, ExitCode.IO_ERROR, "File 'no-such-program.js' does not exists.")
+
+    def test_command_gc_report(self):
+        with tempfile.TemporaryDirectory() as tmp_dir_name:
+            program = os.path.join(tmp_dir_name, "program.js")
+            with open(program, "w") as f:
+                f.write("")
+            inputs = []
+            for name, pause in (("1.txt", "1.00"), ("2.txt", "3.00")):
+                inputs.append(os.path.join(tmp_dir_name, name))
+                with open(inputs[-1], "w") as f:
+                    f.write(pause)
+
+            logger, logging_stream = get_logger()
+            with fake_d8(tmp_dir_name, self._GC_TRACING_D8), \
+                    mock.patch('sys.stdout', new_callable=io.StringIO) as stdout:
+                result = command_gc_report(logger, program, inputs, options=GcReportOptions(jobs=2))
+
+            assert_result(self, result, expected_success=True)
+            # The outputs of the program are discarded.
+            self.assertEqual("", stdout.getvalue())
+            log = logging_stream.getvalue()
+            self.assertIn("[INFO] Kind          Count    Total      p50      p99      Max  Wall %\n"
+                          "scavenge          2  4.00 ms  2.00 ms  2.98 ms  3.00 ms", log)
+            self.assertIn("Heap: peak 8.0 MB used, 8.0 MB committed, 2.0 MB live after the mark-compacts.", log)
+            self.assertIn(f"[DEBUG] Traced '{inputs[1]}': 4 collections so far.", log)
+
+            with fake_d8(tmp_dir_name, self._GC_TRACING_D8), \
+                    mock.patch('sys.stdout', new_callable=io.StringIO) as stdout:
+                result = command_gc_report(logger, program, options=GcReportOptions(report='json'))
+            assert_result(self, result, expected_success=True)
+            self.assertEqual(2, json.loads(stdout.getvalue())['pauses']['all']['count'])
+
+    def test_command_gc_report_without_collections(self):
+        with tempfile.TemporaryDirectory() as tmp_dir_name:
+            program = os.path.join(tmp_dir_name, "program.js")
+            with open(program, "w") as f:
+                f.write("")
+
+            logger, logging_stream = get_logger()
+            with fake_d8(tmp_dir_name, "import sys\nprint('no collections')\nsys.exit(3)\n"):
+                result = command_gc_report(logger, program)
+            assert_fail_result_detail(self, result.detail, 3, None)
+            log = logging_stream.getvalue()
+            self.assertIn(f"[WARNING] 'd8 --trace-gc {program} < {os.devnull}' exited with code 3.\n", log)
+            self.assertIn("[WARNING] No collections were traced.", log)
+
+    # endregion
+
+    # region command_opt_report
+
+    _OPT_TRACING_D8 = ("import sys\n"
+                       "assert {'--trace-opt', '--trace-deopt', '--log-ic', '--prof'} <= set(sys.argv)\n"
+                       "log = next(arg[len('--logfile='):] for arg in sys.argv if arg.startswith('--logfile='))\n"
+                       "with open(log, 'w') as f:\n"
+                       "    f.write('code-creation,JS,10,100,0x1000,100,get /app/a.js:1:13,0x2000,~\\n')\n"
+                       "    f.write('LoadIC,0x1010,200,1,28,1,N,0x3000,x,,\\n')\n"
+                       "    f.write('tick,0x1010,300,0,0x0,0\\n')\n"
+                       "print('[bailout (kind: deopt-eager, reason: wrong map): begin. deoptimizing 0x1 <JSFunction '\n"
+                       "      'get </app/a.js> (sfi = 0x2)>, 0x3 <Code TURBOFAN>, opt id 0]')\n")
+
+    def test_command_opt_report_invalid_params(self):
+        result = command_opt_report(None, None)
+        assert_result_with_type(self, result, expected_success=False, expected_detail_type=ValidationError)
+
+        logger, _ = get_logger()
+        result = command_opt_report(logger, 'no-such-program.js')
+        assert_fail_result_detail(self, result.detail, ExitCode.IO_ERROR, "File 'no-such-program.js' does not exists.")
+
+    def test_command_opt_report(self):
+        with tempfile.TemporaryDirectory() as tmp_dir_name:
+            program = os.path.join(tmp_dir_name, "program.js")
+            with open(program, "w") as f:
+                f.write("")
+            inputs = [os.path.join(tmp_dir_name, name) for name in ("1.txt", "2.txt")]
+            for file in inputs:
+                with open(file, "w") as f:
+                    f.write("")
+
+            logger, logging_stream = get_logger()
+            with fake_d8(tmp_dir_name, self._OPT_TRACING_D8):
+                result = command_opt_report(logger, program, inputs, options=OptReportOptions(jobs=2))
+            assert_result(self, result, expected_success=True)
+            log = logging_stream.getvalue()
+            self.assertIn("[INFO] Functions: 1 traced, 0 optimized, 0 in a deopt loop.\n", log)
+            self.assertIn("  get /app/a.js: 0 requests, 0 attempts, optimized: none\n"
+                          "        2  deopt deopt-eager: wrong map\n", log)
+            self.assertIn("  megamorphic  2      2            LoadIC  x    1:28      get /app/a.js:1:13", log)
+            self.assertIn(f"[DEBUG] Traced '{inputs[1]}': 1 functions so far.", log)
+
+            with fake_d8(tmp_dir_name, self._OPT_TRACING_D8), \
+                    mock.patch('sys.stdout', new_callable=io.StringIO) as stdout:
+                result = command_opt_report(logger, program, options=OptReportOptions(report='json', top=1))
+            assert_result(self, result, expected_success=True)
+            self.assertEqual('get /app/a.js', json.loads(stdout.getvalue())['functions'][0]['name'])
+
+    def test_command_opt_report_without_traces(self):
+        with tempfile.TemporaryDirectory() as tmp_dir_name:
+            program = os.path.join(tmp_dir_name, "program.js")
+            with open(program, "w") as f:
+                f.write("")
+
+            logger, logging_stream = get_logger()
+            with fake_d8(tmp_dir_name, "print('nothing to optimize')\n"):
+                result = command_opt_report(logger, program)
+            assert_result(self, result, expected_success=True)
+            log = logging_stream.getvalue()
+            self.assertIn(f"[WARNING] The inline caches of '{os.devnull}' can not be read: No such file or "
+                          "directory.\n", log)
+            self.assertIn("[WARNING] No optimizations or inline cache transitions were traced.", log)
+
+    # endregion
+
+    # region command_code_report
+
+    _CODE_TRACING_D8 = ("import sys\n"
+                        "assert {'--print-bytecode', '--log-function-events'} <= set(sys.argv)\n"
+                        "log = next(arg[len('--logfile='):] for arg in sys.argv if arg.startswith('--logfile='))\n"
+                        "with open(log, 'w') as f:\n"
+                        "    f.write('script-details,3,/app/a.js,0,0,\\n')\n"
+                        "    f.write('function,preparse-resolution,3,12,36,0.5,1,add\\n')\n"
+                        "    f.write('function,parse-function,3,12,36,0.5,2,add\\n')\n"
+                        "    f.write('function,interpreter,3,12,36,1.5,3,add\\n')\n"
+                        "print('[generated bytecode for function: add (0x1 <SharedFunctionInfo add>)]')\n"
+                        "print('Bytecode length: 6\\nRegister count 2\\nConstant pool (size = 1)')\n"
+                        "print('[generated bytecode for function: other (0x2 <SharedFunctionInfo other>)]')\n")
+
+    def test_command_code_report_invalid_params(self):
+        result = command_code_report(None, None)
+        assert_result_with_type(self, result, expected_success=False, expected_detail_type=ValidationError)
+
+        logger, _ = get_logger()
+        result = command_code_report(logger, 'no-such-program.js')
+        assert_fail_result_detail(self, result.detail, ExitCode.IO_ERROR, "File 'no-such-program.js' does not exists.")
+
+        with tempfile.TemporaryDirectory() as tmp_dir_name:
+            program = os.path.join(tmp_dir_name, "program.js")
+            with open(program, "w") as f:
+                f.write("")
+            previous = os.path.join(tmp_dir_name, "code.json")
+            result = command_code_report(logger, program, options=CodeReportOptions(diff=previous))
+            assert_fail_result_detail(self, result.detail, ExitCode.IO_ERROR,
+                                      f"The previous report '{previous}' can not be read: [Errno 2] No such file or "
+                                      f"directory: '{previous}'.")
+
+    def test_command_code_report(self):
+        with tempfile.TemporaryDirectory() as tmp_dir_name:
+            program = os.path.join(tmp_dir_name, "program.js")
+            with open(program, "w") as f:
+                f.write("")
+            inputs = [os.path.join(tmp_dir_name, name) for name in ("1.txt", "2.txt")]
+            for file in inputs:
+                with open(file, "w") as f:
+                    f.write("")
+
+            logger, logging_stream = get_logger()
+            with fake_d8(tmp_dir_name, self._CODE_TRACING_D8):
+                result = command_code_report(logger, program, inputs, options=CodeReportOptions(jobs=2))
+            assert_result(self, result, expected_success=True)
+            log = logging_stream.getvalue()
+            self.assertIn("[WARNING] 2 printed bytecodes have no compilation event and are not reported.\n", log)
+            self.assertIn("[INFO] 1 functions, 1 compiled (1 lazily), 6 bytes of bytecode, 1.500 ms of compilation "
+                          "per run.\n", log)
+            self.assertIn("       6          2          1     lazy     0.500       1.500  add /app/a.js\n", log)
+            self.assertIn(f"[DEBUG] Traced '{inputs[1]}': 1 functions so far.", log)
+
+            report = os.path.join(tmp_dir_name, "code.json")
+            with fake_d8(tmp_dir_name, self._CODE_TRACING_D8):
+                result = command_code_report(logger, program, options=CodeReportOptions(report='json', output=report))
+            assert_result(self, result, expected_success=True)
+            with open(report) as f:
+                self.assertEqual(['add /app/a.js'], [function['key'] for function in json.load(f)['functions']])
+
+            with fake_d8(tmp_dir_name, self._CODE_TRACING_D8):
+                result = command_code_report(logger, program, options=CodeReportOptions(diff=report, sort='name'))
+            assert_result(self, result, expected_success=True)
+            self.assertIn("[INFO] Before: 1 functions, 1 compiled (1 lazily), 6 bytes of bytecode, 1.500 ms of "
+                          "compilation per run.\nAfter:  1 functions", logging_stream.getvalue())
+            self.assertIn("Changed functions: 0, 0 new, 0 removed.\n", logging_stream.getvalue())
+
+    def test_command_code_report_without_traces(self):
+        with tempfile.TemporaryDirectory() as tmp_dir_name:
+            program = os.path.join(tmp_dir_name, "program.js")
+            with open(program, "w") as f:
+                f.write("")
+
+            logger, logging_stream = get_logger()
+            with fake_d8(tmp_dir_name, "print('nothing to compile')\n"):
+                result = command_code_report(logger, program)
+            assert_result(self, result, expected_success=True)
+            log = logging_stream.getvalue()
+            self.assertIn(f"[WARNING] The function events of '{os.devnull}' can not be read: No such file or "
+                          "directory.\n", log)
+            self.assertIn("[WARNING] No functions were traced.", log)
+
+    # endregion
+
+
+if __name__ == '__main__':
+    unittest.main()
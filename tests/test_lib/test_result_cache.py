@@ -0,0 +1,133 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from docker_entrypoint._libs.executor import LimitStatus, ProcessResult
+from docker_entrypoint._libs.judge import Expectation, Verdict
+from docker_entrypoint._libs.result_cache import ResultCache
+from docker_entrypoint._libs.runner import InputTask, execute_input
+
+
+class TestResultCache(unittest.TestCase):
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self.tmp_dir = self._tmp_dir.name
+        self.cache_dir = os.path.join(self.tmp_dir, 'cache')
+        self.program = self._write('program.js', "print(1);")
+        self.input_file = self._write('1.txt', "input\n")
+        self.calls = []
+
+    def tearDown(self):
+        self._tmp_dir.cleanup()
+
+    def _write(self, name: str, content: str) -> str:
+        path = os.path.join(self.tmp_dir, name)
+        with open(path, 'w') as f:
+            f.write(content)
+        return path
+
+    def _execute(self, task: InputTask, capture: bool) -> ProcessResult:
+        self.calls.append((task, capture))
+        return execute_input(task, capture)
+
+    def test_replays_stored_results(self):
+        task = InputTask(self.input_file, ['sh', '-c', 'cat; echo error >&2; exit 3'])
+        with ResultCache(self.cache_dir) as cache:
+            execute = cache.wrap(self._execute, self.program)
+            first = execute(task, False)
+            second = execute(task, False)
+
+        self.assertEqual(1, len(self.calls))
+        self.assertTrue(self.calls[0][1])
+        for result in (first, second):
+            self.assertEqual((3, b"input\n", b"error\n"), (result.code, result.stdout, result.stderr))
+        self.assertIsNotNone(first.usage)
+        self.assertIsNone(second.usage)
+        self.assertEqual((1, 1), (cache.hits, cache.misses))
+
+    def test_refresh_executes_again(self):
+        task = InputTask(self.input_file, ['sh', '-c', 'cat'])
+        with ResultCache(self.cache_dir) as cache:
+            cache.wrap(self._execute, self.program)(task, True)
+            cache.wrap(self._execute, self.program, refresh=True)(task, True)
+            cache.wrap(self._execute, self.program)(task, True)
+        self.assertEqual(2, len(self.calls))
+        self.assertEqual((1, 2), (cache.hits, cache.misses))
+
+    def test_key_depends_on_program_input_and_command(self):
+        cache = ResultCache(self.cache_dir)
+        task = InputTask(self.input_file, ['sh', '-c', 'cat'])
+        key = cache.key(task, 'digest')
+        self.assertEqual(key, cache.key(InputTask(self.input_file, ['sh', '-c', 'cat']), 'digest'))
+        self.assertNotEqual(key, cache.key(task, 'other digest'))
+        self.assertNotEqual(key, cache.key(InputTask(self.input_file, ['sh', '-c', 'cat', '--flag']), 'digest'))
+        self._write('1.txt', "changed\n")
+        self.assertNotEqual(key, cache.key(task, 'digest'))
+        self.assertNotEqual(key, cache.key(InputTask(self.input_file, ['not-a-command']), 'digest'))
+
+    def test_results_that_exceeded_a_limit_are_not_stored(self):
+        with ResultCache(self.cache_dir) as cache:
+            execute = cache.wrap(lambda task, capture: ProcessResult(137, b"", b"", limit=LimitStatus.TIMEOUT),
+                                 self.program)
+            execute(InputTask(self.input_file, ['d8']), True)
+            execute(InputTask(self.input_file, ['d8']), True)
+        self.assertEqual((0, 2), (cache.hits, cache.misses))
+
+    def test_replayed_results_are_judged_and_written_to_files(self):
+        expected = Expectation(self._write('1.ans', "input\n"))
+        stdout_path = os.path.join(self.tmp_dir, '1.txt.out')
+        task = InputTask(self.input_file, ['sh', '-c', 'cat; echo error >&2'], stdout_path=stdout_path,
+                         stderr_path=os.path.join(self.tmp_dir, '1.txt.err'), expected=expected)
+        with ResultCache(self.cache_dir) as cache:
+            execute = cache.wrap(self._execute, self.program)
+            execute(task, False)
+            os.remove(stdout_path)
+            result = execute(task, False)
+
+        # The task is executed without its files and expected output, so its outputs can be stored.
+        self.assertEqual((None, None, None), (self.calls[0][0].stdout_path, self.calls[0][0].stderr_path,
+                                              self.calls[0][0].expected))
+        self.assertEqual((Verdict.ACCEPTED, None, None), (result.verdict, result.stdout, result.stderr))
+        with open(stdout_path) as f:
+            self.assertEqual("input\n", f.read())
+
+    def test_load_ignores_invalid_entries(self):
+        cache = ResultCache(self.cache_dir)
+        self.assertIsNone(cache.load('ab' * 32))
+        cache.store('ab' * 32, ProcessResult(0, b"out", None))
+        self.assertEqual((0, b"out", b""), (cache.load('ab' * 32).code, cache.load('ab' * 32).stdout,
+                                              cache.load('ab' * 32).stderr))
+        with open(os.path.join(self.cache_dir, 'ab', 'ab' * 32), 'wb') as f:
+            f.write(b"not json\n")
+        self.assertIsNone(cache.load('ab' * 32))
+
+    def test_store_removes_the_temporary_file_on_error(self):
+        cache = ResultCache(self.cache_dir)
+        with mock.patch('os.replace', side_effect=OSError("disk full")), self.assertRaises(OSError):
+            cache.store('cd' * 32, ProcessResult(0, b"out", b""))
+        self.assertEqual([], os.listdir(os.path.join(self.cache_dir, 'cd')))
+
+    def test_evicts_least_recently_used_entries(self):
+        cache = ResultCache(self.cache_dir, max_bytes=100)
+        keys = [f"{index:02d}" * 32 for index in range(4)]
+        for index, key in enumerate(keys):
+            cache.store(key, ProcessResult(0, b"x" * 10, b""))
+            os.utime(os.path.join(self.cache_dir, key[:2], key), (1000 + index, 1000 + index))
+        # Loading an entry makes it the most recently used one.
+        cache.load(keys[0])
+
+        self.assertEqual(2, cache.evict())
+        self.assertIsNotNone(cache.load(keys[0]))
+        self.assertIsNone(cache.load(keys[1]))
+        self.assertIsNone(cache.load(keys[2]))
+        self.assertIsNotNone(cache.load(keys[3]))
+
+        cache.max_bytes = 1
+        cache.close()
+        cache.close()
+        self.assertIsNone(cache.load(keys[0]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from docker_entrypoint._libs import executor
+from docker_entrypoint._libs.executor import LimitStatus
+from docker_entrypoint.api import iter_results
+from tests._helpers import fake_d8
+
+# It sleeps for the number of tenths of a second in the input, and prints the input and its arguments.
+SLEEP_D8 = """
+import sys, time
+content = sys.stdin.read()
+time.sleep(int(content or 0) / 10)
+sys.stdout.write('out ' + content)
+sys.stderr.write(' '.join(sys.argv[1:]))
+sys.exit(len(content))
+"""
+
+
+class TestIterResults(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.inputs = os.path.join(self.tmp_dir.name, 'inputs')
+        os.mkdir(self.inputs)
+        for name, content in (('1.txt', '5'), ('2.txt', '0'), ('10.txt', '')):
+            with open(os.path.join(self.inputs, name), 'w', encoding='utf-8') as file:
+                file.write(content)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_iter_results(self):
+        with fake_d8(self.tmp_dir.name, SLEEP_D8):
+            records = list(iter_results('a.js', [self.inputs], args=['x'], flags=['--jitless'], jobs=3))
+        self.assertEqual([(os.path.join(self.inputs, name), code, stdout, b'--jitless a.js x', None)
+                          for name, code, stdout in (('1.txt', 1, b'out 5'), ('2.txt', 1, b'out 0'),
+                                                     ('10.txt', 0, b'out '))],
+                         [(record.file, record.code, record.stdout, record.stderr, record.limit)
+                          for record in records])
+        self.assertGreaterEqual(records[0].usage.wall_time, 0.5)
+        self.assertIsNotNone(records[0].usage.max_rss)
+
+    def test_iter_results_as_completed(self):
+        with fake_d8(self.tmp_dir.name, SLEEP_D8):
+            files = [record.file for record in iter_results('a.js', [self.inputs], jobs=3, ordered=False)]
+        # The slow first input does not hold back the others.
+        self.assertEqual(os.path.join(self.inputs, '1.txt'), files[-1])
+        self.assertEqual(3, len(files))
+
+    def test_iter_results_without_inputs(self):
+        # Python ignores SIGXFSZ, which d8 is killed by.
+        source = ("import os, signal\nsignal.signal(signal.SIGXFSZ, signal.SIG_DFL)\n"
+                  "os.execvp('head', ['head', '-c', '100000', '/dev/zero'])\n")
+        with fake_d8(self.tmp_dir.name, source):
+            records = list(iter_results('a.js', max_output_bytes=2))
+        self.assertEqual([(os.devnull, 153, b'\0\0', LimitStatus.OUTPUT_LIMIT)],
+                         [(record.file, record.code, record.stdout, record.limit) for record in records])
+
+    def test_iter_results_invalid_params(self):
+        with self.assertRaisesRegex(ValueError, 'The files_and_dirs must be None or a list of existing paths.'):
+            iter_results('a.js', [os.path.join(self.tmp_dir.name, 'missing')])
+        with self.assertRaisesRegex(ValueError, 'The ordered must be a boolean.'):
+            iter_results('a.js', ordered=None)
+
+    def test_iter_results_stopped_early(self):
+        for name in ('1.txt', '10.txt'):
+            with open(os.path.join(self.inputs, name), 'w', encoding='utf-8') as file:
+                file.write('300')
+        with fake_d8(self.tmp_dir.name, SLEEP_D8):
+            start = time.monotonic()
+            records = iter_results('a.js', [self.inputs], jobs=3, ordered=False)
+            self.assertEqual(os.path.join(self.inputs, '2.txt'), next(records).file)
+            records.close()
+        self.assertLess(time.monotonic() - start, 10)
+        self.assertEqual(set(), executor._running_groups)
+
+    def test_iter_results_stopped_early_does_not_kill_other_iterators(self):
+        with open(os.path.join(self.inputs, '1.txt'), 'w', encoding='utf-8') as file:
+            file.write('10')
+        stopped_inputs = os.path.join(self.tmp_dir.name, 'stopped')
+        os.mkdir(stopped_inputs)
+        for name, content in (('a.txt', '0'), ('b.txt', '300')):
+            with open(os.path.join(stopped_inputs, name), 'w', encoding='utf-8') as file:
+                file.write(content)
+
+        with fake_d8(self.tmp_dir.name, SLEEP_D8):
+            records = []
+            other = threading.Thread(target=lambda: records.extend(iter_results('a.js', [self.inputs], jobs=3)))
+            other.start()
+            deadline = time.monotonic() + 5
+            while not executor._running_groups and time.monotonic() < deadline:
+                time.sleep(0.01)
+            # The iterator of this thread is closed while the slow input of the other thread still runs.
+            stopped = iter_results('a.js', [stopped_inputs], jobs=2, ordered=False)
+            self.assertEqual(os.path.join(stopped_inputs, 'a.txt'), next(stopped).file)
+            stopped.close()
+            other.join(10)
+
+        self.assertEqual([(2, b'out 10'), (1, b'out 0'), (0, b'out ')],
+                         [(record.code, record.stdout) for record in records])
+        self.assertEqual(set(), executor._running_groups)
+
+
+if __name__ == '__main__':
+    unittest.main()
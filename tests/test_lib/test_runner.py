@@ -0,0 +1,94 @@
+import os
+import tempfile
+import time
+import unittest
+
+from docker_entrypoint._libs.executor import ResourceLimits
+from docker_entrypoint._libs.runner import (InputTask, execute_input,
+                                            get_available_cpus, run_inputs,
+                                            run_inputs_as_completed)
+
+
+class TestRunner(unittest.TestCase):
+    def test_get_available_cpus(self):
+        self.assertGreaterEqual(get_available_cpus(), 1)
+
+    def test_execute_input(self):
+        with tempfile.TemporaryDirectory() as tmp_dir_name:
+            file = os.path.join(tmp_dir_name, "input.txt")
+            with open(file, "w") as f:
+                f.write("input\n")
+
+            result = execute_input(InputTask(file, ['cat']), capture=True)
+            self.assertEqual(0, result.code)
+            self.assertEqual(b"input\n", result.stdout)
+
+    def test_execute_input_to_files(self):
+        with tempfile.TemporaryDirectory() as tmp_dir_name:
+            file = os.path.join(tmp_dir_name, "input.txt")
+            with open(file, "w") as f:
+                f.write("input\n")
+            task = InputTask(file, ['sh', '-c', 'cat; echo error >&2'], stdout_path=file + '.out',
+                             stderr_path=file + '.err')
+
+            result = execute_input(task, capture=True)
+            self.assertEqual((0, None, None), (result.code, result.stdout, result.stderr))
+            with open(file + '.out') as f:
+                self.assertEqual("input\n", f.read())
+            with open(file + '.err') as f:
+                self.assertEqual("error\n", f.read())
+
+    # region run_inputs
+
+    def test_run_inputs_keeps_order(self):
+        tasks = [InputTask(os.devnull, ['sh', '-c', f"sleep 0.0{5 - index}; echo {index}"]) for index in range(6)]
+        results = list(run_inputs(tasks, jobs=3))
+
+        self.assertEqual(tasks, [result.task for result in results])
+        self.assertEqual([f"{index}\n".encode() for index in range(6)], [result.result.stdout for result in results])
+        self.assertEqual([0] * 6, [result.result.code for result in results])
+
+    def test_run_inputs_empty(self):
+        self.assertEqual([], list(run_inputs([], jobs=2)))
+
+    def test_run_inputs_kills_the_running_inputs_on_error(self):
+        def execute(task: InputTask, capture: bool):
+            if task.file == 'fail':
+                raise KeyboardInterrupt()
+            return execute_input(task, capture)
+
+        tasks = [InputTask('fail', []), InputTask(os.devnull, ['sleep', '30'], limits=ResourceLimits()),
+                 InputTask(os.devnull, ['sleep', '30'], limits=ResourceLimits())]
+        start = time.monotonic()
+        with self.assertRaises(KeyboardInterrupt):
+            list(run_inputs(tasks, jobs=2, execute=execute))
+        self.assertLess(time.monotonic() - start, 10)
+
+    def test_run_inputs_as_completed(self):
+        tasks = [InputTask(os.devnull, ['sh', '-c', f"sleep 0.{index}; echo {index}"]) for index in (5, 0, 3)]
+        results = list(run_inputs_as_completed(tasks, jobs=3))
+
+        self.assertEqual([tasks[1], tasks[2], tasks[0]], [result.task for result in results])
+        self.assertEqual([b'0\n', b'3\n', b'5\n'], [result.result.stdout for result in results])
+
+        # With one job, the tasks run one after the other, in the given order.
+        results = list(run_inputs_as_completed(tasks, jobs=1))
+        self.assertEqual(tasks, [result.task for result in results])
+
+    def test_run_inputs_as_completed_kills_the_running_inputs_on_error(self):
+        def execute(task: InputTask, capture: bool):
+            if task.file == 'fail':
+                raise KeyboardInterrupt()
+            return execute_input(task, capture)
+
+        tasks = [InputTask(os.devnull, ['sleep', '30'], limits=ResourceLimits()), InputTask('fail', [])]
+        start = time.monotonic()
+        with self.assertRaises(KeyboardInterrupt):
+            list(run_inputs_as_completed(tasks, jobs=2, execute=execute))
+        self.assertLess(time.monotonic() - start, 10)
+
+    # endregion
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+import io
+import json
+import os
+import signal
+import socket
+import tempfile
+import threading
+import time
+import unittest
+from typing import Optional
+from unittest import mock
+
+from on_rails import ValidationError, assert_result, assert_result_with_type
+
+from docker_entrypoint._libs.ExitCodes import ExitCode
+from docker_entrypoint._libs.serve_command import command_serve
+from docker_entrypoint._libs.ServeOptions import ServeOptions
+from tests._helpers import assert_fail_result_detail, fake_d8, get_logger
+
+
+class TestServeCommand(unittest.TestCase):
+
+    # region command_serve
+
+    def test_command_serve_invalid_params(self):
+        result = command_serve(None)
+        assert_result_with_type(self, result, expected_success=False, expected_detail_type=ValidationError)
+
+        logger, _ = get_logger()
+        result = command_serve(logger)
+        assert_fail_result_detail(self, result.detail, ExitCode.MISUSE_SHELL_BUILTINS,
+                                  "Give a socket with --socket, or a port with --http.")
+
+        result = command_serve(logger, ServeOptions(http_port=0, preload=['missing.js']))
+        assert_fail_result_detail(self, result.detail, ExitCode.IO_ERROR, "File 'missing.js' does not exists.")
+
+        with tempfile.TemporaryDirectory() as tmp_dir_name:
+            result = command_serve(logger, ServeOptions(socket=tmp_dir_name, http_port=0))
+            assert_fail_result_detail(self, result.detail, ExitCode.IO_ERROR,
+                                      f"The path '{tmp_dir_name}' exists and is not a socket.")
+
+    @staticmethod
+    def _stop_when_listening(logging_stream: io.StringIO, request: Optional[bytes] = None,
+                             socket_path: Optional[str] = None) -> threading.Thread:
+        # Sends a request once the server listens, then SIGTERM, like `docker stop`.
+        def client():
+            deadline = time.monotonic() + 10
+            while 'Listening on' not in logging_stream.getvalue() and time.monotonic() < deadline:
+                time.sleep(0.01)
+            if request is not None:
+                with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+                    connection.connect(socket_path)
+                    connection.sendall(request)
+                    answers.append(connection.makefile('rb').readline())
+            os.kill(os.getpid(), signal.SIGTERM)
+
+        answers = []
+        thread = threading.Thread(target=client)
+        thread.answers = answers
+        thread.start()
+        return thread
+
+    def test_command_serve(self):
+        with tempfile.TemporaryDirectory() as tmp_dir_name:
+            program = os.path.join(tmp_dir_name, 'program.js')
+            unsafe_program = os.path.join(tmp_dir_name, 'unsafe.js')
+            for path, content in ((program, 'print(readline())'), (unsafe_program, 'quit(0)')):
+                with open(path, 'w') as f:
+                    f.write(content)
+            socket_path = os.path.join(tmp_dir_name, 'd8.sock')
+
+            logger, logging_stream = get_logger()
+            previous_handler = signal.getsignal(signal.SIGTERM)
+            client = self._stop_when_listening(logging_stream, json.dumps({'id': 1, 'program': program,
+                                                                           'stdin': 'abc'}).encode() + b'\n',
+                                               socket_path)
+            with fake_d8(tmp_dir_name, "import json, sys\n"
+                                       "for line in sys.stdin:\n"
+                                       "    with open(json.loads(line)['input']) as f:\n"
+                                       "        stdout = f.read().upper()\n"
+                                       "    print(json.dumps({'status': 0, 'stdout': stdout, 'stderr': ''}), flush=True)\n"):
+                result = command_serve(logger, ServeOptions(socket=socket_path, jobs=1,
+                                                            preload=[program, unsafe_program]))
+            client.join()
+
+            assert_result(self, result, expected_success=True)
+            answer = json.loads(client.answers[0])
+            self.assertEqual((1, 0, 'ABC', True), (answer['id'], answer['code'], answer['stdout'], answer['warm']))
+            self.assertEqual(previous_handler, signal.getsignal(signal.SIGTERM))
+            self.assertFalse(os.path.exists(socket_path))
+            log = logging_stream.getvalue()
+            self.assertIn(f"[INFO] 1 warm workers are running '{program}'.\n", log)
+            self.assertIn(f"[WARNING] The program '{unsafe_program}' can not be preloaded, because it can not run in "
+                          "a reused d8 process or the limits are enforced.\n", log)
+            self.assertIn(f"[INFO] Listening on '{socket_path}' with 1 workers and a queue of 64 requests.\n", log)
+            self.assertIn("[INFO] Draining: 0 requests are running and 0 are waiting.\n", log)
+            self.assertIn("[INFO] Stopped after 1 requests. 0 requests were refused.\n", log)
+
+    def test_command_serve_http_with_limits(self):
+        logger, logging_stream = get_logger()
+        client = self._stop_when_listening(logging_stream)
+        result = command_serve(logger, ServeOptions(http_port=0, reuse_process=True, timeout=1, queue_size=0))
+        client.join()
+
+        assert_result(self, result, expected_success=True)
+        log = logging_stream.getvalue()
+        self.assertIn("[WARNING] The resource limits can not be enforced in a reused d8 process. Each request is "
+                      "executed in its own process.\n", log)
+        self.assertRegex(log, r"\[INFO\] Listening on http://127\.0\.0\.1:\d+/run with \d+ workers and a queue of 0 "
+                              r"requests\.\n")
+
+    def test_command_serve_interrupted_while_preloading(self):
+        with tempfile.TemporaryDirectory() as tmp_dir_name:
+            program = os.path.join(tmp_dir_name, 'program.js')
+            with open(program, 'w') as f:
+                f.write('')
+            socket_path = os.path.join(tmp_dir_name, 'd8.sock')
+
+            logger, _ = get_logger()
+            with mock.patch('docker_entrypoint._libs.server.RunService.preload', side_effect=KeyboardInterrupt), \
+                    self.assertRaises(KeyboardInterrupt):
+                command_serve(logger, ServeOptions(socket=socket_path, preload=[program]))
+
+            self.assertEqual([], [thread.name for thread in threading.enumerate() if thread.name.startswith('serve-')])
+            self.assertFalse(os.path.exists(socket_path))
+
+    # endregion
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,339 @@
+import http.client
+import json
+import os
+import socket
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from docker_entrypoint._libs.executor import ResourceLimits
+from docker_entrypoint._libs.server import (ListenError, RequestError,
+                                            RunServer, RunService,
+                                            ServerBusyError, parse_request)
+from tests._helpers import fake_d8
+
+# With `--`, it speaks the protocol of the realm harness. Otherwise it prints the upper-case stdin and its arguments
+# after the program, and waits for the file of the last argument if it is `wait:<path>`.
+SERVE_D8 = """
+import json, os, sys, time
+if '--' in sys.argv:
+    for line in sys.stdin:
+        request = json.loads(line)
+        with open(request['input']) as f:
+            content = f.read()
+        response = {'id': request['id'], 'status': 0, 'stdout': 'warm ' + content.upper(), 'stderr': ''}
+        print(json.dumps(response), flush=True)
+    sys.exit(0)
+if sys.argv[-1].startswith('wait:'):
+    while not os.path.exists(sys.argv[-1][5:]):
+        time.sleep(0.01)
+program = next(index for index, arg in enumerate(sys.argv) if arg.endswith('.js'))
+sys.stdout.write(sys.stdin.read().upper())
+sys.stderr.write(' '.join(sys.argv[1:program] + ['|'] + sys.argv[program + 1:]))
+sys.exit(3)
+"""
+
+
+class TestParseRequest(unittest.TestCase):
+    def test_parse_request(self):
+        request = parse_request({'id': 'a', 'program': 'a.js', 'stdin': 'abc', 'args': ['x'], 'flags': ['--jitless'],
+                                 'timeout': 5, 'memory_limit': 100}, ResourceLimits(timeout=2, cpu_time=3))
+        self.assertEqual(('a', 'a.js', None, b'abc', ['x'], ['--jitless']),
+                         (request.request_id, request.program, request.source, request.stdin, request.args,
+                          request.flags))
+        # A request can only lower the limits of the server.
+        limits = request.limits
+        self.assertEqual((2, 100, 3, None), (limits.timeout, limits.memory, limits.cpu_time, limits.max_output_bytes))
+
+        request = parse_request({'source': 'print(1)', 'stdin_base64': 'AP8='}, ResourceLimits())
+        self.assertEqual((None, None, 'print(1)', b'\x00\xff', [], []),
+                         (request.request_id, request.program, request.source, request.stdin, request.args,
+                          request.flags))
+        self.assertFalse(request.limits.has_limits())
+
+    def test_parse_request_errors(self):
+        for fields, message in (
+                (['a.js'], 'The request is not a JSON object.'),
+                ({'program': 'a.js', 'input': ''},
+                 "Unknown field 'input'. The fields are: id, program, source, stdin, stdin_base64, args, flags, "
+                 "timeout, memory_limit, cpu_limit, max_output_bytes."),
+                ({'program': 'a.js', 'timeout': True}, 'The timeout must be a positive number.'),
+                ({'program': 'a.js', 'memory_limit': 0}, 'The memory_limit must be a positive integer.'),
+                ({'stdin': ''}, 'Exactly one of program and source must be given.'),
+                ({'program': 'a.js', 'source': ''}, 'Exactly one of program and source must be given.'),
+                ({'program': 'a.js', 'stdin': '', 'stdin_base64': ''},
+                 'Only one of stdin and stdin_base64 can be given.'),
+                ({'program': 'a.js', 'stdin_base64': 'a!=='},
+                 'The stdin_base64 is not valid base64.'),
+        ):
+            with self.assertRaises(RequestError) as context:
+                parse_request(fields, ResourceLimits())
+            self.assertEqual(message, str(context.exception))
+
+
+class TestRunService(unittest.TestCase):
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self.tmp_dir = self._tmp_dir.name
+        self.work_dir = os.path.join(self.tmp_dir, 'work')
+        os.mkdir(self.work_dir)
+
+    def tearDown(self):
+        self._tmp_dir.cleanup()
+
+    def _write(self, name: str, content: str) -> str:
+        path = os.path.join(self.tmp_dir, name)
+        with open(path, 'w') as f:
+            f.write(content)
+        return path
+
+    def _execute(self, service: RunService, **fields) -> dict:
+        return service.execute(parse_request(fields, ResourceLimits()))
+
+    def test_execute(self):
+        program = self._write('program.js', '')
+        with fake_d8(self.tmp_dir, SERVE_D8), RunService(self.work_dir, 2) as service:
+            answer = self._execute(service, id=1, program=program, stdin='abc', args=['x'], flags=['--jitless'])
+            self.assertEqual((1, 3, None, 'ABC', '--jitless | x', False),
+                             (answer['id'], answer['code'], answer['status'], answer['stdout'], answer['stderr'],
+                              answer['warm']))
+            self.assertGreater(answer['timings']['wall'], 0)
+            self.assertGreaterEqual(answer['timings']['queue'], 0)
+            self.assertIsNotNone(answer['max_rss'])
+
+            # The sources are written once, named by their content.
+            for _ in range(2):
+                self.assertEqual('DEF', self._execute(service, source='print(readline())', stdin='def')['stdout'])
+            self.assertEqual(1, len([name for name in os.listdir(self.work_dir) if name.endswith('.js')]))
+            self.assertEqual({'running': 0, 'queued': 0, 'served': 3, 'refused': 0, 'draining': False},
+                             service.status())
+
+        with mock.patch.dict(os.environ, {'PATH': self.tmp_dir + '/missing'}), \
+                RunService(self.work_dir, 1) as service:
+            answer = self._execute(service, program=program)
+            self.assertEqual((127, 'd8: command not found\n', None), (answer['code'], answer['stderr'],
+                                                                       answer['timings']['wall']))
+
+    def test_warm_workers(self):
+        program = self._write('program.js', 'print(readline())')
+        unsafe_program = self._write('unsafe.js', 'quit(1)')
+        with fake_d8(self.tmp_dir, SERVE_D8), RunService(self.work_dir, 2, reuse_process=True) as service:
+            self.assertEqual(2, service.preload(program))
+            self.assertEqual(0, service.preload(unsafe_program))
+            answer = self._execute(service, program=program, stdin='abc')
+            self.assertEqual(('warm ABC', True), (answer['stdout'], answer['warm']))
+            self.assertEqual((None, None), (answer['timings']['user'], answer['max_rss']))
+            # The programs that touch the global state of d8, and the requests with flags or limits, run in their
+            # own process.
+            self.assertFalse(self._execute(service, program=unsafe_program)['warm'])
+            self.assertFalse(self._execute(service, program=program, flags=['--jitless'])['warm'])
+            self.assertFalse(self._execute(service, program=program, timeout=1)['warm'])
+            # d8 reports the missing programs.
+            self.assertFalse(self._execute(service, program=self.tmp_dir + '/missing.js')['warm'])
+
+            # A changed program gets new workers, and the pool of the oldest program is closed.
+            with mock.patch('docker_entrypoint._libs.server._MAX_WARM_PROGRAMS', 1):
+                oldest = next(iter(service._pools))
+                pool = service._pools[oldest]
+                self.assertTrue(self._execute(service, program=program, args=['x'])['warm'])
+            self.assertEqual([], pool._workers)
+            self.assertNotIn(oldest, service._pools)
+
+        # The limits can not be enforced in a warm worker, so none is started.
+        with fake_d8(self.tmp_dir, SERVE_D8), \
+                RunService(self.work_dir, 2, limits=ResourceLimits(timeout=1), reuse_process=True) as service:
+            self.assertEqual(0, service.preload(program))
+            self.assertEqual({}, dict(service._pools))
+
+    def test_backpressure_and_drain(self):
+        program = self._write('program.js', '')
+        flag = os.path.join(self.tmp_dir, 'flag')
+        with fake_d8(self.tmp_dir, SERVE_D8), RunService(self.work_dir, 1, queue_size=1) as service:
+            answers = []
+            threads = [threading.Thread(target=lambda: answers.append(
+                self._execute(service, program=program, args=[f"wait:{flag}"]))) for _ in range(2)]
+            for thread in threads:
+                thread.start()
+                time.sleep(0.05)
+            while service.status()['queued'] != 1:
+                time.sleep(0.01)
+            self.assertEqual(1, service.status()['running'])
+            with self.assertRaises(ServerBusyError) as context:
+                self._execute(service, program=program)
+            self.assertEqual('The queue is full: 2 requests are running or waiting.', str(context.exception))
+
+            drain = threading.Thread(target=service.drain)
+            drain.start()
+            while not service.status()['draining']:
+                time.sleep(0.01)
+            with self.assertRaises(ServerBusyError) as context:
+                self._execute(service, program=program)
+            self.assertEqual('The server is shutting down.', str(context.exception))
+            # The admitted requests finish before the drain.
+            self._write('flag', '')
+            drain.join()
+            for thread in threads:
+                thread.join()
+            self.assertEqual([3, 3], [answer['code'] for answer in answers])
+            self.assertEqual({'running': 0, 'queued': 0, 'served': 2, 'refused': 2, 'draining': True},
+                             service.status())
+
+            # The connections that open while the server drains do not read requests.
+            first, second = socket.socketpair()
+            with first, second:
+                service.add_connection(first)
+                self.assertEqual(b'', first.recv(1))
+                service.remove_connection(first)
+            service.add_connection(first)
+
+    def test_answer(self):
+        program = self._write('program.js', '')
+        with fake_d8(self.tmp_dir, SERVE_D8), RunService(self.work_dir, 1, queue_size=0) as service:
+            status, answer = service.answer(json.dumps({'id': 'a', 'program': program}).encode())
+            self.assertEqual((200, 'a', 3), (status, answer['id'], answer['code']))
+            self.assertEqual((400, {'id': None, 'error': 'The request is not valid JSON: Expecting value: line 1 '
+                                                         'column 1 (char 0).'}), service.answer(b'run'))
+            self.assertEqual((400, {'id': None, 'error': 'The request is not a JSON object.'}), service.answer(b'[]'))
+            self.assertEqual((400, {'id': 7, 'error': 'Exactly one of program and source must be given.'}),
+                             service.answer(b'{"id": 7}'))
+            service.drain()
+            self.assertEqual((503, {'id': 8, 'error': 'The server is shutting down.', 'busy': True}),
+                             service.answer(json.dumps({'id': 8, 'program': program}).encode()))
+
+
+class TestRunServer(unittest.TestCase):
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        # The cleanups run in reverse order, so the servers drain before the directory of their socket is removed.
+        self.addCleanup(self._tmp_dir.cleanup)
+        self.tmp_dir = self._tmp_dir.name
+        self.socket_path = os.path.join(self.tmp_dir, 'd8.sock')
+        self.program = os.path.join(self.tmp_dir, 'program.js')
+        with open(self.program, 'w') as f:
+            f.write('')
+
+    def test_socket_and_http(self):
+        with fake_d8(self.tmp_dir, SERVE_D8), RunService(self.tmp_dir, 2) as service:
+            server = RunServer(service)
+            # The threads of the server keep the tests running until it drains.
+            self.addCleanup(server.drain)
+            server.listen_unix(self.socket_path)
+            port = server.listen_http(0)
+
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+                client.connect(self.socket_path)
+                client.sendall(json.dumps({'id': 1, 'program': self.program, 'stdin': 'a'}).encode() + b'\n\n'
+                               + b'{"id": 2}\n')
+                answers = client.makefile('rb')
+                answer = json.loads(answers.readline())
+                self.assertEqual((1, 'A'), (answer['id'], answer['stdout']))
+                self.assertEqual({'id': 2, 'error': 'Exactly one of program and source must be given.'},
+                                 json.loads(answers.readline()))
+
+                # A line that is too long closes the connection.
+                with mock.patch('docker_entrypoint._libs.server.MAX_REQUEST_BYTES', 10), \
+                        socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as other:
+                    other.connect(self.socket_path)
+                    other.sendall(b'{"id": 3, "program": "a.js"}\n')
+                    self.assertEqual(b'{"id": null, "error": "The request is larger than 10 bytes."}\n',
+                                     other.makefile('rb').read())
+
+                connection = http.client.HTTPConnection('127.0.0.1', port)
+                http_answers = []
+                for method, path, body, expected_status in (
+                        ('POST', '/run', json.dumps({'id': 4, 'source': 'x', 'stdin': 'b'}), 200),
+                        ('POST', '/run', '{}', 400),
+                        ('POST', '/other', '{}', 404),
+                        ('GET', '/health', None, 200),
+                        ('GET', '/', None, 404),
+                ):
+                    connection.request(method, path, body)
+                    response = connection.getresponse()
+                    http_answers.append(json.loads(response.read()))
+                    connection.close()
+                    self.assertEqual(expected_status, response.status)
+                connection.putrequest('POST', '/run')
+                connection.endheaders()
+                self.assertEqual(411, connection.getresponse().status)
+                connection.close()
+                self.assertEqual((4, 'B'), (http_answers[0]['id'], http_answers[0]['stdout']))
+                self.assertEqual({'running': 0, 'queued': 0, 'served': 2, 'refused': 0, 'draining': False},
+                                 http_answers[3])
+
+                with mock.patch('docker_entrypoint._libs.server.MAX_REQUEST_BYTES', 10):
+                    connection.request('POST', '/run', json.dumps({'id': 5, 'program': self.program}))
+                    self.assertEqual(413, connection.getresponse().status)
+                    connection.close()
+
+                # The open connection is closed by the drain.
+                server.drain()
+                self.assertEqual(b'', answers.read())
+            self.assertFalse(os.path.exists(self.socket_path))
+
+    def test_busy_http(self):
+        flag = os.path.join(self.tmp_dir, 'flag')
+        with fake_d8(self.tmp_dir, SERVE_D8), RunService(self.tmp_dir, 1, queue_size=0) as service:
+            server = RunServer(service)
+            self.addCleanup(server.drain)
+            port = server.listen_http(0)
+            running = threading.Thread(target=lambda: service.answer(json.dumps(
+                {'program': self.program, 'args': [f"wait:{flag}"]}).encode()))
+            running.start()
+            while service.status()['running'] != 1:
+                time.sleep(0.01)
+            connection = http.client.HTTPConnection('127.0.0.1', port)
+            connection.request('POST', '/run', json.dumps({'program': self.program}))
+            response = connection.getresponse()
+            self.assertEqual((503, '1'), (response.status, response.getheader('Retry-After')))
+            connection.close()
+            with open(flag, 'w'):
+                pass
+            running.join()
+
+    def test_drain_with_idle_http_client(self):
+        with RunService(self.tmp_dir, 1) as service:
+            server = RunServer(service)
+            port = server.listen_http(0)
+            with socket.create_connection(('127.0.0.1', port)) as client:
+                # The client connects, but does not send its request.
+                deadline = time.monotonic() + 5
+                while not service._connections and time.monotonic() < deadline:
+                    time.sleep(0.01)
+                drain = threading.Thread(target=server.drain)
+                drain.start()
+                drain.join(5)
+                self.assertFalse(drain.is_alive())
+                client.settimeout(5)
+                self.assertEqual(b'', client.recv(1024))
+            self.assertEqual([], [thread.name for thread in threading.enumerate() if thread.name.startswith('serve-')])
+
+    def test_listen_errors(self):
+        with RunService(self.tmp_dir, 1) as service:
+            server = RunServer(service)
+            self.addCleanup(server.drain)
+            with self.assertRaisesRegex(ListenError, f"The path '{self.program}' exists and is not a socket."):
+                server.listen_unix(self.program)
+            missing = os.path.join(self.tmp_dir, 'missing', 'd8.sock')
+            with self.assertRaisesRegex(ListenError, f"The socket '{missing}' can not be created: No such file or "
+                                                     "directory."):
+                server.listen_unix(missing)
+
+            # The socket of a server that stopped is replaced, but not the one of a running server.
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as stale:
+                stale.bind(self.socket_path)
+            server.listen_unix(self.socket_path)
+            with self.assertRaisesRegex(ListenError, f"Another server listens on '{self.socket_path}'."):
+                RunServer(service).listen_unix(self.socket_path)
+
+            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as used:
+                used.bind(('127.0.0.1', 0))
+                used.listen()
+                port = used.getsockname()[1]
+                with self.assertRaisesRegex(ListenError, f"The port {port} can not be used: Address already in use."):
+                    server.listen_http(port)
+
+
+if __name__ == '__main__':
+    unittest.main()
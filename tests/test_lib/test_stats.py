@@ -0,0 +1,37 @@
+import json
+import unittest
+
+from docker_entrypoint._libs.executor import ProcessResult, ResourceUsage
+from docker_entrypoint._libs.runner import InputResult, InputTask
+from docker_entrypoint._libs.stats import format_stats_json, format_stats_table
+
+RESULTS = [
+    InputResult(InputTask('inputs/1.txt', ['d8']),
+                ProcessResult(0, usage=ResourceUsage(wall_time=0.01234, user_time=0.008, system_time=0.002,
+                                                     max_rss=36864, voluntary_switches=12, involuntary_switches=3))),
+    InputResult(InputTask('2.txt', ['d8']), ProcessResult(137, usage=ResourceUsage(wall_time=1.5), limit='TIMEOUT')),
+    InputResult(InputTask('3.txt', ['d8']), ProcessResult(127)),
+]
+
+
+class TestStats(unittest.TestCase):
+    def test_format_stats_table(self):
+        expected = "Input         Code  Wall (s)  User (s)  Sys (s)  Max RSS (MiB)  Vol CS  Invol CS  Status\n" \
+                   "inputs/1.txt     0     0.012     0.008    0.002           36.0      12         3  -\n" \
+                   "2.txt          137     1.500         -        -              -       -         -  TIMEOUT\n" \
+                   "3.txt          127         -         -        -              -       -         -  -"
+        self.assertEqual(expected, format_stats_table(RESULTS))
+
+    def test_format_stats_json(self):
+        inputs = json.loads(format_stats_json(RESULTS))['inputs']
+        self.assertEqual({'file': 'inputs/1.txt', 'code': 0, 'wall_time': 0.01234, 'user_time': 0.008,
+                          'system_time': 0.002, 'max_rss_kib': 36864, 'voluntary_context_switches': 12,
+                          'involuntary_context_switches': 3, 'status': None}, inputs[0])
+        self.assertEqual((1.5, None, 'TIMEOUT'), (inputs[1]['wall_time'], inputs[1]['user_time'], inputs[1]['status']))
+        self.assertEqual({'file': '3.txt', 'code': 127, 'wall_time': None, 'user_time': None, 'system_time': None,
+                          'max_rss_kib': None, 'voluntary_context_switches': None,
+                          'involuntary_context_switches': None, 'status': None}, inputs[2])
+
+
+if __name__ == '__main__':
+    unittest.main()
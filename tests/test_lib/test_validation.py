@@ -0,0 +1,110 @@
+import importlib
+import os
+import unittest
+from unittest import mock
+
+from on_rails import (BreakFunctionException, BreakRailsException, Result,
+                      ValidationError, def_result)
+from pylity.decorators.validate_func_params import \
+    validate_func_params as pylity_validate_func_params
+from schema import And, Or, Schema
+
+from docker_entrypoint._libs import validation
+from docker_entrypoint._libs.validation import (is_internal_validation_enabled,
+                                                set_internal_validation,
+                                                validate_func_params)
+
+SCHEMA = Schema({
+    'code': And(int, error='The code must be an integer.'),
+    'message': Or(None, str, error='The message must be None or a string.'),
+})
+
+
+def _func(code: int, message=None):
+    if code < 0:
+        raise OSError("negative")
+    return message or code
+
+
+class _Class:
+    def method(self, code: int, message=None):
+        return _func(code, message)
+
+
+class TestValidation(unittest.TestCase):
+    def tearDown(self):
+        set_internal_validation(True)
+
+    def test_same_results_as_pylity(self):
+        for raise_exception in (False, True):
+            compiled = validate_func_params(SCHEMA, raise_exception=raise_exception)(_func)
+            original = pylity_validate_func_params(SCHEMA, raise_exception=raise_exception)(_func)
+            compiled_method = validate_func_params(SCHEMA, raise_exception=raise_exception)(_Class.method)
+            for args, kwargs in (((1,), {}), ((2, 'a'), {}), ((3,), {'message': 'b'}), (('1',), {}),
+                                 ((1, 2), {}), ((), {}), ((1,), {'other': 1})):
+                expected = self._call(original, args, kwargs)
+                self.assertEqual(expected, self._call(compiled, args, kwargs))
+                self.assertEqual(expected, self._call(compiled_method, (_Class(),) + args, kwargs))
+
+    @staticmethod
+    def _call(func, args, kwargs):
+        try:
+            result = func(*args, **kwargs)
+        except ValueError as e:
+            return 'ValueError', str(e)
+        if isinstance(result, Result):
+            return result.success, result.value, result.detail and result.detail.message
+        return result
+
+    def test_exceptions_of_the_function(self):
+        result = validate_func_params(SCHEMA)(_func)(-1)
+        self.assertFalse(result.success)
+        self.assertIsInstance(result.detail.exception, OSError)
+        with self.assertRaises(OSError):
+            validate_func_params(SCHEMA, raise_exception=True)(_func)(-1)
+
+        def break_rails(code: int):
+            raise BreakRailsException(Result.fail(ValidationError(message=str(code))))
+
+        self.assertEqual('1', validate_func_params(Schema({'code': int}))(break_rails)(1).detail.message)
+
+        def break_function(code: int):
+            Result.fail(ValidationError(message=str(code))).on_fail_break_function()
+
+        # The exception is passed on to the `def_result` decorator of the function.
+        result = def_result()(validate_func_params(Schema({'code': int}))(break_function))(2)
+        self.assertEqual('2', result.detail.message)
+        with self.assertRaises(BreakFunctionException):
+            validate_func_params(Schema({'code': int}))(break_function)(3)
+
+    def test_internal_validation_switch(self):
+        def echo(code, message=None):
+            return message or code
+
+        internal = validate_func_params(SCHEMA, raise_exception=True, internal=True)(echo)
+        boundary = validate_func_params(SCHEMA, internal=False)(echo)
+
+        set_internal_validation(False)
+        self.assertFalse(is_internal_validation_enabled())
+        self.assertEqual('1', internal('1'))
+        self.assertFalse(boundary('1').success)
+        self.assertEqual('1', validate_func_params(SCHEMA, internal=True)(echo)('1').value)
+
+        set_internal_validation(True)
+        with self.assertRaises(ValueError):
+            internal('1')
+
+    def test_validation_environment(self):
+        try:
+            with mock.patch.dict(os.environ, {'D8_VALIDATION': ' Boundary '}):
+                importlib.reload(validation)
+                self.assertFalse(validation.is_internal_validation_enabled())
+            with mock.patch.dict(os.environ, {'D8_VALIDATION': 'all'}):
+                importlib.reload(validation)
+                self.assertTrue(validation.is_internal_validation_enabled())
+        finally:
+            importlib.reload(validation)
+
+
+if __name__ == '__main__':
+    unittest.main()
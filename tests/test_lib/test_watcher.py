@@ -0,0 +1,91 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from docker_entrypoint._libs.watcher import (Watcher, changed_paths,
+                                             find_load_dependencies,
+                                             take_snapshot)
+
+
+class TestWatcher(unittest.TestCase):
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self.tmp_dir = self._tmp_dir.name
+
+    def tearDown(self):
+        self._tmp_dir.cleanup()
+
+    def _write(self, name: str, content: str) -> str:
+        path = os.path.join(self.tmp_dir, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(content)
+        return path
+
+    def test_find_load_dependencies(self):
+        program = self._write('program.js', "load('lib/a.js');\nloadRelativeToScript(\"lib/b.js\");\n"
+                                            "load('missing.js'); load(variable);")
+        first = self._write('lib/a.js', "loadRelativeToScript('c.js'); load('lib/b.js');")
+        second = self._write('lib/b.js', "loadRelativeToScript('../program.js');")
+        third = self._write('lib/c.js', "")
+
+        with mock.patch('os.getcwd', return_value=self.tmp_dir):
+            self.assertEqual([first, second, third], find_load_dependencies(program))
+        self.assertEqual([], find_load_dependencies(os.path.join(self.tmp_dir, 'missing.js')))
+
+    def test_snapshots(self):
+        first = self._write('1.txt', "1")
+        second = self._write('2.txt', "2")
+        before = take_snapshot([first, second, os.path.join(self.tmp_dir, 'missing')])
+        self.assertEqual({first, second}, set(before))
+
+        self._write('1.txt', "changed")
+        os.remove(second)
+        third = self._write('3.txt', "3")
+        after = take_snapshot([first, second, third])
+
+        self.assertEqual({first, second, third}, changed_paths(before, after))
+        self.assertEqual(set(), changed_paths(after, after))
+
+    def _assert_waits_for_change(self, watcher: Watcher):
+        path = self._write('1.txt', "1")
+        watcher.watch([self.tmp_dir])
+        watcher.watch([self.tmp_dir, os.path.join(self.tmp_dir, 'missing')])
+        previous = take_snapshot([path])
+
+        def save_twice():
+            time.sleep(0.05)
+            self._write('1.txt', "22")
+            self._write('1.txt', "333")
+
+        thread = threading.Thread(target=save_twice)
+        thread.start()
+        snapshot = watcher.wait_for_change(lambda: take_snapshot([path]), previous)
+        thread.join()
+        self.assertEqual(3, snapshot[path][1])
+
+    def test_wait_for_change_with_inotify(self):
+        with Watcher(poll_interval=5, debounce=0.05) as watcher:
+            self.assertTrue(watcher.uses_inotify)
+            self._assert_waits_for_change(watcher)
+        self.assertFalse(watcher.uses_inotify)
+        watcher.close()
+
+    def test_wait_for_change_by_polling(self):
+        with mock.patch('ctypes.CDLL') as libc:
+            libc.return_value.inotify_init1.return_value = -1
+            watcher = Watcher(poll_interval=0.01, debounce=0.05)
+        self.assertFalse(watcher.uses_inotify)
+        self._assert_waits_for_change(watcher)
+
+    def test_wait_for_change_waits_until_the_files_are_stable(self):
+        snapshots = iter([{'a': (1, 1)}, {'a': (2, 2)}, {'a': (3, 3)}, {'a': (3, 3)}])
+        with Watcher(poll_interval=0.01, debounce=0.01) as watcher:
+            self.assertEqual({'a': (3, 3)}, watcher.wait_for_change(lambda: next(snapshots), {'a': (1, 1)}))
+
+
+if __name__ == '__main__':
+    unittest.main()
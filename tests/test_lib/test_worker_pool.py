@@ -0,0 +1,152 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from docker_entrypoint._libs.executor import ProcessResult
+from docker_entrypoint._libs.runner import InputTask
+from docker_entrypoint._libs.worker_pool import (D8Worker, WorkerCrashedError,
+                                                 WorkerPool,
+                                                 find_global_state_usage)
+from tests._helpers import fake_d8
+
+# Speaks the protocol of the realm harness: prints the upper-case input of each request.
+HARNESS_D8 = """
+import json, sys
+args = sys.argv[sys.argv.index('--') + 2:]
+for line in sys.stdin:
+    request = json.loads(line)
+    with open(request['input']) as f:
+        content = f.read()
+    if content == 'crash':
+        sys.exit(1)
+    status = 1 if content == 'error' else 0
+    response = {'id': request['id'], 'status': status, 'stdout': content.upper() + ' '.join(args), 'stderr': 'log'}
+    print(json.dumps(response), flush=True)
+"""
+
+FALLBACK = ['/bin/sh', '-c', 'echo fallback; exit 7']
+
+
+class TestWorkerPool(unittest.TestCase):
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self.tmp_dir = self._tmp_dir.name
+
+    def tearDown(self):
+        self._tmp_dir.cleanup()
+
+    def _write(self, name: str, content: str) -> str:
+        path = os.path.join(self.tmp_dir, name)
+        with open(path, 'w') as f:
+            f.write(content)
+        return path
+
+    def _assert_result(self, expected, result):
+        self.assertEqual(expected, (result.code, result.stdout, result.stderr))
+
+    def test_find_global_state_usage(self):
+        self.assertIsNone(find_global_state_usage("const line = readline();\nprint(line.toUpperCase());"))
+        self.assertIsNone(find_global_state_usage("const costs = reload(); print(quitter);"))
+        self.assertEqual('quit', find_global_state_usage("if (done) quit(0);"))
+        self.assertEqual('load', find_global_state_usage("load('lib.js');"))
+        self.assertEqual('await', find_global_state_usage("const x = await f();"))
+        self.assertEqual('os.', find_global_state_usage("os.system('ls');"))
+
+    def test_worker_run(self):
+        input_file = self._write('input.txt', 'abc')
+        with fake_d8(self.tmp_dir, HARNESS_D8):
+            worker = D8Worker('program.js', ['x'])
+            self._assert_result((0, b'ABCx', b'log'), worker.run(input_file))
+            result = worker.run(input_file)
+            self._assert_result((0, b'ABCx', b'log'), result)
+            self.assertGreater(result.usage.wall_time, 0)
+            self.assertIsNone(result.usage.max_rss)
+            worker.close()
+
+            with self.assertRaises(WorkerCrashedError):
+                worker.run(input_file)
+
+    def test_worker_crash(self):
+        crash_file = self._write('crash.txt', 'crash')
+        with fake_d8(self.tmp_dir, HARNESS_D8):
+            worker = D8Worker('program.js', [])
+            with self.assertRaises(WorkerCrashedError):
+                worker.run(crash_file)
+            worker.close()
+
+    def test_worker_exited(self):
+        input_file = self._write('input.txt', 'abc')
+        with fake_d8(self.tmp_dir, "import sys\nsys.stdin.close()\n"):
+            worker = D8Worker('program.js', [])
+            worker._process.wait()
+            with self.assertRaises(WorkerCrashedError):
+                worker.run(input_file)
+            worker.close()
+
+    def test_worker_close_kills_stuck_process(self):
+        with fake_d8(self.tmp_dir, "import signal, time\nsignal.signal(signal.SIGTERM, signal.SIG_IGN)\n"
+                                   "while True: time.sleep(1)\n"):
+            worker = D8Worker('program.js', [])
+            worker.close()
+
+    def test_pool_reuses_workers_and_falls_back(self):
+        input_file = self._write('input.txt', 'abc')
+        error_file = self._write('error.txt', 'error')
+        crash_file = self._write('crash.txt', 'crash')
+        with fake_d8(self.tmp_dir, HARNESS_D8), WorkerPool('program.js', []) as pool:
+            self._assert_result((0, b'ABC', b'log'), pool.execute(InputTask(input_file, FALLBACK)))
+            self._assert_result((1, b'ERROR', b'log'), pool.execute(InputTask(error_file, FALLBACK)))
+            self.assertEqual(1, len(pool._workers))
+            self._assert_result((0, b'ABC', b'log'), pool.execute(InputTask(input_file, FALLBACK)))
+
+            # The crashed worker is discarded and the input is executed with the fallback command.
+            self._assert_result((7, b'fallback\n', b''), pool.execute(InputTask(crash_file, FALLBACK), True))
+            self.assertEqual(0, len(pool._workers))
+
+            self._assert_result((0, b'ABC', b'log'), pool.execute(InputTask(input_file, FALLBACK)))
+            self.assertEqual(1, len(pool._workers))
+        self.assertEqual(0, len(pool._workers))
+
+    def test_pool_executes_compressed_inputs_in_their_own_process(self):
+        input_file = self._write('input.txt.gz', '')
+        with fake_d8(self.tmp_dir, HARNESS_D8), WorkerPool('program.js', []) as pool, \
+                mock.patch('docker_entrypoint._libs.worker_pool.execute_input',
+                           return_value=ProcessResult(code=7)) as execute:
+            task = InputTask(input_file, FALLBACK)
+            self.assertEqual(7, pool.execute(task, True).code)
+            execute.assert_called_once_with(task, True)
+            self.assertEqual(0, len(pool._workers))
+
+    def test_pool_writes_output_files(self):
+        input_file = self._write('input.txt', 'abc')
+        task = InputTask(input_file, FALLBACK, stdout_path=input_file + '.out', stderr_path=input_file + '.err')
+        with fake_d8(self.tmp_dir, HARNESS_D8), WorkerPool('program.js', []) as pool:
+            self._assert_result((0, None, None), pool.execute(task))
+        with open(input_file + '.out') as f:
+            self.assertEqual('ABC', f.read())
+        with open(input_file + '.err') as f:
+            self.assertEqual('log', f.read())
+
+    def test_pool_start_workers(self):
+        input_file = self._write('input.txt', 'abc')
+        with fake_d8(self.tmp_dir, HARNESS_D8), WorkerPool('program.js', []) as pool:
+            self.assertEqual(2, pool.start_workers(2))
+            self._assert_result((0, b'ABC', b'log'), pool.execute(InputTask(input_file, FALLBACK)))
+            # The started workers are reused.
+            self.assertEqual(2, pool.start_workers(1))
+            self.assertEqual(2, len(pool._workers))
+
+        # The fake d8 is still in the temporary directory.
+        with mock.patch.dict(os.environ, {'PATH': os.path.join(self.tmp_dir, 'missing')}), \
+                WorkerPool('program.js', []) as pool:
+            self.assertEqual(0, pool.start_workers(2))
+
+    def test_pool_without_d8(self):
+        with mock.patch.dict(os.environ, {'PATH': self.tmp_dir}), WorkerPool('program.js', []) as pool:
+            self._assert_result((127, b'', b'd8: command not found\n'), pool.execute(InputTask('input.txt', ['d8']), True))
+            self._assert_result((127, b'', b'd8: command not found\n'), pool.execute(InputTask('input.txt', ['d8']), True))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+import subprocess
+import sys
+import unittest
+
+# The recorded budgets of the start of the entrypoint, in seconds. They are a few times the measured values, so only
+# a real regression, like an eager import of a library, goes over them. Before the fast path, the import alone took
+# about 135 ms.
+IMPORT_TIME_BUDGET = 0.05
+VERSION_LATENCY_BUDGET = 0.05
+# The libraries that the trivial paths must not import.
+HEAVY_MODULES = ('on_rails', 'pylity', 'schema', 'argparse', 'docker_entrypoint._libs.commands')
+_MEASUREMENTS = 5
+
+
+def _run_python(source: str) -> str:
+    # A new interpreter is used, because the modules are already imported in the one of the tests.
+    return subprocess.run([sys.executable, '-c', source], check=True, capture_output=True, text=True).stdout
+
+
+class TestStartup(unittest.TestCase):
+    def test_trivial_paths_do_not_import_the_libraries(self):
+        for args in (['--version'], ['bash', '-c', 'exit 3']):
+            output = _run_python("import sys\n"
+                                 "from docker_entrypoint.entrypoint import main\n"
+                                 f"code = main({args!r})\n"
+                                 f"print(code, sorted(name for name in {HEAVY_MODULES!r} if name in sys.modules))\n")
+            self.assertEqual(f"{3 if args[0] == 'bash' else 0} []\n", output)
+
+    def test_import_time_budget(self):
+        import_time = min(self._measure("import docker_entrypoint.entrypoint") for _ in range(_MEASUREMENTS))
+        self.assertLess(import_time, IMPORT_TIME_BUDGET)
+
+    def test_version_latency_budget(self):
+        latency = min(self._measure("from docker_entrypoint.entrypoint import main\nmain(['--version'])")
+                      for _ in range(_MEASUREMENTS))
+        self.assertLess(latency, VERSION_LATENCY_BUDGET)
+
+    @staticmethod
+    def _measure(source: str) -> float:
+        return float(_run_python("import time\n"
+                                 "start = time.perf_counter()\n"
+                                 f"{source}\n"
+                                 "print(time.perf_counter() - start)\n").splitlines()[-1])
+
+
+if __name__ == '__main__':
+    unittest.main()